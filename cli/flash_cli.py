@@ -6,6 +6,7 @@ Provides deploy, flash, erase, and build commands
 import argparse
 import sys
 from pathlib import Path
+from typing import Optional, List, Tuple, Dict
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -13,10 +14,22 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from utils.stm32Programmer.core.programmer import STM32Programmer, STM32Config
 from utils.stm32Programmer.core.deployer import STM32Deployer
 from utils.stm32Programmer.config.settings import SettingsManager
+from utils.stm32Programmer.core.tool_discovery import ToolDiscoveryCache
+from utils.stm32Programmer.core.timing import Timeline
+from utils.stm32Programmer.core.image import ImageCache, ImageFormatError
+from utils.stm32Programmer.core.progress import ProgressCallback
+from utils.stm32Programmer.core.daemon import (
+    DaemonClient, ProgrammerDaemon, DEFAULT_PROBE
+)
+from utils.stm32Programmer.cli.progress_bar import ProgressBar
 
 
-def main():
-    """Main CLI entry point"""
+# Commands a running daemon executes on the CLI's behalf
+DAEMON_COMMANDS = ("flash", "erase", "run", "status", "deploy")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command-line parser shared by the CLI and the daemon"""
     parser = argparse.ArgumentParser(
         description="Unified STM32 Programming Tool - Build, Flash, and Deploy",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -28,14 +41,43 @@ Examples:
   # Flash only (skip build)
   python -m utils.stm32Programmer.cli.flash_cli flash firmware.bin
   
+  # Flash several probes in parallel
+  python -m utils.stm32Programmer.cli.flash_cli flash firmware.bin --probes SN1,SN2
+  
   # Clean, rebuild, and flash
   python -m utils.stm32Programmer.cli.flash_cli deploy ./project --clean
   
   # Erase device
   python -m utils.stm32Programmer.cli.flash_cli erase --full
+  
+  # Dump flash (resumes automatically if interrupted)
+  python -m utils.stm32Programmer.cli.flash_cli dump flash.bin --range 0x08000000:0x20000
+  
+  # Flash through the UART bootloader (BOOT0 high) without STM32CubeProgrammer
+  python -m utils.stm32Programmer.cli.flash_cli flash firmware.bin --port UART --serial-port /dev/ttyUSB0
+  
+  # Same at the fastest baudrate the adapter sustains (remembered per adapter)
+  python -m utils.stm32Programmer.cli.flash_cli flash firmware.bin --port UART --serial-port /dev/ttyUSB0 --baudrate auto
+  
+  # Compare a field dump against the golden image
+  python -m utils.stm32Programmer.cli.flash_cli diff golden.hex field.bin
+  
+  # Keep a warm daemon; flash/erase/status/deploy are forwarded to it
+  python -m utils.stm32Programmer.cli.flash_cli daemon &
         """
     )
     
+    parser.add_argument("--no-progress", action="store_true",
+                        help="Do not draw live progress bars")
+    parser.add_argument("--rescan", action="store_true",
+                        help="Ignore cached tool locations and search again")
+    parser.add_argument("--timings", action="store_true",
+                        help="Print the duration of each phase when done")
+    parser.add_argument("--report", type=Path, metavar="FILE",
+                        help="Write per-phase timings as a JSON run report")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="Run in this process even if a daemon is running")
+    
     subparsers = parser.add_subparsers(dest="command", help="Commands")
     
     # Deploy command (build + flash)
@@ -45,6 +87,8 @@ Examples:
                               help="Project root directory")
     deploy_parser.add_argument("--port", default="SWD", 
                               help="Connection port (default: SWD)")
+    _add_swd_argument(deploy_parser)
+    _add_uart_arguments(deploy_parser)
     deploy_parser.add_argument("--chip", default="STM32F103C8", 
                               help="Target chip (default: STM32F103C8)")
     deploy_parser.add_argument("--no-build", action="store_true", 
@@ -56,6 +100,15 @@ Examples:
                               help="Build configuration (default: Debug)")
     deploy_parser.add_argument("--no-verify", action="store_true", 
                               help="Skip verification after flashing")
+    deploy_parser.add_argument("--verify-mode", default="tool",
+                              choices=["tool", "crc", "readback"],
+                              help="tool: programmer read-back; crc: device CRC "
+                                   "(read-back fallback); readback: chunked host compare")
+    deploy_parser.add_argument("--no-cache", action="store_true", 
+                              help="Always build, ignoring cached artifacts")
+    deploy_parser.add_argument("--trim", action="store_true", 
+                              help="Skip writing 0xFF padding over erased sectors")
+    _add_size_arguments(deploy_parser)
     
     # Flash command
     flash_parser = subparsers.add_parser("flash", 
@@ -64,6 +117,8 @@ Examples:
                              help="Binary file to flash (.bin, .hex, .elf)")
     flash_parser.add_argument("--port", default="SWD", 
                              help="Connection port (default: SWD)")
+    _add_swd_argument(flash_parser)
+    _add_uart_arguments(flash_parser)
     flash_parser.add_argument("--chip", default="STM32F103C8", 
                              help="Target chip (default: STM32F103C8)")
     flash_parser.add_argument("--address", type=lambda x: int(x, 0), 
@@ -71,16 +126,143 @@ Examples:
                              help="Flash start address (default: 0x08000000)")
     flash_parser.add_argument("--no-verify", action="store_true", 
                              help="Skip verification")
+    flash_parser.add_argument("--verify-mode", default="tool",
+                             choices=["tool", "crc", "readback"],
+                             help="tool: programmer read-back; crc: device CRC "
+                                  "(read-back fallback); readback: chunked host compare")
+    flash_parser.add_argument("--diff", action="store_true", 
+                             help="Only write flash sectors that changed")
+    flash_parser.add_argument("--readback", action="store_true", 
+                             help="With --diff, compare against a read-back of the "
+                                  "device instead of the sector digest cache")
+    flash_parser.add_argument("--erase", action="store_true", 
+                             help="Erase the sectors the image spans before writing")
+    flash_parser.add_argument("--trim", action="store_true", 
+                             help="Skip writing 0xFF padding over erased sectors")
+    flash_parser.add_argument("--probes", 
+                             help="Comma-separated probe serials to flash in parallel")
+    flash_parser.add_argument("--jobs", type=int, 
+                             help="Max devices flashed concurrently (default: all)")
+    flash_parser.add_argument("--inject", type=Path, metavar="TEMPLATE",
+                             help="Patch a per-unit record (.toml/.json template) into the image")
+    flash_parser.add_argument("--set", dest="values", action="append", 
+                             type=_name_value, metavar="NAME=VALUE",
+                             help="Value of an --inject template field (repeatable)")
+    flash_parser.add_argument("--base-programmed", action="store_true", 
+                             help="With --inject: device holds the image, rewrite only the record's sectors")
     
     # Erase command
     erase_parser = subparsers.add_parser("erase", 
                                         help="Erase device flash memory")
     erase_parser.add_argument("--port", default="SWD", 
                              help="Connection port (default: SWD)")
+    _add_swd_argument(erase_parser)
+    _add_uart_arguments(erase_parser)
     erase_parser.add_argument("--chip", default="STM32F103C8", 
                              help="Target chip (default: STM32F103C8)")
-    erase_parser.add_argument("--full", action="store_true", 
+    erase_target = erase_parser.add_mutually_exclusive_group()
+    erase_target.add_argument("--full", action="store_true", 
                              help="Full chip erase (default: mass erase)")
+    erase_target.add_argument("--range", dest="ranges", action="append", 
+                             type=_address_range, metavar="ADDRESS:SIZE",
+                             help="Erase only the sectors covering this range (repeatable)")
+    erase_target.add_argument("--image", type=Path, 
+                             help="Erase only the sectors this image occupies")
+    erase_parser.add_argument("--address", type=lambda x: int(x, 0), 
+                             help="Load address of a .bin --image (default: 0x08000000)")
+    
+    # Run command
+    run_parser = subparsers.add_parser("run", 
+                                      help="Run a manifest of erase/write/option-byte/reset "
+                                           "steps in one connection")
+    run_parser.add_argument("manifest", type=Path, 
+                           help="Manifest file (.toml or .json)")
+    run_parser.add_argument("--port", default="SWD", 
+                           help="Connection port (default: SWD)")
+    _add_swd_argument(run_parser)
+    _add_uart_arguments(run_parser)
+    run_parser.add_argument("--chip", 
+                           help="Target chip (default: the manifest's chip, else STM32F103C8)")
+    run_parser.add_argument("--no-verify", action="store_true", 
+                           help="Skip verification of every write step")
+    run_parser.add_argument("--verify-mode", default="tool",
+                           choices=["tool", "crc", "readback"],
+                           help="tool: programmer read-back; crc: device CRC "
+                                "(read-back fallback); readback: chunked host compare")
+    
+    # Production command
+    production_parser = subparsers.add_parser("production", 
+                                             help="Program unit after unit as they are attached")
+    production_parser.add_argument("binary", type=Path, 
+                                  help="Binary file programmed into every unit")
+    production_parser.add_argument("--port", default="SWD", 
+                                  help="Connection port (default: SWD)")
+    _add_swd_argument(production_parser)
+    _add_uart_arguments(production_parser)
+    production_parser.add_argument("--chip", default="STM32F103C8", 
+                                  help="Target chip (default: STM32F103C8)")
+    production_parser.add_argument("--address", type=lambda x: int(x, 0), 
+                                  default=0x08000000,
+                                  help="Flash start address (default: 0x08000000)")
+    production_parser.add_argument("--no-verify", action="store_true", 
+                                  help="Skip verification")
+    production_parser.add_argument("--units", type=int, 
+                                  help="Stop after this many units (default: until Ctrl+C)")
+    production_parser.add_argument("--log", type=Path, 
+                                  help="Append one JSON record per unit to this file")
+    production_parser.add_argument("--serial-format", default="{:06d}", 
+                                  help="Serial pattern for the unit number (default: {:06d})")
+    production_parser.add_argument("--first-serial", type=int, 
+                                  help="First unit number (default: continue the log, else 1)")
+    production_parser.add_argument("--poll", type=float, default=0.5, 
+                                  help="Seconds between attach/detach checks (default: 0.5)")
+    production_parser.add_argument("--verbose", action="store_true", 
+                                  help="Show the programmer output of every unit")
+    production_parser.add_argument("--inject", type=Path, metavar="TEMPLATE",
+                                  help="Patch a per-unit record into every unit "
+                                       "(serial/unit fields are filled in)")
+    production_parser.add_argument("--set", dest="values", action="append", 
+                                  type=_name_value, metavar="NAME=VALUE",
+                                  help="Value of an --inject template field (repeatable)")
+    production_parser.add_argument("--base-programmed", action="store_true", 
+                                  help="With --inject: units hold the image, rewrite only the record's sectors")
+    
+    # Dump command
+    dump_parser = subparsers.add_parser("dump", 
+                                       help="Read device memory to a file")
+    dump_parser.add_argument("output", type=Path, 
+                            help="Output file")
+    dump_parser.add_argument("--range", dest="ranges", action="append", 
+                            type=_address_range, metavar="ADDRESS:SIZE",
+                            help="Range to read (repeatable; default: "
+                                 "0x08000000:0x10000). Ranges are concatenated in order")
+    dump_parser.add_argument("--port", default="SWD", 
+                            help="Connection port (default: SWD)")
+    _add_swd_argument(dump_parser)
+    _add_uart_arguments(dump_parser)
+    dump_parser.add_argument("--chip", default="STM32F103C8", 
+                            help="Target chip (default: STM32F103C8)")
+    dump_parser.add_argument("--chunk-size", type=lambda x: int(x, 0), 
+                            default=16 * 1024,
+                            help="Bytes per checkpointed block (default: 16384)")
+    dump_parser.add_argument("--no-resume", action="store_true", 
+                            help="Ignore an existing checkpoint and start over")
+    
+    # Diff command
+    diff_parser = subparsers.add_parser("diff", 
+                                       help="Compare two dumps or images")
+    diff_parser.add_argument("reference", type=Path, 
+                            help="Reference dump or image (e.g. golden firmware)")
+    diff_parser.add_argument("candidate", type=Path, 
+                            help="Dump or image to check")
+    diff_parser.add_argument("--chip", default="STM32F103C8", 
+                            help="Chip whose sector layout is used (default: STM32F103C8)")
+    diff_parser.add_argument("--address", type=lambda x: int(x, 0), 
+                            help="Load address of .bin files (default: 0x08000000)")
+    diff_parser.add_argument("--hashes", action="store_true", 
+                            help="List the digest of every sector")
+    diff_parser.add_argument("--json", type=Path, metavar="FILE",
+                            help="Write the full report as JSON")
     
     # Build command
     build_parser = subparsers.add_parser("build", 
@@ -92,6 +274,52 @@ Examples:
     build_parser.add_argument("--config", default="Debug", 
                              choices=["Debug", "Release"],
                              help="Build configuration (default: Debug)")
+    _add_size_arguments(build_parser)
+    
+    # Build-all command
+    build_all_parser = subparsers.add_parser("build-all", 
+                                            help="Build several projects/configurations concurrently")
+    build_all_parser.add_argument("projects", type=Path, nargs="+", metavar="project",
+                                 help="Project root directories")
+    build_all_parser.add_argument("--config", dest="configs", action="append",
+                                 choices=["Debug", "Release"],
+                                 help="Build configuration, repeatable (default: Debug)")
+    build_all_parser.add_argument("-j", "--jobs", type=int, 
+                                 help="make jobs shared by all builds (default: CPU count)")
+    build_all_parser.add_argument("--max-parallel", type=int, 
+                                 help="Builds running at once (default: --jobs)")
+    build_all_parser.add_argument("--fail-fast", action="store_true", 
+                                 help="Stop all builds on the first failure")
+    build_all_parser.add_argument("--output", default="prefix", 
+                                 choices=["prefix", "grouped", "quiet"],
+                                 help="prefix: stream tagged lines, grouped: print each "
+                                      "build when done, quiet: summary only (default: prefix)")
+    build_all_parser.add_argument("--log-dir", type=Path, 
+                                 help="Write each build's output to DIR/<project>-<config>.log")
+    build_all_parser.add_argument("--clean", action="store_true", 
+                                 help="Clean before building")
+    build_all_parser.add_argument("--json", type=Path, metavar="FILE",
+                                 help="Write per-build results as JSON")
+    
+    # Size command
+    size_parser = subparsers.add_parser("size", 
+                                       help="Flash/RAM usage by section, object and symbol")
+    size_parser.add_argument("target", type=Path, 
+                            help="Linker .map file, .elf file or project directory")
+    size_parser.add_argument("--config", default="Debug", 
+                            choices=["Debug", "Release"],
+                            help="Build configuration of a project (default: Debug)")
+    size_parser.add_argument("--top", type=int, default=20, 
+                            help="Objects and symbols listed (default: 20)")
+    _add_size_arguments(size_parser)
+    
+    # Chip command
+    chip_parser = subparsers.add_parser("chip", 
+                                       help="Show a part's flash geometry from the chip database")
+    chip_parser.add_argument("part", 
+                            help="Part number (e.g. STM32G474RE)")
+    chip_parser.add_argument("--sectors", action="store_true", 
+                            help="List every sector")
     
     # Status command
     status_parser = subparsers.add_parser("status", 
@@ -100,6 +328,7 @@ Examples:
                               help="Project root directory (optional)")
     status_parser.add_argument("--port", default="SWD", 
                               help="Connection port (default: SWD)")
+    _add_uart_arguments(status_parser)
     
     # Settings command
     settings_parser = subparsers.add_parser("settings", 
@@ -110,30 +339,131 @@ Examples:
                                 help="Reset to defaults")
     settings_parser.add_argument("--set", nargs=2, metavar=("KEY", "VALUE"),
                                 help="Set a configuration value")
+    settings_parser.set_defaults(print_help=settings_parser.print_help)
     
-    args = parser.parse_args()
+    # Daemon command
+    daemon_parser = subparsers.add_parser("daemon", 
+                                         help="Serve commands from a warm background process")
+    daemon_parser.add_argument("--socket", type=Path, 
+                              help="Socket path (default: $STM32PROG_SOCKET or "
+                                   "~/.stm32programmer/daemon.sock)")
+    daemon_parser.add_argument("--status", action="store_true", 
+                              help="Show whether a daemon is running and its queues")
+    daemon_parser.add_argument("--stop", action="store_true", 
+                              help="Stop the running daemon")
+    
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main CLI entry point"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    parser = build_parser()
+    args = parser.parse_args(argv)
     
     if not args.command:
         parser.print_help()
         return 1
     
-    # Load settings
-    settings_mgr = SettingsManager()
+    progress = None if args.no_progress else ProgressBar()
+    try:
+        if args.command == "daemon":
+            return run_daemon(args)
+        
+        if args.command in DAEMON_COMMANDS and not args.no_daemon:
+            code = DaemonClient().run(argv, probes=_probe_keys(args),
+                                      progress=progress)
+            if code is not None:
+                return code
+        
+        timeline = Timeline() if args.timings or args.report else None
+        return run_command(args, progress, timeline)
+    except KeyboardInterrupt:
+        print("\n\n[INFO] Operation cancelled by user")
+        return 130
+    finally:
+        if progress is not None:
+            progress.finish()
+
+
+def _programmer(config: STM32Config, progress: Optional[ProgressCallback] = None,
+                timeline: Optional[Timeline] = None,
+                image_cache: Optional[ImageCache] = None,
+                tools: Optional[Dict[tuple, STM32Programmer]] = None) -> STM32Programmer:
+    """
+    Programmer for config, reusing the tools located for an earlier command
+    
+    Args:
+        config: Programming configuration
+        progress: Progress callback for tool output
+        timeline: Timeline recording phase timings (None: not recorded)
+        image_cache: Cache serving parsed firmware images
+        tools: Programmers by STM32Programmer.tool_key() whose discovered
+            tools are reused; new ones are added (None: always discover)
+    
+    Returns:
+        STM32Programmer instance
+    """
+    key = STM32Programmer.tool_key(config)
+    known = tools.get(key) if tools is not None else None
+    if known is not None:
+        return known.for_config(config, progress, timeline, image_cache)
+    programmer = STM32Programmer(config, progress, timeline=timeline,
+                                 image_cache=image_cache)
+    if tools is not None:
+        tools.setdefault(key, programmer)
+    return programmer
+
+
+def run_command(args: argparse.Namespace,
+                progress: Optional[ProgressCallback] = None,
+                timeline: Optional[Timeline] = None,
+                image_cache: Optional[ImageCache] = None,
+                openocd_session: bool = False,
+                tools: Optional[Dict[tuple, STM32Programmer]] = None) -> int:
+    """
+    Execute one parsed command
+    
+    Args:
+        args: Parsed command line
+        progress: Progress callback for tool output
+        timeline: Timeline recording phase timings (None: not recorded)
+        image_cache: Cache serving parsed firmware images
+        openocd_session: Keep OpenOCD running between commands
+        tools: Programmers of earlier commands whose located tools are
+            reused (see _programmer())
+    
+    Returns:
+        Process exit code
+    """
+    if args.rescan:
+        ToolDiscoveryCache().clear()
+        if tools is not None:
+            tools.clear()
     
-    # Execute command
     try:
         if args.command == "deploy":
             config = STM32Config(
                 port=args.port,
                 chip=args.chip,
-                verify=not args.no_verify
+                verify=not args.no_verify,
+                verify_mode=args.verify_mode,
+                openocd_session=openocd_session,
+                trim_erased=args.trim,
+                swd_frequency=args.swd_freq,
+                **_uart_options(args)
             )
-            deployer = STM32Deployer(args.project, config)
+            deployer = STM32Deployer(args.project, config, progress,
+                                     timeline=timeline,
+                                     programmer=_programmer(config, progress, timeline,
+                                                            image_cache, tools))
             success = deployer.deploy(
                 build=not args.no_build,
                 clean=args.clean,
                 build_config=args.config,
-                verify=not args.no_verify
+                verify=not args.no_verify,
+                use_cache=not args.no_cache,
+                size_gate=_size_gate(args)
             )
         
         elif args.command == "flash":
@@ -141,25 +471,196 @@ Examples:
                 port=args.port,
                 chip=args.chip,
                 flash_start=args.address,
-                verify=not args.no_verify
+                verify=not args.no_verify,
+                verify_mode=args.verify_mode,
+                openocd_session=openocd_session,
+                trim_erased=args.trim,
+                diff_readback=args.readback,
+                swd_frequency=args.swd_freq,
+                **_uart_options(args)
             )
-            programmer = STM32Programmer(config)
-            success = programmer.flash(args.binary)
+            programmer = _programmer(config, timeline=timeline,
+                                     image_cache=image_cache, tools=tools)
+            if args.inject:
+                if args.probes or args.diff or args.erase:
+                    print("[ERROR] --inject cannot be combined with --probes, --diff or --erase")
+                    return 1
+                programmer.progress_callback = progress
+                success = programmer.flash_injected(
+                    args.binary, args.inject, dict(args.values or []),
+                    base_programmed=args.base_programmed)
+            elif args.probes:
+                from utils.stm32Programmer.core.gang import GangProgrammer
+                serials = [sn.strip() for sn in args.probes.split(",") if sn.strip()]
+                gang = GangProgrammer(programmer, serials, max_workers=args.jobs)
+                results = gang.flash(args.binary, diff=args.diff)
+                success = all(r.success for r in results)
+            else:
+                programmer.progress_callback = progress
+                success = programmer.flash(args.binary, diff=args.diff,
+                                           erase=args.erase)
         
         elif args.command == "erase":
-            config = STM32Config(port=args.port, chip=args.chip)
-            programmer = STM32Programmer(config)
-            success = programmer.erase(full=args.full)
+            config = STM32Config(port=args.port, chip=args.chip,
+                                 openocd_session=openocd_session,
+                                 swd_frequency=args.swd_freq,
+                                 **_uart_options(args))
+            programmer = _programmer(config, progress, timeline, tools=tools)
+            plan = None
+            if args.image:
+                try:
+                    image = programmer.load_image(args.image, args.address)
+                except (OSError, ImageFormatError) as e:
+                    print(f"[ERROR] Cannot load image {args.image.name}: {e}")
+                    return 1
+                plan = programmer.erase_plan(image=image)
+            elif args.ranges:
+                plan = programmer.erase_plan(ranges=args.ranges)
+            if (args.image or args.ranges) and plan is None:
+                print(f"[ERROR] Cannot erase sectors: the sector layout of "
+                      f"{args.chip} is unknown")
+                return 1
+            success = programmer.erase(full=args.full, plan=plan)
+        
+        elif args.command == "run":
+            from utils.stm32Programmer.core.manifest import Manifest, ManifestError
+            try:
+                manifest = Manifest.load(args.manifest)
+            except ManifestError as e:
+                print(f"[ERROR] ✗ {e}")
+                return 1
+            config = STM32Config(
+                port=args.port,
+                chip=args.chip or manifest.chip or "STM32F103C8",
+                verify_mode=args.verify_mode,
+                openocd_session=openocd_session,
+                swd_frequency=args.swd_freq,
+                **_uart_options(args)
+            )
+            programmer = _programmer(config, progress, timeline, image_cache, tools)
+            success = programmer.run_manifest(
+                manifest, verify=False if args.no_verify else None)
+        
+        elif args.command == "production":
+            from utils.stm32Programmer.core.production import ProductionLine
+            config = STM32Config(
+                port=args.port,
+                chip=args.chip,
+                flash_start=args.address,
+                verify=not args.no_verify,
+                swd_frequency=args.swd_freq,
+                **_uart_options(args)
+            )
+            programmer = _programmer(config, timeline=timeline,
+                                     image_cache=image_cache, tools=tools)
+            line = ProductionLine(programmer, args.binary, log_path=args.log,
+                                  serial_format=args.serial_format,
+                                  first_serial=args.first_serial,
+                                  poll_interval=args.poll, quiet=not args.verbose,
+                                  template=args.inject,
+                                  values=dict(args.values or []),
+                                  base_programmed=args.base_programmed)
+            stats = line.run(args.units)
+            success = stats.units > 0 and stats.failed == 0
+        
+        elif args.command == "dump":
+            from utils.stm32Programmer.core.dump import MemoryDumper
+            ranges = args.ranges or [(0x08000000, 0x10000)]
+            config = STM32Config(port=args.port, chip=args.chip,
+                                 swd_frequency=args.swd_freq,
+                                 **_uart_options(args))
+            programmer = _programmer(config, progress, timeline, tools=tools)
+            dumper = MemoryDumper(programmer, chunk_size=args.chunk_size)
+            success = dumper.dump(ranges, args.output,
+                                  resume=not args.no_resume).success
+        
+        elif args.command == "diff":
+            from utils.stm32Programmer.core.memdiff import MemoryComparator
+            comparator = MemoryComparator.for_chip(args.chip)
+            report = comparator.compare(args.reference, args.candidate, args.address)
+            for sector in report.sectors:
+                if sector.identical and not args.hashes:
+                    continue
+                status = "same" if sector.identical else f"{sector.bytes_differing} bytes differ"
+                print(f"  sector {sector.index:4d} {hex(sector.address)}: {status}")
+                for lo, hi in sector.ranges:
+                    print(f"      {hex(lo)}-{hex(hi)} ({hi - lo} bytes)")
+                if args.hashes:
+                    print(f"      {sector.digest_a[:16]} {sector.digest_b[:16]}")
+            if args.json:
+                import json
+                args.json.write_text(json.dumps(report.to_dict(), indent=2))
+            print(f"[INFO] {report.summary()}")
+            success = report.identical
         
         elif args.command == "build":
             from utils.stm32Programmer.core.builder import STM32Builder
-            builder = STM32Builder(args.project)
+            builder = STM32Builder(args.project, progress, timeline=timeline)
             success = builder.build(clean=args.clean, config=args.config)
+            gate = _size_gate(args)
+            if success and gate is not None:
+                success = builder.check_size(gate, args.config)
+        
+        elif args.command == "build-all":
+            from utils.stm32Programmer.core.build_scheduler import BuildScheduler
+            missing = [p for p in args.projects if not p.is_dir()]
+            if missing:
+                print(f"[ERROR] Project directory not found: {missing[0]}")
+                return 1
+            scheduler = BuildScheduler.matrix(
+                args.projects, args.configs or ["Debug"], args.clean,
+                budget=args.jobs, max_parallel=args.max_parallel,
+                fail_fast=args.fail_fast, output=args.output,
+                log_dir=args.log_dir, timeline=timeline)
+            report = scheduler.run()
+            if args.json:
+                import json
+                args.json.write_text(json.dumps(report.to_dict(), indent=2))
+            success = report.success
+        
+        elif args.command == "size":
+            from utils.stm32Programmer.core.memory_map import MemoryMap
+            if args.target.is_dir():
+                from utils.stm32Programmer.core.builder import STM32Builder
+                usage = STM32Builder(args.target).memory_usage(args.config)
+            else:
+                usage = MemoryMap.load(args.target)
+            if usage is None:
+                print(f"[ERROR] No .map or .elf file found for {args.target}")
+                return 1
+            print(usage.format_report(args.top))
+            print(f"\n[INFO] {usage.summary()}")
+            gate = _size_gate(args)
+            if gate is not None:
+                report = gate.check(usage)
+                if report.totals:
+                    print(report.format_report())
+                for violation in report.violations:
+                    print(f"[ERROR] ✗ Size limit: {violation}")
+                success = report.success
+            else:
+                success = True
+        
+        elif args.command == "chip":
+            from utils.stm32Programmer.core.chip_db import lookup_chip
+            info = lookup_chip(args.part)
+            if info is None:
+                print(f"[ERROR] {args.part} is not in the chip database")
+                success = False
+            else:
+                print(f"[INFO] {info.describe()}")
+                if args.sectors:
+                    layout = info.layout()
+                    for index, start, size in layout.sectors():
+                        print(f"  sector {index:4d} {hex(start)} {size:7d} bytes"
+                              f"  bank {layout.bank_of(start)}")
+                success = True
         
         elif args.command == "status":
             if args.project:
-                config = STM32Config(port=args.port)
-                deployer = STM32Deployer(args.project, config)
+                config = STM32Config(port=args.port, **_uart_options(args))
+                deployer = STM32Deployer(args.project, config,
+                                         programmer=_programmer(config, tools=tools))
                 status = deployer.get_status()
                 
                 print("\n" + "="*60)
@@ -171,14 +672,19 @@ Examples:
                 if status['build']['binary_found']:
                     print(f"Binary Path: {status['build']['binary_path']}")
                     print(f"Binary Size: {status['build']['binary_size']} bytes")
+                    for name, region in status['build'].get('memory_regions', {}).items():
+                        print(f"{name}: {region['used']}/{region['size']} bytes "
+                              f"({region['percent']}%)")
                 print(f"\nProgrammer: {status['programmer']['tool']}")
+                if status['programmer']['version']:
+                    print(f"Version: {status['programmer']['version']}")
                 print(f"Port: {status['programmer']['port']}")
                 print(f"Chip: {status['programmer']['chip']}")
                 print(f"\nDevice: {status['device']['status']}")
                 print("="*60 + "\n")
             else:
-                config = STM32Config(port=args.port)
-                programmer = STM32Programmer(config)
+                config = STM32Config(port=args.port, **_uart_options(args))
+                programmer = _programmer(config, tools=tools)
                 info = programmer.get_device_info()
                 if info:
                     print(f"\nDevice Info:\n{info['output']}")
@@ -188,6 +694,7 @@ Examples:
             success = True
         
         elif args.command == "settings":
+            settings_mgr = SettingsManager()
             if args.show:
                 print("\n" + "="*60)
                 print("  STM32 Programmer Settings")
@@ -210,10 +717,10 @@ Examples:
                 else:
                     print(f"[ERROR] Failed to update setting")
             else:
-                settings_parser.print_help()
+                args.print_help()
                 success = True
         else:
-            parser.print_help()
+            print(f"[ERROR] Unknown command: {args.command}")
             success = False
         
         return 0 if success else 1
@@ -226,6 +733,161 @@ Examples:
         import traceback
         traceback.print_exc()
         return 1
+    finally:
+        if timeline is not None:
+            if args.timings:
+                print("\n" + timeline.format_table())
+            if args.report and timeline.save(args.report):
+                print(f"[INFO] Run report written to {args.report}")
+
+
+def _add_size_arguments(parser: argparse.ArgumentParser) -> None:
+    """Size regression options shared by build, deploy and size"""
+    parser.add_argument("--size-baseline", type=Path, metavar="FILE",
+                        help="Compare flash/RAM usage with this JSON baseline "
+                             "(created if missing)")
+    parser.add_argument("--max-growth", type=float, default=2.0, metavar="PERCENT",
+                        help="Fail when flash, RAM or a region grew more (default: 2.0)")
+    parser.add_argument("--max-growth-bytes", type=int, metavar="BYTES",
+                        help="Also fail when growth exceeds this many bytes")
+    parser.add_argument("--update-baseline", action="store_true", 
+                        help="Accept the current sizes as the new baseline")
+
+
+def _add_swd_argument(parser: argparse.ArgumentParser) -> None:
+    """SWD clock option shared by the commands that talk to a probe"""
+    parser.add_argument("--swd-freq", type=_swd_frequency, metavar="KHZ|auto|retune",
+                        help="SWD clock in kHz; auto: fastest stable clock remembered "
+                             "per probe and chip, retune: search again from the top "
+                             "(default: tool default)")
+
+
+def _add_uart_arguments(parser: argparse.ArgumentParser) -> None:
+    """Serial options of --port UART"""
+    parser.add_argument("--serial-port", metavar="DEVICE",
+                        help="Serial device of the UART bootloader (e.g. /dev/ttyUSB0)")
+    parser.add_argument("--baudrate", type=_baudrate, default=115200,
+                        metavar="BAUD|auto|retune",
+                        help="UART bootloader baudrate; auto: fastest reliable rate "
+                             "remembered per adapter and chip, retune: search again "
+                             "from the top (default: 115200)")
+    parser.add_argument("--native-uart", action="store_true",
+                        help="Use the built-in UART bootloader client even if "
+                             "STM32CubeProgrammer is installed")
+
+
+def _uart_options(args: argparse.Namespace) -> dict:
+    """STM32Config fields of the UART options"""
+    return {"serial_port": args.serial_port, "baudrate": args.baudrate,
+            "native_uart": args.native_uart}
+
+
+def _baudrate(text: str):
+    """Parse a --baudrate argument"""
+    if text in ("auto", "retune"):
+        return text
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"expected baud, auto or retune, got {text!r}")
+    return value
+
+
+def _swd_frequency(text: str):
+    """Parse a --swd-freq argument"""
+    if text in ("auto", "retune"):
+        return text
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"expected kHz, auto or retune, got {text!r}")
+    return value
+
+
+def _size_gate(args: argparse.Namespace):
+    """SizeGate for --size-baseline, or None"""
+    if not args.size_baseline:
+        return None
+    from utils.stm32Programmer.core.memory_map import SizeGate
+    return SizeGate(args.size_baseline, args.max_growth, args.max_growth_bytes,
+                    args.update_baseline)
+
+
+def _address_range(text: str) -> Tuple[int, int]:
+    """Parse an ADDRESS:SIZE argument"""
+    address, sep, size = text.partition(":")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected ADDRESS:SIZE, got {text!r}")
+    try:
+        start, length = int(address, 0), int(size, 0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number in {text!r}") from None
+    if start < 0 or length <= 0:
+        raise argparse.ArgumentTypeError(f"expected ADDRESS >= 0 and SIZE > 0, got {text!r}")
+    return start, length
+
+
+def _name_value(text: str) -> Tuple[str, str]:
+    """Parse a NAME=VALUE argument"""
+    name, sep, value = text.partition("=")
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    return name.strip(), value
+
+
+def _probe_keys(args: argparse.Namespace) -> List[str]:
+    """Probes a command needs exclusively while it runs in the daemon"""
+    if getattr(args, "probes", None):
+        return [sn.strip() for sn in args.probes.split(",") if sn.strip()]
+    if getattr(args, "serial_port", None):
+        return [args.serial_port]
+    return [DEFAULT_PROBE]
+
+
+def run_daemon(args: argparse.Namespace) -> int:
+    """Start, stop or query the daemon"""
+    client = DaemonClient(args.socket)
+    if args.stop:
+        if not client.stop():
+            print("[INFO] No daemon running")
+            return 1
+        print("[SUCCESS] ✓ Daemon stopped")
+        return 0
+    
+    if args.status:
+        status = client.ping()
+        if status is None:
+            print("[INFO] No daemon running")
+            return 1
+        print(f"[INFO] Daemon pid {status['pid']} on {status['socket']}, "
+              f"up {status['uptime']:.0f}s, {status['served']} requests served, "
+              f"{status.get('images', 0)} images cached")
+        for probe, queue in sorted(status["probes"].items()):
+            print(f"  {probe:<26} running {queue['running']}  waiting {queue['waiting']}")
+        return 0
+    
+    image_cache = ImageCache()
+    tools: Dict[tuple, STM32Programmer] = {}  # Located tools, kept across requests
+    parser = build_parser()
+    
+    def handle(argv: List[str], cwd: Path,
+               progress: Optional[ProgressCallback]) -> int:
+        args = parser.parse_args(argv)
+        # Paths are relative to the client's working directory
+        for name, value in vars(args).items():
+            if isinstance(value, Path) and not value.is_absolute():
+                setattr(args, name, cwd / value)
+        timeline = Timeline() if args.timings or args.report else None
+        return run_command(args, progress, timeline, image_cache=image_cache,
+                           openocd_session=True, tools=tools)
+    
+    daemon = ProgrammerDaemon(handle, args.socket)
+    daemon.status_hooks.append(lambda: {"images": len(image_cache)})
+    return 0 if daemon.serve_forever() else 1
 
 
 if __name__ == "__main__":
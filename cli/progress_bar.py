@@ -0,0 +1,89 @@
+"""
+Progress Bar - Live terminal rendering of ProgressEvents
+"""
+
+import sys
+import threading
+from typing import Optional, TextIO
+
+from utils.stm32Programmer.core.progress import ProgressEvent
+
+
+def _format_rate(rate: Optional[float]) -> str:
+    """Human readable transfer rate"""
+    if not rate:
+        return ""
+    if rate >= 1024 * 1024:
+        return f"{rate / (1024 * 1024):.2f} MB/s"
+    return f"{rate / 1024:.1f} KB/s"
+
+
+class ProgressBar:
+    """ProgressEvent callback that draws a single updating progress line"""
+
+    def __init__(self, stream: Optional[TextIO] = None, width: int = 30):
+        """
+        Initialize progress bar
+
+        Args:
+            stream: Output stream (default: sys.stdout at render time)
+            width: Bar width in characters
+        """
+        self._stream = stream
+        self.width = width
+        self._active = False
+        self._operation = None
+        self._lock = threading.Lock()
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream or sys.stdout
+
+    def _interactive(self) -> bool:
+        isatty = getattr(self.stream, "isatty", None)
+        return bool(isatty and isatty())
+
+    def __call__(self, event: ProgressEvent) -> None:
+        with self._lock:
+            if self._interactive():
+                self._draw(event)
+            elif event.done:
+                # Logs and pipes get one line per finished phase
+                self.stream.write(self._describe(event) + "\n")
+                self.stream.flush()
+
+    def _describe(self, event: ProgressEvent) -> str:
+        parts = [f"{event.operation:<8}"]
+        if event.percent is not None:
+            filled = int(self.width * event.percent / 100)
+            parts.append(f"[{'#' * filled}{'-' * (self.width - filled)}] "
+                         f"{event.percent:5.1f}%")
+        elif event.message:
+            parts.append(event.message[:self.width + 8])
+        if event.bytes_done is not None:
+            size = f"{event.bytes_done}"
+            if event.total_bytes:
+                size += f"/{event.total_bytes}"
+            parts.append(f"{size} bytes")
+        rate = _format_rate(event.rate)
+        if rate:
+            parts.append(rate)
+        return "  ".join(parts)
+
+    def _draw(self, event: ProgressEvent) -> None:
+        if self._active and event.operation != self._operation:
+            self.stream.write("\n")
+        self._operation = event.operation
+        self.stream.write("\r\033[K" + self._describe(event))
+        self._active = not event.done
+        if event.done:
+            self.stream.write("\n")
+        self.stream.flush()
+
+    def finish(self) -> None:
+        """End an unfinished bar line so later output starts cleanly"""
+        with self._lock:
+            if self._active:
+                self.stream.write("\n")
+                self.stream.flush()
+                self._active = False
@@ -4,9 +4,13 @@ Handles settings persistence and defaults
 """
 
 import json
+import threading
 from pathlib import Path
 from typing import Optional, Dict, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
+
+# Serializes read-modify-write updates of the settings file
+_update_lock = threading.Lock()
 
 
 @dataclass
@@ -21,6 +25,10 @@ class ProgrammerSettings:
     auto_reset: bool = True
     build_before_flash: bool = True
     clean_before_build: bool = False
+    # Fastest stable SWD clock in kHz per "<probe serial>/<chip>"
+    swd_frequencies: Dict[str, int] = field(default_factory=dict)
+    # Fastest reliable UART bootloader baudrate per "<serial adapter>/<chip>"
+    uart_baudrates: Dict[str, int] = field(default_factory=dict)
 
 
 class SettingsManager:
@@ -91,6 +99,70 @@ class SettingsManager:
         
         return self.save()
     
+    def swd_frequency(self, probe_serial: Optional[str], chip: str) -> Optional[int]:
+        """
+        Remembered SWD clock for a probe and chip
+        
+        Args:
+            probe_serial: Probe serial number (None: the only probe)
+            chip: Chip part number
+        
+        Returns:
+            Frequency in kHz, or None if never tuned
+        """
+        return self.settings.swd_frequencies.get(_device_key(probe_serial, chip))
+    
+    def remember_swd_frequency(self, probe_serial: Optional[str], chip: str,
+                               freq_khz: int) -> bool:
+        """
+        Store the fastest stable SWD clock for a probe and chip
+        
+        The file is re-read first so concurrent programmers (gang mode,
+        other processes) do not drop each other's entries.
+        
+        Args:
+            probe_serial: Probe serial number (None: the only probe)
+            chip: Chip part number
+            freq_khz: Frequency in kHz
+        
+        Returns:
+            True if successful
+        """
+        with _update_lock:
+            self.settings = self.load()
+            self.settings.swd_frequencies[_device_key(probe_serial, chip)] = freq_khz
+            return self.save()
+    
+    def uart_baudrate(self, adapter: str, chip: str) -> Optional[int]:
+        """
+        Remembered UART bootloader baudrate for a serial adapter and chip
+        
+        Args:
+            adapter: Serial adapter identifier (see uart_tuning.adapter_id)
+            chip: Chip part number
+        
+        Returns:
+            Baudrate, or None if never negotiated
+        """
+        return self.settings.uart_baudrates.get(_device_key(adapter, chip))
+    
+    def remember_uart_baudrate(self, adapter: str, chip: str, baudrate: int) -> bool:
+        """
+        Store the fastest reliable UART bootloader baudrate for an adapter and chip
+        
+        Args:
+            adapter: Serial adapter identifier (see uart_tuning.adapter_id)
+            chip: Chip part number
+            baudrate: Line rate in baud
+        
+        Returns:
+            True if successful
+        """
+        with _update_lock:
+            self.settings = self.load()
+            self.settings.uart_baudrates[_device_key(adapter, chip)] = baudrate
+            return self.save()
+    
     def reset_to_defaults(self) -> bool:
         """
         Reset settings to defaults
@@ -121,3 +193,7 @@ class SettingsManager:
             Dictionary of settings
         """
         return asdict(self.settings)
+
+
+def _device_key(probe_serial: Optional[str], chip: str) -> str:
+    return f"{probe_serial or 'default'}/{chip.upper()}"
@@ -3,5 +3,17 @@
 from .programmer import STM32Programmer, STM32Config
 from .builder import STM32Builder
 from .deployer import STM32Deployer
+from .openocd_session import OpenOCDSession, OpenOCDSessionPool, OpenOCDError
+from .async_api import AsyncSTM32Programmer, AsyncSTM32Builder
 
-__all__ = ["STM32Programmer", "STM32Config", "STM32Builder", "STM32Deployer"]
+__all__ = [
+    "STM32Programmer",
+    "STM32Config",
+    "STM32Builder",
+    "STM32Deployer",
+    "OpenOCDSession",
+    "OpenOCDSessionPool",
+    "OpenOCDError",
+    "AsyncSTM32Programmer",
+    "AsyncSTM32Builder",
+]
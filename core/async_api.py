@@ -0,0 +1,334 @@
+"""
+Async API - Awaitable programmer and builder operations
+Runs the same tool command lines as STM32Programmer/STM32Builder through
+asyncio subprocesses, with timeouts and cancellation. Flows that are not a
+single tool command (UART bootloader, OpenOCD sessions, SWD clock tuning,
+planned erases, chunked reads) run the blocking implementation in a worker
+thread, so both paths behave the same; the thread's tool runs are killed
+on cancellation and timeout as well
+"""
+
+import asyncio
+import functools
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Union
+
+from .builder import STM32Builder
+from .dump import MemoryDumper
+from .erase_plan import ErasePlan
+from .image import ImageFormatError
+from .process import CommandResult, run_command_async
+from .progress import BuildProgressParser
+from .programmer import STM32Programmer, STM32Config
+
+
+class AsyncSTM32Programmer:
+    """Awaitable counterpart of STM32Programmer"""
+
+    def __init__(self, config: STM32Config,
+                 programmer: Optional[STM32Programmer] = None):
+        """
+        Initialize async programmer
+
+        Args:
+            config: Programming configuration
+            programmer: Existing STM32Programmer to reuse (skips tool discovery)
+        """
+        self.programmer = programmer or STM32Programmer(config)
+        self.config = self.programmer.config
+
+    async def _run(self, cmd, timeout: Optional[float],
+                   total_bytes: Optional[int] = None) -> Optional[CommandResult]:
+        """Run a tool command; None on timeout or launch failure"""
+        on_line = None
+        if self.programmer.progress_callback is not None:
+            parser = self.programmer._progress_parser(cmd, total_bytes)
+            on_line = lambda line, stream: parser.feed(line)
+        try:
+            result = await run_command_async(cmd, timeout=timeout, on_line=on_line)
+        except subprocess.TimeoutExpired:
+            print(f"[ERROR] ✗ Timed out after {timeout}s: {cmd[0]}")
+        except OSError as e:
+            print(f"[ERROR] Exception running {cmd[0]}: {e}")
+        else:
+            if self.programmer.tool_log is not None:
+                self.programmer.tool_log.append(result)
+            return result
+        return None
+
+    async def _in_thread(self, name: str, *args, timeout: Optional[float] = None):
+        """
+        Run a blocking programmer method without stalling the event loop
+
+        The method runs on a copy of the programmer bound to a cancel event
+        and the timeout's deadline (STM32Programmer.with_cancel), so its
+        tool processes are killed when the task is cancelled or times out.
+        The worker thread has finished when this returns or re-raises.
+
+        Args:
+            name: STM32Programmer method
+            *args: Its arguments
+            timeout: Timeout in seconds (None waits forever)
+
+        Returns:
+            The method's result (its failure value after a timeout)
+        """
+        cancel = threading.Event()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        method = getattr(self.programmer.with_cancel(cancel, deadline), name)
+        future = asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(method, *args))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            cancel.set()
+            print(f"[ERROR] ✗ Timed out after {timeout}s")
+            return await future
+        except asyncio.CancelledError:
+            cancel.set()
+            await asyncio.wait([future])
+            raise
+
+    async def flash(self, binary_path: Union[Path, str],
+                    address: Optional[int] = None,
+                    verify: Optional[bool] = None,
+                    diff: bool = False,
+                    timeout: Optional[float] = None) -> bool:
+        """
+        Flash binary to STM32 device
+
+        Args:
+            binary_path: Path to binary file (.bin, .hex, .elf)
+            address: Flash start address (default: from config)
+            verify: Verify after flashing (default: from config)
+            diff: Only erase and write sectors that changed
+            timeout: Timeout in seconds (None waits forever)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        programmer = self.programmer
+        host_verify = ((verify if verify is not None else self.config.verify)
+                       and self.config.verify_mode != "tool")
+        if diff or host_verify or programmer._blocking_only():
+            # Multi-step and session-based flows stay on the blocking path
+            return await self._in_thread("flash", binary_path, address, verify,
+                                         diff, timeout=timeout)
+
+        binary_path = Path(binary_path)
+        if not binary_path.exists():
+            print(f"[ERROR] Binary file not found: {binary_path}")
+            return False
+
+        address = address if address is not None else self.config.flash_start
+        verify = verify if verify is not None else self.config.verify
+
+        try:
+            image = programmer.load_image(binary_path, address)
+        except (OSError, ImageFormatError) as e:
+            print(f"[ERROR] Cannot load image {binary_path.name}: {e}")
+            return False
+        if not programmer.check_image_bounds(image):
+            return False
+        if programmer.write_plan(image) is not None:
+            # Trimmed region writes go through temporary files
+            return await self._in_thread("flash_prepared", binary_path, image,
+                                         address, verify, timeout=timeout)
+
+        if programmer.use_openocd:
+            if not programmer.openocd_path:
+                print("[ERROR] OpenOCD not found")
+                return False
+            cmd = programmer._openocd_flash_cmd(binary_path, address, verify)
+        else:
+            if not programmer.stm32_cli_path:
+                print("[ERROR] STM32CubeProgrammer not found")
+                return False
+            cmd = programmer._stm32cube_flash_cmd(binary_path, address, verify)
+
+        print(f"[INFO] Executing: {' '.join(cmd)}")
+        result = await self._run(cmd, timeout, image.size)
+        success = result is not None and result.returncode == 0
+        if success:
+            print(f"[SUCCESS] ✓ Flashing {binary_path.name} completed successfully!")
+        elif result is not None:
+            print(f"[ERROR] ✗ Flashing failed!")
+            print(f"Error: {result.stderr}")
+
+        programmer._track_flash_contents(image, success)
+        return success
+
+    async def erase(self, full: bool = False,
+                    plan: Optional[ErasePlan] = None,
+                    timeout: Optional[float] = None) -> bool:
+        """
+        Erase STM32 flash memory
+
+        Args:
+            full: Perform full chip erase (True) or mass erase (False)
+            plan: Erase only these sectors (see STM32Programmer.erase_plan())
+            timeout: Timeout in seconds (None waits forever)
+
+        Returns:
+            True if successful
+        """
+        programmer = self.programmer
+        if plan is not None or programmer.use_openocd or programmer._blocking_only():
+            return await self._in_thread("erase", full, plan, timeout=timeout)
+
+        if not programmer.stm32_cli_path:
+            print("[ERROR] STM32CubeProgrammer not found")
+            return False
+
+        result = await self._run(programmer._stm32cube_erase_cmd(full), timeout)
+        if result is None:
+            return False
+        if result.returncode != 0:
+            print(f"[ERROR] ✗ Erase failed: {result.stderr}")
+            return False
+
+        print("[SUCCESS] ✓ Erase completed")
+        programmer._track_erase()
+        return True
+
+    async def read_memory(self, address: int, size: int,
+                          output_file: Path,
+                          timeout: Optional[float] = None) -> bool:
+        """
+        Read memory from STM32 device
+
+        Args:
+            address: Start address
+            size: Number of bytes to read
+            output_file: Output file path
+            timeout: Timeout in seconds (None waits forever)
+
+        Returns:
+            True if successful
+        """
+        programmer = self.programmer
+        if programmer.use_openocd or programmer._blocking_only() or \
+                size > MemoryDumper(programmer).chunk_size:
+            # Large reads are chunked and checkpointed by MemoryDumper
+            return await self._in_thread("read_memory", address, size,
+                                         output_file, timeout=timeout)
+
+        if not programmer.stm32_cli_path:
+            print("[ERROR] STM32CubeProgrammer not found")
+            return False
+
+        cmd = programmer._stm32cube_read_cmd(address, size, output_file)
+        result = await self._run(cmd, timeout, size)
+        if result is None:
+            return False
+        if result.returncode != 0:
+            print(f"[ERROR] ✗ Read failed: {result.stderr}")
+            return False
+
+        print(f"[SUCCESS] ✓ Memory read to {output_file}")
+        return True
+
+    async def get_device_info(self, timeout: Optional[float] = None) -> Optional[Dict[str, str]]:
+        """
+        Get connected device information
+
+        Args:
+            timeout: Timeout in seconds (None waits forever)
+
+        Returns:
+            Device info dictionary, or None if no device answered
+        """
+        programmer = self.programmer
+        if programmer.use_openocd or programmer._blocking_only():
+            return await self._in_thread("get_device_info", timeout=timeout)
+        if not programmer.stm32_cli_path:
+            return None
+
+        try:
+            result = await run_command_async(programmer._stm32cube_info_cmd(),
+                                             timeout=timeout)
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+        if programmer.tool_log is not None:
+            programmer.tool_log.append(result)
+        if result.returncode == 0:
+            return {"status": "connected", "output": result.stdout}
+        return None
+
+
+class AsyncSTM32Builder:
+    """Awaitable counterpart of STM32Builder"""
+
+    def __init__(self, project_root: Path,
+                 builder: Optional[STM32Builder] = None):
+        """
+        Initialize async builder
+
+        Args:
+            project_root: Path to STM32 project root
+            builder: Existing STM32Builder to reuse
+        """
+        self.builder = builder or STM32Builder(project_root)
+
+    async def build(self, clean: bool = False, config: str = "Debug",
+                    timeout: Optional[float] = 300) -> bool:
+        """
+        Build the STM32 project
+
+        Args:
+            clean: Clean before building
+            config: Build configuration (Debug/Release)
+            timeout: Timeout in seconds (None waits forever)
+
+        Returns:
+            True if build successful
+        """
+        builder = self.builder
+        if clean:
+            print("[INFO] Cleaning build artifacts...")
+            builder.clean(config)
+
+        build_system = builder.detect_build_system()
+        cmd = None
+        if build_system == "cube":
+            cube_ide_path = builder._find_cube_ide()
+            if cube_ide_path:
+                cmd = builder._cube_build_cmd(cube_ide_path, config)
+            else:
+                print("[WARNING] STM32CubeIDE not found, trying make...")
+                build_system = "make"
+        if build_system == "make":
+            makefile_dir = builder._makefile_dir(config)
+            if not (makefile_dir / "Makefile").exists():
+                print(f"[ERROR] Makefile not found in {makefile_dir}")
+                return False
+            cmd = builder._make_build_cmd(makefile_dir)
+        if cmd is None:
+            print("[ERROR] No supported build system found (.project or Makefile)")
+            return False
+
+        print(f"[INFO] Building {builder.project_name} ({config}): {' '.join(cmd)}")
+        on_line = None
+        if builder.progress_callback is not None:
+            parser = BuildProgressParser(builder.progress_callback)
+            on_line = lambda line, stream: parser.feed(line)
+        try:
+            result = await run_command_async(cmd, timeout=timeout, on_line=on_line)
+        except subprocess.TimeoutExpired:
+            print(f"[ERROR] Build timeout ({timeout} seconds)")
+            return False
+        except FileNotFoundError:
+            print(f"[ERROR] '{cmd[0]}' command not found")
+            return False
+
+        if result.returncode == 0:
+            print(f"[SUCCESS] ✓ Build of {builder.project_name} completed successfully!")
+            return True
+
+        print(f"[ERROR] ✗ Build of {builder.project_name} failed!")
+        print(f"Output: {result.stdout}")
+        print(f"Error: {result.stderr}")
+        return False
@@ -0,0 +1,302 @@
+"""
+Build Cache - Content-addressed store of build artifacts
+A fingerprint of the source tree, build configuration and toolchain
+selects previously built firmware so unchanged projects skip the build
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, List, Iterable
+
+# Files that affect the build output. Dotfiles have no suffix
+# (os.path.splitext(".cproject") == (".cproject", "")), so the Eclipse
+# project files are matched by name
+SOURCE_SUFFIXES = {
+    ".c", ".h", ".cpp", ".cc", ".cxx", ".hpp", ".hh", ".s", ".S", ".ld",
+    ".mk", ".ioc", ".cmake", ".a", ".inc",
+}
+SOURCE_NAMES = {"Makefile", "makefile", "GNUmakefile", "CMakeLists.txt",
+                ".cproject", ".project"}
+MAKEFILE_NAMES = {"Makefile", "makefile", "GNUmakefile"}
+
+# Directories never scanned for sources (build outputs; the makefiles
+# generated into the configuration's directory are added separately)
+SKIP_DIRS = {"Debug", "Release", "build", ".git", ".svn", ".settings",
+             "__pycache__"}
+
+# Build outputs stored per fingerprint
+ARTIFACT_SUFFIXES = (".bin", ".hex", ".elf", ".map")
+
+
+def _file_digest(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def iter_source_files(project_root: Path,
+                      skip_dirs: Iterable[str] = SKIP_DIRS) -> List[Path]:
+    """
+    Files that feed the build, sorted for a stable fingerprint
+
+    Args:
+        project_root: Project root directory
+        skip_dirs: Directory names not descended into
+
+    Returns:
+        Source file paths
+    """
+    skip = set(skip_dirs)
+    files = []
+    for root, dirs, names in os.walk(project_root):
+        dirs[:] = sorted(d for d in dirs if d not in skip)
+        for name in names:
+            if name in SOURCE_NAMES or os.path.splitext(name)[1] in SOURCE_SUFFIXES:
+                files.append(Path(root) / name)
+    return sorted(files)
+
+
+def iter_build_files(project_root: Path, build_config: str) -> List[Path]:
+    """
+    Makefiles generated into a configuration's directory, sorted
+
+    STM32CubeIDE writes the configuration's defines, flags and
+    optimisation level into <config>/makefile and its *.mk includes.
+
+    Args:
+        project_root: Project root directory
+        build_config: Build configuration (Debug/Release)
+
+    Returns:
+        Makefile paths (empty if the directory does not exist)
+    """
+    files = []
+    for root, dirs, names in os.walk(Path(project_root) / build_config):
+        dirs.sort()
+        for name in names:
+            if name in MAKEFILE_NAMES or name.endswith(".mk"):
+                files.append(Path(root) / name)
+    return sorted(files)
+
+
+class BuildCache:
+    """Bounded on-disk artifact store with LRU eviction"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, cache_dir: Optional[Path] = None,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 max_entries: int = 64):
+        """
+        Initialize build cache
+
+        Args:
+            cache_dir: Store location (default: ~/.stm32programmer/build_cache)
+            max_bytes: Total artifact size kept before evicting
+            max_entries: Number of fingerprints kept before evicting
+        """
+        if cache_dir is None:
+            cache_dir = Path.home() / ".stm32programmer" / "build_cache"
+
+        self.cache_dir = Path(cache_dir)
+        self.index_file = self.cache_dir / "index.json"
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+    # ------------------------------------------------------------------
+    # Index persistence
+    # ------------------------------------------------------------------
+
+    def _load_json(self, path: Path) -> dict:
+        if path.exists():
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[WARNING] Failed to load {path.name}: {e}")
+        return {}
+
+    def _save_json(self, path: Path, data: dict) -> bool:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = path.with_name(
+                f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_file, path)
+            return True
+        except Exception as e:
+            print(f"[WARNING] Failed to save {path.name}: {e}")
+            return False
+
+    def load(self) -> Dict[str, dict]:
+        """Fingerprint -> entry metadata"""
+        return self._load_json(self.index_file)
+
+    # ------------------------------------------------------------------
+    # Fingerprinting
+    # ------------------------------------------------------------------
+
+    def fingerprint(self, project_root: Path, build_config: str,
+                    toolchain: str = "",
+                    skip_dirs: Iterable[str] = SKIP_DIRS) -> str:
+        """
+        Content fingerprint of a project build
+
+        Covers the sources, the Eclipse project files and the makefiles
+        generated for build_config. File contents are hashed only when a
+        file's mtime/size changed since the last fingerprint of this
+        project.
+
+        Args:
+            project_root: Project root directory
+            build_config: Build configuration (Debug/Release)
+            toolchain: Toolchain identification (compiler version, IDE path)
+            skip_dirs: Directory names excluded from the source scan
+
+        Returns:
+            Hex digest
+        """
+        project_root = Path(project_root).resolve()
+        key = hashlib.sha256(str(project_root).encode()).hexdigest()[:16]
+        hashes_file = self.cache_dir / f"files-{key}.json"
+        known = self._load_json(hashes_file)
+        current = {}
+
+        sha = hashlib.sha256()
+        sha.update(f"config={build_config}\ntoolchain={toolchain}\n".encode())
+        files = iter_source_files(project_root, skip_dirs)
+        if build_config in set(skip_dirs):
+            files += iter_build_files(project_root, build_config)
+        for path in files:
+            rel = path.relative_to(project_root).as_posix()
+            st = path.stat()
+            stamp = [st.st_mtime_ns, st.st_size]
+            record = known.get(rel)
+            if record is not None and record[:2] == stamp:
+                digest = record[2]
+            else:
+                digest = _file_digest(path)
+            current[rel] = stamp + [digest]
+            sha.update(f"{rel}\0{digest}\n".encode())
+
+        if current != known:
+            self._save_json(hashes_file, current)
+        return sha.hexdigest()
+
+    # ------------------------------------------------------------------
+    # Store / restore
+    # ------------------------------------------------------------------
+
+    def contains(self, fingerprint: str) -> bool:
+        """True if artifacts for fingerprint are stored"""
+        return fingerprint in self.load() and (self.cache_dir / fingerprint).is_dir()
+
+    def store(self, fingerprint: str, output_dir: Path,
+              project: str = "") -> bool:
+        """
+        Copy build artifacts into the cache
+
+        Args:
+            fingerprint: Build fingerprint
+            output_dir: Directory holding the fresh build outputs
+            project: Project name (informational)
+
+        Returns:
+            True if any artifact was stored
+        """
+        artifacts = [p for p in sorted(Path(output_dir).glob("*"))
+                     if p.is_file() and p.suffix in ARTIFACT_SUFFIXES]
+        if not artifacts:
+            return False
+
+        entry_dir = self.cache_dir / fingerprint
+        tmp_dir = self.cache_dir / f".{fingerprint}.{os.getpid()}.{threading.get_ident()}"
+        try:
+            tmp_dir.mkdir(parents=True, exist_ok=True)
+            files = {}
+            for artifact in artifacts:
+                shutil.copy2(artifact, tmp_dir / artifact.name)
+                files[artifact.name] = _file_digest(artifact)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except OSError as e:
+            print(f"[WARNING] Could not store build artifacts: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        now = time.time()
+        with self._lock:
+            index = self.load()
+            index[fingerprint] = {
+                "project": project,
+                "files": files,
+                "size": sum((entry_dir / name).stat().st_size for name in files),
+                "created": now,
+                "last_used": now,
+            }
+            self._evict(index, keep=fingerprint)
+            self._save_json(self.index_file, index)
+        return True
+
+    def restore(self, fingerprint: str, output_dir: Path) -> bool:
+        """
+        Copy cached artifacts back into the build output directory
+
+        Files that already hold the cached content are left untouched.
+
+        Args:
+            fingerprint: Build fingerprint
+            output_dir: Build output directory
+
+        Returns:
+            True on a cache hit
+        """
+        entry = self.load().get(fingerprint)
+        entry_dir = self.cache_dir / fingerprint
+        if entry is None or not entry_dir.is_dir():
+            return False
+
+        output_dir = Path(output_dir)
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            for name, digest in entry["files"].items():
+                source = entry_dir / name
+                target = output_dir / name
+                if (target.exists() and target.stat().st_size == source.stat().st_size
+                        and _file_digest(target) == digest):
+                    continue
+                shutil.copy2(source, target)
+        except (OSError, KeyError) as e:
+            print(f"[WARNING] Could not restore cached build: {e}")
+            return False
+
+        with self._lock:
+            index = self.load()
+            if fingerprint in index:
+                index[fingerprint]["last_used"] = time.time()
+                self._save_json(self.index_file, index)
+        return True
+
+    def _evict(self, index: Dict[str, dict], keep: Optional[str] = None) -> None:
+        """Drop least recently used entries until within limits"""
+        by_age = sorted((fp for fp in index if fp != keep),
+                        key=lambda fp: index[fp].get("last_used", 0))
+        total = sum(entry.get("size", 0) for entry in index.values())
+        while by_age and (total > self.max_bytes or len(index) > self.max_entries):
+            victim = by_age.pop(0)
+            total -= index.pop(victim).get("size", 0)
+            shutil.rmtree(self.cache_dir / victim, ignore_errors=True)
+
+    def clear(self) -> bool:
+        """Remove every cached build"""
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        return True
@@ -0,0 +1,402 @@
+"""
+Build Scheduler - Build many (project, configuration) pairs concurrently
+All jobs share one budget of make jobs so parallel builds do not
+oversubscribe the cores (STM32CubeIDE builds, which pick their own job
+count, take the whole budget); each job's output is streamed under its own
+prefix and its wall and CPU time are reported
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Union
+
+from .builder import STM32Builder
+from .process import DEFAULT_TAIL_LINES
+from .thread_output import OutputSink, thread_stdout
+from .timing import Timeline, NULL_TIMELINE
+from .tool_discovery import ToolDiscoveryCache
+
+# Job states
+PENDING = "pending"
+PASSED = "passed"
+FAILED = "failed"
+CANCELLED = "cancelled"      # Killed by fail-fast while running
+SKIPPED = "skipped"          # Never started because of fail-fast
+
+# How job output reaches the console
+OUTPUT_MODES = ("prefix", "grouped", "quiet")
+
+
+def default_budget() -> int:
+    """CPUs this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 4
+
+
+@dataclass
+class BuildJob:
+    """One project built in one configuration"""
+    project: Path
+    config: str = "Debug"
+    clean: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{Path(self.project).name}/{self.config}"
+
+
+@dataclass
+class BuildJobResult:
+    """Outcome of one build job"""
+    job: BuildJob
+    status: str = PENDING
+    slots: int = 0                    # make -j the job ran with (whole budget: STM32CubeIDE)
+    wall_time: float = 0.0
+    cpu_time: Optional[float] = None  # User+system seconds of make and compilers
+    error: Optional[str] = None
+    log: List[str] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        return self.status == PASSED
+
+    def to_dict(self) -> dict:
+        return {
+            "project": str(self.job.project),
+            "config": self.job.config,
+            "status": self.status,
+            "jobs": self.slots,
+            "wall_time": round(self.wall_time, 3),
+            "cpu_time": None if self.cpu_time is None else round(self.cpu_time, 3),
+            "error": self.error,
+        }
+
+
+@dataclass
+class ScheduleReport:
+    """Results of a scheduler run, in job order"""
+    results: List[BuildJobResult]
+    budget: int
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return all(r.success for r in self.results)
+
+    @property
+    def passed(self) -> int:
+        return sum(1 for r in self.results if r.success)
+
+    @property
+    def cpu_time(self) -> float:
+        return sum(r.cpu_time or 0.0 for r in self.results)
+
+    @property
+    def utilization(self) -> Optional[float]:
+        """Share of the job budget kept busy by compilers (0-1)"""
+        if self.elapsed <= 0 or not any(r.cpu_time is not None for r in self.results):
+            return None
+        return self.cpu_time / (self.elapsed * self.budget)
+
+    def summary(self) -> str:
+        text = (f"{self.passed}/{len(self.results)} builds passed in "
+                f"{self.elapsed:.2f}s (budget {self.budget} jobs")
+        utilization = self.utilization
+        if utilization is not None:
+            text += f", {self.cpu_time:.2f}s CPU, {utilization * 100:.0f}% busy"
+        return text + ")"
+
+    def format_table(self) -> str:
+        """Per-job status, -j, wall and CPU time"""
+        width = max([len(r.job.name) for r in self.results] + [10])
+        lines = [f"  {'job':<{width}} {'status':<9} {'-j':>4} {'wall':>9} {'cpu':>9}"]
+        for r in self.results:
+            cpu = "-" if r.cpu_time is None else f"{r.cpu_time:.2f}s"
+            line = (f"  {r.job.name:<{width}} {r.status:<9} {r.slots or '-':>4} "
+                    f"{r.wall_time:8.2f}s {cpu:>9}")
+            if r.error and r.status == FAILED:
+                line += f"  {r.error.strip()}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "budget": self.budget,
+            "elapsed": round(self.elapsed, 3),
+            "cpu_time": round(self.cpu_time, 3),
+            "success": self.success,
+            "jobs": [r.to_dict() for r in self.results],
+        }
+
+
+class _JobOutput:
+    """Output sink of the worker threads, routing their lines to their job"""
+
+    def __init__(self, sink: OutputSink, mode: str, log_dir: Optional[Path]):
+        self._sink = sink
+        self._mode = mode
+        self._log_dir = log_dir
+        self._jobs: Dict[int, BuildJobResult] = {}
+        self._files = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def open(self, result: BuildJobResult) -> None:
+        """Route the calling thread's output to result (see write())"""
+        if self._mode != "grouped":
+            # Full output only matters for grouped printing; keep a tail
+            result.log = deque(maxlen=DEFAULT_TAIL_LINES)
+        if self._log_dir is not None:
+            name = f"{Path(result.job.project).name}-{result.job.config}.log"
+            self._files[id(result)] = open(self._log_dir / name, "w",
+                                           encoding="utf-8", errors="replace")
+        self._jobs[threading.get_ident()] = result
+
+    def close(self, result: BuildJobResult) -> None:
+        """Stop routing the calling thread; print the job if grouped"""
+        ident = threading.get_ident()
+        with self._lock:
+            rest = self._pending.pop(ident, "")
+            if rest:
+                self._emit(result, rest)
+            self._jobs.pop(ident, None)
+            log_file = self._files.pop(id(result), None)
+            if log_file is not None:
+                log_file.close()
+            if self._mode == "grouped":
+                self._sink(f"\n----- {result.job.name} ({result.status}) -----\n")
+                for line in result.log:
+                    if line.strip():
+                        self._sink(line + "\n")
+
+    def line(self, result: BuildJobResult, text: str) -> None:
+        """Tool output line of result's job (called from reader threads)"""
+        with self._lock:
+            self._emit(result, text)
+
+    def write(self, text: str) -> None:
+        """print() output of a worker thread (registered with ThreadOutput)"""
+        ident = threading.get_ident()
+        result = self._jobs.get(ident)
+        if result is None:
+            self._sink(text)
+            return
+
+        with self._lock:
+            buffered = self._pending.get(ident, "") + text
+            *lines, rest = buffered.split("\n")
+            self._pending[ident] = rest
+            for line in lines:
+                self._emit(result, line)
+
+    def _emit(self, result: BuildJobResult, line: str) -> None:
+        result.log.append(line)
+        log_file = self._files.get(id(result))
+        if log_file is not None:
+            log_file.write(line + "\n")
+        if self._mode == "prefix" and line.strip():
+            self._sink(f"[{result.job.name}] {line}\n")
+
+
+class BuildScheduler:
+    """Build several (project, configuration) jobs under one job budget"""
+
+    def __init__(self, jobs: List[BuildJob], budget: Optional[int] = None,
+                 max_parallel: Optional[int] = None, fail_fast: bool = False,
+                 output: str = "prefix",
+                 log_dir: Optional[Union[Path, str]] = None,
+                 discovery: Optional[ToolDiscoveryCache] = None,
+                 timeline: Optional[Timeline] = None):
+        """
+        Initialize scheduler
+
+        Args:
+            jobs: Builds to run; started in this order
+            budget: make jobs shared by all builds (default: CPU count)
+            max_parallel: Builds running at once (default: budget)
+            fail_fast: Kill running builds and skip the rest on the first failure
+            output: "prefix" streams every line tagged with its job,
+                "grouped" prints each job's output once it finishes,
+                "quiet" prints only the summary
+            log_dir: Also write each job's full output to <project>-<config>.log
+            discovery: Tool discovery cache shared by all builders
+            timeline: Records a span per job (default: disabled)
+        """
+        if output not in OUTPUT_MODES:
+            raise ValueError(f"output must be one of {', '.join(OUTPUT_MODES)}")
+        self.jobs = list(jobs)
+        self.budget = max(1, budget or default_budget())
+        self.max_parallel = max(1, min(max_parallel or self.budget, self.budget))
+        self.fail_fast = fail_fast
+        self.output = output
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.discovery = discovery or ToolDiscoveryCache()
+        self.timeline = timeline or NULL_TIMELINE
+
+    @classmethod
+    def matrix(cls, projects: List[Union[Path, str]],
+               configs: List[str] = ("Debug",), clean: bool = False,
+               **kwargs) -> "BuildScheduler":
+        """Scheduler for every project in every configuration"""
+        jobs = [BuildJob(Path(p), config, clean) for p in projects for config in configs]
+        return cls(jobs, **kwargs)
+
+    def run(self) -> ScheduleReport:
+        """
+        Run all jobs
+
+        A starting job gets an equal share of the free budget as its make
+        -j, at least 1. STM32CubeIDE builds cannot be given a job count, so
+        they run alone and count as the whole budget. Jobs that build in the
+        same directory (or STM32CubeIDE workspace) never run at the same time.
+
+        Returns:
+            ScheduleReport
+        """
+        results = [BuildJobResult(job) for job in self.jobs]
+        report = ScheduleReport(results, self.budget)
+        if self.log_dir is not None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        print(f"\n{'='*60}")
+        print(f"  Building {len(results)} job(s), budget {self.budget} make jobs")
+        print(f"{'='*60}\n")
+
+        keys = {id(r): self._key(r.job) for r in results}
+        whole = {id(r) for r in results if self._takes_budget(r.job)}
+        pending = list(results)
+        running = {}
+        busy = set()
+        free = self.budget
+        cancel = threading.Event()
+        # Workers print to the caller's sink (a daemon client or the console)
+        output = _JobOutput(thread_stdout().sink(), self.output, self.log_dir)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_parallel,
+                                thread_name_prefix="build") as pool:
+            try:
+                while pending or running:
+                    while (pending and not cancel.is_set() and free > 0
+                           and len(running) < self.max_parallel):
+                        result = next((r for r in pending
+                                       if keys[id(r)] not in busy), None)
+                        if result is None:
+                            break
+                        if id(result) in whole:
+                            if running:
+                                break   # Waits until it can have every slot
+                            result.slots = self.budget
+                        else:
+                            starting = min(len(pending), self.max_parallel - len(running))
+                            result.slots = max(1, free // starting)
+                        free -= result.slots
+                        busy.add(keys[id(result)])
+                        pending.remove(result)
+                        future = pool.submit(self._run_job, result, output, cancel)
+                        running[future] = result
+
+                    if cancel.is_set():
+                        for result in pending:
+                            result.status = SKIPPED
+                        pending = []
+                    if not running:
+                        break
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = running.pop(future)
+                        free += result.slots
+                        busy.discard(keys[id(result)])
+                        if result.status == FAILED and self.fail_fast and not cancel.is_set():
+                            print(f"[ERROR] ✗ {result.job.name} failed - "
+                                  f"stopping remaining builds")
+                            cancel.set()
+            except BaseException:
+                # Do not leave compilers running behind an interrupt
+                cancel.set()
+                raise
+        report.elapsed = time.monotonic() - start
+
+        self.print_summary(report)
+        return report
+
+    def _key(self, job: BuildJob) -> tuple:
+        """Builds with the same key share a directory and must not overlap"""
+        try:
+            builder = STM32Builder(job.project, discovery=self.discovery)
+        except FileNotFoundError:
+            return ("missing", str(job.project))
+        if builder.detect_build_system() == "cube":
+            return ("cube", str(builder.project_root.resolve().parent))
+        return ("make", str(builder._makefile_dir(job.config).resolve()))
+
+    def _takes_budget(self, job: BuildJob) -> bool:
+        """Whether job ignores its make -j and must count as the whole budget"""
+        try:
+            builder = STM32Builder(job.project, discovery=self.discovery)
+        except FileNotFoundError:
+            return False
+        return not builder.limits_jobs()
+
+    def _run_job(self, result: BuildJobResult, output: _JobOutput,
+                 cancel: threading.Event) -> BuildJobResult:
+        """Worker body: build one job with its share of the budget"""
+        job = result.job
+        output.open(result)
+        stdout = thread_stdout()
+        stdout.register(output.write)
+        start = time.monotonic()
+        try:
+            with self.timeline.span("job", project=Path(job.project).name,
+                                    config=job.config, jobs=result.slots):
+                builder = STM32Builder(
+                    job.project, discovery=self.discovery, timeline=self.timeline,
+                    output_callback=lambda line, stream: output.line(result, line),
+                    cancel=cancel)
+                success = builder.build(clean=job.clean, config=job.config,
+                                        jobs=result.slots)
+            times = [c.cpu_time for c in builder.commands if c.cpu_time is not None]
+            result.cpu_time = sum(times) if times else None
+            if success:
+                result.status = PASSED
+            elif any(c.cancelled for c in builder.commands):
+                result.status = CANCELLED
+            else:
+                result.status = FAILED
+                result.error = self._first_error(result.log)
+        except Exception as e:
+            result.status = FAILED
+            result.error = str(e)
+        finally:
+            result.wall_time = time.monotonic() - start
+            stdout.unregister()
+            output.close(result)
+        return result
+
+    @staticmethod
+    def _first_error(log) -> str:
+        """First compiler error in a job's log, else its last make or [ERROR] message"""
+        lines = [line.strip() for line in log]
+        for line in lines:
+            if "error:" in line and "[ERROR]" not in line:
+                return line
+        return next((line for line in reversed(lines)
+                     if line.startswith("make: ***")
+                     or ("[ERROR]" in line and "Build failed" not in line)),
+                    "build failed")
+
+    @staticmethod
+    def print_summary(report: ScheduleReport) -> None:
+        """Print the per-job table"""
+        print(f"\n{'='*60}")
+        print(f"  Build result: {report.summary()}")
+        print(f"{'='*60}")
+        print(report.format_table())
+        print("="*60 + "\n")
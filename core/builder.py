@@ -6,51 +6,103 @@ Supports STM32CubeIDE and Makefile-based builds
 import os
 import subprocess
 import platform
+import threading
 from pathlib import Path
 from typing import Optional, List, Dict
 import shutil
 
+from .build_cache import BuildCache
+from .image import FirmwareImage, ImageFormatError
+from .memory_map import MemoryMap, SizeGate
+from .process import CommandResult, LineCallback, run_command
+from .progress import ProgressCallback, BuildProgressParser
+from .timing import Timeline, NULL_TIMELINE
+from .tool_discovery import ToolDiscoveryCache, which, path_search_dirs
+
 
 class STM32Builder:
     """Build STM32 firmware projects"""
     
-    def __init__(self, project_root: Path):
+    def __init__(self, project_root: Path,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 discovery: Optional[ToolDiscoveryCache] = None,
+                 timeline: Optional[Timeline] = None,
+                 output_callback: Optional[LineCallback] = None,
+                 cancel: Optional[threading.Event] = None):
         self.project_root = Path(project_root)
+        self.progress_callback = progress_callback
+        self.discovery = discovery or ToolDiscoveryCache()
+        self.timeline = timeline or NULL_TIMELINE
+        self.output_callback = output_callback  # Streams tool output as it arrives
+        self.cancel = cancel                    # Kills the running tool when set
+        self.commands: List[CommandResult] = []  # Tools run so far, in order
         self.build_dir = self.project_root / "Debug"
         self.project_name = self.project_root.name
         
         if not self.project_root.exists():
             raise FileNotFoundError(f"Project directory not found: {self.project_root}")
     
-    def build(self, clean: bool = False, config: str = "Debug") -> bool:
+    def build(self, clean: bool = False, config: str = "Debug",
+              jobs: Optional[int] = None) -> bool:
         """
         Build the STM32 project
         
         Args:
             clean: Clean before building
             config: Build configuration (Debug/Release)
+            jobs: Parallel make jobs (default: CPU count). STM32CubeIDE
+                headless builds use the project's own parallel build
+                setting instead (see limits_jobs())
         
         Returns:
             True if build successful
         """
         if clean:
             print("[INFO] Cleaning build artifacts...")
-            self.clean()
+            with self.timeline.span("clean"):
+                self.clean(config)
         
         print(f"\n{'='*60}")
         print(f"  Building {self.project_name} ({config})")
         print(f"{'='*60}\n")
         
         # Detect build system
+        with self.timeline.span("build", config=config):
+            build_system = self.detect_build_system()
+            if build_system == "cube":
+                return self._build_cube_project(config, jobs)
+            elif build_system == "make":
+                return self._build_makefile(config, jobs)
+            else:
+                print("[ERROR] No supported build system found (.project or Makefile)")
+                return False
+    
+    def detect_build_system(self) -> Optional[str]:
+        """
+        Detect the project's build system
+        
+        Returns:
+            "cube" for STM32CubeIDE projects, "make" for Makefiles, or None
+        """
         if (self.project_root / ".project").exists():
-            return self._build_cube_project(config)
+            return "cube"
         elif (self.project_root / "Makefile").exists() or (self.build_dir / "Makefile").exists():
-            return self._build_makefile(config)
-        else:
-            print("[ERROR] No supported build system found (.project or Makefile)")
-            return False
+            return "make"
+        return None
     
-    def _build_cube_project(self, config: str) -> bool:
+    def limits_jobs(self) -> bool:
+        """
+        Whether build(jobs=N) keeps the build to N parallel jobs
+        
+        The CDT headless builder has no job count option: STM32CubeIDE
+        builds run with the parallel build setting stored in the project.
+        
+        Returns:
+            False if the project builds with STM32CubeIDE
+        """
+        return not (self.detect_build_system() == "cube" and self._find_cube_ide() is not None)
+    
+    def _build_cube_project(self, config: str, jobs: Optional[int] = None) -> bool:
         """Build using STM32CubeIDE headless build"""
         print("[INFO] Building with STM32CubeIDE...")
         
@@ -59,31 +111,20 @@ class STM32Builder:
         
         if not cube_ide_path:
             print("[WARNING] STM32CubeIDE not found, trying make...")
-            return self._build_makefile(config)
+            return self._build_makefile(config, jobs)
         
-        workspace_path = self.project_root.parent
-        
-        cmd = [
-            str(cube_ide_path),
-            "-nosplash",
-            "-application", "org.eclipse.cdt.managedbuilder.core.headlessbuild",
-            "-data", str(workspace_path),
-            "-import", str(self.project_root),
-            "-build", f"{self.project_name}/{config}",
-        ]
+        cmd = self._cube_build_cmd(cube_ide_path, config)
         
         print(f"[INFO] Executing: {' '.join(cmd)}")
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            result = self._run(cmd, timeout=300)
             
             if result.returncode == 0:
                 print(f"\n[SUCCESS] ✓ Build completed successfully!")
                 return True
             else:
-                print(f"\n[ERROR] ✗ Build failed!")
-                print(f"Output: {result.stdout}")
-                print(f"Error: {result.stderr}")
+                self._report_failure(result)
                 return False
         except subprocess.TimeoutExpired:
             print("[ERROR] Build timeout (5 minutes)")
@@ -92,39 +133,95 @@ class STM32Builder:
             print(f"[ERROR] Exception during build: {e}")
             return False
     
-    def _build_makefile(self, config: str = "Debug") -> bool:
+    def _run(self, cmd: List[str], timeout: Optional[float] = None) -> CommandResult:
+        """Run a build command, reporting compiled sources as progress"""
+        callbacks = []
+        if self.progress_callback is not None:
+            parser = BuildProgressParser(self.progress_callback)
+            callbacks.append(lambda line, stream: parser.feed(line))
+        if self.output_callback is not None:
+            callbacks.append(self.output_callback)
+        
+        def on_line(line: str, stream: str) -> None:
+            for callback in callbacks:
+                callback(line, stream)
+        
+        with self.timeline.span(Path(cmd[0]).stem):
+            result = run_command(cmd, timeout=timeout,
+                                 on_line=on_line if callbacks else None,
+                                 cancel=self.cancel)
+        self.commands.append(result)
+        return result
+    
+    def _report_failure(self, result: CommandResult) -> None:
+        """Print why a build command failed"""
+        if result.cancelled:
+            print(f"\n[INFO] Build cancelled")
+            return
+        print(f"\n[ERROR] ✗ Build failed!")
+        if self.output_callback is None:
+            print(f"Output: {result.stdout}")
+            print(f"Error: {result.stderr}")
+    
+    def _cube_build_cmd(self, cube_ide_path: Path, config: str) -> List[str]:
+        """Build the STM32CubeIDE headless build command"""
+        workspace_path = self.project_root.parent
+        
+        return [
+            str(cube_ide_path),
+            "-nosplash",
+            "-application", "org.eclipse.cdt.managedbuilder.core.headlessbuild",
+            "-data", str(workspace_path),
+            "-import", str(self.project_root),
+            "-build", f"{self.project_name}/{config}",
+        ]
+    
+    def _makefile_dir(self, config: str = "Debug") -> Path:
+        """Directory containing the Makefile to run"""
+        config_dir = self.project_root / config
+        if (config_dir / "Makefile").exists():
+            return config_dir
+        return self.build_dir if self.build_dir.exists() else self.project_root
+    
+    def _make_build_cmd(self, makefile_dir: Path,
+                        jobs: Optional[int] = None) -> List[str]:
+        """Build the make command"""
+        # Determine number of CPU cores for parallel build
+        if jobs is None:
+            try:
+                import multiprocessing
+                jobs = multiprocessing.cpu_count()
+            except:
+                jobs = 4
+        
+        return ["make", f"-j{jobs}", "-C", str(makefile_dir)]
+    
+    def _build_makefile(self, config: str = "Debug",
+                        jobs: Optional[int] = None) -> bool:
         """Build using Make"""
         print("[INFO] Building with Make...")
         
         # Determine build directory
-        makefile_dir = self.build_dir if self.build_dir.exists() else self.project_root
+        makefile_dir = self._makefile_dir(config)
         
         if not (makefile_dir / "Makefile").exists():
             print(f"[ERROR] Makefile not found in {makefile_dir}")
             return False
         
-        # Determine number of CPU cores for parallel build
-        try:
-            import multiprocessing
-            jobs = multiprocessing.cpu_count()
-        except:
-            jobs = 4
-        
-        cmd = ["make", f"-j{jobs}", "-C", str(makefile_dir)]
+        cmd = self._make_build_cmd(makefile_dir, jobs)
         
         print(f"[INFO] Executing: {' '.join(cmd)}")
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            result = self._run(cmd, timeout=300)
             
             if result.returncode == 0:
                 print(f"\n[SUCCESS] ✓ Build completed successfully!")
-                print(result.stdout)
+                if self.output_callback is None:
+                    print(result.stdout)
                 return True
             else:
-                print(f"\n[ERROR] ✗ Build failed!")
-                print(f"Output: {result.stdout}")
-                print(f"Error: {result.stderr}")
+                self._report_failure(result)
                 return False
         except subprocess.TimeoutExpired:
             print("[ERROR] Build timeout (5 minutes)")
@@ -136,22 +233,23 @@ class STM32Builder:
             print(f"[ERROR] Exception during build: {e}")
             return False
     
-    def clean(self) -> bool:
-        """Clean build artifacts"""
-        print(f"[INFO] Cleaning build directory: {self.build_dir}")
+    def clean(self, config: Optional[str] = None) -> bool:
+        """Clean build artifacts (of config's output directory, if given)"""
+        build_dir = self.output_dir(config) if config else self.build_dir
+        print(f"[INFO] Cleaning build directory: {build_dir}")
         
         try:
-            if self.build_dir.exists():
+            if build_dir.exists():
                 # Remove common build artifacts
                 patterns = ["*.o", "*.d", "*.su", "*.map", "*.list"]
                 for pattern in patterns:
-                    for file in self.build_dir.rglob(pattern):
+                    for file in build_dir.rglob(pattern):
                         file.unlink()
                         print(f"  Removed: {file.name}")
                 
                 # Remove build output
                 for ext in [".bin", ".elf", ".hex"]:
-                    for file in self.build_dir.glob(f"*{ext}"):
+                    for file in build_dir.glob(f"*{ext}"):
                         file.unlink()
                         print(f"  Removed: {file.name}")
             
@@ -161,6 +259,45 @@ class STM32Builder:
             print(f"[ERROR] Clean failed: {e}")
             return False
     
+    def output_dir(self, config: str = "Debug") -> Path:
+        """Directory the build writes its firmware files to"""
+        build_dir = self.project_root / config
+        return build_dir if build_dir.exists() else self.build_dir
+    
+    def toolchain_id(self) -> str:
+        """
+        Identify the toolchain that would run the build
+        
+        Returns:
+            Build system, compiler version and IDE location as one string
+        """
+        build_system = self.detect_build_system()
+        gcc = self.discovery.find("arm-none-eabi-gcc", lambda: which("arm-none-eabi-gcc"),
+                                  path_search_dirs(), context=os.environ.get("PATH", ""))
+        parts = [f"system={build_system}",
+                 f"gcc={gcc['path']}@{gcc['version']}"]
+        if build_system == "cube":
+            parts.append(f"ide={self._find_cube_ide()}")
+        return ";".join(parts)
+    
+    def fingerprint(self, config: str = "Debug",
+                    cache: Optional[BuildCache] = None) -> str:
+        """
+        Content fingerprint of this project's build
+        
+        Covers the source tree (including Makefile/.cproject), the build
+        configuration and the toolchain.
+        
+        Args:
+            config: Build configuration (Debug/Release)
+            cache: Build cache holding the per-file hash memo
+        
+        Returns:
+            Hex digest
+        """
+        cache = cache or BuildCache()
+        return cache.fingerprint(self.project_root, config, self.toolchain_id())
+    
     def get_binary_path(self, config: str = "Debug") -> Optional[Path]:
         """
         Get path to built binary
@@ -171,9 +308,7 @@ class STM32Builder:
         Returns:
             Path to binary file or None if not found
         """
-        build_dir = self.project_root / config
-        if not build_dir.exists():
-            build_dir = self.build_dir
+        build_dir = self.output_dir(config)
         
         # Priority order: .bin > .hex > .elf
         extensions = [".bin", ".hex", ".elf"]
@@ -191,6 +326,97 @@ class STM32Builder:
         
         return None
     
+    def get_image(self, config: str = "Debug",
+                  address: int = 0x08000000) -> Optional[FirmwareImage]:
+        """
+        Load the built binary as a FirmwareImage
+        
+        Args:
+            config: Build configuration (Debug/Release)
+            address: Load address used for .bin outputs
+        
+        Returns:
+            Parsed image or None if no usable binary was found
+        """
+        binary_path = self.get_binary_path(config)
+        if not binary_path:
+            return None
+        
+        try:
+            return FirmwareImage.load(binary_path, address)
+        except (OSError, ImageFormatError) as e:
+            print(f"[ERROR] Cannot load image {binary_path.name}: {e}")
+            return None
+    
+    def get_map_path(self, config: str = "Debug") -> Optional[Path]:
+        """
+        Get path to the linker map file (ld -Map)
+        
+        Args:
+            config: Build configuration (Debug/Release)
+        
+        Returns:
+            Path to map file or None if not found
+        """
+        build_dir = self.output_dir(config)
+        map_file = build_dir / f"{self.project_name}.map"
+        if map_file.exists():
+            return map_file
+        matches = list(build_dir.glob("*.map"))
+        return matches[0] if matches else None
+    
+    def memory_usage(self, config: str = "Debug") -> Optional[MemoryMap]:
+        """
+        Flash/RAM usage of the build from its map file, else its ELF file
+        
+        Args:
+            config: Build configuration (Debug/Release)
+        
+        Returns:
+            MemoryMap or None if neither file is usable
+        """
+        source = self.get_map_path(config)
+        if source is None:
+            build_dir = self.output_dir(config)
+            elf_file = build_dir / f"{self.project_name}.elf"
+            matches = [elf_file] if elf_file.exists() else list(build_dir.glob("*.elf"))
+            source = matches[0] if matches else None
+        if source is None:
+            return None
+        
+        try:
+            with self.timeline.span("memory map", source.stat().st_size):
+                return MemoryMap.load(source)
+        except (OSError, ImageFormatError) as e:
+            print(f"[ERROR] Cannot read memory usage from {source.name}: {e}")
+            return None
+    
+    def check_size(self, gate: SizeGate, config: str = "Debug") -> bool:
+        """
+        Compare the build's memory usage with the size baseline
+        
+        Args:
+            gate: Baseline and growth limits
+            config: Build configuration (Debug/Release)
+        
+        Returns:
+            True if within the limits (or no usage information is available)
+        """
+        usage = self.memory_usage(config)
+        if usage is None:
+            print("[WARNING] No .map or .elf file found - size check skipped")
+            return True
+        
+        print(f"[INFO] Memory usage: {usage.summary()}")
+        report = gate.check(usage)
+        if report.totals:
+            print(report.format_report())
+        for violation in report.violations:
+            print(f"[ERROR] ✗ Size limit: {violation}")
+        if report.success and report.totals:
+            print(f"[SUCCESS] ✓ Size check passed: {report.summary()}")
+        return report.success
+    
     def get_build_info(self) -> Dict[str, any]:
         """Get information about the build"""
         binary_path = self.get_binary_path()
@@ -206,11 +432,37 @@ class STM32Builder:
         if binary_path:
             info["binary_size"] = binary_path.stat().st_size
             info["binary_type"] = binary_path.suffix
+            
+            image = self.get_image()
+            if image is not None and image.segments:
+                info["image_size"] = image.size
+                info["image_start"] = hex(image.start)
+                info["image_end"] = hex(image.end)
+                info["image_segments"] = len(image.segments)
+            
+            usage = self.memory_usage()
+            if usage is not None:
+                info["flash_used"] = usage.flash_used
+                info["ram_used"] = usage.ram_used
+                info["memory_regions"] = {
+                    r.name: {"used": r.used, "size": r.length,
+                             "percent": round(r.percent, 1)}
+                    for r in usage.regions
+                }
         
         return info
     
     def _find_cube_ide(self) -> Optional[Path]:
-        """Find STM32CubeIDE executable"""
+        """Find STM32CubeIDE executable (cached across runs)"""
+        candidates = self._cube_ide_candidates()
+        entry = self.discovery.find(
+            "stm32cubeidec",
+            lambda: next((path for path in candidates if path.exists()), None),
+            watch=candidates, version_args=None)
+        return Path(entry["path"]) if entry["path"] else None
+    
+    def _cube_ide_candidates(self) -> List[Path]:
+        """Install locations searched for STM32CubeIDE"""
         if platform.system() == "Windows":
             possible_paths = [
                 Path(r"C:\ST\STM32CubeIDE_1.11.0\STM32CubeIDE\stm32cubeidec.exe"),
@@ -223,8 +475,4 @@ class STM32Builder:
                 Path.home() / "STM32CubeIDE/stm32cubeidec",
             ]
         
-        for path in possible_paths:
-            if path.exists():
-                return path
-        
-        return None
+        return possible_paths
@@ -0,0 +1,170 @@
+"""
+Chip Database - Flash geometry and tool settings of STM32 parts
+Resolves part numbers such as STM32F103C8 or STM32G474RE against the packaged
+chips.json by prefix; the file is only read on the first lookup
+"""
+
+import functools
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple
+
+from .flash_layout import FlashLayout
+
+CHIPS_FILE = Path(__file__).with_name("chips.json")
+
+# Position of the flash size code in a part number (STM32F103C8 -> '8')
+_SIZE_CODE_INDEX = 10
+
+
+@dataclass(frozen=True)
+class ChipInfo:
+    """Flash geometry and tool settings of one part"""
+    part: str
+    family: str
+    core: str
+    flash_base: int
+    flash_size: int                   # bytes
+    sector_sizes: Tuple[int, ...]
+    write_size: int                   # Programming granularity in bytes
+    openocd_target: str
+    bank_size: Optional[int] = None   # Size of bank 1 on dual-bank parts
+    openocd_banks: int = 1            # Flash banks declared by the OpenOCD target
+    dma_crc: bool = False             # CRC unit reachable by DMA1 channel 1 (verify.py)
+    uid_address: Optional[int] = None # 96-bit unique device ID
+
+    @property
+    def dual_bank(self) -> bool:
+        return self.bank_size is not None
+
+    @property
+    def page_size(self) -> int:
+        """Smallest erasable unit"""
+        return min(self.sector_sizes)
+
+    def layout(self, base: Optional[int] = None) -> FlashLayout:
+        """Sector layout of the part's flash"""
+        return FlashLayout(self.flash_base if base is None else base,
+                           list(self.sector_sizes), self.bank_size)
+
+    def describe(self) -> str:
+        """One-line summary"""
+        banks = f", 2 banks ({self.bank_size // 1024} KB + " \
+                f"{(self.flash_size - self.bank_size) // 1024} KB)" if self.dual_bank else ""
+        return (f"{self.part}: {self.family} {self.core}, {self.flash_size // 1024} KB flash "
+                f"at {hex(self.flash_base)}, {len(self.sector_sizes)} sectors "
+                f"({self.page_size} B min), {self.write_size}-byte writes{banks}, "
+                f"OpenOCD target/{self.openocd_target}")
+
+
+def _expand_sectors(runs: List[List[int]], flash_size: int) -> Tuple[int, ...]:
+    """Expand [count, size] runs (count 0: repeat to fill) to flash_size"""
+    sectors: List[int] = []
+    total = 0
+    for count, size in runs:
+        repeat = count if count else max((flash_size - total) // size, 0)
+        for _ in range(repeat):
+            if total >= flash_size:
+                break
+            sectors.append(size)
+            total += size
+    return tuple(sectors)
+
+
+class ChipDatabase:
+    """Prefix-indexed view of a chip database file"""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initialize chip database
+
+        Args:
+            path: Database file (default: chips.json next to this module)
+        """
+        self.path = Path(path or CHIPS_FILE)
+        self._index: Optional[Dict[str, List[dict]]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[dict]]:
+        """Read the file once; index entries by prefix"""
+        with self._lock:
+            if self._index is None:
+                data = json.loads(self.path.read_text())
+                self._size_codes = data["size_codes"]
+                self._defaults = data["defaults"]
+                index: Dict[str, List[dict]] = {}
+                for entry in data["entries"]:
+                    index.setdefault(entry["prefix"].upper(), []).append(entry)
+                self._index = index
+            return self._index
+
+    def families(self) -> List[str]:
+        """Family names in the database"""
+        index = self._load()
+        return sorted({e["family"] for entries in index.values()
+                       for e in entries if "family" in e})
+
+    def lookup(self, part: str) -> Optional[ChipInfo]:
+        """
+        Resolve a part number
+
+        Args:
+            part: Part number (e.g. STM32F103C8, stm32g474re)
+
+        Returns:
+            ChipInfo, or None if no family matches
+        """
+        index = self._load()
+        name = part.strip().upper()
+        matches = []
+        for length in range(1, len(name) + 1):
+            for entry in index.get(name[:length], ()):
+                matches.append((length, entry))
+        if not any("family" in entry for _, entry in matches):
+            return None
+
+        # The flash size selects the size-dependent entries, so resolve it first
+        code = name[_SIZE_CODE_INDEX:_SIZE_CODE_INDEX + 1]
+        size_kb = self._size_codes.get(code)
+        if size_kb is None:
+            size_kb = self._defaults["flash_kb"]
+            for _, entry in matches:
+                size_kb = entry.get("flash_kb", size_kb) if "min_flash_kb" not in entry else size_kb
+
+        fields = dict(self._defaults)
+        for _, entry in sorted(matches, key=lambda m: (m[0], m[1].get("min_flash_kb", 0))):
+            if entry.get("min_flash_kb", 0) <= size_kb:
+                fields.update(entry)
+
+        flash_size = size_kb * 1024
+        bank_size = None
+        if fields.get("bank_kb"):
+            bank_size = fields["bank_kb"] * 1024
+        elif fields.get("banks", 1) > 1:
+            bank_size = flash_size // fields["banks"]
+
+        return ChipInfo(
+            part=name,
+            family=fields["family"],
+            core=fields["core"],
+            flash_base=int(str(fields["flash_base"]), 0),
+            flash_size=flash_size,
+            sector_sizes=_expand_sectors(fields["sectors"], flash_size),
+            write_size=fields["write_size"],
+            openocd_target=fields["openocd_target"],
+            bank_size=bank_size,
+            openocd_banks=fields["openocd_banks"],
+            dma_crc=fields["dma_crc"],
+            uid_address=int(str(fields["uid_address"]), 0) if fields["uid_address"] else None,
+        )
+
+
+_default_db = ChipDatabase()
+
+
+@functools.lru_cache(maxsize=None)
+def lookup_chip(part: str) -> Optional[ChipInfo]:
+    """Resolve a part number against the packaged database (cached)"""
+    return _default_db.lookup(part)
@@ -0,0 +1,338 @@
+"""
+Daemon - Long-lived programmer process behind a Unix domain socket
+Keeps imports, tool discovery, OpenOCD sessions and parsed images warm so
+CLI invocations only pay for connecting to the socket; requests for the same
+probe are queued first-come first-served, different probes run concurrently
+"""
+
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional, List, Dict, Callable, Iterable
+
+from .progress import ProgressEvent, ProgressCallback
+from .thread_output import ThreadOutput
+
+SOCKET_ENV = "STM32PROG_SOCKET"
+
+# Unix domain sockets are not available on every platform (e.g. Windows)
+SUPPORTED = hasattr(socket, "AF_UNIX") and hasattr(socketserver, "ThreadingUnixStreamServer")
+
+# Probe key used when a request does not name a probe serial
+DEFAULT_PROBE = "default"
+
+# handler(argv, cwd, progress_callback) -> exit code
+RequestHandler = Callable[[List[str], Path, Optional[ProgressCallback]], int]
+
+
+def default_socket_path() -> Path:
+    """Socket path: $STM32PROG_SOCKET or ~/.stm32programmer/daemon.sock"""
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return Path(path)
+    return Path.home() / ".stm32programmer" / "daemon.sock"
+
+
+def _send(conn: socket.socket, message: dict) -> None:
+    conn.sendall((json.dumps(message) + "\n").encode())
+
+
+class ProbeQueue:
+    """First-come first-served exclusive access to probes"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._waiting = deque()
+        self._busy = set()
+
+    @contextlib.contextmanager
+    def hold(self, probes: Iterable[str]):
+        """
+        Block until every probe is free and no earlier request waits for one
+
+        Args:
+            probes: Probe keys the request needs (all are taken at once)
+        """
+        ticket = (object(), frozenset(probes) or frozenset([DEFAULT_PROBE]))
+        with self._cond:
+            self._waiting.append(ticket)
+            while not self._ready(ticket):
+                self._cond.wait()
+            self._waiting.remove(ticket)
+            self._busy |= ticket[1]
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._busy -= ticket[1]
+                self._cond.notify_all()
+
+    def _ready(self, ticket) -> bool:
+        if ticket[1] & self._busy:
+            return False
+        for other in self._waiting:
+            if other is ticket:
+                return True
+            if other[1] & ticket[1]:
+                return False
+        return True
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Per-probe count of running and waiting requests"""
+        with self._cond:
+            state = {probe: {"running": 1, "waiting": 0} for probe in self._busy}
+            for _, probes in self._waiting:
+                for probe in probes:
+                    state.setdefault(probe, {"running": 0, "waiting": 0})["waiting"] += 1
+            return state
+
+
+class ProgrammerDaemon:
+    """Serve CLI requests from one warm process"""
+
+    def __init__(self, handler: RequestHandler,
+                 socket_path: Optional[Path] = None):
+        """
+        Initialize daemon
+
+        Args:
+            handler: Runs one CLI command line and returns its exit code
+            socket_path: Socket to listen on (default: default_socket_path())
+        """
+        self.handler = handler
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.queue = ProbeQueue()
+        self.started = time.time()
+        self.served = 0
+        self.status_hooks: List[Callable[[], dict]] = []
+        self._server = None
+        self._log = sys.stdout
+        self._lock = threading.Lock()
+
+    def serve_forever(self) -> bool:
+        """
+        Listen until stopped by a client or KeyboardInterrupt
+
+        Returns:
+            True if the daemon ran, False if it could not start
+        """
+        if not SUPPORTED:
+            print("[ERROR] Daemon mode needs Unix domain sockets, not available on this platform")
+            return False
+        if DaemonClient(self.socket_path).ping() is not None:
+            print(f"[ERROR] A daemon is already listening on {self.socket_path}")
+            return False
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            self.socket_path.unlink()  # Stale socket of a daemon that died
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon._handle(self.request, self.rfile)
+
+        old_umask = os.umask(0o077)  # Only the owner may connect
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+
+        # Gang workers register with their request's sink; other helper
+        # threads are attributed to the request when only one is running
+        output = ThreadOutput(sys.stdout, adopt_helpers=True)
+        errors = ThreadOutput(sys.stderr, adopt_helpers=True)
+        self._outputs = (output, errors)
+        original = sys.stdout, sys.stderr
+        self._log = original[0]
+        sys.stdout, sys.stderr = output, errors
+        print(f"[INFO] Daemon listening on {self.socket_path} (pid {os.getpid()})")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n[INFO] Daemon interrupted")
+        finally:
+            sys.stdout, sys.stderr = original
+            self._server.server_close()
+            with contextlib.suppress(FileNotFoundError):
+                self.socket_path.unlink()
+        print("[INFO] Daemon stopped")
+        return True
+
+    def stop(self) -> None:
+        """Ask serve_forever to return"""
+        if self._server is not None:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def status(self) -> dict:
+        """Daemon state reported to `daemon --status`"""
+        state = {
+            "pid": os.getpid(),
+            "socket": str(self.socket_path),
+            "uptime": time.time() - self.started,
+            "served": self.served,
+            "probes": self.queue.snapshot(),
+        }
+        for hook in self.status_hooks:
+            state.update(hook())
+        return state
+
+    def _handle(self, conn: socket.socket, rfile) -> None:
+        """Serve one connection: a single JSON request line"""
+        try:
+            request = json.loads(rfile.readline() or b"{}")
+        except ValueError:
+            return
+
+        send_lock = threading.Lock()
+        connected = [True]
+
+        def send(message: dict) -> None:
+            # Keep running if the client went away; the device must not be
+            # left half-programmed because a terminal was closed
+            with send_lock:
+                if connected[0]:
+                    try:
+                        _send(conn, message)
+                    except OSError:
+                        connected[0] = False
+
+        control = request.get("control")
+        if control == "ping":
+            send({"type": "exit", "code": 0, "status": self.status()})
+            return
+        if control == "stop":
+            send({"type": "exit", "code": 0})
+            self.stop()
+            return
+
+        argv = request.get("argv")
+        if not isinstance(argv, list):
+            send({"type": "exit", "code": 2})
+            return
+
+        progress = None
+        if request.get("progress"):
+            progress = lambda event: send({"type": "progress", "event": asdict(event)})
+
+        output, errors = self._outputs
+        start = time.monotonic()
+        code = 1
+        with self.queue.hold(request.get("probes") or []):
+            output.register(lambda text: send({"type": "output", "data": text}))
+            errors.register(lambda text: send({"type": "output", "data": text, "stream": "stderr"}))
+            try:
+                code = self.handler(argv, Path(request.get("cwd") or "."), progress)
+            except SystemExit as e:  # argparse errors
+                code = e.code if isinstance(e.code, int) else 2
+            except Exception as e:
+                print(f"[ERROR] Unexpected error: {e}")
+            finally:
+                output.unregister()
+                errors.unregister()
+        with self._lock:
+            self.served += 1
+        self._log.write(f"[INFO] {' '.join(argv)} -> {code} "
+                        f"({time.monotonic() - start:.2f}s)\n")
+        self._log.flush()
+        send({"type": "exit", "code": code})
+
+
+class DaemonClient:
+    """Forward CLI requests to a running daemon"""
+
+    def __init__(self, socket_path: Optional[Path] = None,
+                 connect_timeout: float = 0.5):
+        """
+        Initialize client
+
+        Args:
+            socket_path: Daemon socket (default: default_socket_path())
+            connect_timeout: Seconds to wait for the daemon to accept
+        """
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.connect_timeout = connect_timeout
+
+    def _connect(self) -> Optional[socket.socket]:
+        """Connected socket, or None when no daemon is listening"""
+        if not SUPPORTED or not self.socket_path.exists():
+            return None
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(self.connect_timeout)
+        try:
+            conn.connect(str(self.socket_path))
+        except OSError:
+            conn.close()
+            return None
+        conn.settimeout(None)
+        return conn
+
+    def _request(self, request: dict,
+                 on_message: Optional[Callable[[dict], None]] = None) -> Optional[dict]:
+        """Send a request; returns the final exit message or None if unreachable"""
+        conn = self._connect()
+        if conn is None:
+            return None
+        with conn, conn.makefile("rb") as rfile:
+            try:
+                _send(conn, request)
+            except OSError:
+                return None
+            for line in rfile:
+                message = json.loads(line)
+                if message.get("type") == "exit":
+                    return message
+                if on_message is not None:
+                    on_message(message)
+        print("[ERROR] Daemon closed the connection")
+        return {"type": "exit", "code": 1}
+
+    def run(self, argv: List[str], cwd: Optional[Path] = None,
+            probes: Optional[List[str]] = None,
+            progress: Optional[ProgressCallback] = None) -> Optional[int]:
+        """
+        Run a CLI command line in the daemon, relaying its output
+
+        Args:
+            argv: Command line (without the program name)
+            cwd: Directory relative paths are resolved against (default: cwd)
+            probes: Probe keys the command needs exclusively
+            progress: Callback receiving the daemon's progress events
+
+        Returns:
+            Exit code, or None if no daemon is running
+        """
+        def relay(message: dict) -> None:
+            if message["type"] == "output":
+                stream = sys.stderr if message.get("stream") == "stderr" else sys.stdout
+                stream.write(message["data"])
+                stream.flush()
+            elif message["type"] == "progress" and progress is not None:
+                progress(ProgressEvent(**message["event"]))
+
+        result = self._request({
+            "argv": list(argv),
+            "cwd": str(cwd or Path.cwd()),
+            "probes": probes or [DEFAULT_PROBE],
+            "progress": progress is not None,
+        }, relay)
+        return None if result is None else result["code"]
+
+    def ping(self) -> Optional[dict]:
+        """Daemon status, or None if no daemon is running"""
+        result = self._request({"control": "ping"})
+        return None if result is None else result.get("status", {})
+
+    def stop(self) -> bool:
+        """Ask the daemon to exit; False if none was running"""
+        return self._request({"control": "stop"}) is not None
@@ -3,29 +3,50 @@ STM32 Deployer - Unified deployment combining build and flash operations
 """
 
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Dict, Any
 from .builder import STM32Builder
+from .build_cache import BuildCache
 from .programmer import STM32Programmer, STM32Config
+from .image import ImageFormatError
+from .memory_map import SizeGate
+from .production import ProductionLine, LineStats
+from .progress import ProgressCallback
+from .timing import Timeline, NULL_TIMELINE
 
 
 class STM32Deployer:
     """Unified deployment for STM32 projects"""
     
-    def __init__(self, project_root: Path, config: STM32Config):
+    def __init__(self, project_root: Path, config: STM32Config,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 build_cache: Optional[BuildCache] = None,
+                 timeline: Optional[Timeline] = None,
+                 programmer: Optional[STM32Programmer] = None):
         """
         Initialize deployer
         
         Args:
             project_root: Path to STM32 project root
             config: Programming configuration
+            progress_callback: Receives build and flash ProgressEvents
+            build_cache: Artifact cache used to skip unchanged builds
+            timeline: Records per-phase timings (default: disabled)
+            programmer: Programmer for config to flash with (default: a new
+                one, which locates the programming tools again)
         """
-        self.builder = STM32Builder(project_root)
-        self.programmer = STM32Programmer(config)
+        self.timeline = timeline or NULL_TIMELINE
+        self.build_cache = build_cache or BuildCache()
+        self.builder = STM32Builder(project_root, progress_callback,
+                                    timeline=self.timeline)
+        self.programmer = programmer or STM32Programmer(config, progress_callback,
+                                                        timeline=self.timeline)
         self.project_root = Path(project_root)
         self.config = config
     
     def deploy(self, build: bool = True, clean: bool = False, 
-               build_config: str = "Debug", verify: bool = True) -> bool:
+               build_config: str = "Debug", verify: bool = True,
+               use_cache: bool = True,
+               size_gate: Optional[SizeGate] = None) -> bool:
         """
         Full deployment: build and flash
         
@@ -34,6 +55,8 @@ class STM32Deployer:
             clean: Whether to clean before building
             build_config: Build configuration (Debug/Release)
             verify: Whether to verify after flashing
+            use_cache: Reuse cached artifacts when the sources are unchanged
+            size_gate: Abort if flash/RAM usage grew past the baseline limits
         
         Returns:
             True if deployment successful
@@ -43,41 +66,89 @@ class STM32Deployer:
         print(f"  Project: {self.builder.project_name}")
         print(f"{'='*70}\n")
         
-        try:
-            # Build step
-            if build:
-                print(f"[STEP 1/2] Building project...")
-                if not self.builder.build(clean=clean, config=build_config):
-                    print("[ERROR] ✗ Build failed - deployment aborted")
+        with self.timeline.span("deploy"):
+            try:
+                # Build step
+                if build:
+                    print(f"[STEP 1/2] Building project...")
+                    if not self._build(clean, build_config, use_cache):
+                        print("[ERROR] ✗ Build failed - deployment aborted")
+                        return False
+                    print("[SUCCESS] ✓ Build successful\n")
+                else:
+                    print("[INFO] Skipping build step\n")
+                
+                if size_gate is not None and not self.builder.check_size(size_gate, build_config):
+                    print("[ERROR] ✗ Size check failed - deployment aborted")
                     return False
-                print("[SUCCESS] ✓ Build successful\n")
-            else:
-                print("[INFO] Skipping build step\n")
-            
-            # Get binary
-            binary_path = self.builder.get_binary_path(config=build_config)
-            if not binary_path:
-                print("[ERROR] ✗ Binary file not found - deployment aborted")
-                print(f"[INFO] Searched in: {self.builder.build_dir}")
-                return False
-            
-            print(f"[INFO] Binary found: {binary_path}")
-            print(f"[INFO] Binary size: {binary_path.stat().st_size} bytes\n")
-            
-            # Flash step
-            print(f"[STEP 2/2] Flashing firmware...")
-            if not self.programmer.flash(binary_path, verify=verify):
-                print("[ERROR] ✗ Flashing failed - deployment aborted")
+                
+                # Get binary
+                binary_path = self.builder.get_binary_path(config=build_config)
+                if not binary_path:
+                    print("[ERROR] ✗ Binary file not found - deployment aborted")
+                    print(f"[INFO] Searched in: {self.builder.build_dir}")
+                    return False
+                
+                print(f"[INFO] Binary found: {binary_path}")
+                if not self._report_image(binary_path):
+                    return False
+                
+                # Flash step
+                print(f"[STEP 2/2] Flashing firmware...")
+                if not self.programmer.flash(binary_path, verify=verify):
+                    print("[ERROR] ✗ Flashing failed - deployment aborted")
+                    return False
+                
+                print("\n" + "="*70)
+                print(f"[SUCCESS] ✓✓✓ Deployment completed successfully! ✓✓✓")
+                print("="*70 + "\n")
+                return True
+                
+            except Exception as e:
+                print(f"\n[ERROR] ✗ Deployment failed with exception: {e}")
                 return False
-            
-            print("\n" + "="*70)
-            print(f"[SUCCESS] ✓✓✓ Deployment completed successfully! ✓✓✓")
-            print("="*70 + "\n")
-            return True
-            
-        except Exception as e:
-            print(f"\n[ERROR] ✗ Deployment failed with exception: {e}")
+    
+    def _build(self, clean: bool, build_config: str, use_cache: bool) -> bool:
+        """
+        Build, or restore the artifacts of an identical earlier build
+        
+        Args:
+            clean: Whether to clean before building (always rebuilds)
+            build_config: Build configuration (Debug/Release)
+            use_cache: Consult and fill the build cache
+        
+        Returns:
+            True if build artifacts are in place
+        """
+        fingerprint = None
+        if use_cache:
+            try:
+                with self.timeline.span("fingerprint"):
+                    fingerprint = self.builder.fingerprint(build_config, self.build_cache)
+            except OSError as e:
+                print(f"[WARNING] Cannot fingerprint sources, building: {e}")
+        
+        output_dir = self.builder.output_dir(build_config)
+        if fingerprint and not clean:
+            with self.timeline.span("cache restore"):
+                restored = self.build_cache.restore(fingerprint, output_dir)
+            if restored:
+                print(f"[INFO] Sources unchanged (build {fingerprint[:12]}) - "
+                      f"using cached artifacts, skipping build")
+                return True
+        
+        if not self.builder.build(clean=clean, config=build_config):
             return False
+        
+        if fingerprint:
+            # Recompute: the output dir may not have existed before the build
+            output_dir = self.builder.output_dir(build_config)
+            with self.timeline.span("cache store"):
+                stored = self.build_cache.store(fingerprint, output_dir,
+                                                self.builder.project_name)
+            if stored:
+                print(f"[INFO] Cached build artifacts ({fingerprint[:12]})")
+        return True
     
     def flash_only(self, binary_path: Optional[Path] = None, 
                    verify: bool = True) -> bool:
@@ -106,7 +177,8 @@ class STM32Deployer:
                 return False
             
             print(f"[INFO] Binary: {binary_path}")
-            print(f"[INFO] Size: {binary_path.stat().st_size} bytes\n")
+            if not self._report_image(binary_path):
+                return False
             
             # Flash
             if not self.programmer.flash(binary_path, verify=verify):
@@ -122,6 +194,73 @@ class STM32Deployer:
             print(f"\n[ERROR] ✗ Flash failed with exception: {e}")
             return False
     
+    def run_line(self, binary_path: Optional[Path] = None,
+                 verify: bool = True, units: Optional[int] = None,
+                 log_path: Optional[Path] = None,
+                 serial_format: str = "{:06d}",
+                 poll_interval: float = 0.5,
+                 quiet: bool = True,
+                 template: Optional[Path] = None,
+                 values: Optional[Dict[str, Any]] = None,
+                 base_programmed: bool = False) -> Optional[LineStats]:
+        """
+        Flash-only production loop: program every unit that attaches
+        
+        Args:
+            binary_path: Path to binary file (if None, search for built binary)
+            verify: Whether to verify every unit
+            units: Units to program (default: until interrupted)
+            log_path: JSON-lines production log
+            serial_format: Pattern turning unit numbers into serials
+            poll_interval: Seconds between attach/detach checks
+            quiet: Hide the per-unit programmer output
+            template: Per-unit record template injected into every unit
+            values: Fixed values for the template fields
+            base_programmed: Units hold the image, rewrite only the record
+        
+        Returns:
+            LineStats, or None if the image cannot be programmed
+        """
+        if binary_path is None:
+            binary_path = self.builder.get_binary_path()
+        if not binary_path or not Path(binary_path).exists():
+            print("[ERROR] ✗ No binary file specified or found")
+            print(f"[INFO] Searched in: {self.builder.build_dir}")
+            return None
+        
+        line = ProductionLine(self.programmer, binary_path, verify=verify,
+                              log_path=log_path, serial_format=serial_format,
+                              poll_interval=poll_interval, quiet=quiet,
+                              template=template, values=values,
+                              base_programmed=base_programmed)
+        if not line.prepare():
+            return None
+        return line.run(units)
+    
+    def _report_image(self, binary_path: Path) -> bool:
+        """
+        Parse the firmware, print its real footprint and check it fits
+        
+        Args:
+            binary_path: Firmware file about to be flashed
+        
+        Returns:
+            True if the image is valid for the configured chip
+        """
+        try:
+            image = self.programmer.load_image(binary_path)
+        except (OSError, ImageFormatError) as e:
+            print(f"[ERROR] ✗ Cannot load image: {e}")
+            return False
+        
+        if image.segments:
+            print(f"[INFO] Image size: {image.size} bytes "
+                  f"({hex(image.start)}-{hex(image.end)}, "
+                  f"{len(image.segments)} segment(s))\n")
+        else:
+            print("[WARNING] Image contains no data\n")
+        return self.programmer.check_image_bounds(image)
+    
     def rebuild_and_deploy(self, build_config: str = "Debug", 
                           verify: bool = True) -> bool:
         """
@@ -151,7 +290,8 @@ class STM32Deployer:
             "build": build_info,
             "device": device_info if device_info else {"status": "not connected"},
             "programmer": {
-                "tool": "STM32CubeProgrammer" if self.programmer.stm32_cli_path else "OpenOCD" if self.programmer.use_openocd else "None",
+                "tool": "UART bootloader" if self.programmer.use_uart else "STM32CubeProgrammer" if self.programmer.stm32_cli_path else "OpenOCD" if self.programmer.use_openocd else "None",
+                "version": self.programmer.tool_version,
                 "port": self.config.port,
                 "chip": self.config.chip,
             }
@@ -0,0 +1,343 @@
+"""
+Differential Flashing - Only erase and write sectors that changed
+Compares per-sector digests of the new image against a cached or read-back
+digest of the device contents
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Union
+
+from .flash_layout import FlashLayout, layout_for_chip
+from .image import FirmwareImage, Segment
+from .verify import Verifier
+
+
+def sector_digest(data: bytes) -> str:
+    """Digest of one sector's contents"""
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class DiffFlashReport:
+    """Outcome of a differential flash"""
+    success: bool = False
+    sectors_total: int = 0
+    sectors_written: List[int] = field(default_factory=list)
+    bytes_written: int = 0
+    bytes_skipped: int = 0
+    source: str = "cache"  # cache, readback
+    write_time: float = 0.0
+    compare_time: float = 0.0
+    time_saved: Optional[float] = None
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        text = (f"{len(self.sectors_written)}/{self.sectors_total} sectors "
+                f"written, {self.bytes_written} bytes written, "
+                f"{self.bytes_skipped} bytes skipped ({self.source})")
+        if self.time_saved is not None:
+            text += f", ~{self.time_saved:.2f}s saved"
+        return text
+
+
+class SectorDigestCache:
+    """Per-device record of the sector digests last programmed"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        """
+        Initialize digest cache
+
+        Args:
+            cache_file: Path to cache file (default: ~/.stm32programmer/sector_digests.json)
+        """
+        if cache_file is None:
+            cache_file = Path.home() / ".stm32programmer" / "sector_digests.json"
+
+        self.cache_file = Path(cache_file)
+        self.entries = self.load()
+
+    def load(self) -> Dict[str, dict]:
+        """Load cache entries from file"""
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[WARNING] Failed to load sector digest cache: {e}")
+        return {}
+
+    def save(self) -> bool:
+        """Save cache entries to file"""
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(
+                f"{self.cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+            return True
+        except Exception as e:
+            print(f"[WARNING] Failed to save sector digest cache: {e}")
+            return False
+
+    def get(self, device_key: str) -> Dict[str, str]:
+        """Sector start address (hex) -> digest for a device"""
+        return self.entries.get(device_key, {}).get("sectors", {})
+
+    def uid(self, device_key: str) -> Optional[str]:
+        """Unique ID of the device the digests were taken from, if known"""
+        return self.entries.get(device_key, {}).get("uid")
+
+    def throughput(self, device_key: str) -> Optional[float]:
+        """Last measured write throughput in bytes/second"""
+        return self.entries.get(device_key, {}).get("throughput")
+
+    def update(self, device_key: str, digests: Dict[str, str],
+               throughput: Optional[float] = None,
+               uid: Optional[str] = None) -> bool:
+        """
+        Merge new sector digests for a device and persist
+
+        Args:
+            device_key: Probe/target pair
+            digests: Sector start address (hex) -> digest
+            throughput: Measured write throughput in bytes/second
+            uid: Unique ID of the device, None if it was not read (the
+                entry is then not trusted until a read-back)
+
+        Returns:
+            True if saved
+        """
+        with self._lock:
+            # Re-read so concurrent programmers do not drop each other's entries
+            self.entries = self.load()
+            entry = self.entries.setdefault(device_key, {"sectors": {}})
+            if entry.get("uid") != uid:
+                # Digests of another (or an unidentified) device
+                entry["sectors"] = {}
+                entry["uid"] = uid
+            entry["sectors"].update(digests)
+            if throughput:
+                entry["throughput"] = throughput
+            return self.save()
+
+    def invalidate(self, device_key: str) -> bool:
+        """Forget everything known about a device's flash contents"""
+        with self._lock:
+            self.entries = self.load()
+            if self.entries.pop(device_key, None) is None:
+                return True
+            return self.save()
+
+
+class DiffFlasher:
+    """Sector-level differential flashing on top of STM32Programmer"""
+
+    def __init__(self, programmer, layout: Optional[FlashLayout] = None,
+                 cache: Optional[SectorDigestCache] = None):
+        """
+        Initialize differential flasher
+
+        Args:
+            programmer: STM32Programmer used for read-back and writes
+            layout: Flash sector layout (default: derived from config.chip;
+                None for parts missing from the chip database)
+            cache: Sector digest cache (default: ~/.stm32programmer)
+        """
+        self.programmer = programmer
+        self.config = programmer.config
+        self.layout = layout or layout_for_chip(self.config.chip)
+        self.cache = cache or SectorDigestCache()
+
+    @property
+    def device_key(self) -> str:
+        """Cache key identifying the probe/target pair (entries name the device UID)"""
+        probe = self.config.probe_serial or self.config.port
+        return f"{probe}:{self.config.chip.upper()}"
+
+    def image_sectors(self, image: FirmwareImage) -> List[Tuple[int, int, bytes]]:
+        """
+        Split an image into the sectors it covers
+
+        Sector contents are padded with the erased value, matching what a
+        sector erase followed by a write leaves on the device.
+
+        Args:
+            image: Firmware image
+
+        Returns:
+            List of (sector index, sector start, expected sector contents)
+        """
+        covered = {}
+        for segment in image.segments:
+            for index, start, size in self.layout.sectors_in_range(
+                    segment.address, segment.end):
+                covered[index] = (start, size)
+        return [(index, start, image.read(start, size))
+                for index, (start, size) in sorted(covered.items())]
+
+    @staticmethod
+    def _image_regions(image: FirmwareImage,
+                       sectors: List[Tuple[int, int, bytes]]) -> List[List[int]]:
+        """Image bytes inside sectors as [start, end) runs, contiguous runs coalesced"""
+        regions = []
+        for _, start, expected in sectors:
+            end = start + len(expected)
+            for segment in image.segments:
+                lo = max(start, segment.address)
+                hi = min(end, segment.end)
+                if lo >= hi:
+                    continue
+                if regions and regions[-1][1] == lo:
+                    regions[-1][1] = hi
+                else:
+                    regions.append([lo, hi])
+        return regions
+
+    def record(self, image: FirmwareImage,
+               throughput: Optional[float] = None) -> None:
+        """
+        Record the digests of an image that was fully programmed
+
+        The device's UID is not read here, so the next differential flash
+        compares by read-back once before it trusts these digests.
+        """
+        if self.layout is None:
+            self.cache.invalidate(self.device_key)
+            return
+        digests = {hex(start): sector_digest(expected)
+                   for _, start, expected in self.image_sectors(image)}
+        self.cache.update(self.device_key, digests, throughput)
+
+    def _device_digests(self, sectors: List[Tuple[int, int, bytes]], readback: bool,
+                        uid: Optional[str]) -> Tuple[Optional[Dict[str, str]], str]:
+        """
+        Get device digests for the given sectors from cache or read-back
+
+        The cache is only trusted for the device it was recorded on: the
+        key names the probe, not the board behind it.
+        """
+        cached = self.cache.get(self.device_key)
+        if not readback and uid is not None and self.cache.uid(self.device_key) == uid \
+                and all(hex(start) in cached for _, start, _ in sectors):
+            return cached, "cache"
+
+        first = sectors[0][1]
+        last_start, last_size = sectors[-1][1], len(sectors[-1][2])
+        device = self.programmer.read_bytes(first, last_start + last_size - first)
+        if device is None:
+            return None, "readback"
+
+        view = memoryview(device)
+        digests = {}
+        for _, start, expected in sectors:
+            offset = start - first
+            digests[hex(start)] = sector_digest(view[offset:offset + len(expected)])
+        return digests, "readback"
+
+    def flash(self, image: Union[FirmwareImage, Path, str],
+              address: Optional[int] = None,
+              verify: Optional[bool] = None,
+              readback: bool = False) -> DiffFlashReport:
+        """
+        Flash only the sectors whose contents differ from the device
+
+        Args:
+            image: Firmware image or image file (.bin, .hex, .elf)
+            address: Load address for .bin files (default: from config)
+            verify: Verify written sectors (default: from config)
+            readback: Ignore the digest cache and read the device back
+
+        Returns:
+            DiffFlashReport describing what was written and skipped
+        """
+        address = address if address is not None else self.config.flash_start
+        report = DiffFlashReport()
+
+        if not isinstance(image, FirmwareImage):
+            image = FirmwareImage.load(image, address)
+        if self.layout is None:
+            print(f"[ERROR] ✗ The sector layout of {self.config.chip} is unknown")
+            return report
+        outside = image.out_of_range(self.layout.base, self.layout.size)
+        if outside:
+            print(f"[ERROR] ✗ Image range {hex(outside[0][0])}-{hex(outside[0][1])} "
+                  f"does not fit in {self.config.chip} flash")
+            return report
+
+        sectors = self.image_sectors(image)
+        report.sectors_total = len(sectors)
+        if not sectors:
+            report.success = True
+            return report
+
+        start_time = time.monotonic()
+        uid = self.programmer.device_uid()
+        device, report.source = self._device_digests(sectors, readback, uid)
+        if device is None:
+            print("[ERROR] ✗ Could not read device contents for comparison")
+            return report
+
+        changed = [(index, start, expected) for index, start, expected in sectors
+                   if device.get(hex(start)) != sector_digest(expected)]
+        report.sectors_written = [index for index, _, _ in changed]
+
+        if report.source == "cache":
+            # Sectors are skipped on the cache's word alone: check them on
+            # the device before trusting it
+            written = set(report.sectors_written)
+            skipped = self._image_regions(image, [s for s in sectors if s[0] not in written])
+            if skipped and not Verifier(self.programmer).verify(FirmwareImage(
+                    [Segment(lo, bytearray(image.read(lo, hi - lo))) for lo, hi in skipped])).success:
+                print("[WARNING] Device does not match the sector digest cache, "
+                      "comparing by read-back")
+                self.cache.invalidate(self.device_key)
+                return self.flash(image, address, verify, readback=True)
+        report.compare_time = time.monotonic() - start_time
+
+        # Write only the image bytes inside changed sectors; the programmer
+        # erases the touched sectors itself
+        regions = self._image_regions(image, changed)
+
+        report.bytes_written = sum(hi - lo for lo, hi in regions)
+        report.bytes_skipped = image.size - report.bytes_written
+
+        print(f"[INFO] Differential flash: {len(changed)} of {len(sectors)} "
+              f"sectors changed ({report.source})")
+
+        throughput = None
+        if regions:
+            start_time = time.monotonic()
+            ok = self.programmer.write_regions(
+                [(lo, image.read(lo, hi - lo)) for lo, hi in regions],
+                verify=verify)
+            report.write_time = time.monotonic() - start_time
+            if not ok:
+                # The device is now in an unknown state
+                self.cache.invalidate(self.device_key)
+                return report
+            if report.write_time > 0:
+                throughput = report.bytes_written / report.write_time
+        elif self.config.auto_reset:
+            self.programmer.reset()
+
+        # Net saving versus a full flash, including the comparison cost
+        rate = throughput or self.cache.throughput(self.device_key)
+        if rate:
+            report.time_saved = report.bytes_skipped / rate - report.compare_time
+
+        self.cache.update(self.device_key,
+                          {hex(start): sector_digest(expected)
+                           for _, start, expected in sectors},
+                          throughput, uid)
+        report.success = True
+        print(f"[SUCCESS] ✓ {report.summary()}")
+        return report
@@ -0,0 +1,237 @@
+"""
+Memory Dump - Chunked, resumable reads of large memory ranges
+Reads fixed-size blocks into a preallocated memory-mapped file and
+checkpoints completed blocks so an interrupted dump can resume
+"""
+
+import json
+import mmap
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Tuple, Union
+
+from .progress import ProgressEvent
+
+
+@dataclass
+class DumpChunk:
+    """One block of the dump"""
+    index: int
+    address: int
+    size: int
+    offset: int  # Position in the output file
+
+
+@dataclass
+class DumpReport:
+    """Outcome of a dump"""
+    success: bool = False
+    bytes_total: int = 0
+    bytes_read: int = 0
+    bytes_resumed: int = 0
+    chunks_read: int = 0
+    chunks_failed: List[int] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Read throughput in bytes/second"""
+        if self.duration <= 0 or not self.bytes_read:
+            return None
+        return self.bytes_read / self.duration
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        text = f"{self.bytes_read} bytes read in {self.duration:.2f}s"
+        if self.rate:
+            text += f" ({self.rate / 1024:.1f} KB/s)"
+        if self.bytes_resumed:
+            text += f", {self.bytes_resumed} bytes resumed from checkpoint"
+        if self.chunks_failed:
+            text += f", {len(self.chunks_failed)} chunk(s) failed"
+        return text
+
+
+class MemoryDumper:
+    """Chunked dump engine on top of STM32Programmer.read_chunks"""
+
+    def __init__(self, programmer, chunk_size: int = 16 * 1024,
+                 chunks_per_call: int = 16, retries: int = 2):
+        """
+        Initialize dumper
+
+        Args:
+            programmer: STM32Programmer connected to the device
+            chunk_size: Bytes per block (the checkpoint granularity)
+            chunks_per_call: Blocks read per programmer invocation
+            retries: Extra attempts for a failing batch
+        """
+        self.programmer = programmer
+        self.chunk_size = chunk_size
+        self.chunks_per_call = max(1, chunks_per_call)
+        self.retries = retries
+
+    @staticmethod
+    def checkpoint_path(output_file: Path) -> Path:
+        """Checkpoint file kept next to an unfinished dump"""
+        return output_file.with_name(output_file.name + ".ckpt.json")
+
+    def plan(self, ranges: List[Tuple[int, int]]) -> List[DumpChunk]:
+        """
+        Split address ranges into blocks laid out back to back in the output
+
+        Args:
+            ranges: (address, size) pairs, dumped in the given order
+
+        Returns:
+            Blocks in output order
+        """
+        chunks = []
+        offset = 0
+        for address, size in ranges:
+            for start in range(0, size, self.chunk_size):
+                length = min(self.chunk_size, size - start)
+                chunks.append(DumpChunk(len(chunks), address + start, length, offset))
+                offset += length
+        return chunks
+
+    def _load_checkpoint(self, output_file: Path, ranges: List[Tuple[int, int]],
+                         total: int) -> set:
+        """Completed block indices from a matching checkpoint"""
+        checkpoint = self.checkpoint_path(output_file)
+        if not checkpoint.exists() or not output_file.exists():
+            return set()
+        try:
+            with open(checkpoint, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[WARNING] Ignoring unreadable dump checkpoint: {e}")
+            return set()
+        if (data.get("ranges") != [list(r) for r in ranges]
+                or data.get("chunk_size") != self.chunk_size
+                or output_file.stat().st_size != total):
+            print("[INFO] Dump checkpoint does not match this request, starting over")
+            return set()
+        done = set()
+        for first, last in data.get("done", []):
+            done.update(range(first, last + 1))
+        return done
+
+    def _save_checkpoint(self, output_file: Path, ranges: List[Tuple[int, int]],
+                         done: set) -> None:
+        """Record completed blocks as index ranges"""
+        spans = []
+        for index in sorted(done):
+            if spans and spans[-1][1] == index - 1:
+                spans[-1][1] = index
+            else:
+                spans.append([index, index])
+        data = {"ranges": [list(r) for r in ranges],
+                "chunk_size": self.chunk_size, "done": spans}
+        checkpoint = self.checkpoint_path(output_file)
+        tmp_file = checkpoint.with_name(checkpoint.name + ".tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_file, checkpoint)
+
+    def dump(self, ranges: Union[Tuple[int, int], List[Tuple[int, int]]],
+             output_file: Union[Path, str], resume: bool = True) -> DumpReport:
+        """
+        Dump one or more address ranges to a file
+
+        Args:
+            ranges: (address, size) or a list of them; disjoint ranges are
+                    concatenated in order in the output
+            output_file: Output file path
+            resume: Continue from a matching checkpoint
+
+        Returns:
+            DumpReport
+        """
+        if isinstance(ranges, tuple):
+            ranges = [ranges]
+        ranges = [(int(a), int(s)) for a, s in ranges if s > 0]
+        output_file = Path(output_file)
+        chunks = self.plan(ranges)
+        total = sum(size for _, size in ranges)
+        report = DumpReport(bytes_total=total)
+        if not chunks:
+            report.success = True
+            return report
+
+        done = self._load_checkpoint(output_file, ranges, total) if resume else set()
+        report.bytes_resumed = sum(chunks[i].size for i in done)
+        if done:
+            print(f"[INFO] Resuming dump: {len(done)}/{len(chunks)} chunks already read")
+
+        # Preallocate so every block lands at its final offset
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        mode = "r+b" if done else "w+b"
+        with open(output_file, mode) as f:
+            f.truncate(total)
+            with mmap.mmap(f.fileno(), total) as view:
+                start = time.monotonic()
+                pending = [c for c in chunks if c.index not in done]
+                for i in range(0, len(pending), self.chunks_per_call):
+                    batch = pending[i:i + self.chunks_per_call]
+                    if not self._read_batch(batch, view):
+                        report.chunks_failed = [c.index for c in pending[i:]]
+                        break
+                    view.flush()
+                    done.update(c.index for c in batch)
+                    self._save_checkpoint(output_file, ranges, done)
+                    report.chunks_read += len(batch)
+                    report.bytes_read += sum(c.size for c in batch)
+                    report.duration = time.monotonic() - start
+                    self._report_progress(batch, report)
+                report.duration = time.monotonic() - start
+
+        report.success = not report.chunks_failed
+        if report.success:
+            try:
+                self.checkpoint_path(output_file).unlink()
+            except FileNotFoundError:
+                pass
+            print(f"[SUCCESS] ✓ Dumped {total} bytes to {output_file}: {report.summary()}")
+        else:
+            print(f"[ERROR] ✗ Dump interrupted ({report.summary()}); "
+                  f"rerun to resume from the checkpoint")
+        return report
+
+    def _read_batch(self, batch: List[DumpChunk], view: mmap.mmap) -> bool:
+        """Read a batch of blocks into the mapped output, with retries"""
+        for attempt in range(self.retries + 1):
+            with tempfile.TemporaryDirectory(prefix="stm32dump_") as tmp:
+                files = [Path(tmp) / f"chunk_{c.index}.bin" for c in batch]
+                ok = self.programmer.read_chunks(
+                    [(c.address, c.size, path) for c, path in zip(batch, files)])
+                if ok and all(p.exists() and p.stat().st_size == c.size
+                              for c, p in zip(batch, files)):
+                    for chunk, path in zip(batch, files):
+                        view[chunk.offset:chunk.offset + chunk.size] = path.read_bytes()
+                    return True
+            if attempt < self.retries:
+                print(f"[WARNING] Read of {hex(batch[0].address)} failed, "
+                      f"retrying ({attempt + 1}/{self.retries})")
+        return False
+
+    def _report_progress(self, batch: List[DumpChunk], report: DumpReport) -> None:
+        """Per-chunk progress line and ProgressEvents"""
+        callback = getattr(self.programmer, "progress_callback", None)
+        done = report.bytes_read + report.bytes_resumed
+        rate = report.rate
+        if callback is not None:
+            position = done - sum(c.size for c in batch)
+            for chunk in batch:
+                position += chunk.size
+                callback(ProgressEvent("dump", 100.0 * position / report.bytes_total,
+                                       position, report.bytes_total, rate,
+                                       report.duration, f"read {hex(chunk.address)}",
+                                       position == report.bytes_total))
+        else:
+            rate_text = f" {rate / 1024:.1f} KB/s" if rate else ""
+            print(f"[INFO] {hex(batch[0].address)}-{hex(batch[-1].address + batch[-1].size)}"
+                  f" read, {done}/{report.bytes_total} bytes{rate_text}")
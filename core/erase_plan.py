@@ -0,0 +1,105 @@
+"""
+Erase Planning - Minimal sector sets for partial erases
+Maps images or address ranges onto the chip's sector geometry and renders
+the sector erase commands of STM32_Programmer_CLI and OpenOCD
+"""
+
+from dataclasses import dataclass
+from typing import List, Tuple, Iterable
+
+from .flash_layout import FlashLayout
+from .image import FirmwareImage
+
+
+@dataclass
+class ErasePlan:
+    """Sectors to erase, in ascending order"""
+    layout: FlashLayout
+    sectors: List[int]
+
+    @classmethod
+    def for_ranges(cls, layout: FlashLayout,
+                   ranges: Iterable[Tuple[int, int]]) -> "ErasePlan":
+        """
+        Sectors overlapping any of the (address, size) ranges
+
+        Parts of a range outside flash are ignored.
+        """
+        sectors = set()
+        for address, size in ranges:
+            for index, _, _ in layout.sectors_in_range(address, address + size):
+                sectors.add(index)
+        return cls(layout, sorted(sectors))
+
+    @classmethod
+    def for_image(cls, layout: FlashLayout, image: FirmwareImage,
+                  span: bool = False) -> "ErasePlan":
+        """
+        Sectors an image occupies
+
+        Args:
+            layout: Flash sector layout
+            image: Parsed firmware image
+            span: Also erase sectors in gaps between segments
+        """
+        if span and image.segments:
+            return cls.for_ranges(layout, [(image.start, image.end - image.start)])
+        return cls.for_ranges(layout, [(s.address, len(s.data)) for s in image.segments])
+
+    @property
+    def bytes(self) -> int:
+        """Bytes erased"""
+        return sum(self.layout.sector_sizes[i] for i in self.sectors)
+
+    @property
+    def full(self) -> bool:
+        """True if every sector is erased"""
+        return len(self.sectors) == len(self.layout.sector_sizes)
+
+    def runs(self) -> List[Tuple[int, int]]:
+        """Contiguous (first, last) sector runs, split at the bank boundary"""
+        runs: List[Tuple[int, int]] = []
+        for index in self.sectors:
+            if runs and runs[-1][1] == index - 1 and \
+                    self._bank(index) == self._bank(runs[-1][0]):
+                runs[-1] = (runs[-1][0], index)
+            else:
+                runs.append((index, index))
+        return runs
+
+    def _bank(self, index: int) -> int:
+        return self.layout.bank_of(self.layout.sector_start(index))
+
+    def stm32cube_args(self) -> List[str]:
+        """`-e [first last]` options (sector numbers count across both banks)"""
+        args: List[str] = []
+        for first, last in self.runs():
+            args.extend(["-e", f"[{first}", f"{last}]"])
+        return args
+
+    def openocd_commands(self, split_banks: bool = False) -> List[str]:
+        """
+        `flash erase_sector` commands
+
+        Args:
+            split_banks: The target config declares bank 2 as its own OpenOCD
+                flash bank with sectors numbered from 0 (e.g. STM32H7)
+        """
+        bank2_first = None
+        if split_banks and self.layout.bank_size is not None:
+            bank2_first = self.layout.sector_at(self.layout.base + self.layout.bank_size)
+        commands = []
+        for first, last in self.runs():
+            bank = 0
+            if bank2_first is not None and first >= bank2_first:
+                bank, first, last = 1, first - bank2_first, last - bank2_first
+            commands.append(f"flash erase_sector {bank} {first} {last}")
+        return commands
+
+    def summary(self) -> str:
+        """Human readable description"""
+        if not self.sectors:
+            return "nothing to erase"
+        runs = ", ".join(f"{a}" if a == b else f"{a}-{b}" for a, b in self.runs())
+        return (f"sectors {runs} ({self.bytes // 1024} KB of "
+                f"{self.layout.size // 1024} KB)")
@@ -0,0 +1,102 @@
+"""
+Flash Layout - Sector geometry of STM32 flash memory
+Maps addresses to erase sectors for range-aware operations
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import List, Tuple, Optional
+
+
+@dataclass
+class FlashLayout:
+    """Sector geometry of one flash array"""
+    base: int = 0x08000000
+    sector_sizes: List[int] = field(default_factory=lambda: [1024] * 64)
+    bank_size: Optional[int] = None   # Size of bank 1 on dual-bank parts
+
+    def __post_init__(self):
+        self._starts = []
+        address = self.base
+        for size in self.sector_sizes:
+            self._starts.append(address)
+            address += size
+
+    @property
+    def size(self) -> int:
+        """Total flash size in bytes"""
+        return sum(self.sector_sizes)
+
+    @property
+    def end(self) -> int:
+        """First address past the end of flash"""
+        return self.base + self.size
+
+    def sector_start(self, index: int) -> int:
+        """Start address of sector index"""
+        return self._starts[index]
+
+    def sector_at(self, address: int) -> Optional[int]:
+        """Index of the sector containing address, or None if outside flash"""
+        if address < self.base or address >= self.end:
+            return None
+        return bisect_right(self._starts, address) - 1
+
+    def sectors(self) -> List[Tuple[int, int, int]]:
+        """All sectors as (index, start address, size)"""
+        return [(i, start, size) for i, (start, size)
+                in enumerate(zip(self._starts, self.sector_sizes))]
+
+    def sectors_in_range(self, start: int, end: int) -> List[Tuple[int, int, int]]:
+        """
+        Sectors overlapping the address range [start, end)
+
+        Args:
+            start: First address
+            end: Address one past the last byte
+
+        Returns:
+            List of (index, start address, size)
+        """
+        if end <= start:
+            return []
+        first = self.sector_at(max(start, self.base))
+        last = self.sector_at(min(end, self.end) - 1)
+        if first is None or last is None:
+            return []
+        return [(i, self._starts[i], self.sector_sizes[i])
+                for i in range(first, last + 1)]
+
+    def contains(self, start: int, size: int) -> bool:
+        """Check that [start, start+size) lies inside flash"""
+        return self.base <= start and start + size <= self.end
+
+    def bank_of(self, address: int) -> Optional[int]:
+        """Bank (1 or 2) holding address, or None if outside flash"""
+        if not self.base <= address < self.end:
+            return None
+        if self.bank_size is None or address < self.base + self.bank_size:
+            return 1
+        return 2
+
+
+def layout_for_chip(chip: str, base: Optional[int] = None) -> Optional[FlashLayout]:
+    """
+    Flash sector layout of a part from the chip database
+
+    Unknown parts get no layout rather than a guessed one: a wrong guess
+    rejects images that fit and erases sectors outside the image.
+
+    Args:
+        chip: Part number such as STM32F103C8 or STM32G474RE
+        base: Flash base address (default: from the database)
+
+    Returns:
+        FlashLayout for the part, or None if it is not in the database
+    """
+    from .chip_db import lookup_chip  # Deferred: loads the database
+
+    info = lookup_chip(chip)
+    if info is None:
+        return None
+    return info.layout(base)
@@ -0,0 +1,148 @@
+"""
+Gang Programming - Flash many probes in parallel
+Loads and validates the image once, then programs every probe concurrently
+with per-device pass/fail and timing
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Union
+
+from .image import ImageFormatError
+from .thread_output import thread_stdout
+
+
+@dataclass
+class GangResult:
+    """Outcome of programming one probe"""
+    probe_serial: str
+    success: bool = False
+    duration: float = 0.0
+    error: Optional[str] = None
+    log: List[str] = field(default_factory=list)
+
+
+class _PrefixedSink:
+    """Output sink tagging one worker's lines and keeping them as its log"""
+
+    def __init__(self, sink, prefix: str, lock: threading.Lock):
+        self._sink = sink
+        self._prefix = prefix
+        self._lock = lock
+        self._pending = ""
+        self.lines: List[str] = []
+
+    def __call__(self, text: str) -> None:
+        *lines, self._pending = (self._pending + text).split("\n")
+        with self._lock:
+            for line in lines:
+                self.lines.append(line)
+                if line.strip():
+                    self._sink(f"[{self._prefix}] {line}\n")
+
+
+class GangProgrammer:
+    """Program the same image on several probes concurrently"""
+
+    def __init__(self, programmer, probe_serials: List[str],
+                 max_workers: Optional[int] = None):
+        """
+        Initialize gang programmer
+
+        Args:
+            programmer: Configured STM32Programmer used as template
+            probe_serials: Serial numbers of the probes to program
+            max_workers: Concurrent devices (default: one per probe)
+        """
+        self.programmer = programmer
+        self.probe_serials = list(dict.fromkeys(probe_serials))
+        self.max_workers = max_workers or len(self.probe_serials) or 1
+
+    def flash(self, binary_path: Union[Path, str],
+              address: Optional[int] = None,
+              verify: Optional[bool] = None,
+              diff: bool = False) -> List[GangResult]:
+        """
+        Flash binary to every probe
+
+        Args:
+            binary_path: Path to binary file (.bin, .hex, .elf)
+            address: Flash start address (default: from config)
+            verify: Verify after flashing (default: from config)
+            diff: Only erase and write sectors that changed
+
+        Returns:
+            One GangResult per probe, in probe order
+        """
+        config = self.programmer.config
+        binary_path = Path(binary_path)
+        address = address if address is not None else config.flash_start
+        verify = verify if verify is not None else config.verify
+
+        print(f"\n{'='*60}")
+        print(f"  Gang flashing {binary_path.name} to {len(self.probe_serials)} "
+              f"x {config.chip}")
+        print(f"{'='*60}\n")
+
+        # Load and validate once; workers share the parsed image
+        try:
+            image = self.programmer.load_image(binary_path, address)
+        except (OSError, ImageFormatError) as e:
+            print(f"[ERROR] Cannot load image {binary_path.name}: {e}")
+            return [GangResult(sn, error=str(e)) for sn in self.probe_serials]
+        if not self.programmer.check_image_bounds(image):
+            return [GangResult(sn, error="image outside flash")
+                    for sn in self.probe_serials]
+
+        # Workers print to the caller's sink (a daemon client or the console)
+        output = thread_stdout()
+        caller = output.sink()
+        lock = threading.Lock()
+
+        def worker(serial: str) -> GangResult:
+            sink = _PrefixedSink(caller, serial, lock)
+            output.register(sink)
+            result = GangResult(serial)
+            start = time.monotonic()
+            try:
+                programmer = self.programmer.for_probe(serial)
+                result.success = programmer.flash_prepared(
+                    binary_path, image, address, verify, diff)
+                if not result.success:
+                    result.error = next((line for line in reversed(sink.lines)
+                                         if "[ERROR]" in line or "Error" in line),
+                                        "flash failed")
+            except Exception as e:
+                result.error = str(e)
+            finally:
+                output.unregister()
+                result.duration = time.monotonic() - start
+                result.log = sink.lines
+            return result
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="gang") as pool:
+            results = list(pool.map(worker, self.probe_serials))
+        elapsed = time.monotonic() - start
+
+        self.print_summary(results, elapsed)
+        return results
+
+    @staticmethod
+    def print_summary(results: List[GangResult], elapsed: float) -> None:
+        """Print a per-device pass/fail table"""
+        passed = sum(1 for r in results if r.success)
+        print(f"\n{'='*60}")
+        print(f"  Gang result: {passed}/{len(results)} passed in {elapsed:.2f}s")
+        print(f"{'='*60}")
+        for r in results:
+            status = "PASS" if r.success else "FAIL"
+            line = f"  {r.probe_serial:<26} {status}  {r.duration:7.2f}s"
+            if r.error and not r.success:
+                line += f"  {r.error.strip()}"
+            print(line)
+        print("="*60 + "\n")
@@ -0,0 +1,515 @@
+"""
+Firmware Image - In-process loader for Intel HEX, ELF and raw binary files
+Parses images into a sparse segment map backed by bytearray so sizes, address
+ranges and chunked writes can be handled without the external tools
+"""
+
+import binascii
+import hashlib
+import mmap
+import struct
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, List, Iterator, Tuple, Union
+
+ERASED = 0xFF
+
+# ELF constants
+_PT_LOAD = 1
+_ELF_MAGIC = b"\x7fELF"
+_ELF_HEADER_SIZE = {False: 52, True: 64}
+_PHDR_FORMAT = {False: "IIIII", True: "IIQQQQ"}
+
+# Data bytes of the Intel HEX records that carry an address
+_HEX_RECORD_LENGTHS = {2: 2, 3: 4, 4: 2, 5: 4}
+
+
+class ImageFormatError(ValueError):
+    """Raised when a firmware image file cannot be parsed"""
+
+
+@dataclass
+class Segment:
+    """Contiguous run of image bytes at an absolute address"""
+    address: int
+    data: bytearray
+
+    @property
+    def end(self) -> int:
+        """First address past the end of the segment"""
+        return self.address + len(self.data)
+
+
+class FirmwareImage:
+    """Sparse firmware image made of non-overlapping, sorted segments"""
+
+    def __init__(self, segments: Optional[List[Segment]] = None,
+                 entry_point: Optional[int] = None,
+                 source: Optional[Path] = None):
+        """
+        Initialize image
+
+        Args:
+            segments: Initial segments (merged and sorted)
+            entry_point: Start address from the image, if any
+            source: File the image was loaded from
+        """
+        self.segments: List[Segment] = []
+        self.entry_point = entry_point
+        self.source = source
+        for segment in segments or []:
+            self.add_segment(segment.address, segment.data)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def add_segment(self, address: int, data: Union[bytes, bytearray, memoryview]) -> None:
+        """
+        Add data at address, merging with adjacent segments
+
+        Later data overwrites earlier data where ranges overlap.
+
+        Args:
+            address: Absolute start address
+            data: Segment contents
+        """
+        if not len(data):
+            return
+        new = Segment(address, bytearray(data))
+        starts = [s.address for s in self.segments]
+        index = bisect_right(starts, address)
+
+        # Fast path: append to or after the last segment
+        if index == len(self.segments) and self.segments:
+            last = self.segments[-1]
+            if last.end == address:
+                last.data += new.data
+                return
+            if last.end < address:
+                self.segments.append(new)
+                return
+
+        merged = [s for s in self.segments
+                  if s.end < address or s.address > new.end]
+        overlapping = [s for s in self.segments
+                       if not (s.end < address or s.address > new.end)]
+        if overlapping:
+            lo = min(address, overlapping[0].address)
+            hi = max(new.end, overlapping[-1].end)
+            combined = bytearray([ERASED]) * (hi - lo)
+            for s in overlapping:
+                combined[s.address - lo:s.end - lo] = s.data
+            combined[address - lo:new.end - lo] = new.data
+            new = Segment(lo, combined)
+        merged.append(new)
+        merged.sort(key=lambda s: s.address)
+        self.segments = merged
+
+    @classmethod
+    def load(cls, path: Union[Path, str],
+             address: Optional[int] = None) -> "FirmwareImage":
+        """
+        Load an image, choosing the parser from the file extension
+
+        Args:
+            path: Image file (.hex, .ihex, .elf, .axf, .out, .bin)
+            address: Load address for raw binaries (default: 0x08000000)
+
+        Returns:
+            FirmwareImage instance
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ImageFormatError: If the file cannot be parsed
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Image file not found: {path}")
+
+        suffix = path.suffix.lower()
+        if suffix in (".hex", ".ihex", ".ihx"):
+            return cls.from_hex(path)
+        if suffix in (".elf", ".axf", ".out"):
+            return cls.from_elf(path)
+        if suffix == ".bin":
+            return cls.from_bin(path, 0x08000000 if address is None else address)
+
+        with open(path, "rb") as f:
+            head = f.read(4)
+        if head == _ELF_MAGIC:
+            return cls.from_elf(path)
+        if head[:1] == b":":
+            return cls.from_hex(path)
+        return cls.from_bin(path, 0x08000000 if address is None else address)
+
+    @classmethod
+    def from_bin(cls, path: Union[Path, str], address: int) -> "FirmwareImage":
+        """Load a raw binary file at address"""
+        path = Path(path)
+        image = cls(source=path)
+        data = bytearray(path.read_bytes())
+        if data:
+            image.segments.append(Segment(address, data))
+        return image
+
+    @classmethod
+    def from_hex(cls, path: Union[Path, str]) -> "FirmwareImage":
+        """
+        Load an Intel HEX file, streaming record by record
+
+        Consecutive data records are appended directly to the current
+        segment's bytearray, so parsing is linear in the file size.
+
+        Args:
+            path: Intel HEX file
+
+        Returns:
+            FirmwareImage instance
+        """
+        path = Path(path)
+        image = cls(source=path)
+        pending: List[Segment] = []
+        current: Optional[bytearray] = None
+        current_end = -1
+        upper = 0
+        unhexlify = binascii.unhexlify
+
+        with open(path, "rb") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                if line[:1] != b":":
+                    raise ImageFormatError(f"{path.name}:{line_no}: missing ':'")
+                try:
+                    raw = unhexlify(line[1:])
+                except (binascii.Error, ValueError):
+                    raise ImageFormatError(f"{path.name}:{line_no}: invalid hex")
+                if len(raw) < 5 or len(raw) != raw[0] + 5:
+                    raise ImageFormatError(f"{path.name}:{line_no}: bad length")
+                if sum(raw) & 0xFF:
+                    raise ImageFormatError(f"{path.name}:{line_no}: bad checksum")
+
+                count = raw[0]
+                record_type = raw[3]
+                expected = _HEX_RECORD_LENGTHS.get(record_type)
+                if expected is not None and count != expected:
+                    raise ImageFormatError(f"{path.name}:{line_no}: record type "
+                                           f"{record_type} needs {expected} data bytes")
+                if record_type == 0:
+                    address = upper + (raw[1] << 8 | raw[2])
+                    if address == current_end:
+                        current += raw[4:4 + count]
+                    else:
+                        current = bytearray(raw[4:4 + count])
+                        pending.append(Segment(address, current))
+                    current_end = address + count
+                elif record_type == 1:
+                    break
+                elif record_type == 2:
+                    upper = (raw[4] << 8 | raw[5]) << 4
+                elif record_type == 4:
+                    upper = (raw[4] << 8 | raw[5]) << 16
+                elif record_type == 3:
+                    image.entry_point = ((raw[4] << 8 | raw[5]) << 4) + (raw[6] << 8 | raw[7])
+                elif record_type == 5:
+                    image.entry_point = struct.unpack(">I", raw[4:8])[0]
+                else:
+                    raise ImageFormatError(
+                        f"{path.name}:{line_no}: unknown record type {record_type}")
+
+        image._adopt(pending)
+        return image
+
+    @classmethod
+    def from_elf(cls, path: Union[Path, str]) -> "FirmwareImage":
+        """
+        Load the PT_LOAD segments of an ELF file at their load addresses
+
+        Args:
+            path: ELF file
+
+        Returns:
+            FirmwareImage instance
+        """
+        path = Path(path)
+        image = cls(source=path)
+        pending = []
+        if path.stat().st_size < _ELF_HEADER_SIZE[False]:
+            raise ImageFormatError(f"{path.name}: truncated ELF header")
+
+        with open(path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                try:
+                    header = ElfHeader.parse(view)
+                except ImageFormatError as e:
+                    raise ImageFormatError(f"{path.name}: {e}")
+                image.entry_point = header.entry
+                for p_type, offset, paddr, filesz in header.program_headers(view):
+                    if p_type != _PT_LOAD or filesz == 0:
+                        continue
+                    if offset + filesz > len(view):
+                        raise ImageFormatError(f"{path.name}: segment past end of file")
+                    pending.append(Segment(paddr, bytearray(view[offset:offset + filesz])))
+            finally:
+                view.release()
+
+        image._adopt(pending)
+        return image
+
+    def _adopt(self, pending: List[Segment]) -> None:
+        """Take ownership of parsed segments, joining adjacent ones in place"""
+        pending.sort(key=lambda s: s.address)
+        merged: List[Segment] = []
+        for segment in pending:
+            if merged and segment.address < merged[-1].end:
+                # Overlapping records are rare; resolve them the slow way
+                self.segments = []
+                for seg in pending:
+                    self.add_segment(seg.address, seg.data)
+                return
+            if merged and segment.address == merged[-1].end:
+                merged[-1].data += segment.data
+            else:
+                merged.append(segment)
+        self.segments = merged
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    @property
+    def start(self) -> Optional[int]:
+        """Lowest address in the image"""
+        return self.segments[0].address if self.segments else None
+
+    @property
+    def end(self) -> Optional[int]:
+        """First address past the highest byte in the image"""
+        return self.segments[-1].end if self.segments else None
+
+    @property
+    def size(self) -> int:
+        """Number of bytes actually present in the image"""
+        return sum(len(s.data) for s in self.segments)
+
+    @property
+    def span(self) -> int:
+        """Distance from the lowest to the highest address"""
+        return self.end - self.start if self.segments else 0
+
+    def out_of_range(self, base: int, size: int) -> List[Tuple[int, int]]:
+        """
+        Segment ranges that fall outside [base, base+size)
+
+        Args:
+            base: Memory region start
+            size: Memory region size
+
+        Returns:
+            List of (start, end) ranges outside the region
+        """
+        return [(s.address, s.end) for s in self.segments
+                if s.address < base or s.end > base + size]
+
+    def slice(self, address: int, length: int) -> memoryview:
+        """
+        Zero-copy view of image bytes
+
+        Args:
+            address: Start address
+            length: Number of bytes
+
+        Returns:
+            memoryview into the owning segment
+
+        Raises:
+            ValueError: If the range is not inside a single segment
+        """
+        index = bisect_right([s.address for s in self.segments], address) - 1
+        if index >= 0:
+            segment = self.segments[index]
+            if address + length <= segment.end:
+                offset = address - segment.address
+                return memoryview(segment.data)[offset:offset + length]
+        raise ValueError(f"Range {hex(address)}+{hex(length)} is not contiguous "
+                         f"image data")
+
+    def read(self, address: int, length: int, fill: int = ERASED) -> bytes:
+        """
+        Copy image bytes, filling gaps with the erased value
+
+        Args:
+            address: Start address
+            length: Number of bytes
+            fill: Value for addresses not covered by the image
+
+        Returns:
+            Bytes for [address, address+length)
+        """
+        out = bytearray([fill]) * length
+        end = address + length
+        for segment in self.segments:
+            if segment.end <= address:
+                continue
+            if segment.address >= end:
+                break
+            lo = max(address, segment.address)
+            hi = min(end, segment.end)
+            out[lo - address:hi - address] = \
+                memoryview(segment.data)[lo - segment.address:hi - segment.address]
+        return bytes(out)
+
+    def chunks(self, chunk_size: int) -> Iterator[Tuple[int, memoryview]]:
+        """
+        Iterate over the image in zero-copy chunks that never span a gap
+
+        Args:
+            chunk_size: Maximum chunk size in bytes
+
+        Yields:
+            (address, memoryview) pairs
+        """
+        for segment in self.segments:
+            view = memoryview(segment.data)
+            for offset in range(0, len(view), chunk_size):
+                yield segment.address + offset, view[offset:offset + chunk_size]
+
+    def to_bytes(self, fill: int = ERASED) -> bytes:
+        """Flatten the image from start to end, filling gaps"""
+        if not self.segments:
+            return b""
+        return self.read(self.start, self.span, fill)
+
+    def save_bin(self, path: Union[Path, str], fill: int = ERASED) -> Path:
+        """Write the flattened image as a raw binary file"""
+        path = Path(path)
+        path.write_bytes(self.to_bytes(fill))
+        return path
+
+    def digest(self) -> str:
+        """Content hash covering addresses and data of every segment"""
+        h = hashlib.sha256()
+        for segment in self.segments:
+            h.update(struct.pack("<QQ", segment.address, len(segment.data)))
+            h.update(segment.data)
+        return h.hexdigest()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        if not self.segments:
+            return "FirmwareImage(empty)"
+        return (f"FirmwareImage({len(self.segments)} segments, "
+                f"{hex(self.start)}-{hex(self.end)}, {self.size} bytes)")
+
+
+class ImageCache:
+    """Parsed images kept in memory, reloaded when the file changes"""
+
+    def __init__(self, max_entries: int = 8):
+        """
+        Initialize image cache
+
+        Args:
+            max_entries: Images kept before the least recently used is dropped
+        """
+        self.max_entries = max_entries
+        self._images: "OrderedDict[tuple, FirmwareImage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, path: Union[Path, str],
+             address: Optional[int] = None) -> FirmwareImage:
+        """
+        FirmwareImage.load, served from memory while the file is unchanged
+
+        Callers must treat the returned image as read-only; it is shared
+        """
+        path = Path(path).resolve()
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size, address)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+
+        image = FirmwareImage.load(path, address)
+        with self._lock:
+            # Drop stale versions of the same file
+            for old in [k for k in self._images if k[0] == key[0]]:
+                del self._images[old]
+            self._images[key] = image
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+        return image
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+
+@dataclass
+class ElfHeader:
+    """Fields of the ELF file header needed to walk program headers"""
+    is_64: bool
+    endian: str
+    entry: int
+    phoff: int
+    phentsize: int
+    phnum: int
+    shoff: int
+    shentsize: int
+    shnum: int
+    shstrndx: int
+
+    @classmethod
+    def parse(cls, view: memoryview) -> "ElfHeader":
+        """Parse the ELF header from the start of view"""
+        if bytes(view[:4]) != _ELF_MAGIC:
+            raise ImageFormatError("not an ELF file")
+        if len(view) < _ELF_HEADER_SIZE[False]:
+            raise ImageFormatError("truncated ELF header")
+        ei_class, ei_data = view[4], view[5]
+        if ei_class not in (1, 2) or ei_data not in (1, 2):
+            raise ImageFormatError("unsupported ELF class or byte order")
+        is_64 = ei_class == 2
+        endian = "<" if ei_data == 1 else ">"
+        if len(view) < _ELF_HEADER_SIZE[is_64]:
+            raise ImageFormatError("truncated ELF header")
+        if is_64:
+            fields = struct.unpack_from(endian + "QQQIHHHHHH", view, 24)
+        else:
+            fields = struct.unpack_from(endian + "IIIIHHHHHH", view, 24)
+        entry, phoff, shoff, _, _, phentsize, phnum, shentsize, shnum, shstrndx = fields
+        return cls(is_64, endian, entry, phoff, phentsize, phnum,
+                   shoff, shentsize, shnum, shstrndx)
+
+    def program_headers(self, view: memoryview) -> Iterator[Tuple[int, int, int, int]]:
+        """
+        Yield (p_type, p_offset, p_paddr, p_filesz) for each program header
+
+        Raises:
+            ImageFormatError: If the table does not fit in view
+        """
+        fmt = self.endian + _PHDR_FORMAT[self.is_64]
+        if self.phnum and (self.phentsize < struct.calcsize(fmt) or
+                           self.phoff + self.phnum * self.phentsize > len(view)):
+            raise ImageFormatError("program header table past end of file")
+        for i in range(self.phnum):
+            fields = struct.unpack_from(fmt, view, self.phoff + i * self.phentsize)
+            if self.is_64:
+                p_type, _, p_offset, _, p_paddr, p_filesz = fields
+            else:
+                p_type, p_offset, _, p_paddr, p_filesz = fields
+            yield p_type, p_offset, p_paddr, p_filesz
@@ -0,0 +1,403 @@
+"""
+Data Injection - Per-unit fields patched into a shared base image
+Renders serial numbers, calibration values and a CRC from a template into a
+copy-on-write view of the base image, and plans writes that only re-send the
+sectors holding the patched record
+"""
+
+import struct
+import zlib
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Union, Any
+
+from .flash_layout import FlashLayout
+from .image import FirmwareImage, Segment, ERASED
+from .manifest import read_document, parse_int
+from .verify import stm32_crc32
+from .write_plan import WritePlan, plan_writes
+
+# Numeric field types (little-endian; a "be" suffix selects big-endian)
+_STRUCT_FORMATS = {
+    "u8": "B", "u16": "H", "u32": "I", "u64": "Q",
+    "i8": "b", "i16": "h", "i32": "i", "i64": "q",
+    "f32": "f", "f64": "d",
+}
+
+CRC_ALGORITHMS = ("crc32", "stm32")
+
+
+class InjectionError(ValueError):
+    """Raised when a template is invalid or a value does not fit its field"""
+
+
+@dataclass
+class FieldSpec:
+    """One field of the per-unit record"""
+    name: str
+    offset: int                   # From the record address
+    type: str                     # u8..u64, i8..i64, f32, f64 (+"be"), str:N, bytes:N
+    default: Any = None
+
+    def __post_init__(self):
+        kind, _, length = self.type.partition(":")
+        if kind in ("str", "bytes"):
+            if not length.isdigit() or int(length) == 0:
+                raise InjectionError(f"field {self.name}: {kind} needs a length "
+                                     f"({kind}:N)")
+            self._format = None
+            self.size = int(length)
+            return
+        big = kind.endswith("be") and kind[:-2] in _STRUCT_FORMATS
+        code = _STRUCT_FORMATS.get(kind[:-2] if big else kind)
+        if code is None:
+            raise InjectionError(f"field {self.name}: unknown type {self.type!r}")
+        self._format = (">" if big else "<") + code
+        self.size = struct.calcsize(self._format)
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+    def pack(self, value: Any) -> bytes:
+        """
+        Encode a value (strings are parsed for numeric fields)
+
+        Args:
+            value: Field value
+
+        Returns:
+            Exactly size bytes
+        """
+        kind = self.type.partition(":")[0]
+        try:
+            if kind == "str":
+                data = str(value).encode()
+                if len(data) > self.size:
+                    raise InjectionError(f"field {self.name}: {value!r} is longer "
+                                         f"than {self.size} bytes")
+                return data.ljust(self.size, b"\x00")
+            if kind == "bytes":
+                data = bytes.fromhex(value) if isinstance(value, str) else bytes(value)
+                if len(data) != self.size:
+                    raise InjectionError(f"field {self.name}: expected {self.size} "
+                                         f"bytes, got {len(data)}")
+                return data
+            if self._format[-1] in "fd":
+                return struct.pack(self._format, float(value))
+            if isinstance(value, str):
+                value = int(value, 0)
+            return struct.pack(self._format, value)
+        except (struct.error, ValueError, TypeError) as e:
+            if isinstance(e, InjectionError):
+                raise
+            raise InjectionError(f"field {self.name} ({self.type}): "
+                                 f"cannot encode {value!r}: {e}")
+
+
+@dataclass
+class CrcSpec:
+    """Checksum over part of the record, stored as a u32"""
+    offset: int                   # Where the CRC is stored
+    start: int = 0                # Covered record bytes [start, end)
+    end: Optional[int] = None     # Default: up to the CRC itself
+    algorithm: str = "crc32"      # crc32 (zlib), stm32 (CRC peripheral)
+    big_endian: bool = False
+
+    def compute(self, record: bytes) -> bytes:
+        """CRC bytes for a rendered record"""
+        data = record[self.start:self.offset if self.end is None else self.end]
+        value = zlib.crc32(data) if self.algorithm == "crc32" else stm32_crc32(data)
+        return struct.pack(">I" if self.big_endian else "<I", value & 0xFFFFFFFF)
+
+
+@dataclass
+class InjectionTemplate:
+    """Layout of the per-unit record and where it lives in flash"""
+    address: int
+    fields: List[FieldSpec] = field(default_factory=list)
+    crc: Optional[CrcSpec] = None
+    size: int = 0                 # Record bytes (default: up to the last field/CRC)
+    path: Optional[Path] = None
+
+    def __post_init__(self):
+        ends = [f.end for f in self.fields]
+        if self.crc is not None:
+            ends.append(self.crc.offset + 4)
+            ends.append(self.crc.end or 0)
+        self.size = max([self.size] + ends)
+        if not self.fields:
+            raise InjectionError("template has no fields")
+
+    @property
+    def names(self) -> List[str]:
+        return [f.name for f in self.fields]
+
+    @classmethod
+    def load(cls, path: Union[Path, str]) -> "InjectionTemplate":
+        """
+        Read a .toml or .json template
+
+        Args:
+            path: Template file
+
+        Returns:
+            InjectionTemplate
+
+        Raises:
+            InjectionError: If the file cannot be parsed or is invalid
+        """
+        path = Path(path)
+        return cls.from_dict(read_document(path, InjectionError), path)
+
+    @classmethod
+    def from_dict(cls, data: dict, path: Optional[Path] = None) -> "InjectionTemplate":
+        """
+        Build a template from parsed TOML/JSON data
+
+        Args:
+            data: {"address": ..., "size": ..., "fields": [...], "crc": {...}}
+            path: Template file, for messages
+
+        Returns:
+            InjectionTemplate
+        """
+        if not isinstance(data, dict) or "address" not in data:
+            raise InjectionError("template needs an 'address'")
+        if not isinstance(data.get("fields"), list):
+            raise InjectionError("template needs a 'fields' list")
+
+        fields = []
+        for number, raw in enumerate(data["fields"], 1):
+            if not isinstance(raw, dict) or not raw.get("name") or not raw.get("type"):
+                raise InjectionError(f"field {number}: 'name' and 'type' are required")
+            fields.append(FieldSpec(
+                str(raw["name"]),
+                parse_int(raw.get("offset", 0), f"field {raw['name']} offset",
+                          InjectionError),
+                str(raw["type"]), raw.get("default")))
+        names = [f.name for f in fields]
+        if len(set(names)) != len(names):
+            raise InjectionError("template has duplicate field names")
+
+        crc = None
+        raw = data.get("crc")
+        if raw is not None:
+            if not isinstance(raw, dict) or "offset" not in raw:
+                raise InjectionError("crc needs an 'offset'")
+            algorithm = raw.get("algorithm", "crc32")
+            if algorithm not in CRC_ALGORITHMS:
+                raise InjectionError(f"crc algorithm must be one of "
+                                     f"{', '.join(CRC_ALGORITHMS)} (got {algorithm!r})")
+            end = raw.get("end")
+            crc = CrcSpec(parse_int(raw["offset"], "crc offset", InjectionError),
+                          parse_int(raw.get("start", 0), "crc start", InjectionError),
+                          None if end is None else parse_int(end, "crc end", InjectionError),
+                          algorithm, bool(raw.get("big_endian", False)))
+
+        template = cls(parse_int(data["address"], "address", InjectionError), fields,
+                       crc, parse_int(data.get("size", 0), "size", InjectionError), path)
+        if crc is not None:
+            covered_end = crc.offset if crc.end is None else crc.end
+            if not 0 <= crc.start <= covered_end:
+                raise InjectionError("crc range is empty")
+            if crc.start < crc.offset + 4 and crc.offset < covered_end:
+                raise InjectionError("crc range covers the crc itself")
+        return template
+
+    def render(self, values: Dict[str, Any], base: bytes = b"") -> bytes:
+        """
+        Build the record for one unit
+
+        Bytes not covered by a field keep their base image contents (0xFF
+        where the image has none). Values for unknown names are ignored.
+
+        Args:
+            values: Field name -> value
+            base: Base image bytes at the record address
+
+        Returns:
+            size bytes
+        """
+        record = bytearray(base[:self.size]).ljust(self.size, bytes([ERASED]))
+        for spec in self.fields:
+            value = values.get(spec.name, spec.default)
+            if value is None:
+                raise InjectionError(f"no value for field {spec.name}")
+            record[spec.offset:spec.end] = spec.pack(value)
+        if self.crc is not None:
+            record[self.crc.offset:self.crc.offset + 4] = self.crc.compute(bytes(record))
+        return bytes(record)
+
+
+class PatchedImage(FirmwareImage):
+    """
+    Copy-on-write view of a base image with byte patches applied
+
+    The base image is never modified. read() overlays the patches without
+    copying any segment; segment-level access (digest, chunks, verify)
+    copies only the segments a patch touches and shares the rest.
+    """
+
+    def __init__(self, base: FirmwareImage, patches: List[Tuple[int, bytes]]):
+        """
+        Initialize patched view
+
+        Args:
+            base: Image the patches apply to
+            patches: (address, data) pairs, applied in order
+        """
+        self.base = base
+        self.patches = [(address, bytes(data)) for address, data in patches]
+        self.entry_point = base.entry_point
+        self.source = base.source
+        self._segments: Optional[List[Segment]] = None
+
+    @property
+    def segments(self) -> List[Segment]:
+        if self._segments is None:
+            self._segments = self._apply()
+        return self._segments
+
+    def _apply(self) -> List[Segment]:
+        """Base segments with patched ones replaced by patched copies"""
+        segments = list(self.base.segments)
+        for address, data in self.patches:
+            end = address + len(data)
+            touched = [i for i, s in enumerate(segments)
+                       if s.address < end and s.end > address]
+            if not touched:
+                index = bisect_right([s.address for s in segments], address)
+                segments.insert(index, Segment(address, bytearray(data)))
+                continue
+            first, last = segments[touched[0]], segments[touched[-1]]
+            lo, hi = min(address, first.address), max(end, last.end)
+            combined = bytearray([ERASED]) * (hi - lo)
+            for i in touched:
+                s = segments[i]
+                combined[s.address - lo:s.end - lo] = s.data
+            combined[address - lo:end - lo] = data
+            segments[touched[0]:touched[-1] + 1] = [Segment(lo, combined)]
+        return segments
+
+    def add_segment(self, address: int, data) -> None:
+        raise TypeError("PatchedImage is read-only")
+
+    def read(self, address: int, length: int, fill: int = ERASED) -> bytes:
+        if self._segments is not None:
+            return super().read(address, length, fill)
+        out = bytearray(self.base.read(address, length, fill))
+        end = address + length
+        for patch_address, data in self.patches:
+            lo = max(address, patch_address)
+            hi = min(end, patch_address + len(data))
+            if lo < hi:
+                out[lo - address:hi - address] = data[lo - patch_address:hi - patch_address]
+        return bytes(out)
+
+
+@dataclass
+class InjectionPlan:
+    """One unit's patched image and the writes that program it"""
+    image: PatchedImage           # Full image as the unit will hold it
+    target: FirmwareImage         # The part programmed (record sectors or full image)
+    plan: WritePlan
+    sectors: List[int] = field(default_factory=list)   # Sectors holding the record
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        return (f"record in sector(s) {', '.join(map(str, self.sectors))}, "
+                f"{self.plan.bytes_written} bytes in {len(self.plan.regions)} region(s)")
+
+
+class Injector:
+    """Renders per-unit records into one base image"""
+
+    def __init__(self, base: FirmwareImage, template: InjectionTemplate,
+                 layout: FlashLayout, write_size: int = 8):
+        """
+        Initialize injector
+
+        Args:
+            base: Base image shared by all units (treated as read-only)
+            template: Record layout and address
+            layout: Flash sector layout of the chip
+            write_size: Programming granularity
+        """
+        if not layout.contains(template.address, template.size):
+            raise InjectionError(f"record {hex(template.address)}+{template.size} "
+                                 f"is outside flash ({hex(layout.base)}-{hex(layout.end)})")
+        self.base = base
+        self.template = template
+        self.layout = layout
+        self.write_size = write_size
+        self.sectors = [index for index, _, _ in layout.sectors_in_range(
+            template.address, template.address + template.size)]
+        self._base_record = base.read(template.address, template.size)
+        self._rest: Optional[WritePlan] = None
+
+    @property
+    def sector_range(self) -> Tuple[int, int]:
+        """Address range [start, end) of the record's sectors"""
+        first, last = self.sectors[0], self.sectors[-1]
+        return (self.layout.sector_start(first),
+                self.layout.sector_start(last) + self.layout.sector_sizes[last])
+
+    def patch(self, values: Dict[str, Any]) -> PatchedImage:
+        """
+        Base image with one unit's record
+
+        Args:
+            values: Field name -> value
+
+        Returns:
+            PatchedImage sharing the base image's data
+        """
+        record = self.template.render(values, self._base_record)
+        return PatchedImage(self.base, [(self.template.address, record)])
+
+    def plan(self, values: Dict[str, Any], full: bool = False) -> InjectionPlan:
+        """
+        Writes that program one unit
+
+        Args:
+            values: Field name -> value
+            full: Program the whole patched image; otherwise only the record's
+                sectors are erased and rewritten, for devices that already
+                hold the base image
+
+        Returns:
+            InjectionPlan
+        """
+        image = self.patch(values)
+        lo, hi = self.sector_range
+        # The record sectors as a sector erase + write leaves them
+        sectors = FirmwareImage([Segment(lo, bytearray(image.read(lo, hi - lo)))])
+        plan = plan_writes(sectors, self.layout, self.write_size)
+        if not full:
+            return InjectionPlan(image, sectors, plan, list(self.sectors))
+
+        rest = self._rest_of_image()
+        combined = WritePlan(self.layout,
+                             sorted(rest.regions + plan.regions),
+                             sorted(rest.blank_sectors + plan.blank_sectors),
+                             image.size)
+        return InjectionPlan(image, image, combined, list(self.sectors))
+
+    def _rest_of_image(self) -> WritePlan:
+        """Base image writes outside the record sectors (planned once)"""
+        if self._rest is None:
+            lo, hi = self.sector_range
+            base = plan_writes(self.base, self.layout, self.write_size)
+            regions = []
+            for address, data in base.regions:
+                end = address + len(data)
+                if address < lo:
+                    regions.append((address, data[:min(end, lo) - address]))
+                if end > hi:
+                    start = max(address, hi)
+                    regions.append((start, data[start - address:]))
+            blank = [i for i in base.blank_sectors if i not in self.sectors]
+            self._rest = WritePlan(self.layout, regions, blank, self.base.size)
+        return self._rest
@@ -0,0 +1,213 @@
+"""
+Programming Manifests - Several programming steps in one tool invocation
+Parses TOML/JSON manifests listing erase, write, option-byte and reset steps;
+STM32Programmer.run_manifest() compiles them into a single
+STM32_Programmer_CLI command line or OpenOCD command list
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Union
+
+try:
+    import tomllib as _toml          # Python 3.11+
+except ImportError:
+    try:
+        import tomli as _toml
+    except ImportError:
+        _toml = None
+
+from .erase_plan import ErasePlan
+from .flash_layout import FlashLayout
+
+ACTIONS = ("erase", "write", "option_bytes", "reset")
+
+
+class ManifestError(ValueError):
+    """Raised when a manifest cannot be read or is invalid"""
+
+
+def read_document(path: Path, error: type = ManifestError) -> dict:
+    """
+    Parse a .toml or .json file (also used for injection templates)
+
+    Args:
+        path: File to read
+        error: Exception type raised on failure
+
+    Returns:
+        Parsed document
+    """
+    try:
+        text = path.read_bytes()
+    except OSError as e:
+        raise error(f"Cannot read {path}: {e}")
+
+    if path.suffix.lower() == ".toml":
+        if _toml is None:
+            raise error(f"{path.name}: TOML needs Python 3.11+ or the tomli "
+                        f"package; use a .json file instead")
+        try:
+            return _toml.loads(text.decode())
+        except (ValueError, UnicodeDecodeError) as e:
+            raise error(f"{path.name}: {e}")
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise error(f"{path.name}: {e}")
+
+
+def parse_int(value, what: str, error: type = ManifestError) -> int:
+    """Integer from a TOML/JSON number or a "0x..." string"""
+    if isinstance(value, bool):
+        raise error(f"{what}: expected an integer, got {value!r}")
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value), 0)
+    except ValueError:
+        raise error(f"{what}: expected an integer, got {value!r}")
+
+
+@dataclass
+class ManifestStep:
+    """One manifest step"""
+    action: str
+    file: Optional[Path] = None                 # write
+    address: Optional[int] = None               # write (.bin load address)
+    verify: Optional[bool] = None               # write (default: manifest/config)
+    all: bool = False                           # erase: mass erase
+    ranges: List[Tuple[int, int]] = field(default_factory=list)   # erase
+    sectors: List[int] = field(default_factory=list)              # erase
+    options: Dict[str, str] = field(default_factory=dict)         # option_bytes
+    openocd: List[str] = field(default_factory=list)              # option_bytes
+    halt: bool = False                          # reset
+
+    def erase_plan(self, layout: FlashLayout) -> Optional[ErasePlan]:
+        """Sectors a partial erase step covers (None for a mass erase)"""
+        if self.action != "erase" or self.all:
+            return None
+        plan = ErasePlan.for_ranges(layout, self.ranges)
+        for index in self.sectors:
+            if not 0 <= index < len(layout.sector_sizes):
+                raise ManifestError(f"erase: sector {index} does not exist "
+                                    f"({len(layout.sector_sizes)} sectors)")
+        plan.sectors = sorted(set(plan.sectors) | set(self.sectors))
+        return plan
+
+    def describe(self) -> str:
+        """One-line description"""
+        if self.action == "write":
+            at = f" at {hex(self.address)}" if self.address is not None else ""
+            return f"write {self.file.name}{at}"
+        if self.action == "erase":
+            if self.all:
+                return "erase all"
+            parts = [f"{hex(a)}+{hex(s)}" for a, s in self.ranges]
+            parts += [f"sector {i}" for i in self.sectors]
+            return f"erase {', '.join(parts)}"
+        if self.action == "option_bytes":
+            return "option bytes " + " ".join(f"{k}={v}" for k, v in self.options.items())
+        return "reset (halt)" if self.halt else "reset"
+
+
+@dataclass
+class Manifest:
+    """Ordered programming steps"""
+    steps: List[ManifestStep]
+    path: Optional[Path] = None
+    chip: Optional[str] = None        # Part the manifest was written for
+    verify: Optional[bool] = None     # Default for write steps
+
+    @property
+    def files(self) -> List[Path]:
+        """Files written by the manifest"""
+        return [s.file for s in self.steps if s.action == "write"]
+
+    @classmethod
+    def load(cls, path: Union[Path, str]) -> "Manifest":
+        """
+        Read a .toml or .json manifest
+
+        Relative file paths are resolved against the manifest's directory.
+
+        Args:
+            path: Manifest file
+
+        Returns:
+            Manifest
+
+        Raises:
+            ManifestError: If the file cannot be parsed or is invalid
+        """
+        path = Path(path)
+        return cls.from_dict(read_document(path), path.parent, path)
+
+    @classmethod
+    def from_dict(cls, data: dict, base_dir: Optional[Path] = None,
+                  path: Optional[Path] = None) -> "Manifest":
+        """
+        Build a manifest from parsed TOML/JSON data
+
+        Args:
+            data: {"chip": ..., "verify": ..., "steps": [{"action": ...}, ...]}
+            base_dir: Directory relative file paths are resolved against
+            path: Manifest file, for messages
+
+        Returns:
+            Manifest
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("steps"), list):
+            raise ManifestError("manifest needs a 'steps' list")
+        if not data["steps"]:
+            raise ManifestError("manifest has no steps")
+        base_dir = Path(base_dir or ".")
+        steps = [_parse_step(raw, number, base_dir)
+                 for number, raw in enumerate(data["steps"], 1)]
+        verify = data.get("verify")
+        return cls(steps, path, data.get("chip"),
+                   None if verify is None else bool(verify))
+
+
+def _parse_step(raw, number: int, base_dir: Path) -> ManifestStep:
+    """Validate one step table"""
+    if not isinstance(raw, dict):
+        raise ManifestError(f"step {number}: expected a table")
+    action = raw.get("action")
+    if action not in ACTIONS:
+        raise ManifestError(f"step {number}: action must be one of "
+                            f"{', '.join(ACTIONS)} (got {action!r})")
+    where = f"step {number} ({action})"
+    step = ManifestStep(action)
+
+    if action == "write":
+        if not raw.get("file"):
+            raise ManifestError(f"{where}: 'file' is required")
+        step.file = base_dir / raw["file"]
+        if "address" in raw:
+            step.address = parse_int(raw["address"], f"{where} address")
+        if "verify" in raw:
+            step.verify = bool(raw["verify"])
+    elif action == "erase":
+        step.all = bool(raw.get("all", False))
+        for text in raw.get("ranges", []):
+            if isinstance(text, str):
+                address, _, size = text.partition(":")
+            else:
+                address, size = text
+            step.ranges.append((parse_int(address, f"{where} range"),
+                                parse_int(size, f"{where} range")))
+        step.sectors = [parse_int(s, f"{where} sector") for s in raw.get("sectors", [])]
+        if step.all == bool(step.ranges or step.sectors):
+            raise ManifestError(f"{where}: give either all = true or ranges/sectors")
+    elif action == "option_bytes":
+        values = raw.get("values") or {}
+        if not isinstance(values, dict) or not values:
+            raise ManifestError(f"{where}: 'values' table is required")
+        step.options = {str(k): (hex(v) if isinstance(v, int) and not isinstance(v, bool)
+                                 else str(v)) for k, v in values.items()}
+        step.openocd = [str(c) for c in raw.get("openocd", [])]
+    else:
+        step.halt = bool(raw.get("halt", False))
+    return step
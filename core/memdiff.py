@@ -0,0 +1,287 @@
+"""
+Memory Diff - Compare flash dumps and firmware images sector by sector
+Dumps are memory-mapped and compared in whole-sector blocks; only sectors
+that differ are scanned for the exact differing byte ranges
+"""
+
+import mmap
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Tuple, Union
+
+from .diff_flash import sector_digest
+from .flash_layout import FlashLayout, layout_for_chip
+from .image import FirmwareImage
+
+ERASED = 0xFF
+
+_IMAGE_SUFFIXES = (".hex", ".ihex", ".ihx", ".elf", ".axf", ".out")
+
+# Runs of non-zero bytes in an XOR of two blocks
+_DIFF_RUN_RE = re.compile(rb"[^\x00]+")
+
+
+class MemorySource:
+    """Read-only view of a dump or image at its load address"""
+
+    def __init__(self, path: Union[Path, str], address: Optional[int] = None):
+        """
+        Open a dump or image
+
+        Raw binaries are memory-mapped; HEX/ELF images are flattened with
+        gaps filled by the erased value.
+
+        Args:
+            path: .bin dump or any format FirmwareImage.load() accepts
+            address: Load address for raw binaries (default: 0x08000000)
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ImageFormatError: If an image file cannot be parsed
+        """
+        self.path = Path(path)
+        self._file = None
+        self._map = None
+        if self._is_raw(self.path):
+            self.base = 0x08000000 if address is None else address
+            self._file = open(self.path, "rb")
+            if self.path.stat().st_size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.data = self._map
+            else:
+                self.data = b""
+        else:
+            image = FirmwareImage.load(self.path, address)
+            self.base = image.start if image.segments else 0x08000000
+            self.data = image.to_bytes()
+
+    @staticmethod
+    def _is_raw(path: Path) -> bool:
+        """True for files FirmwareImage.load() would read as raw binary"""
+        suffix = path.suffix.lower()
+        if suffix == ".bin":
+            return True
+        if suffix in _IMAGE_SUFFIXES:
+            return False
+        with open(path, "rb") as f:
+            head = f.read(4)
+        return head != b"\x7fELF" and head[:1] != b":"
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def end(self) -> int:
+        return self.base + self.size
+
+    def read(self, address: int, length: int) -> bytes:
+        """Bytes for [address, address+length), erased outside the source"""
+        lo = max(address, self.base)
+        hi = min(address + length, self.end)
+        if lo == address and hi == address + length:
+            return self.data[lo - self.base:hi - self.base]
+        out = bytearray([ERASED]) * length
+        if lo < hi:
+            out[lo - address:hi - address] = self.data[lo - self.base:hi - self.base]
+        return bytes(out)
+
+    def close(self) -> None:
+        """Release the file mapping"""
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._map = self._file = None
+
+    def __enter__(self) -> "MemorySource":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@dataclass
+class SectorDiff:
+    """Comparison result for one sector"""
+    index: int
+    address: int
+    size: int
+    digest_a: str
+    digest_b: str
+    erased_a: int = 0          # 0xFF bytes in A
+    erased_b: int = 0          # 0xFF bytes in B
+    bytes_differing: int = 0
+    ranges: List[Tuple[int, int]] = field(default_factory=list)  # [start, end)
+
+    @property
+    def identical(self) -> bool:
+        return self.bytes_differing == 0
+
+
+@dataclass
+class MemoryDiffReport:
+    """Outcome of comparing two memory contents"""
+    base: int = 0
+    size: int = 0
+    sectors: List[SectorDiff] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def identical(self) -> bool:
+        return all(s.identical for s in self.sectors)
+
+    @property
+    def differing_sectors(self) -> List[SectorDiff]:
+        return [s for s in self.sectors if not s.identical]
+
+    @property
+    def ranges(self) -> List[Tuple[int, int]]:
+        """All differing ranges, in address order"""
+        return [r for s in self.sectors for r in s.ranges]
+
+    @property
+    def bytes_differing(self) -> int:
+        return sum(s.bytes_differing for s in self.sectors)
+
+    def erased_percent(self, side: str = "a") -> float:
+        """Percentage of 0xFF bytes in the reference ("a") or candidate ("b")"""
+        if not self.size:
+            return 0.0
+        erased = sum(s.erased_a if side == "a" else s.erased_b for s in self.sectors)
+        return 100.0 * erased / self.size
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        return (f"{len(self.differing_sectors)}/{len(self.sectors)} sectors differ, "
+                f"{self.bytes_differing} bytes in {len(self.ranges)} range(s); "
+                f"erased {self.erased_percent('a'):.1f}% / "
+                f"{self.erased_percent('b'):.1f}% ({self.duration * 1000:.1f} ms)")
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable form"""
+        return {
+            "base": self.base,
+            "size": self.size,
+            "identical": self.identical,
+            "bytes_differing": self.bytes_differing,
+            "erased_percent": [self.erased_percent("a"), self.erased_percent("b")],
+            "duration": self.duration,
+            "sectors": [{
+                "index": s.index,
+                "address": s.address,
+                "size": s.size,
+                "digest": [s.digest_a, s.digest_b],
+                "erased": [s.erased_a, s.erased_b],
+                "bytes_differing": s.bytes_differing,
+                "ranges": [list(r) for r in s.ranges],
+            } for s in self.sectors],
+        }
+
+
+class MemoryComparator:
+    """Sector-wise comparison of two memory contents"""
+
+    def __init__(self, layout: Optional[FlashLayout] = None,
+                 block_size: int = 1024, merge_gap: int = 16):
+        """
+        Initialize comparator
+
+        Args:
+            layout: Flash sector geometry (default: uniform blocks)
+            block_size: Uniform block size used when the compared span does
+                        not lie inside the layout
+            merge_gap: Differing runs closer than this many bytes are
+                       reported as one range (never across sectors)
+        """
+        self.layout = layout
+        self.block_size = block_size
+        self.merge_gap = merge_gap
+
+    @classmethod
+    def for_chip(cls, chip: str, **kwargs) -> "MemoryComparator":
+        """Comparator using a part number's flash sector layout"""
+        return cls(layout_for_chip(chip), **kwargs)
+
+    def sectors(self, start: int, end: int) -> List[Tuple[int, int, int]]:
+        """
+        Sectors covering [start, end)
+
+        Args:
+            start: First address
+            end: Address one past the last byte
+
+        Returns:
+            List of (index, start address, size), clipped to the range
+        """
+        layout = self.layout
+        if layout is None or not layout.contains(start, end - start):
+            count = (end - start + self.block_size - 1) // self.block_size
+            layout = FlashLayout(start, [self.block_size] * count)
+        return [(index, max(address, start), min(address + size, end) - max(address, start))
+                for index, address, size in layout.sectors_in_range(start, end)]
+
+    def compare(self, a: Union[MemorySource, Path, str],
+                b: Union[MemorySource, Path, str],
+                address: Optional[int] = None) -> MemoryDiffReport:
+        """
+        Compare two dumps or images
+
+        The compared span is the union of both; bytes missing on one side
+        count as erased.
+
+        Args:
+            a: Reference (e.g. golden image)
+            b: Candidate (e.g. field dump)
+            address: Load address for raw binaries given as paths
+
+        Returns:
+            MemoryDiffReport
+        """
+        opened = []
+        if not isinstance(a, MemorySource):
+            a = MemorySource(a, address)
+            opened.append(a)
+        if not isinstance(b, MemorySource):
+            b = MemorySource(b, address)
+            opened.append(b)
+        try:
+            return self._compare(a, b)
+        finally:
+            for source in opened:
+                source.close()
+
+    def _compare(self, a: MemorySource, b: MemorySource) -> MemoryDiffReport:
+        start_time = time.monotonic()
+        start = min(a.base, b.base)
+        end = max(a.end, b.end)
+        report = MemoryDiffReport(base=start, size=end - start)
+
+        for index, address, size in self.sectors(start, end):
+            block_a = a.read(address, size)
+            block_b = b.read(address, size)
+            sector = SectorDiff(index, address, size,
+                                sector_digest(block_a), sector_digest(block_b),
+                                block_a.count(ERASED), block_b.count(ERASED))
+            if block_a != block_b:
+                self._scan(sector, block_a, block_b)
+            report.sectors.append(sector)
+
+        report.duration = time.monotonic() - start_time
+        return report
+
+    def _scan(self, sector: SectorDiff, block_a: bytes, block_b: bytes) -> None:
+        """Locate differing byte runs in a sector"""
+        # XOR the whole sector as one integer; equal bytes become zero
+        xor = (int.from_bytes(block_a, "little") ^ int.from_bytes(block_b, "little")
+               ).to_bytes(sector.size, "little")
+        sector.bytes_differing = sector.size - xor.count(0)
+        for match in _DIFF_RUN_RE.finditer(xor):
+            lo = sector.address + match.start()
+            hi = sector.address + match.end()
+            if sector.ranges and lo - sector.ranges[-1][1] < self.merge_gap:
+                sector.ranges[-1] = (sector.ranges[-1][0], hi)
+            else:
+                sector.ranges.append((lo, hi))
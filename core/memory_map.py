@@ -0,0 +1,746 @@
+"""
+Memory Map - Flash and RAM usage from GNU ld map files and ELF files
+Streams .map files line by line in a single pass into per-section,
+per-object and per-symbol totals, and gates builds on growth against a
+stored baseline
+"""
+
+import json
+import mmap
+import struct
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Union, Iterator, BinaryIO
+
+from .image import ElfHeader, ImageFormatError
+
+# Symbol/object kind bits
+FLASH = 1
+RAM = 2
+KINDS = {"flash": FLASH, "ram": RAM}
+
+# Input section name prefixes stripped to name unlabelled sections
+_SECTION_PREFIXES = (b".text.", b".rodata.", b".data.", b".bss.", b".sdata.",
+                     b".sbss.", b".ramfunc.")
+
+# ELF section header constants
+_SHT_SYMTAB = 2
+_SHT_NOBITS = 8
+_SHF_WRITE = 0x1
+_SHF_ALLOC = 0x2
+_STT_OBJECT = 1
+_STT_FUNC = 2
+
+
+@dataclass
+class MemoryRegion:
+    """One MEMORY region of the linker script"""
+    name: str
+    origin: int
+    length: int
+    attributes: str = ""
+    used: int = 0
+
+    @property
+    def kind(self) -> str:
+        """"flash" or "ram" (from the name, else the w attribute)"""
+        upper = self.name.upper()
+        if "FLASH" in upper or "ROM" in upper:
+            return "flash"
+        if "RAM" in upper:
+            return "ram"
+        return "ram" if "w" in self.attributes.lower() else "flash"
+
+    @property
+    def end(self) -> int:
+        return self.origin + self.length
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.used / self.length if self.length else 0.0
+
+    def contains(self, address: int) -> bool:
+        return self.origin <= address < self.end
+
+
+@dataclass
+class SectionUsage:
+    """One output section"""
+    name: str
+    address: int
+    size: int
+    load_address: Optional[int] = None   # LMA when it differs from the address
+    kind: int = 0                        # FLASH | RAM bits
+
+    @property
+    def flash(self) -> bool:
+        return bool(self.kind & FLASH)
+
+    @property
+    def ram(self) -> bool:
+        return bool(self.kind & RAM)
+
+
+@dataclass
+class ObjectUsage:
+    """Bytes an object file (or archive member) contributes"""
+    name: str
+    flash: int = 0
+    ram: int = 0
+
+
+@dataclass
+class SymbolUsage:
+    """One symbol (or unlabelled input section)"""
+    name: str
+    address: int
+    size: int
+    kind: int
+    object: str = ""
+
+
+class MemoryMap:
+    """Flash/RAM usage by region, section, object file and symbol"""
+
+    def __init__(self, source: Optional[Path] = None):
+        """
+        Initialize an empty map
+
+        Args:
+            source: File the map was read from
+        """
+        self.source = source
+        self.regions: List[MemoryRegion] = []
+        self.sections: List[SectionUsage] = []
+        self._objects: Dict[bytes, List[int]] = {}
+        # Symbols in parallel compact arrays, sorted by size on first query
+        self._names: List[bytes] = []
+        self._addresses = array("Q")
+        self._sizes = array("Q")
+        self._kinds = bytearray()
+        self._owners = array("L")
+        self._owner_names: List[bytes] = []
+        self._owner_index: Dict[bytes, int] = {}
+        self._order: Optional[List[int]] = None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: Union[Path, str]) -> "MemoryMap":
+        """
+        Read a GNU ld .map file or an ELF file (chosen by content)
+
+        Args:
+            path: .map or .elf/.axf/.out file
+
+        Returns:
+            MemoryMap
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ImageFormatError: If an ELF file cannot be parsed
+        """
+        path = Path(path)
+        with open(path, "rb") as f:
+            if f.read(4) == b"\x7fELF":
+                return cls.from_elf(path)
+        return cls.from_map(path)
+
+    @classmethod
+    def from_map(cls, path: Union[Path, str]) -> "MemoryMap":
+        """
+        Parse a GNU ld map file (ld -Map) in one streaming pass
+
+        Symbol sizes are the distance to the next symbol, or to the end of
+        the input section; input sections without global symbols (static
+        functions and data with -ffunction-sections/-fdata-sections) are
+        reported under their section name. Memory grows with the number of
+        symbols, not with the file size.
+
+        Args:
+            path: Map file
+
+        Returns:
+            MemoryMap
+        """
+        path = Path(path)
+        memory_map = cls(path)
+        with open(path, "rb") as f:
+            _MapParser(memory_map).feed(f)
+        return memory_map
+
+    @classmethod
+    def from_elf(cls, path: Union[Path, str]) -> "MemoryMap":
+        """
+        Read section headers and the symbol table of an ELF file
+
+        Without a linker map there are no regions or object files. Allocated
+        read-only sections count as flash, NOBITS sections as RAM and
+        writable initialized sections as both. Symbol sizes are exact.
+
+        Args:
+            path: ELF file
+
+        Returns:
+            MemoryMap
+        """
+        path = Path(path)
+        memory_map = cls(path)
+        with open(path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                memory_map._read_elf(view, path.name)
+            except struct.error:
+                raise ImageFormatError(f"{path.name}: truncated ELF file")
+            finally:
+                view.release()
+        return memory_map
+
+    def _read_elf(self, view: memoryview, name: str) -> None:
+        header = ElfHeader.parse(view)
+        endian = header.endian
+        fmt = endian + ("IIQQQQIIQQ" if header.is_64 else "IIIIIIIIII")
+        sections = [struct.unpack_from(fmt, view, header.shoff + i * header.shentsize)
+                    for i in range(header.shnum)]
+        if not sections:
+            raise ImageFormatError(f"{name}: no section headers")
+
+        tables: Dict[int, bytes] = {}
+
+        def string(table: int, offset: int) -> bytes:
+            data = tables.get(table)
+            if data is None:
+                start, size = sections[table][4], sections[table][5]
+                data = tables[table] = bytes(view[start:start + size])
+            end = data.find(b"\0", offset)
+            return data[offset:end if end >= 0 else len(data)]
+
+        kinds = {}
+        for index, (sh_name, sh_type, flags, addr, _, size, _, _, _, _) in enumerate(sections):
+            if not flags & _SHF_ALLOC or not size:
+                continue
+            if sh_type == _SHT_NOBITS:
+                kind = RAM
+            elif flags & _SHF_WRITE:
+                kind = FLASH | RAM
+            else:
+                kind = FLASH
+            kinds[index] = kind
+            self.sections.append(SectionUsage(
+                string(header.shstrndx, sh_name).decode(errors="replace"), addr, size,
+                kind=kind))
+
+        sym_fmt = endian + ("IBBHQQ" if header.is_64 else "IIIBBH")
+        sym_size = struct.calcsize(sym_fmt)
+        for sh_name, sh_type, _, _, offset, size, link, _, _, _ in sections:
+            if sh_type != _SHT_SYMTAB:
+                continue
+            for entry in range(offset, offset + size, sym_size):
+                if header.is_64:
+                    st_name, info, _, shndx, value, st_size = struct.unpack_from(sym_fmt, view, entry)
+                else:
+                    st_name, value, st_size, info, _, shndx = struct.unpack_from(sym_fmt, view, entry)
+                if st_size and shndx in kinds and info & 0xF in (_STT_OBJECT, _STT_FUNC):
+                    # Thumb functions have bit 0 set
+                    self._add_symbol(string(link, st_name), value & ~1, st_size,
+                                     kinds[shndx], b"")
+
+    def _add_symbol(self, name: bytes, address: int, size: int, kind: int,
+                    owner: bytes) -> None:
+        index = self._owner_index.get(owner)
+        if index is None:
+            index = self._owner_index[owner] = len(self._owner_names)
+            self._owner_names.append(owner)
+        self._names.append(name)
+        self._addresses.append(address)
+        self._sizes.append(size)
+        self._kinds.append(kind)
+        self._owners.append(index)
+        self._order = None
+
+    def _add_object(self, name: bytes, size: int, kind: int) -> None:
+        totals = self._objects.get(name)
+        if totals is None:
+            totals = self._objects[name] = [0, 0]
+        if kind & FLASH:
+            totals[0] += size
+        if kind & RAM:
+            totals[1] += size
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    @property
+    def flash_used(self) -> int:
+        return sum(s.size for s in self.sections if s.flash)
+
+    @property
+    def ram_used(self) -> int:
+        return sum(s.size for s in self.sections if s.ram)
+
+    @property
+    def symbol_count(self) -> int:
+        return len(self._names)
+
+    def region(self, name: str) -> Optional[MemoryRegion]:
+        """Memory region by name"""
+        return next((r for r in self.regions if r.name == name), None)
+
+    def objects(self) -> List[ObjectUsage]:
+        """Every object file, largest flash user first"""
+        usage = [ObjectUsage(name.decode(errors="replace"), flash, ram)
+                 for name, (flash, ram) in self._objects.items()]
+        usage.sort(key=lambda o: (o.flash, o.ram), reverse=True)
+        return usage
+
+    def top_objects(self, count: int = 20, kind: str = "flash") -> List[ObjectUsage]:
+        """
+        Largest object files
+
+        Args:
+            count: Objects to return
+            kind: "flash" or "ram"
+
+        Returns:
+            ObjectUsage list, largest first
+        """
+        key = (lambda o: o.flash) if kind == "flash" else (lambda o: o.ram)
+        return sorted(self.objects(), key=key, reverse=True)[:count]
+
+    def top_symbols(self, count: int = 20, kind: Optional[str] = None) -> List[SymbolUsage]:
+        """
+        Largest symbols (the size index is built on the first query)
+
+        Args:
+            count: Symbols to return
+            kind: "flash", "ram" or None for both
+
+        Returns:
+            SymbolUsage list, largest first
+        """
+        if self._order is None:
+            self._order = sorted(range(len(self._sizes)),
+                                 key=self._sizes.__getitem__, reverse=True)
+        mask = KINDS.get(kind, FLASH | RAM)
+        return [self._symbol(i) for i in self._iter_order(mask, count)]
+
+    def _iter_order(self, mask: int, count: int) -> Iterator[int]:
+        found = 0
+        for i in self._order:
+            if found >= count:
+                return
+            if self._kinds[i] & mask:
+                found += 1
+                yield i
+
+    def _symbol(self, i: int) -> SymbolUsage:
+        return SymbolUsage(self._names[i].decode(errors="replace"), self._addresses[i],
+                           self._sizes[i], self._kinds[i],
+                           self._owner_names[self._owners[i]].decode(errors="replace"))
+
+    def symbols(self) -> Iterator[SymbolUsage]:
+        """Every symbol in map order"""
+        for i in range(len(self._names)):
+            yield self._symbol(i)
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        parts = [f"flash {self.flash_used} bytes", f"RAM {self.ram_used} bytes"]
+        for region in self.regions:
+            parts.append(f"{region.name} {region.percent:.1f}%")
+        return ", ".join(parts)
+
+    def format_report(self, top: int = 20) -> str:
+        """
+        Regions, sections, largest objects and largest symbols as text
+
+        Args:
+            top: Rows per object/symbol table
+
+        Returns:
+            Multi-line report
+        """
+        lines = []
+        if self.regions:
+            lines.append(f"{'Region':<16} {'Used':>10} {'Size':>10} {'Use%':>7}")
+            for r in self.regions:
+                lines.append(f"{r.name:<16} {r.used:>10} {r.length:>10} {r.percent:>6.1f}%")
+            lines.append("")
+        lines.append(f"{'Section':<24} {'Address':>10} {'Size':>10}  Memory")
+        for s in sorted(self.sections, key=lambda s: s.address):
+            memory = "+".join(k for k, bit in KINDS.items() if s.kind & bit)
+            lines.append(f"{s.name:<24} {s.address:>#10x} {s.size:>10}  {memory}")
+        objects = self.objects()
+        if objects:
+            lines.append("")
+            lines.append(f"{'Object (top ' + str(top) + ' by flash)':<48} {'Flash':>9} {'RAM':>9}")
+            for o in objects[:top]:
+                lines.append(f"{_shorten(o.name, 48):<48} {o.flash:>9} {o.ram:>9}")
+        if self.symbol_count:
+            lines.append("")
+            lines.append(f"{'Symbol (top ' + str(top) + ')':<40} {'Size':>9}  Memory  Object")
+            for sym in self.top_symbols(top):
+                memory = "+".join(k for k, bit in KINDS.items() if sym.kind & bit)
+                lines.append(f"{_shorten(sym.name, 40):<40} {sym.size:>9}  {memory:<6}  "
+                             f"{_shorten(sym.object, 40)}")
+        return "\n".join(lines)
+
+    def to_dict(self, symbols: int = 1000) -> dict:
+        """
+        Totals for a size baseline
+
+        Args:
+            symbols: Largest symbols to include
+
+        Returns:
+            JSON-serializable dict
+        """
+        return {
+            "flash": self.flash_used,
+            "ram": self.ram_used,
+            "regions": {r.name: r.used for r in self.regions},
+            "objects": {o.name: [o.flash, o.ram] for o in self.objects()},
+            "symbols": {s.name: s.size for s in self.top_symbols(symbols)},
+        }
+
+
+def _shorten(text: str, width: int) -> str:
+    """Keep the end of long names (paths, mangled symbols)"""
+    return text if len(text) <= width else "..." + text[-(width - 3):]
+
+
+class _MapParser:
+    """State machine over the lines of a GNU ld map file"""
+
+    def __init__(self, memory_map: MemoryMap):
+        self.map = memory_map
+        self.section: Optional[SectionUsage] = None
+        self.kind = 0
+        self.pending_output: Optional[bytes] = None
+        self.pending_input: Optional[bytes] = None
+        # Current input section: name, address, end, object; and its symbols
+        self.input: Optional[Tuple[bytes, int, int, bytes]] = None
+        self.symbols: List[Tuple[int, bytes]] = []
+
+    def feed(self, f: BinaryIO) -> None:
+        """Parse a map file opened in binary mode"""
+        lines = iter(f)
+        for line in lines:
+            if line.startswith(b"Memory Configuration"):
+                break
+        for line in lines:
+            if line.startswith(b"Linker script and memory map"):
+                break
+            self._region(line)
+
+        for line in lines:
+            first = line[:1]
+            if first == b" ":
+                if line[1:2] != b" ":
+                    self._input_section(line)
+                else:
+                    self._indented(line)
+            elif first in (b"\n", b"\r"):
+                continue
+            elif line.startswith(b"Cross Reference Table"):
+                break
+            else:
+                self._output_section(line)
+        self._end_input()
+        self._end_output()
+
+    def _region(self, line: bytes) -> None:
+        tokens = line.split()
+        if len(tokens) >= 3 and tokens[1][:2] == b"0x" and tokens[0] != b"*default*":
+            self.map.regions.append(MemoryRegion(
+                tokens[0].decode(), int(tokens[1], 16), int(tokens[2], 16),
+                tokens[3].decode() if len(tokens) > 3 else ""))
+
+    def _region_of(self, address: int) -> Optional[MemoryRegion]:
+        for region in self.map.regions:
+            if region.contains(address):
+                return region
+        return None
+
+    def _output_section(self, line: bytes) -> None:
+        """Column-0 line: output section header or linker script statement"""
+        self._end_input()
+        self._end_output()
+        tokens = line.split()
+        if len(tokens) == 1 and tokens[0][:1] == b".":
+            self.pending_output = tokens[0]      # Address/size on the next line
+        elif len(tokens) >= 3 and tokens[1][:2] == b"0x":
+            self._start_output(tokens[0], tokens)
+
+    def _start_output(self, name: bytes, tokens: List[bytes]) -> None:
+        """tokens: [name,] address, size[, load address LMA]"""
+        if tokens[0][:2] != b"0x":
+            tokens = tokens[1:]
+        address, size = int(tokens[0], 16), int(tokens[1], 16)
+        lma = int(tokens[4], 16) if tokens[2:4] == [b"load", b"address"] else None
+        vma_region = self._region_of(address) if size else None
+        if vma_region is None:
+            self.section = None                  # Debug info, /DISCARD/, empty
+            return
+        kind = FLASH if vma_region.kind == "flash" else RAM
+        vma_region.used += size
+        if lma is not None and lma != address:
+            lma_region = self._region_of(lma)
+            if lma_region is not None and lma_region is not vma_region:
+                lma_region.used += size
+                kind |= FLASH if lma_region.kind == "flash" else RAM
+        else:
+            lma = None
+        self.section = SectionUsage(name.decode(), address, size, lma, kind)
+        self.kind = kind
+
+    def _end_output(self) -> None:
+        if self.section is not None:
+            self.map.sections.append(self.section)
+            self.section = None
+        self.pending_output = None
+
+    def _input_section(self, line: bytes) -> None:
+        """One-space line: input section (or input section pattern)"""
+        self._end_input()
+        self.pending_input = None
+        if self.section is None:
+            return
+        tokens = line.split(None, 3)
+        name = tokens[0]
+        if len(tokens) >= 3 and tokens[1][:2] == b"0x":
+            owner = tokens[3].strip() if len(tokens) > 3 else b""
+            self._start_input(name, int(tokens[1], 16), int(tokens[2], 16), owner)
+        elif len(tokens) == 1 and (name[:1] == b"." or name == b"COMMON"):
+            self.pending_input = name            # Address/size on the next line
+
+    def _start_input(self, name: bytes, address: int, size: int, owner: bytes) -> None:
+        if not size:
+            return
+        if name == b"*fill*":
+            owner = b"*fill*"
+        self.map._add_object(owner, size, self.kind)
+        if name != b"*fill*":
+            self.input = (name, address, address + size, owner)
+
+    def _end_input(self) -> None:
+        if self.input is None:
+            return
+        name, address, end, owner = self.input
+        symbols = self.symbols
+        if not symbols:
+            label = name
+            for prefix in _SECTION_PREFIXES:
+                if name.startswith(prefix):
+                    label = name[len(prefix):]
+                    break
+            self.map._add_symbol(label, address, end - address, self.kind, owner)
+        else:
+            for i, (sym_address, sym_name) in enumerate(symbols):
+                next_address = symbols[i + 1][0] if i + 1 < len(symbols) else end
+                size = min(next_address, end) - sym_address
+                if size > 0:
+                    self.map._add_symbol(sym_name, sym_address, size, self.kind, owner)
+            self.symbols = []
+        self.input = None
+
+    def _indented(self, line: bytes) -> None:
+        """Deeply indented line: symbol, assignment or wrapped header"""
+        tokens = line.split()
+        if not tokens or tokens[0][:2] != b"0x":
+            return
+        if self.pending_output is not None:
+            name, self.pending_output = self.pending_output, None
+            if len(tokens) >= 2 and tokens[1][:2] == b"0x":
+                self._start_output(name, tokens)
+            return
+        if self.pending_input is not None:
+            name, self.pending_input = self.pending_input, None
+            if len(tokens) >= 2 and tokens[1][:2] == b"0x" and self.section is not None:
+                owner = line.split(None, 2)[2].strip() if len(tokens) > 2 else b""
+                self._start_input(name, int(tokens[0], 16), int(tokens[1], 16), owner)
+            return
+        if (self.input is None or len(tokens) < 2 or b" = " in line
+                or tokens[1].startswith(b"PROVIDE")):
+            return
+        address = int(tokens[0], 16)
+        if self.input[1] <= address < self.input[2]:
+            name = tokens[1] if len(tokens) == 2 else line.split(None, 1)[1].strip()
+            self.symbols.append((address, name))
+
+
+# ----------------------------------------------------------------------
+# Size regression gating
+# ----------------------------------------------------------------------
+
+@dataclass
+class SizeChange:
+    """Size of one item in the baseline and now"""
+    name: str
+    old: int
+    new: int
+
+    @property
+    def delta(self) -> int:
+        return self.new - self.old
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.delta / self.old if self.old else (100.0 if self.new else 0.0)
+
+    def describe(self) -> str:
+        return (f"{self.name}: {self.old} -> {self.new} bytes "
+                f"({self.delta:+d}, {self.percent:+.1f}%)")
+
+
+@dataclass
+class SizeReport:
+    """Comparison of a build's memory usage with the baseline"""
+    totals: List[SizeChange] = field(default_factory=list)     # flash, ram, regions
+    objects: List[SizeChange] = field(default_factory=list)    # Largest changes
+    symbols: List[SizeChange] = field(default_factory=list)    # Largest changes
+    violations: List[str] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        return not self.violations
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        text = ", ".join(f"{c.name} {c.delta:+d} ({c.percent:+.1f}%)" for c in self.totals)
+        return text if self.success else f"{text} - {len(self.violations)} limit(s) exceeded"
+
+    def format_report(self, top: int = 10) -> str:
+        """Totals and the largest object/symbol changes as text"""
+        lines = [change.describe() for change in self.totals]
+        for title, changes in (("Objects", self.objects), ("Symbols", self.symbols)):
+            if changes:
+                lines.append(f"{title} with the largest changes:")
+                lines.extend(f"  {_shorten(c.name, 48):<48} {c.old:>9} -> {c.new:>9} "
+                             f"({c.delta:+d})" for c in changes[:top])
+        return "\n".join(lines)
+
+
+class SizeGate:
+    """Fails builds whose memory usage grew past a limit since the baseline"""
+
+    def __init__(self, baseline_path: Union[Path, str],
+                 max_growth: Optional[float] = 2.0,
+                 max_growth_bytes: Optional[int] = None,
+                 update: bool = False):
+        """
+        Initialize size gate
+
+        Args:
+            baseline_path: JSON baseline (created on the first check)
+            max_growth: Allowed growth of flash, RAM and each region in percent
+            max_growth_bytes: Allowed growth in bytes
+            update: Accept the new sizes and rewrite the baseline
+        """
+        self.baseline_path = Path(baseline_path)
+        self.max_growth = max_growth
+        self.max_growth_bytes = max_growth_bytes
+        self.update = update
+
+    def load(self) -> Optional[dict]:
+        """Stored baseline, or None if there is none"""
+        if not self.baseline_path.exists():
+            return None
+        try:
+            with open(self.baseline_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[WARNING] Failed to load size baseline: {e}")
+            return None
+
+    def save(self, memory_map: MemoryMap) -> bool:
+        """Store the map's totals as the new baseline"""
+        try:
+            self.baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.baseline_path, "w") as f:
+                json.dump(memory_map.to_dict(), f, indent=2)
+            return True
+        except Exception as e:
+            print(f"[WARNING] Failed to save size baseline: {e}")
+            return False
+
+    def compare(self, memory_map: MemoryMap, baseline: dict) -> SizeReport:
+        """
+        Compare usage with a baseline dict (MemoryMap.to_dict())
+
+        Args:
+            memory_map: Usage of the new build
+            baseline: Stored totals
+
+        Returns:
+            SizeReport; violations list every total over the limits and
+            every region that overflows
+        """
+        current = memory_map.to_dict()
+        report = SizeReport()
+        report.totals.append(SizeChange("flash", baseline.get("flash", 0), current["flash"]))
+        report.totals.append(SizeChange("ram", baseline.get("ram", 0), current["ram"]))
+        old_regions = baseline.get("regions", {})
+        # A single FLASH/RAM region pair only repeats the totals
+        regions = current["regions"] if len(current["regions"]) > 2 else {}
+        for name, used in regions.items():
+            if name in old_regions:
+                report.totals.append(SizeChange(name, old_regions[name], used))
+
+        for change in report.totals:
+            if change.delta <= 0:
+                continue
+            if self.max_growth is not None and change.percent > self.max_growth:
+                report.violations.append(f"{change.describe()} exceeds +{self.max_growth}%")
+            elif self.max_growth_bytes is not None and change.delta > self.max_growth_bytes:
+                report.violations.append(f"{change.describe()} exceeds "
+                                         f"+{self.max_growth_bytes} bytes")
+        for region in memory_map.regions:
+            if region.used > region.length:
+                report.violations.append(f"{region.name} overflows: {region.used} of "
+                                         f"{region.length} bytes")
+
+        old_objects = baseline.get("objects", {})
+        objects = []
+        for name in set(old_objects) | set(current["objects"]):
+            old = sum(old_objects.get(name, [0, 0]))
+            new = sum(current["objects"].get(name, [0, 0]))
+            if old != new:
+                objects.append(SizeChange(name, old, new))
+        report.objects = sorted(objects, key=lambda c: abs(c.delta), reverse=True)
+
+        # Only symbols in both top lists are comparable
+        old_symbols = baseline.get("symbols", {})
+        report.symbols = sorted(
+            (SizeChange(name, old_symbols[name], size)
+             for name, size in current["symbols"].items()
+             if name in old_symbols and old_symbols[name] != size),
+            key=lambda c: abs(c.delta), reverse=True)
+        return report
+
+    def check(self, memory_map: MemoryMap) -> SizeReport:
+        """
+        Compare with the stored baseline, creating or updating it as needed
+
+        Args:
+            memory_map: Usage of the new build
+
+        Returns:
+            SizeReport (empty and successful when a baseline was created)
+        """
+        baseline = self.load()
+        if baseline is None:
+            self.save(memory_map)
+            print(f"[INFO] Size baseline created: {self.baseline_path}")
+            return SizeReport()
+        report = self.compare(memory_map, baseline)
+        if self.update:
+            self.save(memory_map)
+            print(f"[INFO] Size baseline updated: {self.baseline_path}")
+            report.violations = []
+        return report
@@ -0,0 +1,409 @@
+"""
+OpenOCD Session - Persistent OpenOCD process driven over the Tcl RPC port
+Starts OpenOCD once per probe and issues flash/erase/read/reset commands on
+the live session instead of paying adapter bring-up on every operation
+"""
+
+import atexit
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, List
+
+TCL_TERMINATOR = b"\x1a"
+
+
+class OpenOCDError(Exception):
+    """Raised when an OpenOCD session command fails"""
+
+
+def _tcl_path(path: Path) -> str:
+    """Quote a filesystem path for use inside a Tcl command"""
+    return "{" + Path(path).as_posix() + "}"
+
+
+def _free_tcp_port(host: str = "127.0.0.1") -> int:
+    """Ask the OS for a currently unused TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class OpenOCDSession:
+    """Long-lived OpenOCD process for a single probe"""
+
+    def __init__(self, openocd_path: Optional[Path] = None,
+                 interface: str = "stlink.cfg",
+                 target: str = "stm32f1x.cfg",
+                 probe_serial: Optional[str] = None,
+                 host: str = "127.0.0.1",
+                 tcl_port: Optional[int] = None,
+                 spawn: bool = True,
+                 timeout: float = 30.0,
+                 speed_khz: Optional[int] = None):
+        """
+        Initialize session
+
+        Args:
+            openocd_path: OpenOCD executable (only needed when spawning)
+            interface: Interface config file (under interface/)
+            target: Target config file (under target/)
+            probe_serial: Adapter serial number to bind to
+            host: Tcl RPC host
+            tcl_port: Tcl RPC port (default: free port when spawning, 6666 otherwise)
+            spawn: Start an OpenOCD process (False attaches to a running one)
+            timeout: Default per-command timeout in seconds
+            speed_khz: Adapter (SWD) clock in kHz (default: target config's)
+        """
+        self.openocd_path = openocd_path
+        self.interface = interface
+        self.target = target
+        self.probe_serial = probe_serial
+        self.host = host
+        self.spawn = spawn
+        self.tcl_port = tcl_port if tcl_port is not None else (
+            _free_tcp_port(host) if spawn else 6666)
+        self.timeout = timeout
+        self.speed_khz = speed_khz
+
+        self.process: Optional[subprocess.Popen] = None
+        self._log = None
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def _launch_command(self) -> List[str]:
+        """Build the command line that starts OpenOCD in server mode"""
+        cmd = [
+            str(self.openocd_path),
+            "-f", f"interface/{self.interface}",
+        ]
+        if self.probe_serial:
+            cmd.extend(["-c", f"adapter serial {self.probe_serial}"])
+        cmd.extend(["-f", f"target/{self.target}"])
+        if self.speed_khz:
+            cmd.extend(["-c", f"adapter speed {self.speed_khz}"])
+        cmd.extend([
+            "-c", "gdb_port disabled",
+            "-c", "telnet_port disabled",
+            "-c", f"tcl_port {self.tcl_port}",
+            "-c", "init",
+        ])
+        return cmd
+
+    def start(self) -> bool:
+        """
+        Start (or attach to) OpenOCD and open the Tcl RPC connection
+
+        Returns:
+            True if the session is ready
+        """
+        if self.is_alive():
+            return True
+
+        if self.spawn:
+            if not self.openocd_path:
+                print("[ERROR] OpenOCD not found")
+                return False
+            cmd = self._launch_command()
+            print(f"[INFO] Starting OpenOCD session: {' '.join(cmd)}")
+            # OpenOCD logs continuously; a pipe nobody drains would block it
+            self._log = tempfile.TemporaryFile()
+            try:
+                self.process = subprocess.Popen(cmd,
+                                                stdout=subprocess.DEVNULL,
+                                                stderr=self._log)
+            except Exception as e:
+                print(f"[ERROR] Failed to start OpenOCD: {e}")
+                self.close()
+                return False
+
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.process is not None and self.process.poll() is not None:
+                self._log.seek(0)
+                stderr = self._log.read().decode(errors="replace")
+                print(f"[ERROR] OpenOCD exited during startup: {stderr}")
+                self.close()
+                return False
+            try:
+                self._sock = socket.create_connection(
+                    (self.host, self.tcl_port), timeout=self.timeout)
+                return True
+            except OSError:
+                time.sleep(0.05)
+
+        print(f"[ERROR] Timed out connecting to OpenOCD on "
+              f"{self.host}:{self.tcl_port}")
+        self.close()
+        return False
+
+    def is_alive(self) -> bool:
+        """Check whether the session is connected and the process running"""
+        if self._sock is None:
+            return False
+        if self.process is not None and self.process.poll() is not None:
+            return False
+        return True
+
+    def close(self) -> None:
+        """Shut down the OpenOCD process and drop the connection"""
+        if self._sock is not None:
+            if self.process is not None:
+                try:
+                    self._sock.sendall(b"shutdown" + TCL_TERMINATOR)
+                except OSError:
+                    pass
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def command(self, cmd: str, timeout: Optional[float] = None) -> str:
+        """
+        Run one command on the live session
+
+        Args:
+            cmd: OpenOCD/Tcl command
+            timeout: Timeout in seconds (default: session timeout)
+
+        Returns:
+            Command result text
+
+        Raises:
+            OpenOCDError: If the session is down or the command fails
+        """
+        if not self.is_alive():
+            raise OpenOCDError("OpenOCD session is not running")
+
+        wrapped = (f"if {{[catch {{{cmd}}} _ocd_msg]}} "
+                   f"{{concat ERROR: $_ocd_msg}} else {{set _ocd_msg}}")
+
+        with self._lock:
+            self._sock.settimeout(timeout or self.timeout)
+            try:
+                self._sock.sendall(wrapped.encode() + TCL_TERMINATOR)
+                chunks = []
+                while True:
+                    chunk = self._sock.recv(65536)
+                    if not chunk:
+                        raise OpenOCDError("OpenOCD closed the connection")
+                    if chunk.endswith(TCL_TERMINATOR):
+                        chunks.append(chunk[:-1])
+                        break
+                    chunks.append(chunk)
+            except socket.timeout:
+                # Response framing is lost; the session cannot be reused
+                self.close()
+                raise OpenOCDError(f"Timeout waiting for '{cmd}'")
+            except OSError as e:
+                self.close()
+                raise OpenOCDError(f"Connection error: {e}")
+
+        reply = b"".join(chunks).decode(errors="replace").strip()
+        if reply.startswith("ERROR:"):
+            raise OpenOCDError(reply[len("ERROR:"):].strip())
+        return reply
+
+    def set_speed(self, speed_khz: int) -> None:
+        """
+        Change the adapter clock of the running session
+
+        Args:
+            speed_khz: Adapter (SWD) clock in kHz
+
+        Raises:
+            OpenOCDError: If the session is down or the target is lost
+        """
+        self.command(f"adapter speed {speed_khz}")
+        self.speed_khz = speed_khz
+
+    def flash(self, binary_path: Path, address: int,
+              verify: bool = True, reset: bool = True) -> bool:
+        """
+        Program an image on the live session
+
+        Args:
+            binary_path: Image file (.bin, .hex, .elf)
+            address: Load address (used for .bin files only)
+            verify: Verify after programming
+            reset: Reset and run after programming
+
+        Returns:
+            True if successful
+        """
+        image = _tcl_path(binary_path)
+        # .hex/.elf carry their own addresses; OpenOCD treats the argument
+        # as an offset for those formats
+        offset = f" {hex(address)}" if Path(binary_path).suffix.lower() == ".bin" else ""
+
+        try:
+            self.command("reset halt")
+            self.command(f"flash write_image erase {image}{offset}")
+            if verify:
+                self.command(f"verify_image {image}{offset}")
+            if reset:
+                self.command("reset run")
+            return True
+        except OpenOCDError as e:
+            print(f"[ERROR] ✗ OpenOCD session flash failed: {e}")
+            return False
+
+    def erase(self, full: bool = False) -> bool:
+        """
+        Erase flash on the live session
+
+        Args:
+            full: Erase every sector of bank 0 (True) or only sector 0 (False)
+
+        Returns:
+            True if successful
+        """
+        try:
+            self.command("reset halt")
+            self.command(f"flash erase_sector 0 0 {'last' if full else '0'}")
+            return True
+        except OpenOCDError as e:
+            print(f"[ERROR] ✗ OpenOCD session erase failed: {e}")
+            return False
+
+    def read_memory(self, address: int, size: int,
+                    output_file: Path) -> bool:
+        """
+        Dump target memory to a file on the live session
+
+        Args:
+            address: Start address
+            size: Number of bytes to read
+            output_file: Output file path
+
+        Returns:
+            True if successful
+        """
+        try:
+            self.command(f"dump_image {_tcl_path(output_file)} "
+                         f"{hex(address)} {hex(size)}")
+            return True
+        except OpenOCDError as e:
+            print(f"[ERROR] ✗ OpenOCD session read failed: {e}")
+            return False
+
+    def reset(self, halt: bool = False) -> bool:
+        """
+        Reset the target
+
+        Args:
+            halt: Leave the core halted after reset
+
+        Returns:
+            True if successful
+        """
+        try:
+            self.command("reset halt" if halt else "reset run")
+            return True
+        except OpenOCDError as e:
+            print(f"[ERROR] ✗ OpenOCD session reset failed: {e}")
+            return False
+
+    def __enter__(self) -> "OpenOCDSession":
+        if not self.start():
+            raise OpenOCDError("Failed to start OpenOCD session")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class OpenOCDSessionPool:
+    """Sessions keyed by probe serial, started on first use"""
+
+    # Session settings fixed at launch; a request for other values restarts
+    # the probe's session (a probe can only be held by one OpenOCD process)
+    LAUNCH_SETTINGS = ("openocd_path", "interface", "target")
+
+    def __init__(self):
+        self._sessions: Dict[str, OpenOCDSession] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, probe_serial: Optional[str] = None,
+                **session_kwargs) -> Optional[OpenOCDSession]:
+        """
+        Return the live session for a probe, starting one if needed
+
+        A pooled session started with another OpenOCD, interface or target
+        config is closed and replaced.
+
+        Args:
+            probe_serial: Probe serial number (None selects the only probe)
+            **session_kwargs: Arguments forwarded to OpenOCDSession
+
+        Returns:
+            Ready OpenOCDSession, or None if it could not be started
+        """
+        key = probe_serial or ""
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and session.is_alive() and all(
+                    getattr(session, name) == session_kwargs[name]
+                    for name in self.LAUNCH_SETTINGS if name in session_kwargs):
+                return session
+            if session is not None:
+                session.close()
+
+            session = OpenOCDSession(probe_serial=probe_serial,
+                                     **session_kwargs)
+            if not session.start():
+                self._sessions.pop(key, None)
+                return None
+            self._sessions[key] = session
+            return session
+
+    def release(self, probe_serial: Optional[str] = None) -> None:
+        """Close and forget the session for a probe"""
+        with self._lock:
+            session = self._sessions.pop(probe_serial or "", None)
+        if session is not None:
+            session.close()
+
+    def close_all(self) -> None:
+        """Close every pooled session"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def serials(self) -> List[str]:
+        """Probe serials with a pooled session"""
+        with self._lock:
+            return list(self._sessions)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+_default_pool: Optional[OpenOCDSessionPool] = None
+
+
+def default_pool() -> OpenOCDSessionPool:
+    """Process-wide session pool used by STM32Programmer"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = OpenOCDSessionPool()
+        atexit.register(_default_pool.close_all)
+    return _default_pool
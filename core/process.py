@@ -0,0 +1,297 @@
+"""
+Process Runner - Shared sync/async execution of external tools
+All programmer and builder subprocess calls go through here
+"""
+
+import asyncio
+import codecs
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, List, Union, Callable, Deque
+
+# Lines of stdout/stderr kept per stream for error reporting
+DEFAULT_TAIL_LINES = 200
+
+_READ_SIZE = 65536
+
+# Seconds between checks of a cancel event while waiting for a process
+_CANCEL_POLL = 0.1
+
+# Called as on_line(line, stream) with stream "stdout" or "stderr"
+LineCallback = Callable[[str, str], None]
+
+# Tools start in a process group of their own, so killing one (make) also
+# kills everything it started (compilers) instead of leaving them running
+# with our pipes open
+if os.name == "nt":
+    _GROUP_KWARGS = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    _GROUP_KWARGS = {"start_new_session": True}
+
+
+@dataclass
+class CommandResult:
+    """Outcome of one external tool invocation"""
+    cmd: List[str]
+    returncode: int
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    lines_dropped: int = 0  # Output lines that fell out of the tail buffers
+    cpu_time: Optional[float] = None  # User+system seconds incl. reaped children (POSIX)
+    cancelled: bool = False  # Killed because the cancel event was set
+
+
+class _OutputStream:
+    """Splits one pipe into lines and keeps only the most recent ones"""
+
+    def __init__(self, name: str, tail_lines: int,
+                 on_line: Optional[LineCallback], lock: threading.Lock):
+        self.name = name
+        self.tail: Deque[str] = deque(maxlen=tail_lines)
+        self.dropped = 0
+        self._on_line = on_line
+        self._lock = lock
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        """Consume a chunk of raw output"""
+        text = self._partial + self._decoder.decode(data, final)
+        hold = ""
+        if not final and text.endswith("\r"):
+            # Might be the first half of a \r\n split across reads
+            text, hold = text[:-1], "\r"
+        # Progress bars redraw with bare carriage returns
+        parts = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        self._partial = "" if final else parts.pop() + hold
+        for line in parts:
+            if final and not line:
+                continue
+            self._add(line)
+
+    def _add(self, line: str) -> None:
+        if len(self.tail) == self.tail.maxlen:
+            self.dropped += 1
+        self.tail.append(line)
+        if self._on_line is not None:
+            with self._lock:
+                self._on_line(line, self.name)
+
+    def text(self) -> str:
+        """Retained lines joined back into text"""
+        return "".join(line + "\n" for line in self.tail)
+
+
+class _ResourcePopen(subprocess.Popen):
+    """Popen that keeps the child's resource usage when reaping it (POSIX)"""
+
+    rusage = None
+
+    def _try_wait(self, wait_flags):
+        if not hasattr(os, "wait4"):
+            return super()._try_wait(wait_flags)
+        try:
+            pid, status, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            return self.pid, 0
+        if pid == self.pid:
+            self.rusage = rusage
+        return pid, status
+
+    @property
+    def cpu_time(self) -> Optional[float]:
+        if self.rusage is None:
+            return None
+        return self.rusage.ru_utime + self.rusage.ru_stime
+
+
+def _kill_group(process) -> None:
+    """Kill a process started with _GROUP_KWARGS and all its descendants"""
+    if process.returncode is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    try:
+        process.kill()
+    except ProcessLookupError:
+        pass
+
+
+def _wait(process: subprocess.Popen, timeout: Optional[float],
+          cancel: Optional[threading.Event]) -> bool:
+    """Wait for process to exit; kill it and return False if cancel is set first"""
+    if cancel is None:
+        process.wait(timeout)
+        return True
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not cancel.is_set():
+        step = _CANCEL_POLL
+        if deadline is not None:
+            step = max(min(step, deadline - time.monotonic()), 0)
+        try:
+            process.wait(step)
+            return True
+        except subprocess.TimeoutExpired:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise
+    _kill_group(process)
+    process.wait()
+    return False
+
+
+def _pump(pipe, stream: _OutputStream) -> None:
+    """Reader thread body: drain a pipe into an _OutputStream"""
+    try:
+        while True:
+            data = pipe.read1(_READ_SIZE)
+            if not data:
+                break
+            stream.feed(data)
+    finally:
+        stream.feed(b"", final=True)
+        pipe.close()
+
+
+def run_command(cmd: List[str], timeout: Optional[float] = None,
+                cwd: Optional[Union[Path, str]] = None,
+                on_line: Optional[LineCallback] = None,
+                tail_lines: int = DEFAULT_TAIL_LINES,
+                cancel: Optional[threading.Event] = None) -> CommandResult:
+    """
+    Run a command to completion, consuming its output line by line
+
+    Output is never buffered whole: each line is handed to on_line as it
+    arrives and only the last tail_lines lines of each stream are kept in
+    the result for error reporting.
+
+    Args:
+        cmd: Command line
+        timeout: Timeout in seconds (None waits forever)
+        cwd: Working directory
+        on_line: Called with (line, "stdout"|"stderr") for every output line
+        tail_lines: Lines retained per stream
+        cancel: Kill the process and everything it started when this
+            event is set (result.cancelled)
+
+    Returns:
+        CommandResult
+
+    Raises:
+        FileNotFoundError: If the executable does not exist
+        subprocess.TimeoutExpired: If the timeout elapsed (process is killed)
+    """
+    start = time.monotonic()
+    lock = threading.Lock()
+    out = _OutputStream("stdout", tail_lines, on_line, lock)
+    err = _OutputStream("stderr", tail_lines, on_line, lock)
+
+    process = _ResourcePopen(cmd, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, cwd=cwd, **_GROUP_KWARGS)
+    readers = [threading.Thread(target=_pump, args=(process.stdout, out), daemon=True),
+               threading.Thread(target=_pump, args=(process.stderr, err), daemon=True)]
+    for reader in readers:
+        reader.start()
+
+    try:
+        finished = _wait(process, timeout, cancel)
+    except subprocess.TimeoutExpired:
+        _kill_group(process)
+        process.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout, out.text(), err.text())
+    finally:
+        if process.returncode is None:
+            # Interrupted (e.g. KeyboardInterrupt): do not leave it running.
+            # The tool is in its own session and never saw the Ctrl+C
+            _kill_group(process)
+            process.wait()
+        for reader in readers:
+            reader.join()
+
+    return CommandResult(cmd, process.returncode, out.text(), err.text(),
+                         time.monotonic() - start, out.dropped + err.dropped,
+                         process.cpu_time, not finished)
+
+
+async def _pump_async(reader: asyncio.StreamReader, stream: _OutputStream) -> None:
+    """Drain an asyncio pipe into an _OutputStream"""
+    while True:
+        data = await reader.read(_READ_SIZE)
+        if not data:
+            break
+        stream.feed(data)
+    stream.feed(b"", final=True)
+
+
+async def run_command_async(cmd: List[str], timeout: Optional[float] = None,
+                            cwd: Optional[Union[Path, str]] = None,
+                            on_line: Optional[LineCallback] = None,
+                            tail_lines: int = DEFAULT_TAIL_LINES) -> CommandResult:
+    """
+    Run a command to completion without blocking the event loop
+
+    Output is consumed line by line exactly like run_command. Cancelling
+    the awaiting task kills the process before the CancelledError
+    propagates.
+
+    Args:
+        cmd: Command line
+        timeout: Timeout in seconds (None waits forever)
+        cwd: Working directory
+        on_line: Called with (line, "stdout"|"stderr") for every output line
+        tail_lines: Lines retained per stream
+
+    Returns:
+        CommandResult
+
+    Raises:
+        FileNotFoundError: If the executable does not exist
+        subprocess.TimeoutExpired: If the timeout elapsed (process is killed)
+        asyncio.CancelledError: If the awaiting task was cancelled
+    """
+    start = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=None if cwd is None else str(cwd),
+        **_GROUP_KWARGS,
+    )
+    lock = threading.Lock()
+    out = _OutputStream("stdout", tail_lines, on_line, lock)
+    err = _OutputStream("stderr", tail_lines, on_line, lock)
+
+    async def communicate() -> None:
+        await asyncio.gather(_pump_async(process.stdout, out),
+                             _pump_async(process.stderr, err))
+        await process.wait()
+
+    try:
+        await asyncio.wait_for(communicate(), timeout)
+    except asyncio.TimeoutError:
+        await _kill(process)
+        raise subprocess.TimeoutExpired(cmd, timeout, out.text(), err.text())
+    except asyncio.CancelledError:
+        await _kill(process)
+        raise
+
+    return CommandResult(cmd, process.returncode, out.text(), err.text(),
+                         time.monotonic() - start, out.dropped + err.dropped)
+
+
+async def _kill(process: asyncio.subprocess.Process) -> None:
+    """Kill a child process and its descendants, and reap it"""
+    _kill_group(process)
+    await process.wait()
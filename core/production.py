@@ -0,0 +1,333 @@
+"""
+Production Line - Program unit after unit from one preloaded image
+Waits for a target to attach, programs and records it, then waits for it to
+be removed; the next unit's serial, log record and injected data are
+prepared while the current one is programmed
+"""
+
+import contextlib
+import io
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Callable, Union, Any
+
+from .image import FirmwareImage, ImageFormatError
+from .injection import Injector, InjectionPlan, InjectionTemplate, InjectionError
+
+
+@dataclass
+class UnitRecord:
+    """Outcome of programming one unit (one line of the production log)"""
+    unit: int
+    serial: str
+    digest: str                   # Image digest (FirmwareImage.digest())
+    success: bool = False
+    error: Optional[str] = None
+    attached_at: float = 0.0      # Wall-clock time the unit was detected
+    wait: float = 0.0             # Seconds spent waiting for the unit
+    program_time: float = 0.0
+    cycle_time: float = 0.0       # Since the previous unit finished
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile (0.0 for no values)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(math.ceil(percent / 100 * len(ordered))), 1)
+    return ordered[rank - 1]
+
+
+class LineStats:
+    """Running throughput and cycle-time statistics"""
+
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+        self.first_attach: Optional[float] = None
+        self.last_done: Optional[float] = None
+        self.cycle_times: List[float] = []
+        self.program_times: List[float] = []
+
+    @property
+    def units(self) -> int:
+        return self.passed + self.failed
+
+    @property
+    def units_per_hour(self) -> float:
+        if not self.units or self.last_done is None or self.last_done <= self.first_attach:
+            return 0.0
+        return self.units * 3600 / (self.last_done - self.first_attach)
+
+    def add(self, record: UnitRecord, attached: float, done: float) -> None:
+        """Account for a finished unit (monotonic attach/done times)"""
+        if self.first_attach is None:
+            self.first_attach = attached
+        record.cycle_time = done - (self.last_done if self.last_done is not None else attached)
+        self.last_done = done
+        self.cycle_times.append(record.cycle_time)
+        self.program_times.append(record.program_time)
+        if record.success:
+            self.passed += 1
+        else:
+            self.failed += 1
+
+    def summary(self) -> str:
+        """One-line live report"""
+        cycles = self.cycle_times
+        return (f"{self.units} units ({self.passed} pass, {self.failed} fail), "
+                f"{self.units_per_hour:.0f} units/h, cycle p50 {percentile(cycles, 50):.2f}s "
+                f"p90 {percentile(cycles, 90):.2f}s p99 {percentile(cycles, 99):.2f}s")
+
+
+class ProductionLine:
+    """Program every unit attached to one probe with the same image"""
+
+    def __init__(self, programmer, binary_path: Union[Path, str],
+                 address: Optional[int] = None,
+                 verify: Optional[bool] = None,
+                 log_path: Optional[Path] = None,
+                 serial_format: str = "{:06d}",
+                 first_serial: Optional[int] = None,
+                 poll_interval: float = 0.5,
+                 quiet: bool = True,
+                 template: Optional[Union[InjectionTemplate, Path, str]] = None,
+                 values: Optional[Dict[str, Any]] = None,
+                 base_programmed: bool = False):
+        """
+        Initialize production line
+
+        Args:
+            programmer: Configured STM32Programmer
+            binary_path: Firmware file programmed into every unit
+            address: Flash start address for .bin files (default: from config)
+            verify: Verify every unit (default: from config)
+            log_path: JSON-lines production log, appended to
+            serial_format: str.format pattern turning the unit number into a serial
+            first_serial: First unit number (default: continue the log, else 1)
+            poll_interval: Seconds between attach/detach checks
+            quiet: Capture the programmer's output; failures keep their error line
+            template: Per-unit record injected into every unit; its "serial"
+                and "unit" fields are filled in automatically
+            values: Fixed values for the other template fields
+            base_programmed: Units already hold the base image, only the
+                record's sectors are rewritten
+        """
+        self.programmer = programmer
+        self.binary_path = Path(binary_path)
+        self.address = address if address is not None else programmer.config.flash_start
+        self.verify = verify if verify is not None else programmer.config.verify
+        self.log_path = Path(log_path) if log_path else None
+        self.serial_format = serial_format
+        self.poll_interval = poll_interval
+        self.quiet = quiet
+        self.image: Optional[FirmwareImage] = None
+        self.digest: Optional[str] = None
+        self.template = template
+        self.values = dict(values or {})
+        self.base_programmed = base_programmed
+        self.injector: Optional[Injector] = None
+        self.stats = LineStats()
+        # Called with each UnitRecord (e.g. to drive a pass/fail indicator)
+        self.on_result: List[Callable[[UnitRecord], None]] = []
+        self._next_unit = first_serial
+        self._stop = threading.Event()
+
+    def prepare(self) -> bool:
+        """
+        Load, validate and hash the image once for the whole run
+
+        Returns:
+            True if the image can be programmed
+        """
+        if not self.binary_path.exists():
+            print(f"[ERROR] Binary file not found: {self.binary_path}")
+            return False
+        try:
+            self.image = self.programmer.load_image(self.binary_path, self.address)
+        except (OSError, ImageFormatError) as e:
+            print(f"[ERROR] Cannot load image {self.binary_path.name}: {e}")
+            return False
+        if not self.programmer.check_image_bounds(self.image):
+            return False
+        self.digest = self.image.digest()
+        if self._next_unit is None:
+            self._next_unit = self._last_logged_unit() + 1
+        if self.template is not None:
+            try:
+                self.injector = self.programmer.injector(self.image, self.template)
+                unknown = sorted(set(self.values) - set(self.injector.template.names))
+                if unknown:
+                    raise InjectionError(f"template has no field {', '.join(unknown)}")
+                # Fail before the first unit rather than on it
+                unit = self._next_unit
+                self.injector.plan(self._unit_values(unit, self.serial_format.format(unit)))
+            except InjectionError as e:
+                print(f"[ERROR] ✗ Cannot inject unit data: {e}")
+                return False
+        return True
+
+    def _last_logged_unit(self) -> int:
+        """Unit number of the last production log record (0 if none)"""
+        if self.log_path is None or not self.log_path.exists():
+            return 0
+        with open(self.log_path, "rb") as f:
+            f.seek(0, 2)
+            f.seek(max(f.tell() - 4096, 0))
+            lines = f.read().splitlines()
+        for line in reversed(lines):
+            try:
+                return int(json.loads(line)["unit"])
+            except (ValueError, KeyError, TypeError):
+                continue
+        return 0
+
+    def stop(self) -> None:
+        """Finish after the unit being programmed (callable from any thread)"""
+        self._stop.set()
+
+    def run(self, units: Optional[int] = None) -> LineStats:
+        """
+        Program units until the count is reached, stop() or Ctrl+C
+
+        Args:
+            units: Units to program (default: until stopped)
+
+        Returns:
+            LineStats of this run
+        """
+        if self.image is None and not self.prepare():
+            return self.stats
+
+        config = self.programmer.config
+        print(f"\n{'='*60}")
+        print(f"  Production line: {self.binary_path.name} -> {config.chip}")
+        print(f"  Image {self.image.size} bytes, sha256 {self.digest[:16]}")
+        if self.injector is not None:
+            what = "record sectors only" if self.base_programmed else "full image"
+            print(f"  Injecting {', '.join(self.injector.template.names)} "
+                  f"at {hex(self.injector.template.address)} ({what})")
+        print(f"{'='*60}\n")
+
+        if self.injector is not None:
+            # Units are swapped under the probe; cached digests mean nothing
+            self.programmer._track_flash_contents(self.image, False)
+        log = open(self.log_path, "a") if self.log_path else None
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="line") as pool:
+                pending = pool.submit(self._prepare_unit)
+                while units is None or self.stats.units < units:
+                    print("[INFO] Waiting for next unit...")
+                    waited = time.monotonic()
+                    if not self._wait_for(attached=True):
+                        break
+                    attached = time.monotonic()
+                    record, unit = pending.result()
+                    record.attached_at = time.time()
+                    record.wait = attached - waited
+
+                    # Prepare the next unit while this one is programmed
+                    last = units is not None and self.stats.units + 1 >= units
+                    pending = None if last else pool.submit(self._prepare_unit)
+                    self._program(record, unit)
+                    self.stats.add(record, attached, time.monotonic())
+                    if log is not None:
+                        pool.submit(self._write_record, log, record)
+                    self._report(record)
+                    for callback in self.on_result:
+                        callback(record)
+
+                    if not last and not self._wait_for(attached=False):
+                        break
+        except KeyboardInterrupt:
+            print("\n[INFO] Production line stopped")
+        finally:
+            if log is not None:
+                log.close()
+        self.print_summary()
+        return self.stats
+
+    def _prepare_unit(self) -> Tuple[UnitRecord, Optional[InjectionPlan]]:
+        """Allocate the next serial and its log record, render its data"""
+        unit = self._next_unit
+        self._next_unit += 1
+        record = UnitRecord(unit, self.serial_format.format(unit), self.digest)
+        if self.injector is None:
+            return record, None
+        try:
+            plan = self.injector.plan(self._unit_values(unit, record.serial),
+                                      full=not self.base_programmed)
+        except InjectionError as e:
+            record.error = str(e)
+            return record, None
+        return record, plan
+
+    def _unit_values(self, unit: int, serial: str) -> Dict[str, Any]:
+        """Template values for one unit"""
+        return {**self.values, "unit": unit, "serial": serial}
+
+    def _wait_for(self, attached: bool) -> bool:
+        """Poll until a target is (or is no longer) connected; False if stopped"""
+        while not self._stop.is_set():
+            if (self.programmer.get_device_info() is not None) == attached:
+                return True
+            self._stop.wait(self.poll_interval)
+        return False
+
+    def _program(self, record: UnitRecord,
+                 unit: Optional[InjectionPlan] = None) -> None:
+        """Program one unit with the preloaded image (and its injected data)"""
+        print(f"[INFO] Unit {record.unit} attached, serial {record.serial}")
+        if record.error is not None:
+            return
+        output = io.StringIO()
+        start = time.monotonic()
+        try:
+            with contextlib.redirect_stdout(output) if self.quiet else contextlib.nullcontext():
+                if unit is not None:
+                    record.success = self.programmer.inject(unit, self.verify,
+                                                            track=False)
+                else:
+                    record.success = self.programmer.flash_prepared(
+                        self.binary_path, self.image, self.address, self.verify)
+        except Exception as e:
+            record.error = str(e)
+        record.program_time = time.monotonic() - start
+        if not record.success and record.error is None:
+            lines = output.getvalue().splitlines()
+            record.error = next((line.strip() for line in reversed(lines)
+                                 if "[ERROR]" in line or "Error" in line), "flash failed")
+
+    @staticmethod
+    def _write_record(log, record: UnitRecord) -> None:
+        log.write(json.dumps(asdict(record)) + "\n")
+        log.flush()
+
+    def _report(self, record: UnitRecord) -> None:
+        """Print the unit result and the running statistics"""
+        if record.success:
+            print(f"[SUCCESS] ✓ Unit {record.unit} ({record.serial}) programmed "
+                  f"in {record.program_time:.2f}s")
+        else:
+            print(f"[ERROR] ✗ Unit {record.unit} ({record.serial}) failed: {record.error}")
+        print(f"[INFO] {self.stats.summary()}")
+
+    def print_summary(self) -> None:
+        """Print the totals of the run"""
+        stats = self.stats
+        print(f"\n{'='*60}")
+        print(f"  Production result: {stats.passed}/{stats.units} passed, "
+              f"{stats.units_per_hour:.0f} units/h")
+        if stats.units:
+            print(f"  Cycle time    p50 {percentile(stats.cycle_times, 50):.2f}s  "
+                  f"p90 {percentile(stats.cycle_times, 90):.2f}s  "
+                  f"p99 {percentile(stats.cycle_times, 99):.2f}s")
+            print(f"  Programming   p50 {percentile(stats.program_times, 50):.2f}s  "
+                  f"p90 {percentile(stats.program_times, 90):.2f}s  "
+                  f"p99 {percentile(stats.program_times, 99):.2f}s")
+        print("="*60 + "\n")
@@ -4,60 +4,230 @@ Handles flashing, erasing, and memory operations for STM32 devices
 """
 
 import os
+import re
 import sys
-import subprocess
+import copy
 import platform
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Optional, List, Dict, Union
-from dataclasses import dataclass
+from typing import Optional, List, Dict, Union, Tuple, Callable
+from dataclasses import dataclass, replace
+
+from .openocd_session import OpenOCDSession, OpenOCDError, default_pool
+from .diff_flash import DiffFlasher, sector_digest
+from .dump import MemoryDumper
+from .erase_plan import ErasePlan
+from .write_plan import WritePlan, plan_writes
+from .flash_layout import FlashLayout, layout_for_chip
+from .chip_db import lookup_chip
+from .image import FirmwareImage, ImageFormatError, ImageCache
+from .injection import Injector, InjectionPlan, InjectionTemplate, InjectionError
+from .manifest import Manifest, ManifestError
+from .swd_tuning import SwdTuner
+from .uart_tuning import BaudrateTuner
+from .process import CommandResult, run_command
+from .progress import (ProgressCallback, ProgressEvent, STM32CubeProgressParser,
+                       OpenOCDProgressParser)
+from .timing import Timeline, ToolPhaseTracker, NULL_TIMELINE
+from .tool_discovery import ToolDiscoveryCache, which, path_search_dirs
+from .uart_bootloader import UartBootloader, BootloaderError
+from .verify import (Verifier, supports_dma_crc, dma_crc_writes, RCC_AHBENR,
+                     RCC_AHBENR_RESET, RCC_AHBENR_DMA1EN, RCC_AHBENR_CRCEN,
+                     CRC_DR, DMA1_ISR, DMA_ISR_TCIF1, DMA_ISR_TEIF1)
+
+
+# Smallest saving for which an image is written as trimmed regions
+_MIN_TRIM_BYTES = 1024
+
+# Bytes in the unique device ID
+UID_SIZE = 12
+
+# "0x40023000 : 1A2B3C4D" lines printed by STM32_Programmer_CLI -r32
+_R32_RE = re.compile(r"^\s*0x([0-9A-Fa-f]{8})\s*:\s*([0-9A-Fa-f]{8})")
 
 
 @dataclass
 class STM32Config:
     """Configuration for STM32 programming operations"""
     port: str = "SWD"  # SWD, UART, USB
-    baudrate: int = 115200
+    # UART line rate; "auto" negotiates the fastest reliable rate per
+    # serial adapter and chip starting from the remembered one, "retune"
+    # from the fastest
+    baudrate: Union[int, str] = 115200
+    
+    # Serial device for port="UART" (/dev/ttyUSB0, COM3). Without
+    # STM32CubeProgrammer, or with native_uart, the built-in AN3155
+    # bootloader client programs the part; uart_pipeline sends each write
+    # block with its address in one burst instead of waiting for every ACK
+    serial_port: Optional[str] = None
+    native_uart: bool = False
+    uart_pipeline: bool = True
     chip: str = "STM32F103C8"
     flash_start: int = 0x08000000
     verify: bool = True
+    verify_mode: str = "tool"  # tool (programmer read-back), crc, readback
     auto_reset: bool = True
     
     # Optional programmer paths
     stm32cube_path: Optional[Path] = None
     openocd_path: Optional[Path] = None
+    
+    # Probe selection (ST-Link serial number) and persistent OpenOCD session
+    probe_serial: Optional[str] = None
+    openocd_session: bool = False
+    
+    # Skip writing 0xFF runs in sectors that are erased anyway (opt-in)
+    trim_erased: bool = False
+    
+    # Differential flashing compares against a read-back of the device
+    # instead of the sector digest cache
+    diff_readback: bool = False
+    
+    # SWD clock in kHz (None: tool default); "auto" tunes it per probe and
+    # chip starting from the remembered value, "retune" from the fastest
+    swd_frequency: Union[int, str, None] = None
 
 
 class STM32Programmer:
     """Unified STM32 Programming Tool"""
     
-    def __init__(self, config: STM32Config):
+    def __init__(self, config: STM32Config,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 discovery: Optional[ToolDiscoveryCache] = None,
+                 timeline: Optional[Timeline] = None,
+                 image_cache: Optional[ImageCache] = None):
         self.config = config
+        self.progress_callback = progress_callback
+        self.discovery = discovery or ToolDiscoveryCache()
+        self.timeline = timeline or NULL_TIMELINE
+        self.image_cache = image_cache
         self.stm32_cli_path = None
         self.openocd_path = None
+        self.tool_version = None
         self.use_openocd = False
+        self.use_uart = False
+        self.tool_log: Optional[List[CommandResult]] = None  # Collects tool runs when set
+        self.cancel_event: Optional[threading.Event] = None  # Stops tool runs when set
+        self.deadline: Optional[float] = None  # time.monotonic() the operation must end by
         
         # Try to find programming tools
-        self._find_programming_tools()
+        with self.timeline.span("discovery"):
+            self._find_programming_tools()
+        self._report_tools()
+    
+    @staticmethod
+    def tool_key(config: STM32Config) -> tuple:
+        """
+        Configuration fields that tool discovery depends on
+        
+        Programmers whose configurations have the same key select the same
+        tools (see for_config()).
+        
+        Args:
+            config: Programming configuration
+        
+        Returns:
+            Hashable key
+        """
+        uart = config.port.upper() == "UART"
+        return (uart, uart and (config.native_uart or config.baudrate in ("auto", "retune")),
+                config.stm32cube_path, config.openocd_path)
+    
+    def for_config(self, config: STM32Config,
+                   progress_callback: Optional[ProgressCallback] = None,
+                   timeline: Optional[Timeline] = None,
+                   image_cache: Optional[ImageCache] = None) -> "STM32Programmer":
+        """
+        Copy of this programmer with another configuration
+        
+        Tool discovery results are reused instead of searching again, so
+        config must have the same tool_key() as this programmer's.
+        
+        Args:
+            config: Programming configuration
+            progress_callback: Progress callback of the copy
+            timeline: Timeline of the copy (default: disabled)
+            image_cache: Image cache of the copy
+        
+        Returns:
+            New STM32Programmer instance
+        """
+        if self.tool_key(config) != self.tool_key(self.config):
+            raise ValueError("config selects tools differently than this programmer")
+        clone = copy.copy(self)
+        clone.config = config
+        clone.progress_callback = progress_callback
+        clone.timeline = timeline or NULL_TIMELINE
+        clone.image_cache = image_cache
+        clone.tool_log = None
+        clone.cancel_event = None
+        clone.deadline = None
+        clone.__dict__.pop("_layout_warned", None)
+        clone.__dict__.pop("_unknown_chip_warned", None)
+        clone._report_tools()
+        return clone
     
     def _find_programming_tools(self) -> None:
         """Locate STM32 programming tools"""
+        uart = self.config.port.upper() == "UART"
+        # Only the built-in client can negotiate the baudrate
+        if uart and (self.config.native_uart or self._uart_auto()):
+            self.use_uart = True
+            return
+        
         # Try STM32CubeProgrammer first
         self.stm32_cli_path = self._find_stm32_programmer()
         
+        # OpenOCD cannot talk to the UART bootloader
+        if not self.stm32_cli_path and uart:
+            self.use_uart = True
         # If not found, try OpenOCD
-        if not self.stm32_cli_path:
+        elif not self.stm32_cli_path:
             self.openocd_path = self._find_openocd()
             if self.openocd_path:
                 self.use_openocd = True
-                print(f"[INFO] Using OpenOCD: {self.openocd_path}")
-        else:
-            print(f"[INFO] Using STM32CubeProgrammer: {self.stm32_cli_path}")
+    
+    def _report_tools(self) -> None:
+        """Print the programming tool in use"""
+        if self.use_uart:
+            # Program through the built-in UART bootloader client
+            rate = "negotiated baudrate" if self._uart_auto() else f"{self.config.baudrate} baud"
+            print(f"[INFO] Using UART bootloader: {self.config.serial_port or '(no serial port)'} "
+                  f"at {rate}")
+        elif self.use_openocd:
+            print(f"[INFO] Using OpenOCD: {self.openocd_path}{self._version_suffix()}")
+        elif self.stm32_cli_path:
+            print(f"[INFO] Using STM32CubeProgrammer: {self.stm32_cli_path}{self._version_suffix()}")
+    
+    def _version_suffix(self) -> str:
+        return f" (v{self.tool_version})" if self.tool_version else ""
+    
+    def _discover(self, name: str, search, watch=(),
+                  context: Optional[str] = None) -> Optional[Path]:
+        """Look a tool up through the discovery cache"""
+        entry = self.discovery.find(name, search, watch, context=context)
+        if not entry["path"]:
+            return None
+        self.tool_version = entry["version"]
+        return Path(entry["path"])
     
     def _find_stm32_programmer(self) -> Optional[Path]:
         """Locate STM32_Programmer_CLI executable"""
         if self.config.stm32cube_path and self.config.stm32cube_path.exists():
-            return self.config.stm32cube_path
+            path = Path(self.config.stm32cube_path)
+            return self._discover(f"STM32_Programmer_CLI:{path}", lambda: path)
         
+        candidates = self._stm32_programmer_candidates()
+        watch = [Path(str(p).split("**")[0]) if "**" in str(p) else p
+                 for p in candidates]
+        return self._discover("STM32_Programmer_CLI",
+                              lambda: self._search_stm32_programmer(candidates),
+                              watch)
+    
+    def _stm32_programmer_candidates(self) -> List[Path]:
+        """Install locations searched for STM32_Programmer_CLI"""
         possible_paths = []
         
         if platform.system() == "Windows":
@@ -72,6 +242,10 @@ class STM32Programmer:
                 Path.home() / "STMicroelectronics/STM32Cube/STM32CubeProgrammer/bin/STM32_Programmer_CLI",
             ]
         
+        return possible_paths
+    
+    def _search_stm32_programmer(self, possible_paths: List[Path]) -> Optional[Path]:
+        """Search install locations (slow: may walk the CubeIDE plugins tree)"""
         for path in possible_paths:
             if path.exists():
                 return path
@@ -89,22 +263,18 @@ class STM32Programmer:
     def _find_openocd(self) -> Optional[Path]:
         """Locate OpenOCD executable"""
         if self.config.openocd_path and self.config.openocd_path.exists():
-            return self.config.openocd_path
+            path = Path(self.config.openocd_path)
+            return self._discover(f"openocd:{path}", lambda: path)
         
         # Try system PATH
-        try:
-            result = subprocess.run(["openocd", "--version"], 
-                                  capture_output=True, text=True)
-            if result.returncode == 0:
-                return Path("openocd")
-        except FileNotFoundError:
-            pass
-        
-        return None
+        return self._discover("openocd", lambda: which("openocd"),
+                              path_search_dirs(), os.environ.get("PATH", ""))
     
     def flash(self, binary_path: Union[Path, str], 
              address: Optional[int] = None,
-             verify: Optional[bool] = None) -> bool:
+             verify: Optional[bool] = None,
+             diff: bool = False,
+             erase: bool = False) -> bool:
         """
         Flash binary to STM32 device
         
@@ -112,6 +282,9 @@ class STM32Programmer:
             binary_path: Path to binary file (.bin, .hex, .elf)
             address: Flash start address (default: from config)
             verify: Verify after flashing (default: from config)
+            diff: Only erase and write sectors that changed
+            erase: First erase every sector the image spans, including gaps
+                between segments (instead of a separate full erase)
         
         Returns:
             True if successful, False otherwise
@@ -125,25 +298,510 @@ class STM32Programmer:
         address = address if address is not None else self.config.flash_start
         verify = verify if verify is not None else self.config.verify
         
+        with self.timeline.span("load image") as span:
+            try:
+                image = self.load_image(binary_path, address)
+            except (OSError, ImageFormatError) as e:
+                print(f"[ERROR] Cannot load image {binary_path.name}: {e}")
+                return False
+            span.bytes = image.size
+            if not self.check_image_bounds(image):
+                return False
+        
         print(f"\n{'='*60}")
         print(f"  Flashing {binary_path.name} to {self.config.chip}")
         print(f"{'='*60}\n")
+        print(f"[INFO] Image: {image.size} bytes in {len(image.segments)} "
+              f"segment(s), {hex(image.start or address)}-{hex(image.end or address)}")
         
-        if self.use_openocd:
-            return self._flash_with_openocd(binary_path, address, verify)
+        if erase:
+            # Unknown parts: the plain write erases what it writes
+            plan = self.erase_plan(image=image, span=True)
+            if plan is not None and not self.erase(plan=plan):
+                return False
+        
+        return self.flash_prepared(binary_path, image, address, verify, diff)
+    
+    def flash_prepared(self, binary_path: Path, image: FirmwareImage,
+                       address: int, verify: bool, diff: bool = False) -> bool:
+        """
+        Flash an image that was already loaded and bounds-checked
+        
+        Used when one image is shared by several programmers (gang mode),
+        so parsing and validation happen once.
+        
+        Args:
+            binary_path: Path the image was loaded from
+            image: Parsed image
+            address: Flash start address for .bin files
+            verify: Verify after flashing
+            diff: Only erase and write sectors that changed
+        
+        Returns:
+            True if successful
+        """
+        if self._swd_auto():
+            return SwdTuner(self, retune=self.config.swd_frequency == "retune").run(
+                lambda programmer: programmer.flash_prepared(
+                    binary_path, image, address, verify, diff))
+        
+        host_verify = self._host_verify(verify)
+        tool_verify = verify and not host_verify
+        attrs = {"probe": self.config.probe_serial} if self.config.probe_serial else {}
+        
+        if diff and self.flash_layout() is None:
+            print("[WARNING] Differential flashing needs the sector layout, "
+                  "writing the whole image")
+            diff = False
+        
+        with self.timeline.span("flash", image.size, **attrs) as span:
+            plan = None if diff else self.write_plan(image)
+            if diff:
+                success = DiffFlasher(self).flash(image, address, tool_verify,
+                                                  self.config.diff_readback).success
+            elif plan is not None:
+                print(f"[INFO] Write plan: {plan.summary()}")
+                if self.timeline.enabled:
+                    span.attrs["bytes_avoided"] = plan.bytes_avoided
+                success = self.write_regions(plan.regions, tool_verify,
+                                             erase=plan.erase_plan(),
+                                             verify_file=(binary_path, address))
+                if success:
+                    print(f"\n[SUCCESS] ✓ Flashing completed successfully!")
+                self._track_flash_contents(image, success)
+            else:
+                if self.use_uart:
+                    success = self._flash_with_uart(image, tool_verify)
+                elif self.use_openocd:
+                    success = self._flash_with_openocd(binary_path, address,
+                                                       tool_verify, image.size)
+                else:
+                    success = self._flash_with_stm32cube(binary_path, address,
+                                                         tool_verify, image.size)
+                self._track_flash_contents(image, success)
+            
+            if success and host_verify:
+                success = self.verify_image(image)
+                if not success:
+                    self._track_flash_contents(image, False)
+        return success
+    
+    def _host_verify(self, verify: bool) -> bool:
+        """Whether verification runs on the host after programming"""
+        # The UART backend reads back before it leaves the bootloader
+        return verify and self.config.verify_mode != "tool" and not self.use_uart
+    
+    def write_plan(self, image: FirmwareImage) -> Optional[WritePlan]:
+        """
+        Trimmed writes for an image, if they save enough to be worth it
+        
+        Args:
+            image: Parsed firmware image
+        
+        Returns:
+            WritePlan, or None to write the image file as-is
+        """
+        if not self.config.trim_erased:
+            return None
+        layout = self.flash_layout()
+        if layout is None:
+            return None
+        plan = plan_writes(image, layout, lookup_chip(self.config.chip).write_size)
+        return plan if plan.bytes_avoided >= _MIN_TRIM_BYTES else None
+    
+    def verify_image(self, image: FirmwareImage,
+                     method: Optional[str] = None) -> bool:
+        """
+        Verify device flash against an image without the tool's read-back
+        
+        Args:
+            image: Image expected in flash
+            method: "crc", "readback" or "auto" (default: from verify_mode,
+                    where "crc" falls back to read-back when unsupported)
+        
+        Returns:
+            True if the device matches
+        """
+        if method is None:
+            method = "auto" if self.config.verify_mode == "crc" else self.config.verify_mode
+        print(f"[INFO] Verifying ({method})...")
+        with self.timeline.span("verify", image.size, method=method):
+            report = Verifier(self).verify(image, method)
+        if report.success:
+            print(f"[SUCCESS] ✓ Verified: {report.summary()}")
         else:
-            return self._flash_with_stm32cube(binary_path, address, verify)
+            print(f"[ERROR] ✗ Verification failed: {report.summary()}")
+        return report.success
+    
+    def for_probe(self, probe_serial: str) -> "STM32Programmer":
+        """
+        Copy of this programmer bound to another probe
+        
+        Tool discovery results are reused instead of searching again.
+        
+        Args:
+            probe_serial: Probe serial number
+        
+        Returns:
+            New STM32Programmer instance
+        """
+        clone = copy.copy(self)
+        clone.config = replace(self.config, probe_serial=probe_serial)
+        return clone
+    
+    def with_cancel(self, cancel: threading.Event,
+                    deadline: Optional[float] = None) -> "STM32Programmer":
+        """
+        Copy of this programmer whose operations can be stopped from outside
+        
+        Tool processes are killed when the event is set and time out at
+        the deadline; UART transfers and OpenOCD session commands stop
+        between blocks and commands.
+        
+        Args:
+            cancel: Event that cancels the running operation
+            deadline: time.monotonic() value the operation must end by
+        
+        Returns:
+            New STM32Programmer instance
+        """
+        clone = copy.copy(self)
+        clone.cancel_event = cancel
+        clone.deadline = deadline
+        return clone
+    
+    def _stop_reason(self) -> Optional[str]:
+        """Why the operation must stop now (see with_cancel()), if it must"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return "Cancelled"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "Timed out"
+        return None
+    
+    def _time_left(self, timeout: Optional[float] = None) -> Optional[float]:
+        """timeout capped to the time left before the deadline"""
+        if self.deadline is None:
+            return timeout
+        left = max(self.deadline - time.monotonic(), 0.0)
+        return left if timeout is None else min(timeout, left)
+    
+    def with_swd_frequency(self, freq_khz: int) -> "STM32Programmer":
+        """
+        Copy of this programmer running the probe at a fixed SWD clock
+        
+        Args:
+            freq_khz: SWD clock in kHz
+        
+        Returns:
+            New STM32Programmer instance
+        """
+        clone = copy.copy(self)
+        clone.config = replace(self.config, swd_frequency=freq_khz)
+        return clone
+    
+    def _swd_auto(self) -> bool:
+        """Whether the SWD clock is tuned automatically"""
+        return self.config.swd_frequency in ("auto", "retune")
+    
+    def _blocking_only(self) -> bool:
+        """
+        Whether operations need the blocking flows rather than one tool command
+        
+        The UART bootloader and OpenOCD sessions are driven from Python, and
+        SWD clock tuning reruns an operation. AsyncSTM32Programmer hands
+        these to a worker thread.
+        """
+        return (self.use_uart or self._swd_auto() or
+                (self.use_openocd and self.config.openocd_session))
+    
+    def _uart_auto(self) -> bool:
+        """Whether the UART baudrate is negotiated automatically"""
+        return self.config.baudrate in ("auto", "retune")
+    
+    def _swd_khz(self) -> Optional[int]:
+        """
+        SWD clock in kHz, or None for the tool default
+        
+        Under auto and retune, operations that are not tuned themselves
+        run at the clock remembered for the probe and chip.
+        """
+        if self.config.port not in ("SWD", "JTAG"):
+            return None
+        freq = self.config.swd_frequency
+        if self._swd_auto():
+            return SwdTuner(self).remembered
+        return freq if isinstance(freq, int) else None
+    
+    def load_image(self, binary_path: Union[Path, str],
+                   address: Optional[int] = None) -> FirmwareImage:
+        """
+        Parse a firmware file into a FirmwareImage
+        
+        Args:
+            binary_path: Path to binary file (.bin, .hex, .elf)
+            address: Load address for .bin files (default: from config)
+        
+        Returns:
+            FirmwareImage instance
+        """
+        address = address if address is not None else self.config.flash_start
+        if self.image_cache is not None:
+            return self.image_cache.load(binary_path, address)
+        return FirmwareImage.load(binary_path, address)
+    
+    def flash_layout(self) -> Optional[FlashLayout]:
+        """
+        Flash sector layout of the configured chip
+        
+        Parts missing from the chip database are programmed with the
+        tool's plain write, which erases what it writes; a warning says so
+        once per programmer.
+        
+        Returns:
+            FlashLayout, or None if the chip is not in the database
+        """
+        layout = layout_for_chip(self.config.chip)
+        if layout is None and not getattr(self, "_layout_warned", False):
+            self._layout_warned = True
+            print(f"[WARNING] {self.config.chip} is not in the chip database: "
+                  f"no bounds check, trimmed writes or sector erases")
+        return layout
+    
+    def check_image_bounds(self, image: FirmwareImage) -> bool:
+        """
+        Check that every image segment lies inside the chip's flash
+        
+        Args:
+            image: Parsed firmware image
+        
+        Returns:
+            True if the image fits (or the chip's flash size is unknown)
+        """
+        layout = self.flash_layout()
+        if layout is None:
+            return True
+        outside = image.out_of_range(layout.base, layout.size)
+        for start, end in outside:
+            print(f"[ERROR] ✗ Image range {hex(start)}-{hex(end)} is outside "
+                  f"{self.config.chip} flash ({hex(layout.base)}-{hex(layout.end)})")
+        return not outside
+    
+    def _track_flash_contents(self, image: FirmwareImage,
+                              success: bool) -> None:
+        """Keep the sector digest cache in step with a full flash"""
+        try:
+            flasher = DiffFlasher(self)
+            if success:
+                flasher.record(image)
+            else:
+                flasher.cache.invalidate(flasher.device_key)
+        except Exception as e:
+            print(f"[WARNING] Could not update sector digest cache: {e}")
+    
+    def injector(self, image: FirmwareImage,
+                 template: Union[InjectionTemplate, Path, str]) -> Injector:
+        """
+        Injector for per-unit records on this chip
+        
+        Args:
+            image: Loaded, bounds-checked base image
+            template: Record template or template file
+        
+        Returns:
+            Injector using the chip's sector layout and write size
+        
+        Raises:
+            InjectionError: If the template is invalid or outside flash
+        """
+        layout = self.flash_layout()
+        if layout is None:
+            raise InjectionError(f"the sector layout of {self.config.chip} is unknown")
+        if not isinstance(template, InjectionTemplate):
+            template = InjectionTemplate.load(template)
+        return Injector(image, template, layout, lookup_chip(self.config.chip).write_size)
+    
+    def inject(self, unit: InjectionPlan, verify: Optional[bool] = None,
+               track: bool = True) -> bool:
+        """
+        Program one unit's patched record from memory
+        
+        Only the writes in unit.plan are sent: the record's sectors on a
+        device that already holds the base image, or the whole patched
+        image. No image file is generated for the unit.
+        
+        Args:
+            unit: Plan from Injector.plan()
+            verify: Verify after writing (default: from config)
+            track: Keep the sector digest cache in step (production lines
+                turn this off: the probe sees a different device every time)
+        
+        Returns:
+            True if successful
+        """
+        verify = verify if verify is not None else self.config.verify
+        if self._swd_auto():
+            return SwdTuner(self, retune=self.config.swd_frequency == "retune").run(
+                lambda programmer: programmer.inject(unit, verify, track))
+        
+        host_verify = self._host_verify(verify)
+        plan = unit.plan
+        
+        print(f"[INFO] Injecting: {unit.summary()}")
+        with self.timeline.span("inject", plan.bytes_written):
+            success = self.write_regions(plan.regions, verify and not host_verify,
+                                         erase=plan.erase_plan())
+            if success and host_verify:
+                success = self.verify_image(unit.target)
+        if success:
+            print(f"[SUCCESS] ✓ Record programmed")
+        if track:
+            self._track_flash_contents(unit.target, success)
+        return success
+    
+    def flash_injected(self, binary_path: Union[Path, str],
+                       template: Union[InjectionTemplate, Path, str],
+                       values: Dict[str, object],
+                       address: Optional[int] = None,
+                       verify: Optional[bool] = None,
+                       base_programmed: bool = False) -> bool:
+        """
+        Flash an image with a per-unit record patched in
+        
+        Args:
+            binary_path: Base image file (.bin, .hex, .elf)
+            template: Record template or template file
+            values: Field name -> value
+            address: Flash start address (default: from config)
+            verify: Verify after writing (default: from config)
+            base_programmed: The device already holds the base image; only
+                the record's sectors are rewritten
+        
+        Returns:
+            True if successful
+        """
+        binary_path = Path(binary_path)
+        address = address if address is not None else self.config.flash_start
+        try:
+            image = self.load_image(binary_path, address)
+        except (OSError, ImageFormatError) as e:
+            print(f"[ERROR] Cannot load image {binary_path.name}: {e}")
+            return False
+        if not self.check_image_bounds(image):
+            return False
+        try:
+            injector = self.injector(image, template)
+            unknown = sorted(set(values) - set(injector.template.names))
+            if unknown:
+                raise InjectionError(f"template has no field {', '.join(unknown)}")
+            unit = injector.plan(values, full=not base_programmed)
+        except InjectionError as e:
+            print(f"[ERROR] ✗ Cannot inject unit data: {e}")
+            return False
+        
+        print(f"\n{'='*60}")
+        print(f"  Flashing {binary_path.name} + record to {self.config.chip}")
+        print(f"{'='*60}\n")
+        return self.inject(unit, verify)
     
     def _flash_with_stm32cube(self, binary_path: Path, 
-                             address: int, verify: bool) -> bool:
+                             address: int, verify: bool,
+                             total_bytes: Optional[int] = None) -> bool:
         """Flash using STM32CubeProgrammer"""
         if not self.stm32_cli_path:
             print("[ERROR] STM32CubeProgrammer not found")
             return False
         
+        cmd = self._stm32cube_flash_cmd(binary_path, address, verify)
+        
+        print(f"[INFO] Executing: {' '.join(cmd)}")
+        
+        try:
+            result = self._run(cmd, total_bytes=total_bytes)
+            
+            if result.returncode == 0:
+                print(f"\n[SUCCESS] ✓ Flashing completed successfully!")
+                return True
+            else:
+                print(f"\n[ERROR] ✗ Flashing failed!")
+                print(f"Error: {result.stderr}")
+                return False
+        except Exception as e:
+            print(f"[ERROR] Exception during flashing: {e}")
+            return False
+    
+    def _run(self, cmd: List[str], timeout: Optional[float] = None,
+             total_bytes: Optional[int] = None,
+             on_line=None) -> CommandResult:
+        """
+        Run a programming tool command to completion
+        
+        Output is streamed; when a progress callback is set, tool progress
+        lines are turned into ProgressEvents as they arrive.
+        
+        Args:
+            cmd: Command line
+            timeout: Timeout in seconds (None waits forever)
+            total_bytes: Bytes the command transfers, for rate reporting
+            on_line: Extra (line, stream) callback for parsing tool output
+        
+        Returns:
+            CommandResult holding the tail of the tool output
+        """
+        callbacks = [on_line] if on_line is not None else []
+        if self.progress_callback is not None:
+            parser = self._progress_parser(cmd, total_bytes)
+            callbacks.append(lambda line, stream: parser.feed(line))
+        
+        def dispatch(line: str, stream: str) -> None:
+            for callback in callbacks:
+                callback(line, stream)
+        
+        with self.timeline.span(Path(cmd[0]).stem, total_bytes) as span:
+            tracker = None
+            if self.timeline.enabled:
+                # Split the invocation into the phases the tool reports
+                tracker = ToolPhaseTracker(self.timeline, span)
+                phases = self._progress_parser(cmd, total_bytes, tracker)
+                callbacks.append(lambda line, stream: phases.feed(line))
+            try:
+                result = run_command(cmd, timeout=self._time_left(timeout),
+                                     on_line=dispatch if callbacks else None,
+                                     cancel=self.cancel_event)
+            finally:
+                if tracker is not None:
+                    tracker.close()
+        if result.cancelled:
+            print(f"[INFO] Cancelled {Path(cmd[0]).name}")
+        if self.tool_log is not None:
+            self.tool_log.append(result)
+        return result
+    
+    def _progress_parser(self, cmd: List[str], total_bytes: Optional[int] = None,
+                         callback: Optional[ProgressCallback] = None):
+        """Progress parser matching the tool that runs cmd"""
+        callback = callback or self.progress_callback
+        if self.openocd_path and cmd[0] == str(self.openocd_path):
+            return OpenOCDProgressParser(callback, total_bytes)
+        return STM32CubeProgressParser(callback, total_bytes)
+    
+    def _stm32cube_connect_args(self) -> List[str]:
+        """Build the STM32_Programmer_CLI connect arguments"""
+        if self.config.port.upper() == "UART" and self.config.serial_port:
+            return ["-c", f"port={self.config.serial_port}", f"br={self.config.baudrate}"]
+        args = ["-c", f"port={self.config.port}"]
+        if self.config.probe_serial:
+            args.append(f"sn={self.config.probe_serial}")
+        freq = self._swd_khz()
+        if freq:
+            args.append(f"freq={freq}")
+        return args
+    
+    def _stm32cube_flash_cmd(self, binary_path: Path, address: int,
+                             verify: bool) -> List[str]:
+        """Build the STM32_Programmer_CLI flash command"""
         cmd = [
             str(self.stm32_cli_path),
-            "-c", f"port={self.config.port}",
+            *self._stm32cube_connect_args(),
             "-w", str(binary_path), f"{hex(address)}",
         ]
         
@@ -152,11 +810,92 @@ class STM32Programmer:
         
         if self.config.auto_reset:
             cmd.append("-rst")
+        return cmd
+    
+    def _stm32cube_erase_cmd(self, full: bool,
+                             plan: Optional[ErasePlan] = None) -> List[str]:
+        """Build the STM32_Programmer_CLI erase command"""
+        cmd = [str(self.stm32_cli_path), *self._stm32cube_connect_args()]
+        if plan is not None:
+            cmd.extend(plan.stm32cube_args())
+        else:
+            cmd.extend(["-e", "all" if full else "0"])
+        return cmd
+    
+    def _stm32cube_read_cmd(self, address: int, size: int,
+                            output_file: Path) -> List[str]:
+        """Build the STM32_Programmer_CLI memory read command"""
+        return [
+            str(self.stm32_cli_path),
+            *self._stm32cube_connect_args(),
+            "-r", str(output_file), f"{hex(address)}", f"{hex(size)}",
+        ]
+    
+    def _stm32cube_info_cmd(self) -> List[str]:
+        """Build the STM32_Programmer_CLI connect/query command"""
+        return [
+            str(self.stm32_cli_path),
+            *self._stm32cube_connect_args(),
+            "-q",
+        ]
+    
+    def _openocd_base_cmd(self) -> List[str]:
+        """Build the OpenOCD command prefix selecting probe and target"""
+        cmd = [
+            str(self.openocd_path),
+            "-f", f"interface/{self._openocd_interface()}",
+        ]
+        if self.config.probe_serial:
+            cmd.extend(["-c", f"adapter serial {self.config.probe_serial}"])
+        cmd.extend(["-f", f"target/{self._openocd_target()}"])
+        freq = self._swd_khz()
+        if freq:
+            # After the target config, which sets its own default speed
+            cmd.extend(["-c", f"adapter speed {freq}"])
+        return cmd
+    
+    def _openocd_flash_cmd(self, binary_path: Path, address: int,
+                           verify: bool) -> List[str]:
+        """Build the one-shot OpenOCD flash command"""
+        # .hex/.elf carry their own addresses; OpenOCD treats the argument
+        # as an offset for those formats
+        offset = f" {hex(address)}" if binary_path.suffix.lower() == ".bin" else ""
+        
+        cmd = self._openocd_base_cmd()
+        cmd.extend([
+            "-c", "init",
+            "-c", "halt",
+            "-c", f"program {binary_path}{offset}{' verify' if verify else ''}",
+        ])
+        if self.config.auto_reset:
+            cmd.extend(["-c", "reset"])
+        cmd.extend(["-c", "exit"])
+        return cmd
+    
+    def _flash_with_openocd(self, binary_path: Path, 
+                           address: int, verify: bool,
+                           total_bytes: Optional[int] = None) -> bool:
+        """Flash using OpenOCD"""
+        if not self.openocd_path:
+            print("[ERROR] OpenOCD not found")
+            return False
+        
+        if self.config.openocd_session:
+            session = self._openocd_session()
+            if session is None:
+                return False
+            if not session.flash(binary_path, address, verify,
+                                 reset=self.config.auto_reset):
+                return False
+            print(f"\n[SUCCESS] ✓ Flashing completed successfully!")
+            return True
+        
+        cmd = self._openocd_flash_cmd(binary_path, address, verify)
         
         print(f"[INFO] Executing: {' '.join(cmd)}")
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = self._run(cmd, total_bytes=total_bytes)
             
             if result.returncode == 0:
                 print(f"\n[SUCCESS] ✓ Flashing completed successfully!")
@@ -169,88 +908,496 @@ class STM32Programmer:
             print(f"[ERROR] Exception during flashing: {e}")
             return False
     
-    def _flash_with_openocd(self, binary_path: Path, 
-                           address: int, verify: bool) -> bool:
-        """Flash using OpenOCD"""
+    def write_regions(self, regions: List[Tuple[int, bytes]],
+                      verify: Optional[bool] = None,
+                      erase: Optional[ErasePlan] = None,
+                      verify_file: Optional[Tuple[Path, int]] = None) -> bool:
+        """
+        Write several address/data regions in one programmer invocation
+        
+        Touched sectors are erased by the programmer before writing.
+        
+        Args:
+            regions: List of (address, data) to program
+            verify: Verify after writing (default: from config)
+            erase: Extra sectors to erase first, in the same invocation
+            verify_file: (image file, load address) verified instead of
+                each region, covering bytes that were not written
+        
+        Returns:
+            True if successful
+        """
+        verify = verify if verify is not None else self.config.verify
+        if not regions and not (erase and erase.sectors):
+            return True
+        if self.use_uart:
+            return self._write_regions_with_uart(regions, verify, erase, verify_file)
+        
+        with tempfile.TemporaryDirectory(prefix="stm32prog_") as tmp:
+            files = []
+            for address, data in regions:
+                region_file = Path(tmp) / f"region_{address:08x}.bin"
+                region_file.write_bytes(data)
+                files.append((region_file, address))
+            
+            if self.use_openocd:
+                return self._write_files_with_openocd(files, verify, erase, verify_file)
+            return self._write_files_with_stm32cube(files, verify, erase, verify_file)
+    
+    def _write_files_with_stm32cube(self, files: List[Tuple[Path, int]],
+                                    verify: bool,
+                                    erase: Optional[ErasePlan] = None,
+                                    verify_file: Optional[Tuple[Path, int]] = None) -> bool:
+        """Write raw binary files at their addresses with one CLI call"""
+        if not self.stm32_cli_path:
+            print("[ERROR] STM32CubeProgrammer not found")
+            return False
+        
+        cmd = [str(self.stm32_cli_path), *self._stm32cube_connect_args()]
+        if erase is not None:
+            cmd.extend(erase.stm32cube_args())
+        for region_file, address in files:
+            cmd.extend(["-w", str(region_file), hex(address)])
+            if verify and verify_file is None:
+                cmd.extend(["-v", str(region_file), hex(address)])
+        if verify and verify_file is not None:
+            cmd.extend(["-v", str(verify_file[0]), hex(verify_file[1])])
+        if self.config.auto_reset:
+            cmd.append("-rst")
+        
+        total_bytes = sum(region_file.stat().st_size for region_file, _ in files)
+        try:
+            result = self._run(cmd, total_bytes=total_bytes)
+            if result.returncode == 0:
+                return True
+            print(f"[ERROR] ✗ Write failed: {result.stderr}")
+            return False
+        except Exception as e:
+            print(f"[ERROR] Exception during write: {e}")
+            return False
+    
+    def _write_files_with_openocd(self, files: List[Tuple[Path, int]],
+                                  verify: bool,
+                                  erase: Optional[ErasePlan] = None,
+                                  verify_file: Optional[Tuple[Path, int]] = None) -> bool:
+        """Write raw binary files at their addresses with OpenOCD"""
         if not self.openocd_path:
             print("[ERROR] OpenOCD not found")
             return False
         
-        # Determine target config based on chip
-        chip_lower = self.config.chip.lower()
-        if "f103" in chip_lower:
-            target = "stm32f1x.cfg"
-        elif "f4" in chip_lower:
-            target = "stm32f4x.cfg"
-        elif "g4" in chip_lower:
-            target = "stm32g4x.cfg"
-        else:
-            target = "stm32f1x.cfg"  # default
+        commands = ["reset halt"]
+        if erase is not None and erase.sectors:
+            commands.extend(self._openocd_erase_commands(False, erase))
+        for region_file, address in files:
+            image = f"{{{region_file.as_posix()}}} {hex(address)}"
+            commands.append(f"flash write_image erase {image}")
+            if verify and verify_file is None:
+                commands.append(f"verify_image {image}")
+        if verify and verify_file is not None:
+            path, address = verify_file
+            # .hex/.elf carry their own addresses
+            offset = f" {hex(address)}" if path.suffix.lower() == ".bin" else ""
+            commands.append(f"verify_image {{{path.as_posix()}}}{offset}")
+        if self.config.auto_reset:
+            commands.append("reset run")
         
-        # Determine interface
-        interface = "stlink.cfg" if self.config.port == "SWD" else "jlink.cfg"
+        if self.config.openocd_session:
+            session = self._openocd_session()
+            if session is None:
+                return False
+            try:
+                self._session_commands(session, commands)
+                return True
+            except OpenOCDError as e:
+                print(f"[ERROR] ✗ Write failed: {e}")
+                return False
         
-        cmd = [
-            str(self.openocd_path),
-            "-f", f"interface/{interface}",
-            "-f", f"target/{target}",
-            "-c", "init",
-            "-c", "halt",
-            "-c", f"program {binary_path} {hex(address)} {'verify' if verify else ''}",
-            "-c", "reset" if self.config.auto_reset else "",
-            "-c", "exit"
-        ]
+        cmd = self._openocd_base_cmd()
+        cmd.extend(["-c", "init"])
+        for command in commands:
+            cmd.extend(["-c", command])
+        cmd.extend(["-c", "exit"])
+        
+        total_bytes = sum(region_file.stat().st_size for region_file, _ in files)
+        try:
+            result = self._run(cmd, total_bytes=total_bytes)
+            if result.returncode == 0:
+                return True
+            print(f"[ERROR] ✗ Write failed: {result.stderr}")
+            return False
+        except Exception as e:
+            print(f"[ERROR] Exception during write: {e}")
+            return False
+    
+    def run_manifest(self, manifest: Union[Manifest, Path, str],
+                     verify: Optional[bool] = None) -> bool:
+        """
+        Run the steps of a programming manifest in one tool invocation
         
-        # Remove empty commands
-        cmd = [c for c in cmd if c]
+        Every image is loaded and bounds-checked before the device is
+        touched; the probe then connects once for all steps. auto_reset is
+        not applied, the manifest's reset steps decide when to reset.
         
-        print(f"[INFO] Executing: {' '.join(cmd)}")
+        Args:
+            manifest: Manifest or path of a .toml/.json manifest
+            verify: Default verification of write steps (default: the
+                manifest's verify setting, then config)
+        
+        Returns:
+            True if successful
+        """
+        if not isinstance(manifest, Manifest):
+            try:
+                manifest = Manifest.load(manifest)
+            except ManifestError as e:
+                print(f"[ERROR] ✗ {e}")
+                return False
+        if verify is None:
+            verify = manifest.verify if manifest.verify is not None else self.config.verify
+        if manifest.chip and manifest.chip.upper() != self.config.chip.upper():
+            print(f"[WARNING] Manifest was written for {manifest.chip}, "
+                  f"programming {self.config.chip}")
+        
+        layout = self.flash_layout()
+        images: Dict[int, FirmwareImage] = {}
+        plans: Dict[int, Optional[ErasePlan]] = {}
+        with self.timeline.span("load image") as span:
+            for index, step in enumerate(manifest.steps):
+                if step.action == "erase":
+                    if layout is None and not step.all:
+                        print(f"[ERROR] ✗ Step {index + 1} erases sectors, but the "
+                              f"sector layout of {self.config.chip} is unknown")
+                        return False
+                    try:
+                        plans[index] = step.erase_plan(layout)
+                    except ManifestError as e:
+                        print(f"[ERROR] ✗ {e}")
+                        return False
+                if step.action == "option_bytes" and self.use_uart:
+                    print("[ERROR] ✗ Option bytes cannot be programmed through "
+                          "the UART bootloader")
+                    return False
+                if step.action == "reset" and not step.halt and self.use_uart and \
+                        index + 1 < len(manifest.steps):
+                    # Go hands the part to the application; only a reset pin
+                    # would bring the bootloader back for the next step
+                    print("[ERROR] ✗ Over the UART bootloader a reset (Go) must be "
+                          "the last step")
+                    return False
+                if step.action == "option_bytes" and self.use_openocd and not step.openocd:
+                    print("[ERROR] ✗ Option bytes with OpenOCD need the step's "
+                          "'openocd' commands (names like RDP are STM32CubeProgrammer's)")
+                    return False
+                if step.action != "write":
+                    continue
+                if not step.file.exists():
+                    print(f"[ERROR] Binary file not found: {step.file}")
+                    return False
+                address = step.address if step.address is not None else self.config.flash_start
+                try:
+                    images[index] = self.load_image(step.file, address)
+                except (OSError, ImageFormatError) as e:
+                    print(f"[ERROR] Cannot load image {step.file.name}: {e}")
+                    return False
+                if not self.check_image_bounds(images[index]):
+                    return False
+            span.bytes = sum(image.size for image in images.values())
+        
+        host_verify = self._host_verify(verify)
+        tool_verify = {index: (step.verify if step.verify is not None else verify)
+                       and not host_verify
+                       for index, step in enumerate(manifest.steps)}
+        
+        print(f"\n{'='*60}")
+        print(f"  Running {manifest.path.name if manifest.path else 'manifest'} "
+              f"on {self.config.chip}")
+        print(f"{'='*60}\n")
+        for number, step in enumerate(manifest.steps, 1):
+            print(f"[INFO]   {number}. {step.describe()}")
+        
+        total_bytes = sum(image.size for image in images.values())
+        with self.timeline.span("manifest", total_bytes):
+            if self.use_uart:
+                success = self._run_manifest_with_uart(manifest, plans, images,
+                                                       tool_verify)
+            elif self.use_openocd:
+                success = self._run_manifest_with_openocd(manifest, plans, tool_verify,
+                                                          total_bytes)
+            else:
+                success = self._run_manifest_with_stm32cube(manifest, plans, tool_verify,
+                                                            total_bytes)
+        
+        # Replay the steps on the sector digest cache
+        if not success:
+            self._track_erase()
+        for index, step in enumerate(manifest.steps):
+            if not success:
+                break
+            if step.action == "erase":
+                self._track_erase(plans[index])
+            elif step.action == "write":
+                self._track_flash_contents(images[index], True)
+        
+        if success and host_verify:
+            for index, step in enumerate(manifest.steps):
+                if index in images and step.verify is not False and \
+                        not self.verify_image(images[index]):
+                    self._track_flash_contents(images[index], False)
+                    return False
+        if success:
+            print(f"\n[SUCCESS] ✓ Manifest completed ({len(manifest.steps)} steps)")
+        return success
+    
+    def _stm32cube_manifest_cmd(self, manifest: Manifest,
+                                plans: Dict[int, Optional[ErasePlan]],
+                                verify: Dict[int, bool]) -> List[str]:
+        """Build one STM32_Programmer_CLI command line running every step"""
+        cmd = [str(self.stm32_cli_path), *self._stm32cube_connect_args()]
+        for index, step in enumerate(manifest.steps):
+            if step.action == "erase":
+                if plans[index] is None:
+                    cmd.extend(["-e", "all"])
+                else:
+                    cmd.extend(plans[index].stm32cube_args())
+            elif step.action == "write":
+                address = step.address if step.address is not None else self.config.flash_start
+                cmd.extend(["-w", str(step.file), hex(address)])
+                if verify[index]:
+                    cmd.extend(["-v", str(step.file), hex(address)])
+            elif step.action == "option_bytes":
+                cmd.append("-ob")
+                cmd.extend(f"{name}={value}" for name, value in step.options.items())
+            else:
+                cmd.append("-rst")
+                if step.halt:
+                    cmd.append("-halt")
+        return cmd
+    
+    def _run_manifest_with_stm32cube(self, manifest: Manifest,
+                                     plans: Dict[int, Optional[ErasePlan]],
+                                     verify: Dict[int, bool],
+                                     total_bytes: int) -> bool:
+        """Run a manifest with STM32CubeProgrammer"""
+        if not self.stm32_cli_path:
+            print("[ERROR] STM32CubeProgrammer not found")
+            return False
         
+        cmd = self._stm32cube_manifest_cmd(manifest, plans, verify)
+        print(f"[INFO] Executing: {' '.join(cmd)}")
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
+            result = self._run(cmd, total_bytes=total_bytes)
             if result.returncode == 0:
-                print(f"\n[SUCCESS] ✓ Flashing completed successfully!")
                 return True
+            print(f"[ERROR] ✗ Manifest failed: {result.stderr}")
+            return False
+        except Exception as e:
+            print(f"[ERROR] Exception during manifest: {e}")
+            return False
+    
+    def _openocd_manifest_commands(self, manifest: Manifest,
+                                   plans: Dict[int, Optional[ErasePlan]],
+                                   verify: Dict[int, bool]) -> List[str]:
+        """OpenOCD commands running every step, after init"""
+        commands = ["reset halt"]
+        for index, step in enumerate(manifest.steps):
+            if step.action == "erase":
+                commands.extend(self._openocd_erase_commands(plans[index] is None,
+                                                             plans[index]))
+            elif step.action == "write":
+                # .hex/.elf carry their own addresses
+                address = step.address if step.address is not None else self.config.flash_start
+                offset = f" {hex(address)}" if step.file.suffix.lower() == ".bin" else ""
+                image = f"{{{step.file.as_posix()}}}{offset}"
+                commands.append(f"flash write_image erase {image}")
+                if verify[index]:
+                    commands.append(f"verify_image {image}")
+            elif step.action == "option_bytes":
+                commands.extend(step.openocd)
             else:
-                print(f"\n[ERROR] ✗ Flashing failed!")
-                print(f"Error: {result.stderr}")
+                commands.append("reset halt" if step.halt else "reset run")
+        return commands
+    
+    def _run_manifest_with_openocd(self, manifest: Manifest,
+                                   plans: Dict[int, Optional[ErasePlan]],
+                                   verify: Dict[int, bool],
+                                   total_bytes: int) -> bool:
+        """Run a manifest with OpenOCD"""
+        if not self.openocd_path:
+            print("[ERROR] OpenOCD not found")
+            return False
+        
+        commands = self._openocd_manifest_commands(manifest, plans, verify)
+        if self.config.openocd_session:
+            session = self._openocd_session()
+            if session is None:
+                return False
+            try:
+                self._session_commands(session, commands)
+                return True
+            except OpenOCDError as e:
+                print(f"[ERROR] ✗ Manifest failed: {e}")
                 return False
+        
+        cmd = self._openocd_base_cmd()
+        cmd.extend(["-c", "init"])
+        for command in commands:
+            cmd.extend(["-c", command])
+        cmd.extend(["-c", "exit"])
+        
+        print(f"[INFO] Executing: {' '.join(cmd)}")
+        try:
+            result = self._run(cmd, total_bytes=total_bytes)
+            if result.returncode == 0:
+                return True
+            print(f"[ERROR] ✗ Manifest failed: {result.stderr}")
+            return False
         except Exception as e:
-            print(f"[ERROR] Exception during flashing: {e}")
+            print(f"[ERROR] Exception during manifest: {e}")
             return False
     
-    def erase(self, full: bool = False) -> bool:
+    def _openocd_target(self) -> str:
+        """Determine OpenOCD target config from the chip database"""
+        info = lookup_chip(self.config.chip)
+        if info is None:
+            if not getattr(self, "_unknown_chip_warned", False):
+                print(f"[WARNING] {self.config.chip} is not in the chip database, "
+                      f"assuming target/stm32f1x.cfg")
+                self._unknown_chip_warned = True
+            return "stm32f1x.cfg"
+        return info.openocd_target
+    
+    def _openocd_interface(self) -> str:
+        """Determine OpenOCD interface config based on port"""
+        return "stlink.cfg" if self.config.port == "SWD" else "jlink.cfg"
+    
+    def _openocd_session(self) -> Optional[OpenOCDSession]:
+        """Get the pooled OpenOCD session for the configured probe"""
+        if not self.openocd_path:
+            print("[ERROR] OpenOCD not found")
+            return None
+        
+        freq = self._swd_khz()
+        session = default_pool().acquire(
+            self.config.probe_serial,
+            openocd_path=self.openocd_path,
+            interface=self._openocd_interface(),
+            target=self._openocd_target(),
+            speed_khz=freq,
+        )
+        if session is None:
+            print("[ERROR] ✗ Could not start OpenOCD session")
+        elif freq and session.speed_khz != freq:
+            # Pooled session started at another clock
+            try:
+                session.set_speed(freq)
+            except OpenOCDError as e:
+                print(f"[ERROR] ✗ Cannot set adapter speed: {e}")
+                return None
+        return session
+    
+    def _session_commands(self, session: OpenOCDSession, commands: List[str]) -> None:
+        """
+        Run commands on a live OpenOCD session
+        
+        The batch is logged like a tool run, so SWD clock tuning sees
+        that the probe was used and the text of any error.
+        
+        Raises:
+            OpenOCDError: If a command fails
+        """
+        result = CommandResult(cmd=list(commands), returncode=0)
+        try:
+            for command in commands:
+                reason = self._stop_reason()
+                if reason:
+                    raise OpenOCDError(reason)
+                session.command(command, timeout=self._time_left())
+        except OpenOCDError as e:
+            result.returncode = 1
+            result.stderr = str(e)
+            raise
+        finally:
+            if self.tool_log is not None:
+                self.tool_log.append(result)
+    
+    def erase(self, full: bool = False,
+              plan: Optional[ErasePlan] = None) -> bool:
         """
         Erase STM32 flash memory
         
         Args:
             full: Perform full chip erase (True) or mass erase (False)
+            plan: Erase only these sectors (see erase_plan())
         
         Returns:
             True if successful
         """
-        print(f"\n[INFO] Erasing flash memory ({'full' if full else 'mass'})...")
-        
-        if self.use_openocd:
-            return self._erase_with_openocd(full)
+        if plan is not None:
+            if not plan.sectors:
+                print("\n[INFO] Nothing to erase")
+                return True
+            print(f"\n[INFO] Erasing {plan.summary()}...")
         else:
-            return self._erase_with_stm32cube(full)
+            print(f"\n[INFO] Erasing flash memory ({'full' if full else 'mass'})...")
+        
+        with self.timeline.span("erase", plan.bytes if plan else None):
+            if self.use_uart:
+                success = self._erase_with_uart(plan)
+            elif self.use_openocd:
+                success = self._erase_with_openocd(full, plan)
+            else:
+                success = self._erase_with_stm32cube(full, plan)
+        
+        if success:
+            self._track_erase(plan)
+        return success
     
-    def _erase_with_stm32cube(self, full: bool) -> bool:
+    def erase_plan(self, ranges: Optional[List[Tuple[int, int]]] = None,
+                   image: Optional[FirmwareImage] = None,
+                   span: bool = False) -> Optional[ErasePlan]:
+        """
+        Minimal set of sectors covering address ranges or an image
+        
+        Args:
+            ranges: (address, size) ranges to erase
+            image: Parsed image whose sectors are erased
+            span: With image, also erase sectors in gaps between segments
+        
+        Returns:
+            ErasePlan over the chip's sector layout, or None if the layout
+            is unknown
+        """
+        layout = self.flash_layout()
+        if layout is None:
+            return None
+        if image is not None:
+            return ErasePlan.for_image(layout, image, span)
+        return ErasePlan.for_ranges(layout, ranges or [])
+    
+    def _track_erase(self, plan: Optional[ErasePlan] = None) -> None:
+        """Keep the sector digest cache in step with an erase"""
+        flasher = DiffFlasher(self)
+        if plan is None:
+            flasher.cache.invalidate(flasher.device_key)
+            return
+        # Erased sectors hold known contents
+        flasher.cache.update(flasher.device_key, {
+            hex(plan.layout.sector_start(i)):
+                sector_digest(b"\xff" * plan.layout.sector_sizes[i])
+            for i in plan.sectors
+        })
+    
+    def _erase_with_stm32cube(self, full: bool,
+                              plan: Optional[ErasePlan] = None) -> bool:
         """Erase using STM32CubeProgrammer"""
         if not self.stm32_cli_path:
             print("[ERROR] STM32CubeProgrammer not found")
             return False
         
-        cmd = [
-            str(self.stm32_cli_path),
-            "-c", f"port={self.config.port}",
-            "-e", "all" if full else "0",
-        ]
+        cmd = self._stm32cube_erase_cmd(full, plan)
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = self._run(cmd)
             if result.returncode == 0:
                 print("[SUCCESS] ✓ Erase completed")
                 return True
@@ -261,62 +1408,337 @@ class STM32Programmer:
             print(f"[ERROR] Exception during erase: {e}")
             return False
     
-    def _erase_with_openocd(self, full: bool) -> bool:
+    def _openocd_erase_commands(self, full: bool,
+                                plan: Optional[ErasePlan] = None) -> List[str]:
+        """OpenOCD commands erasing the planned sectors (or bank 0)"""
+        if plan is None:
+            return [f"flash erase_sector 0 0 {'last' if full else '0'}"]
+        info = lookup_chip(self.config.chip)
+        return plan.openocd_commands(
+            split_banks=info is not None and info.openocd_banks > 1)
+    
+    def _erase_with_openocd(self, full: bool,
+                            plan: Optional[ErasePlan] = None) -> bool:
         """Erase using OpenOCD"""
-        # Implement OpenOCD erase if needed
-        print("[WARNING] OpenOCD erase not implemented yet")
-        return False
+        if not self.openocd_path:
+            print("[ERROR] OpenOCD not found")
+            return False
+        
+        commands = ["reset halt", *self._openocd_erase_commands(full, plan)]
+        if self.config.openocd_session:
+            session = self._openocd_session()
+            if session is None:
+                return False
+            try:
+                self._session_commands(session, commands)
+            except OpenOCDError as e:
+                print(f"[ERROR] ✗ OpenOCD session erase failed: {e}")
+                return False
+            print("[SUCCESS] ✓ Erase completed")
+            return True
+        
+        cmd = self._openocd_base_cmd()
+        cmd.extend(["-c", "init"])
+        for command in commands:
+            cmd.extend(["-c", command])
+        cmd.extend(["-c", "exit"])
+        
+        try:
+            result = self._run(cmd)
+            if result.returncode == 0:
+                print("[SUCCESS] ✓ Erase completed")
+                return True
+            print(f"[ERROR] ✗ Erase failed: {result.stderr}")
+            return False
+        except Exception as e:
+            print(f"[ERROR] Exception during erase: {e}")
+            return False
     
     def read_memory(self, address: int, size: int, 
-                   output_file: Path) -> bool:
+                   output_file: Path, resume: bool = False) -> bool:
         """
         Read memory from STM32 device
         
+        Reads larger than one dump chunk go through MemoryDumper: fixed-size
+        blocks, several per tool invocation, checkpointed for resuming.
+        
         Args:
             address: Start address
             size: Number of bytes to read
             output_file: Output file path
+            resume: Continue an interrupted chunked read of the same range
         
         Returns:
             True if successful
         """
         print(f"\n[INFO] Reading memory from {hex(address)}, size={size} bytes...")
         
+        with self.timeline.span("read", size):
+            dumper = MemoryDumper(self)
+            if size > dumper.chunk_size:
+                return dumper.dump([(address, size)], output_file, resume=resume).success
+            
+            if not self.read_chunks([(address, size, Path(output_file))]):
+                return False
+        print(f"[SUCCESS] ✓ Memory read to {output_file}")
+        return True
+    
+    def read_chunks(self, chunks: List[Tuple[int, int, Path]]) -> bool:
+        """
+        Read several address ranges to files with one tool invocation
+        
+        Args:
+            chunks: (address, size, output file) triples
+        
+        Returns:
+            True if every range was read
+        """
+        if not chunks:
+            return True
+        if self.use_uart:
+            return self._read_chunks_with_uart(chunks)
+        if self._swd_auto():
+            return SwdTuner(self, retune=self.config.swd_frequency == "retune").run(
+                lambda programmer: programmer.read_chunks(chunks))
+        
+        if self.use_openocd:
+            if not self.openocd_path:
+                print("[ERROR] OpenOCD not found")
+                return False
+            commands = [f"dump_image {{{Path(path).as_posix()}}} {hex(address)} {hex(size)}"
+                        for address, size, path in chunks]
+            if self.config.openocd_session:
+                session = self._openocd_session()
+                if session is None:
+                    return False
+                try:
+                    self._session_commands(session, commands)
+                    return True
+                except OpenOCDError as e:
+                    print(f"[ERROR] ✗ Read failed: {e}")
+                    return False
+            cmd = self._openocd_base_cmd()
+            cmd.extend(["-c", "init", "-c", "halt"])
+            for command in commands:
+                cmd.extend(["-c", command])
+            cmd.extend(["-c", "exit"])
+        else:
+            if not self.stm32_cli_path:
+                print("[ERROR] STM32CubeProgrammer not found")
+                return False
+            cmd = [str(self.stm32_cli_path), *self._stm32cube_connect_args()]
+            for address, size, path in chunks:
+                cmd.extend(["-r", str(path), hex(address), hex(size)])
+        
+        try:
+            result = self._run(cmd, total_bytes=sum(size for _, size, _ in chunks))
+            if result.returncode == 0:
+                return True
+            print(f"[ERROR] ✗ Read failed: {result.stderr.strip()}")
+            return False
+        except Exception as e:
+            print(f"[ERROR] Exception during read: {e}")
+            return False
+    
+    def device_uid(self) -> Optional[str]:
+        """
+        Unique device ID of the connected part
+        
+        Returns:
+            96-bit UID as hex, or None if the chip's UID address is unknown
+            or the read failed
+        """
+        info = lookup_chip(self.config.chip)
+        if info is None or info.uid_address is None:
+            return None
+        uid = self.read_bytes(info.uid_address, UID_SIZE)
+        return uid.hex() if uid is not None else None
+    
+    def read_bytes(self, address: int, size: int) -> Optional[bytes]:
+        """
+        Read memory from STM32 device into a bytes object
+        
+        Args:
+            address: Start address
+            size: Number of bytes to read
+        
+        Returns:
+            Memory contents, or None if the read failed
+        """
+        with tempfile.TemporaryDirectory(prefix="stm32prog_") as tmp:
+            output_file = Path(tmp) / "read.bin"
+            if not self.read_memory(address, size, output_file):
+                return None
+            data = output_file.read_bytes()
+        
+        if len(data) != size:
+            print(f"[ERROR] ✗ Short read: {len(data)} of {size} bytes")
+            return None
+        return data
+    
+    def device_crc32(self, regions: List[Tuple[int, int]]) -> Optional[List[int]]:
+        """
+        Have the device's CRC unit checksum flash regions
+        
+        The CRC peripheral is fed from flash by DMA1 channel 1, so only
+        register accesses cross the debug link. The core is halted while
+        this runs and reset afterwards when auto_reset is set.
+        
+        Args:
+            regions: (word-aligned address, size) pairs
+        
+        Returns:
+            STM32 CRC32 per region, or None if not supported here
+        """
+        if not supports_dma_crc(self.config.chip) or self.use_uart:
+            return None
+        if self.use_openocd:
+            if not self.config.openocd_session:
+                return None
+            return self._crc_with_openocd_session(regions)
+        if self.stm32_cli_path:
+            return self._crc_with_stm32cube(regions)
+        return None
+    
+    def _crc_with_openocd_session(self, regions: List[Tuple[int, int]]) -> Optional[List[int]]:
+        """Device CRC through live OpenOCD register writes"""
+        session = self._openocd_session()
+        if session is None:
+            return None
+        
+        def read32(address: int) -> int:
+            return int(session.command(f"read_memory {address:#x} 32 1").split()[0], 0)
+        
+        try:
+            session.command("halt")
+            session.command(f"mmw {RCC_AHBENR:#x} "
+                            f"{RCC_AHBENR_DMA1EN | RCC_AHBENR_CRCEN:#x} 0")
+            crcs = []
+            for address, size in regions:
+                for register, value in dma_crc_writes(address, size):
+                    session.command(f"mww {register:#x} {value:#x}")
+                if read32(DMA1_ISR) & (DMA_ISR_TCIF1 | DMA_ISR_TEIF1) != DMA_ISR_TCIF1:
+                    print(f"[WARNING] Device CRC DMA did not complete at {hex(address)}")
+                    return None
+                crcs.append(read32(CRC_DR))
+            if self.config.auto_reset:
+                session.command("reset run")
+            return crcs
+        except (OpenOCDError, ValueError, IndexError) as e:
+            print(f"[WARNING] Device CRC failed: {e}")
+            return None
+    
+    def _crc_with_stm32cube(self, regions: List[Tuple[int, int]]) -> Optional[List[int]]:
+        """Device CRC with one STM32_Programmer_CLI call (-w32/-r32)"""
+        cmd = [str(self.stm32_cli_path), *self._stm32cube_connect_args(), "-halt",
+               "-w32", hex(RCC_AHBENR),
+               hex(RCC_AHBENR_RESET | RCC_AHBENR_DMA1EN | RCC_AHBENR_CRCEN)]
+        for address, size in regions:
+            for register, value in dma_crc_writes(address, size):
+                cmd.extend(["-w32", hex(register), hex(value)])
+            cmd.extend(["-r32", hex(DMA1_ISR), "4", "-r32", hex(CRC_DR), "4"])
+        if self.config.auto_reset:
+            cmd.append("-rst")
+        
+        values = []
+        
+        def collect(line: str, stream: str) -> None:
+            match = _R32_RE.match(line)
+            if match and int(match.group(1), 16) in (DMA1_ISR, CRC_DR):
+                values.append(int(match.group(2), 16))
+        
+        try:
+            result = self._run(cmd, on_line=collect)
+        except Exception as e:
+            print(f"[WARNING] Device CRC failed: {e}")
+            return None
+        if result.returncode != 0:
+            print(f"[WARNING] Device CRC failed: {result.stderr.strip()}")
+            return None
+        
+        if len(values) != 2 * len(regions):
+            print("[WARNING] Unexpected STM32_Programmer_CLI -r32 output")
+            return None
+        crcs = []
+        for isr, crc in zip(values[0::2], values[1::2]):
+            if isr & (DMA_ISR_TCIF1 | DMA_ISR_TEIF1) != DMA_ISR_TCIF1:
+                print("[WARNING] Device CRC DMA did not complete")
+                return None
+            crcs.append(crc)
+        return crcs
+    
+    def reset(self, halt: bool = False) -> bool:
+        """
+        Reset the STM32 device
+        
+        Args:
+            halt: Keep the core halted after reset (OpenOCD session only;
+                over UART: stay in the bootloader)
+        
+        Returns:
+            True if successful
+        """
+        with self.timeline.span("reset"):
+            return self._reset(halt)
+    
+    def _reset(self, halt: bool) -> bool:
+        """Reset through the active tool"""
+        if self.use_uart:
+            return self._reset_with_uart(halt)
+        if self.use_openocd:
+            if not self.config.openocd_session:
+                print("[WARNING] OpenOCD reset requires openocd_session")
+                return False
+            session = self._openocd_session()
+            return session is not None and session.reset(halt)
+        
         if not self.stm32_cli_path:
             print("[ERROR] STM32CubeProgrammer not found")
             return False
         
         cmd = [
             str(self.stm32_cli_path),
-            "-c", f"port={self.config.port}",
-            "-r", str(output_file), f"{hex(address)}", f"{hex(size)}",
+            *self._stm32cube_connect_args(),
+            "-rst",
         ]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = self._run(cmd)
             if result.returncode == 0:
-                print(f"[SUCCESS] ✓ Memory read to {output_file}")
                 return True
-            else:
-                print(f"[ERROR] ✗ Read failed: {result.stderr}")
-                return False
+            print(f"[ERROR] ✗ Reset failed: {result.stderr}")
+            return False
         except Exception as e:
-            print(f"[ERROR] Exception during read: {e}")
+            print(f"[ERROR] Exception during reset: {e}")
             return False
     
     def get_device_info(self) -> Optional[Dict[str, str]]:
         """Get connected device information"""
+        if self.use_uart:
+            try:
+                with self._uart_connect() as bootloader:
+                    return {"status": "connected", "output": bootloader.describe()}
+            except (BootloaderError, OSError):
+                return None
+        
+        if self.use_openocd and self.openocd_path:
+            # A target is attached if OpenOCD can examine it
+            cmd = self._openocd_base_cmd() + ["-c", "init", "-c", "exit"]
+            try:
+                result = self._run(cmd)
+                if result.returncode == 0:
+                    return {"status": "connected", "output": result.stderr}
+            except Exception:
+                pass
+            return None
+        
         if not self.stm32_cli_path:
             return None
         
-        cmd = [
-            str(self.stm32_cli_path),
-            "-c", f"port={self.config.port}",
-            "-q",
-        ]
+        cmd = self._stm32cube_info_cmd()
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = self._run(cmd)
             if result.returncode == 0:
                 # Parse device info from output
                 info = {"status": "connected", "output": result.stdout}
@@ -325,3 +1747,204 @@ class STM32Programmer:
             pass
         
         return None
+    
+    def _uart_connect(self) -> UartBootloader:
+        """
+        Open the serial port and synchronize with the bootloader
+        
+        Returns:
+            Connected client (a context manager closing the port)
+        
+        Raises:
+            BootloaderError: If no bootloader answers (at any rate, with
+                baudrate="auto")
+            OSError: If the serial port cannot be opened
+        """
+        if not self.config.serial_port:
+            raise BootloaderError("No serial port set for port=UART")
+        if self._uart_auto():
+            return BaudrateTuner(self, retune=self.config.baudrate == "retune").connect()
+        bootloader = UartBootloader.open(self.config.serial_port, self.config.baudrate,
+                                         pipeline=self.config.uart_pipeline)
+        try:
+            bootloader.connect()
+        except BaseException:
+            bootloader.close()
+            raise
+        return bootloader
+    
+    def _uart_progress(self, operation: str,
+                       total_bytes: int) -> Optional[Callable[[int], None]]:
+        """
+        Callback turning bytes transferred into ProgressEvents, if wanted
+        
+        With a cancel event or deadline (see with_cancel()) the callback
+        also stops the transfer by raising BootloaderError.
+        """
+        stoppable = self.cancel_event is not None or self.deadline is not None
+        if (self.progress_callback is None or not total_bytes) and not stoppable:
+            return None
+        callback = self.progress_callback
+        start = time.monotonic()
+        
+        def report(done: int) -> None:
+            reason = self._stop_reason()
+            if reason:
+                raise BootloaderError(reason)
+            if callback is None or not total_bytes:
+                return
+            elapsed = time.monotonic() - start
+            callback(ProgressEvent(operation, 100.0 * done / total_bytes, done,
+                                   total_bytes, done / elapsed if elapsed > 0 else None,
+                                   elapsed, done=done >= total_bytes))
+        return report
+    
+    def _uart_program(self, bootloader: UartBootloader,
+                      regions: List[Tuple[int, bytes]], verify: bool,
+                      erase: Optional[ErasePlan] = None,
+                      expected: Optional[List[Tuple[int, bytes]]] = None) -> None:
+        """
+        Erase the sectors regions touch, write them and read them back
+        
+        Args:
+            bootloader: Connected client
+            regions: (address, data) to program
+            verify: Read back and compare after writing
+            erase: Extra sectors to erase first
+            expected: (address, data) compared instead of regions
+        
+        Raises:
+            BootloaderError: If a command fails or the read-back differs
+        """
+        # Write Memory does not erase, unlike -w and flash write_image erase
+        layout = self.flash_layout()
+        if layout is None:
+            raise BootloaderError(f"The sector layout of {self.config.chip} is unknown: "
+                                  f"cannot tell which pages to erase")
+        sectors = set(ErasePlan.for_ranges(
+            layout, [(address, len(data)) for address, data in regions]).sectors)
+        if erase is not None:
+            sectors.update(erase.sectors)
+        reason = self._stop_reason()
+        if reason:
+            raise BootloaderError(reason)
+        if sectors:
+            bootloader.erase(sorted(sectors))
+        
+        progress = self._uart_progress("download", sum(len(d) for _, d in regions))
+        done = 0
+        for address, data in regions:
+            bootloader.write(address, data, progress and
+                             (lambda count, base=done: progress(base + count)))
+            done += len(data)
+        if not verify:
+            return
+        
+        expected = regions if expected is None else expected
+        progress = self._uart_progress("verify", sum(len(d) for _, d in expected))
+        done = 0
+        for address, data in expected:
+            actual = bootloader.read(address, len(data), progress and
+                                     (lambda count, base=done: progress(base + count)))
+            if actual != data:
+                # A short read that matches so far differs at its end
+                offset = next((i for i, (a, b) in enumerate(zip(actual, data)) if a != b),
+                              min(len(actual), len(data)))
+                raise BootloaderError(f"Verification failed at {hex(address + offset)}")
+            done += len(data)
+    
+    def _flash_with_uart(self, image: FirmwareImage, verify: bool) -> bool:
+        """Flash an image's segments through the UART bootloader"""
+        regions = [(s.address, bytes(s.data)) for s in image.segments]
+        if not self._write_regions_with_uart(regions, verify):
+            print(f"\n[ERROR] ✗ Flashing failed!")
+            return False
+        print(f"\n[SUCCESS] ✓ Flashing completed successfully!")
+        return True
+    
+    def _write_regions_with_uart(self, regions: List[Tuple[int, bytes]],
+                                 verify: bool,
+                                 erase: Optional[ErasePlan] = None,
+                                 verify_file: Optional[Tuple[Path, int]] = None) -> bool:
+        """Write regions in one bootloader connection"""
+        total_bytes = sum(len(data) for _, data in regions)
+        try:
+            expected = None
+            if verify and verify_file is not None:
+                image = self.load_image(*verify_file)
+                expected = [(s.address, bytes(s.data)) for s in image.segments]
+            with self.timeline.span("bootloader", total_bytes), \
+                    self._uart_connect() as bootloader:
+                print(f"[INFO] {bootloader.describe()}")
+                self._uart_program(bootloader, regions, verify, erase, expected)
+                if self.config.auto_reset:
+                    bootloader.go(self.config.flash_start)
+            return True
+        except (BootloaderError, OSError, ImageFormatError) as e:
+            print(f"[ERROR] ✗ Write failed: {e}")
+            return False
+    
+    def _erase_with_uart(self, plan: Optional[ErasePlan] = None) -> bool:
+        """Erase the planned sectors (or mass erase) through the UART bootloader"""
+        try:
+            with self.timeline.span("bootloader"), self._uart_connect() as bootloader:
+                bootloader.erase(plan.sectors if plan is not None else None)
+        except (BootloaderError, OSError) as e:
+            print(f"[ERROR] ✗ Erase failed: {e}")
+            return False
+        print("[SUCCESS] ✓ Erase completed")
+        return True
+    
+    def _read_chunks_with_uart(self, chunks: List[Tuple[int, int, Path]]) -> bool:
+        """Read ranges to files in one bootloader connection"""
+        total_bytes = sum(size for _, size, _ in chunks)
+        progress = self._uart_progress("read", total_bytes)
+        try:
+            with self.timeline.span("bootloader", total_bytes), \
+                    self._uart_connect() as bootloader:
+                done = 0
+                for address, size, path in chunks:
+                    Path(path).write_bytes(bootloader.read(
+                        address, size, progress and
+                        (lambda count, base=done: progress(base + count))))
+                    done += size
+            return True
+        except (BootloaderError, OSError) as e:
+            print(f"[ERROR] ✗ Read failed: {e}")
+            return False
+    
+    def _run_manifest_with_uart(self, manifest: Manifest,
+                                plans: Dict[int, Optional[ErasePlan]],
+                                images: Dict[int, FirmwareImage],
+                                verify: Dict[int, bool]) -> bool:
+        """Run a manifest in one bootloader connection"""
+        try:
+            with self._uart_connect() as bootloader:
+                print(f"[INFO] {bootloader.describe()}")
+                for index, step in enumerate(manifest.steps):
+                    if step.action == "erase":
+                        bootloader.erase(plans[index].sectors
+                                         if plans[index] is not None else None)
+                    elif step.action == "write":
+                        self._uart_program(bootloader,
+                                           [(s.address, bytes(s.data))
+                                            for s in images[index].segments],
+                                           verify[index])
+                    elif not step.halt:
+                        # Last step (checked in run_manifest): Go leaves the bootloader
+                        bootloader.go(self.config.flash_start)
+            return True
+        except (BootloaderError, OSError) as e:
+            print(f"[ERROR] ✗ Manifest failed: {e}")
+            return False
+    
+    def _reset_with_uart(self, halt: bool) -> bool:
+        """Start the application with Go (halt: stay in the bootloader)"""
+        try:
+            with self._uart_connect() as bootloader:
+                if not halt:
+                    bootloader.go(self.config.flash_start)
+            return True
+        except (BootloaderError, OSError) as e:
+            print(f"[ERROR] ✗ Reset failed: {e}")
+            return False
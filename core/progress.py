@@ -0,0 +1,196 @@
+"""
+Progress Parsing - Turn tool output lines into progress events
+Understands STM32_Programmer_CLI, OpenOCD and build (make/CubeIDE) output
+"""
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional, Callable
+
+# STM32_Programmer_CLI phase markers
+_CUBE_PHASES = (
+    ("Erasing", "erase"),
+    ("Download in Progress", "download"),
+    ("Verifying", "verify"),
+    ("Reading data", "read"),
+    ("Uploading", "read"),
+    ("MCU Reset", "reset"),
+)
+_PERCENT_RE = re.compile(r"(\d{1,3})\s*%")
+_CUBE_ELAPSED_RE = re.compile(
+    r"Time elapsed during (\w+) operation:\s*(\d+):(\d+):([\d.]+)")
+
+# OpenOCD progress lines
+_OPENOCD_PHASES = (
+    ("** Programming Started **", "download"),
+    ("** Verify Started **", "verify"),
+    ("auto erase enabled", "erase"),
+    ("** Resetting Target **", "reset"),
+)
+_OPENOCD_DONE_RE = re.compile(
+    r"(wrote|verified|dumped)\s+(\d+)\s+bytes.*?in\s+([\d.]+)s(?:\s+\(([\d.]+)\s+KiB/s\))?")
+
+# Build output
+_COMPILE_RE = re.compile(r"(?:arm-none-eabi-gcc|arm-none-eabi-g\+\+)\b.*\s-c\s.*?(\S+\.(?:c|cpp|s|S))\b")
+_CUBE_BUILD_RE = re.compile(r"Finished building:\s*(.+)")
+
+
+@dataclass
+class ProgressEvent:
+    """Progress of one tool operation"""
+    operation: str
+    percent: Optional[float] = None
+    bytes_done: Optional[int] = None
+    total_bytes: Optional[int] = None
+    rate: Optional[float] = None  # bytes per second
+    elapsed: float = 0.0
+    message: str = ""
+    done: bool = False
+
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+class ProgressParser:
+    """Base class: feed output lines, receive ProgressEvents"""
+
+    def __init__(self, callback: ProgressCallback,
+                 total_bytes: Optional[int] = None,
+                 operation: str = "run"):
+        """
+        Initialize parser
+
+        Args:
+            callback: Called with each ProgressEvent
+            total_bytes: Bytes the operation will transfer, if known
+            operation: Initial operation name
+        """
+        self.callback = callback
+        self.total_bytes = total_bytes
+        self.operation = operation
+        self._phase_start = time.monotonic()
+
+    def _set_phase(self, operation: str) -> None:
+        if operation != self.operation:
+            self.operation = operation
+            self._phase_start = time.monotonic()
+
+    def _emit(self, percent: Optional[float] = None,
+              bytes_done: Optional[int] = None,
+              rate: Optional[float] = None,
+              message: str = "", done: bool = False,
+              elapsed: Optional[float] = None) -> None:
+        if elapsed is None:
+            elapsed = time.monotonic() - self._phase_start
+        if bytes_done is None and percent is not None and self.total_bytes:
+            bytes_done = int(self.total_bytes * percent / 100)
+        if rate is None and bytes_done and elapsed > 0:
+            rate = bytes_done / elapsed
+        self.callback(ProgressEvent(self.operation, percent, bytes_done,
+                                    self.total_bytes, rate, elapsed,
+                                    message, done))
+
+    def feed(self, line: str) -> None:
+        """Consume one output line"""
+        raise NotImplementedError
+
+
+class STM32CubeProgressParser(ProgressParser):
+    """Parses STM32_Programmer_CLI output"""
+
+    def __init__(self, callback: ProgressCallback,
+                 total_bytes: Optional[int] = None,
+                 operation: str = "connect"):
+        super().__init__(callback, total_bytes, operation)
+        self._last_percent = None
+
+    def feed(self, line: str) -> None:
+        text = line.strip()
+        if not text:
+            return
+
+        for marker, operation in _CUBE_PHASES:
+            if text.startswith(marker):
+                self._set_phase(operation)
+                self._last_percent = None
+                self._emit(percent=0.0, message=text)
+                return
+
+        match = _CUBE_ELAPSED_RE.search(text)
+        if match:
+            hours, minutes, seconds = match.group(2, 3, 4)
+            elapsed = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            self._emit(percent=100.0, bytes_done=self.total_bytes,
+                       message=text, done=True, elapsed=elapsed)
+            return
+
+        if text.startswith("File download complete"):
+            # The "Time elapsed" line that follows closes the phase
+            self._emit(percent=100.0, message=text)
+            return
+
+        if text.startswith(("Download verified successfully", "Data read successfully",
+                            "Mass erase successfully", "Flash memory erased")):
+            self._emit(percent=100.0, message=text, done=True)
+            return
+
+        match = _PERCENT_RE.search(text)
+        if match and ("[" in text or "█" in text or "=" in text):
+            percent = float(min(int(match.group(1)), 100))
+            if percent != self._last_percent:
+                self._last_percent = percent
+                self._emit(percent=percent, message=text)
+
+
+class OpenOCDProgressParser(ProgressParser):
+    """Parses OpenOCD log output"""
+
+    def __init__(self, callback: ProgressCallback,
+                 total_bytes: Optional[int] = None,
+                 operation: str = "connect"):
+        super().__init__(callback, total_bytes, operation)
+
+    def feed(self, line: str) -> None:
+        text = line.strip()
+        if not text:
+            return
+
+        for marker, operation in _OPENOCD_PHASES:
+            if marker in text:
+                self._set_phase(operation)
+                self._emit(percent=0.0, message=text)
+                return
+
+        match = _OPENOCD_DONE_RE.search(text)
+        if match:
+            verb, count, seconds, kib_rate = match.groups()
+            self._set_phase({"wrote": "download", "verified": "verify",
+                             "dumped": "read"}[verb])
+            rate = float(kib_rate) * 1024 if kib_rate else None
+            self._emit(percent=100.0, bytes_done=int(count), rate=rate,
+                       message=text, done=True, elapsed=float(seconds))
+            return
+
+        if "** Programming Finished **" in text or "** Verified OK **" in text:
+            self._emit(percent=100.0, message=text, done=True)
+
+
+class BuildProgressParser(ProgressParser):
+    """Counts compiled sources in make / CubeIDE headless build output"""
+
+    def __init__(self, callback: ProgressCallback,
+                 total_sources: Optional[int] = None):
+        super().__init__(callback, None, "build")
+        self.total_sources = total_sources
+        self.compiled = 0
+
+    def feed(self, line: str) -> None:
+        match = _COMPILE_RE.search(line) or _CUBE_BUILD_RE.search(line)
+        if not match:
+            return
+        self.compiled += 1
+        percent = None
+        if self.total_sources:
+            percent = min(100.0, 100.0 * self.compiled / self.total_sources)
+        self._emit(percent=percent, message=f"Compiling {match.group(1).strip()}")
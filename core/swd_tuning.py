@@ -0,0 +1,125 @@
+"""
+SWD Clock Tuning - Fastest stable SWD frequency per probe and chip
+Runs a programming operation from the fastest clock down, stepping to the
+next slower one on connect, verify or read errors, and remembers the
+fastest clock that worked in the settings store
+"""
+
+from typing import Optional, List, Callable, Sequence
+
+from ..config.settings import SettingsManager
+from .process import CommandResult
+
+# SWD clocks tried, fastest first (kHz): ST-LINK/V3 and ST-LINK/V2 steps.
+# Probes round a request down to the nearest clock they support
+SWD_FREQUENCIES_KHZ = (24000, 8000, 4000, 1800, 950, 480, 240, 125)
+
+# Tool messages (lowercase) of a link too fast for the wiring
+LINK_ERRORS = (
+    # STM32_Programmer_CLI
+    "dev_connect_err", "dev_target_not_halted", "no stm32 target found",
+    "unable to get core id", "verification failed", "data read failed",
+    "failed to download", "target not halted",
+    # OpenOCD
+    "error connecting dp", "init mode failed", "checksum mismatch",
+    "verify failed", "failed to read memory", "failed to write memory",
+    "timed out while waiting", "sticky error",
+)
+
+
+def is_link_failure(results: List[CommandResult]) -> bool:
+    """
+    Whether a failed operation looks like a signal integrity problem
+
+    A failed tool run counts when its output reports a connect, verify or
+    read error. When tools ran and none failed, the failure came from
+    comparing the data read back on the host, and counts as well. When no
+    tool ran at all, the operation failed before touching the probe
+    (missing tool, bad image) and a slower clock cannot help; neither can
+    it after a cancelled run.
+
+    Args:
+        results: Tool runs of the failed operation
+
+    Returns:
+        True if a slower clock may succeed
+    """
+    if not results or any(r.cancelled for r in results):
+        return False
+    failed = [r for r in results if r.returncode != 0]
+    if not failed:
+        return True
+    text = (failed[-1].stdout + failed[-1].stderr).lower()
+    return any(error in text for error in LINK_ERRORS)
+
+
+class SwdTuner:
+    """Run operations at the fastest SWD clock a probe and chip sustain"""
+
+    def __init__(self, programmer, settings: Optional[SettingsManager] = None,
+                 frequencies: Sequence[int] = SWD_FREQUENCIES_KHZ,
+                 retune: bool = False):
+        """
+        Initialize tuner
+
+        Args:
+            programmer: STM32Programmer whose probe is tuned
+            settings: Settings store holding the remembered clocks
+            frequencies: Candidate clocks in kHz, fastest first
+            retune: Start from the fastest clock instead of the remembered one
+        """
+        self.programmer = programmer
+        self.settings = settings or SettingsManager()
+        self.frequencies = sorted(frequencies, reverse=True)
+        self.retune = retune
+        self.frequency: Optional[int] = None   # Clock of the last success
+
+    @property
+    def remembered(self) -> Optional[int]:
+        """Stored clock for the programmer's probe and chip"""
+        config = self.programmer.config
+        return self.settings.swd_frequency(config.probe_serial, config.chip)
+
+    def candidates(self) -> List[int]:
+        """Clocks to try, in order"""
+        start = None if self.retune else self.remembered
+        if start is None:
+            return list(self.frequencies)
+        return [start] + [f for f in self.frequencies if f < start]
+
+    def run(self, operation: Callable[..., bool]) -> bool:
+        """
+        Run an operation, slowing the clock down until it succeeds
+
+        The operation is retried only after link errors (see
+        is_link_failure); any other failure is returned as is.
+
+        Args:
+            operation: Called with a programmer bound to one clock;
+                returns True on success
+
+        Returns:
+            True if the operation succeeded at some clock
+        """
+        config = self.programmer.config
+        remembered = self.remembered
+        candidates = self.candidates()
+        for index, freq in enumerate(candidates):
+            programmer = self.programmer.with_swd_frequency(freq)
+            programmer.tool_log = []
+            print(f"[INFO] SWD clock {freq} kHz")
+            if operation(programmer):
+                self.frequency = freq
+                if freq != remembered:
+                    self.settings.remember_swd_frequency(config.probe_serial,
+                                                         config.chip, freq)
+                    print(f"[INFO] Remembered SWD clock {freq} kHz for "
+                          f"{config.probe_serial or 'default probe'}/{config.chip}")
+                return True
+            if not is_link_failure(programmer.tool_log):
+                return False
+            if index + 1 < len(candidates):
+                print(f"[WARNING] Link errors at {freq} kHz, retrying at "
+                      f"{candidates[index + 1]} kHz")
+        print("[ERROR] ✗ No stable SWD clock found")
+        return False
@@ -0,0 +1,85 @@
+"""
+Thread Output - Route print() output per thread
+One process-wide stdout/stderr wrapper sends the lines of registered threads
+to their own sink (a daemon client, a prefixed gang log) and everything else
+to the wrapped stream, so concurrent callers never swap sys.stdout
+"""
+
+import sys
+import threading
+from typing import Dict, Callable
+
+# Receives the text a thread writes
+OutputSink = Callable[[str], None]
+
+_install_lock = threading.Lock()
+
+
+class ThreadOutput:
+    """stdout/stderr replacement sending each registered thread's output to its sink"""
+
+    def __init__(self, stream, adopt_helpers: bool = False):
+        """
+        Initialize wrapper
+
+        Args:
+            stream: Stream unregistered threads write to
+            adopt_helpers: Attribute unregistered threads to the registered
+                sink when there is exactly one (helper threads of a daemon
+                request that cannot be traced back to it)
+        """
+        self._stream = stream
+        self._adopt_helpers = adopt_helpers
+        self._sinks: Dict[int, OutputSink] = {}
+        self._lock = threading.Lock()
+
+    def register(self, sink: OutputSink) -> None:
+        """Send the calling thread's output to sink"""
+        with self._lock:
+            self._sinks[threading.get_ident()] = sink
+
+    def unregister(self) -> None:
+        """Send the calling thread's output to the wrapped stream again"""
+        with self._lock:
+            self._sinks.pop(threading.get_ident(), None)
+
+    def sink(self) -> OutputSink:
+        """Where the calling thread's output goes, to hand on to its worker threads"""
+        with self._lock:
+            sink = self._sinks.get(threading.get_ident())
+        return sink if sink is not None else self._stream.write
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            sink = self._sinks.get(threading.get_ident())
+            if sink is None and self._adopt_helpers and len(self._sinks) == 1:
+                sink = next(iter(self._sinks.values()))
+        if sink is None:
+            return self._stream.write(text)
+        sink(text)
+        return len(text)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+    def isatty(self) -> bool:
+        with self._lock:
+            if threading.get_ident() in self._sinks:
+                return False
+        return self._stream.isatty()
+
+
+def thread_stdout() -> ThreadOutput:
+    """
+    sys.stdout as a ThreadOutput, wrapping it on first use
+
+    The wrapper is left in place: unregistered threads write straight
+    through it, and overlapping callers have nothing to restore out of order.
+
+    Returns:
+        The installed ThreadOutput
+    """
+    with _install_lock:
+        if not isinstance(sys.stdout, ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+        return sys.stdout
@@ -0,0 +1,256 @@
+"""
+Timing - Per-phase instrumentation of programming runs
+Spans with monotonic timestamps recorded by the programmer, builder and
+deployer, reported as a table or a JSON run report
+"""
+
+import contextlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+from .progress import ProgressEvent
+
+# Tool phase names as reported in spans
+_PHASE_NAMES = {"download": "write"}
+
+
+@dataclass
+class Span:
+    """One timed phase"""
+    name: str
+    start: float                      # time.monotonic()
+    end: Optional[float] = None
+    bytes: Optional[int] = None
+    depth: int = 0
+    parent: Optional[int] = None      # Index of the enclosing span
+    index: int = 0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        end = self.end if self.end is not None else time.monotonic()
+        return max(end - self.start, 0.0)
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Effective throughput in bytes/second"""
+        if not self.bytes or self.end is None or self.duration <= 0:
+            return None
+        return self.bytes / self.duration
+
+
+class Timeline:
+    """Records nested spans; each thread keeps its own nesting"""
+
+    enabled = True
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.origin = time.monotonic()
+        self.started = datetime.now(timezone.utc)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, name: str, bytes: Optional[int] = None,
+              parent: Optional[Span] = None, start: Optional[float] = None,
+              **attrs) -> Span:
+        """
+        Open a span
+
+        Args:
+            name: Phase name
+            bytes: Bytes the phase transfers, if known
+            parent: Enclosing span (default: innermost open span of this thread)
+            start: Start timestamp (default: now)
+            **attrs: Extra fields for the report
+
+        Returns:
+            The open Span
+        """
+        stack = self._stack()
+        if parent is None and stack:
+            parent = stack[-1]
+        span = Span(name, start if start is not None else time.monotonic(),
+                    bytes=bytes, attrs=attrs,
+                    depth=parent.depth + 1 if parent else 0,
+                    parent=parent.index if parent else None)
+        with self._lock:
+            span.index = len(self.spans)
+            self.spans.append(span)
+        stack.append(span)
+        return span
+
+    def end(self, span: Span, bytes: Optional[int] = None,
+            end: Optional[float] = None) -> None:
+        """Close a span (and any span still open inside it)"""
+        span.end = end if end is not None else time.monotonic()
+        if bytes is not None:
+            span.bytes = bytes
+        stack = self._stack()
+        if span in stack:
+            del stack[stack.index(span):]
+
+    def add(self, name: str, start: float, end: float,
+            bytes: Optional[int] = None, parent: Optional[Span] = None,
+            **attrs) -> Span:
+        """Record an already finished span"""
+        span = self.begin(name, bytes, parent, start, **attrs)
+        self.end(span, end=end)
+        return span
+
+    @contextlib.contextmanager
+    def span(self, name: str, bytes: Optional[int] = None, **attrs):
+        """Context manager timing the enclosed block"""
+        span = self.begin(name, bytes, **attrs)
+        try:
+            yield span
+        finally:
+            self.end(span)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable run report"""
+        spans = []
+        for span in self.spans:
+            entry = {
+                "name": span.name,
+                "start": span.start - self.origin,
+                "duration": span.duration,
+                "depth": span.depth,
+                "parent": span.parent,
+            }
+            if span.bytes is not None:
+                entry["bytes"] = span.bytes
+                entry["rate"] = span.rate
+            entry.update(span.attrs)
+            spans.append(entry)
+        total = max((s.start + s.duration for s in self.spans), default=self.origin)
+        return {
+            "started": self.started.isoformat(),
+            "total": total - self.origin,
+            "spans": spans,
+        }
+
+    def save(self, path: Path) -> bool:
+        """
+        Write the run report as JSON
+
+        Args:
+            path: Report file
+
+        Returns:
+            True if successful
+        """
+        try:
+            Path(path).write_text(json.dumps(self.to_dict(), indent=2))
+            return True
+        except OSError as e:
+            print(f"[ERROR] Failed to write run report {path}: {e}")
+            return False
+
+    def format_table(self) -> str:
+        """Indented phase table with durations and throughput"""
+        lines = [f"{'Phase':<36} {'Duration':>10} {'Bytes':>10} {'Throughput':>12}"]
+        for span in self._ordered():
+            label = "  " * span.depth + span.name
+            if "probe" in span.attrs:
+                label += f" [{span.attrs['probe']}]"
+            size = f"{span.bytes}" if span.bytes is not None else ""
+            rate = f"{span.rate / 1024:.1f} KB/s" if span.rate else ""
+            lines.append(f"{label:<36} {span.duration:>9.3f}s {size:>10} {rate:>12}")
+        return "\n".join(lines)
+
+    def _ordered(self) -> List[Span]:
+        """Spans depth-first, children in start order"""
+        children: Dict[Optional[int], List[Span]] = {}
+        for span in self.spans:
+            children.setdefault(span.parent, []).append(span)
+        ordered = []
+
+        def walk(parent: Optional[int]) -> None:
+            for span in sorted(children.get(parent, []), key=lambda s: s.start):
+                ordered.append(span)
+                walk(span.index)
+
+        walk(None)
+        return ordered
+
+
+class _NullTimeline(Timeline):
+    """Timeline that records nothing (instrumentation disabled)"""
+
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+        self._null_span = Span("", 0.0, 0.0)
+        self._null_context = contextlib.nullcontext(self._null_span)
+
+    def begin(self, name: str, bytes: Optional[int] = None,
+              parent: Optional[Span] = None, start: Optional[float] = None,
+              **attrs) -> Span:
+        return self._null_span
+
+    def end(self, span: Span, bytes: Optional[int] = None,
+            end: Optional[float] = None) -> None:
+        pass
+
+    def span(self, name: str, bytes: Optional[int] = None, **attrs):
+        return self._null_context
+
+
+# Shared disabled timeline used when no instrumentation was requested
+NULL_TIMELINE = _NullTimeline()
+
+
+class ToolPhaseTracker:
+    """Turns a tool's progress events into phase spans"""
+
+    def __init__(self, timeline: Timeline, parent: Span):
+        """
+        Initialize tracker
+
+        Args:
+            timeline: Timeline receiving the phase spans
+            parent: Span of the tool invocation
+        """
+        self.timeline = timeline
+        self.parent = parent
+        self.phase = "connect"  # Time before the first phase marker
+        self.phase_start = parent.start
+        self.phase_bytes: Optional[int] = None
+        self.seen = False
+
+    def __call__(self, event: ProgressEvent) -> None:
+        """Progress callback: close the current phase on a phase change"""
+        self.seen = True
+        if event.operation != self.phase:
+            self._close(time.monotonic())
+            self.phase = event.operation
+            self.phase_start = time.monotonic()
+            self.phase_bytes = None
+        if event.bytes_done:
+            self.phase_bytes = event.bytes_done
+
+    def _close(self, end: float) -> None:
+        self.timeline.add(_PHASE_NAMES.get(self.phase, self.phase),
+                          self.phase_start, end, self.phase_bytes, self.parent)
+
+    def close(self) -> None:
+        """Close the last phase when the tool exits"""
+        if self.seen:
+            self._close(time.monotonic())
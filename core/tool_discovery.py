@@ -0,0 +1,203 @@
+"""
+Tool Discovery Cache - Remember where external tools live
+Discovery results (and tool version strings) are persisted under
+~/.stm32programmer/ and reused until a watched path changes
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List, Callable, Iterable
+
+_VERSION_RE = re.compile(r"(\d+\.\d+(?:\.\d+)?(?:[-+][\w.-]+)?)")
+
+
+def _stamp(path: Path) -> Optional[List[int]]:
+    """mtime/size fingerprint of a path, None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def path_search_dirs() -> List[Path]:
+    """Directories on PATH (watched when a tool was not found there)"""
+    return [Path(d) for d in os.environ.get("PATH", "").split(os.pathsep) if d]
+
+
+def which(name: str) -> Optional[Path]:
+    """Absolute path of an executable on PATH"""
+    found = shutil.which(name)
+    return Path(found) if found else None
+
+
+def probe_version(path: Path, args: Iterable[str] = ("--version",),
+                  timeout: float = 10) -> Optional[str]:
+    """
+    Run a tool's version command and extract the version string
+
+    Args:
+        path: Tool executable
+        args: Version arguments
+        timeout: Timeout in seconds
+
+    Returns:
+        Version string (e.g. "2.15.0") or None
+    """
+    try:
+        result = subprocess.run([str(path), *args], capture_output=True,
+                                text=True, timeout=timeout)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    # OpenOCD prints its banner on stderr
+    for line in (result.stdout + result.stderr).splitlines():
+        if "version" in line.lower() or "debugger" in line.lower():
+            match = _VERSION_RE.search(line)
+            if match:
+                return match.group(1)
+    return None
+
+
+class ToolDiscoveryCache:
+    """Persistent record of located tools, invalidated by path mtimes"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        """
+        Initialize discovery cache
+
+        Args:
+            cache_file: Path to cache file (default: ~/.stm32programmer/tools.json)
+        """
+        if cache_file is None:
+            cache_file = Path.home() / ".stm32programmer" / "tools.json"
+
+        self.cache_file = Path(cache_file)
+        self.entries = self.load()
+
+    def load(self) -> Dict[str, dict]:
+        """Load cache entries from file"""
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[WARNING] Failed to load tool discovery cache: {e}")
+        return {}
+
+    def save(self) -> bool:
+        """Save cache entries to file"""
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(
+                f"{self.cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+            return True
+        except Exception as e:
+            print(f"[WARNING] Failed to save tool discovery cache: {e}")
+            return False
+
+    def _valid(self, entry: dict) -> bool:
+        """True if no watched path changed since the entry was stored"""
+        watch = entry.get("watch", {})
+        return all(_stamp(Path(path)) == stamp for path, stamp in watch.items())
+
+    def get(self, name: str, context: Optional[str] = None) -> Optional[dict]:
+        """
+        Valid cache entry for a tool
+
+        Args:
+            name: Tool key
+            context: Search context the entry must match (e.g. $PATH)
+
+        Returns:
+            Entry dict with "path" (None = known missing) and "version",
+            or None if the tool must be searched for again
+        """
+        entry = self.entries.get(name)
+        if (entry is not None and entry.get("context") == context
+                and self._valid(entry)):
+            return entry
+        return None
+
+    def put(self, name: str, path: Optional[Path],
+            version: Optional[str] = None,
+            watch: Iterable[Path] = (),
+            context: Optional[str] = None) -> dict:
+        """
+        Store a discovery result
+
+        Args:
+            name: Tool key
+            path: Located executable, or None if not found
+            version: Tool version string
+            watch: Extra paths whose change invalidates the entry
+                   (search roots for a missing tool)
+            context: Search context the entry is valid for
+
+        Returns:
+            The stored entry
+        """
+        watched = [Path(path)] if path else []
+        watched.extend(Path(p) for p in watch)
+        entry = {
+            "path": str(path) if path else None,
+            "version": version,
+            "context": context,
+            "watch": {str(p): _stamp(p) for p in watched},
+        }
+        with self._lock:
+            self.entries = self.load()
+            self.entries[name] = entry
+            self.save()
+        return entry
+
+    def find(self, name: str, search: Callable[[], Optional[Path]],
+             watch: Iterable[Path] = (),
+             version_args: Optional[Iterable[str]] = ("--version",),
+             context: Optional[str] = None) -> dict:
+        """
+        Cached tool lookup
+
+        Args:
+            name: Tool key
+            search: Performs the actual (slow) search
+            watch: Search roots to watch while the tool is missing
+            version_args: Arguments that print the version (None: skip)
+            context: Search context the result depends on (e.g. $PATH)
+
+        Returns:
+            Entry dict with "path" and "version"
+        """
+        entry = self.get(name, context)
+        if entry is not None:
+            return entry
+
+        path = search()
+        version = None
+        if path is not None and version_args is not None:
+            version = probe_version(path, version_args)
+        return self.put(name, path, version, () if path else watch, context)
+
+    def clear(self, name: Optional[str] = None) -> bool:
+        """
+        Forget cached discovery results
+
+        Args:
+            name: Tool key to forget (default: all tools)
+
+        Returns:
+            True if successful
+        """
+        with self._lock:
+            self.entries = {} if name is None else {
+                key: value for key, value in self.load().items() if key != name}
+            return self.save()
@@ -0,0 +1,513 @@
+"""
+UART Bootloader - STM32 system memory bootloader over USART (AN3155)
+Programs parts through their ROM bootloader without STM32CubeProgrammer:
+get/ID, read, write, erase and go. Command frames are built once, block
+buffers are reused and every 256-byte block costs one round trip
+"""
+
+import os
+import select
+import struct
+import time
+from functools import reduce
+from operator import xor
+from typing import Optional, List, Iterable, Callable, Union
+
+ACK = 0x79
+NACK = 0x1F
+SYNC = 0x7F   # First byte after reset; the bootloader measures the baudrate on it
+
+CMD_GET = 0x00
+CMD_GET_ID = 0x02
+CMD_READ = 0x11
+CMD_GO = 0x21
+CMD_WRITE = 0x31
+CMD_ERASE = 0x43
+CMD_EXTENDED_ERASE = 0x44
+
+COMMAND_NAMES = {
+    CMD_GET: "Get", CMD_GET_ID: "Get ID", CMD_READ: "Read Memory",
+    CMD_GO: "Go", CMD_WRITE: "Write Memory", CMD_ERASE: "Erase",
+    CMD_EXTENDED_ERASE: "Extended Erase",
+}
+
+# Command byte followed by its complement
+COMMAND_FRAMES = {cmd: bytes((cmd, cmd ^ 0xFF)) for cmd in COMMAND_NAMES}
+
+# Largest read or write of one command
+BLOCK_SIZE = 256
+
+# Special erase codes (with checksum): whole flash
+_EXTENDED_MASS_ERASE = b"\xff\xff\x00"
+_LEGACY_MASS_ERASE = b"\xff\x00"
+
+# Pages per legacy Erase command (the count is a single byte)
+_LEGACY_ERASE_BATCH = 255
+
+# Seconds to wait for the answer to one sync byte (a byte takes 9 ms at
+# 1200 baud; USB adapters add a few ms)
+SYNC_TIMEOUT = 0.1
+
+# Seconds to wait for erase acknowledgement: per page (F4/F7 sectors of
+# 128 KB take up to 2 s) and for a mass erase
+PAGE_ERASE_TIMEOUT = 2.0
+MASS_ERASE_TIMEOUT = 40.0
+
+# Progress callback: bytes transferred so far
+BlockCallback = Callable[[int], None]
+
+
+class BootloaderError(Exception):
+    """Raised when the bootloader rejects a command or answers garbage"""
+
+
+class BootloaderTimeout(BootloaderError):
+    """Raised when the bootloader does not answer in time"""
+
+
+class BootloaderNack(BootloaderError):
+    """Raised when the bootloader rejects a command with NACK"""
+
+
+def address_checksum(address: int) -> int:
+    """XOR of the four big-endian address bytes"""
+    return (address ^ (address >> 8) ^ (address >> 16) ^ (address >> 24)) & 0xFF
+
+
+class SerialPort:
+    """Serial device in raw 8E1 mode, driven through termios (POSIX only)"""
+
+    def __init__(self, path: str, baudrate: int = 115200):
+        """
+        Open and configure a serial device
+
+        Args:
+            path: Device path (e.g. /dev/ttyUSB0)
+            baudrate: Line rate in baud
+
+        Raises:
+            BootloaderError: If termios is unavailable or the rate unsupported
+            OSError: If the device cannot be opened
+        """
+        try:
+            import termios  # noqa: F401 - POSIX only
+        except ImportError:
+            raise BootloaderError("Native UART programming needs a POSIX "
+                                  "serial port (termios)")
+        self.path = path
+        self.baudrate = baudrate
+        # O_NONBLOCK: do not wait for carrier detect while opening
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            import fcntl
+            flags = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+            fcntl.fcntl(self.fd, fcntl.F_SETFL, flags & ~os.O_NONBLOCK)
+            self.set_baudrate(baudrate)
+        except Exception:
+            os.close(self.fd)
+            raise
+
+    def set_baudrate(self, baudrate: int) -> None:
+        """
+        Switch the line to raw 8 data bits, even parity, 1 stop bit at a rate
+
+        Args:
+            baudrate: Line rate in baud
+
+        Raises:
+            BootloaderError: If the platform has no termios constant for it
+        """
+        import termios
+        speed = getattr(termios, f"B{baudrate}", None)
+        if speed is None:
+            raise BootloaderError(f"Unsupported baudrate {baudrate}")
+        attrs = termios.tcgetattr(self.fd)
+        # Clear flags one by one: the speed bits in cflag stay consistent
+        attrs[0] &= ~(termios.IGNBRK | termios.BRKINT | termios.PARMRK |  # iflag
+                      termios.ISTRIP | termios.INLCR | termios.IGNCR |
+                      termios.ICRNL | termios.IXON | termios.IXOFF |
+                      termios.IXANY | termios.INPCK)
+        attrs[1] &= ~termios.OPOST                                         # oflag
+        attrs[2] &= ~(termios.CSIZE | termios.PARODD | termios.CSTOPB |    # cflag: 8E1
+                      getattr(termios, "CRTSCTS", 0))
+        attrs[2] |= termios.CS8 | termios.PARENB | termios.CREAD | termios.CLOCAL
+        attrs[3] &= ~(termios.ICANON | termios.ECHO | termios.ECHOE |      # lflag: raw
+                      termios.ECHOK | termios.ECHONL | termios.ISIG |
+                      termios.IEXTEN)
+        attrs[4] = attrs[5] = speed
+        attrs[6][termios.VMIN] = 0
+        attrs[6][termios.VTIME] = 0
+        try:
+            termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+        except termios.error:
+            # Pseudo-terminals (the simulator) may refuse parity
+            attrs[2] &= ~termios.PARENB
+            termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+        self.baudrate = baudrate
+        self.flush_input()
+
+    def write(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        """Write all of data"""
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def read_into(self, buffer: memoryview, timeout: float) -> None:
+        """
+        Fill buffer from the line
+
+        Args:
+            buffer: Writable view to fill completely
+            timeout: Seconds to wait for all bytes
+
+        Raises:
+            BootloaderTimeout: If fewer bytes arrived in time
+        """
+        deadline = time.monotonic() + timeout
+        filled = 0
+        while filled < len(buffer):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                raise BootloaderTimeout(
+                    f"No answer from bootloader on {self.path} at {self.baudrate} "
+                    f"baud ({filled} of {len(buffer)} bytes)")
+            count = os.readv(self.fd, [buffer[filled:]])
+            if count == 0:
+                raise BootloaderError(f"{self.path} closed")
+            filled += count
+
+    def flush_input(self) -> None:
+        """Discard bytes received but not read"""
+        import termios
+        termios.tcflush(self.fd, termios.TCIFLUSH)
+
+    def close(self) -> None:
+        """Close the device"""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class UartBootloader:
+    """Client of the STM32 USART bootloader protocol (AN3155)"""
+
+    def __init__(self, port: SerialPort, timeout: float = 1.0,
+                 pipeline: bool = True):
+        """
+        Initialize client
+
+        Args:
+            port: Open serial port
+            timeout: Seconds to wait for an acknowledgement
+            pipeline: Send the command, address and data of a block in one
+                write and collect the acknowledgements afterwards. The
+                bootloader polls its USART while it parses a command, so
+                the frames queue up behind each other; only the next block
+                waits for the flash write to finish
+        """
+        self.port = port
+        self.timeout = timeout
+        self.pipeline = pipeline
+        self.version: Optional[int] = None
+        self.commands = b""
+        self.pid: Optional[int] = None
+        self.round_trips = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+        # Pre-built frames: only address, length, data and checksum change
+        # between blocks
+        self._read_frame = bytearray(COMMAND_FRAMES[CMD_READ] + bytes(5 + 2))
+        self._write_frame = bytearray(COMMAND_FRAMES[CMD_WRITE] + bytes(5 + 1 + BLOCK_SIZE + 1))
+        self._go_frame = bytearray(COMMAND_FRAMES[CMD_GO] + bytes(5))
+        self._rx = bytearray(BLOCK_SIZE + 3)
+        self._rx_view = memoryview(self._rx)
+
+    @classmethod
+    def open(cls, path: str, baudrate: int = 115200, **kwargs) -> "UartBootloader":
+        """
+        Open a serial device and wrap it in a client
+
+        Args:
+            path: Device path (e.g. /dev/ttyUSB0)
+            baudrate: Line rate in baud
+            **kwargs: Passed to UartBootloader()
+
+        Returns:
+            Client (not yet connected, see connect())
+        """
+        return cls(SerialPort(path, baudrate), **kwargs)
+
+    def close(self) -> None:
+        """Close the serial port"""
+        self.port.close()
+
+    def __enter__(self) -> "UartBootloader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def extended_erase(self) -> bool:
+        """Whether the bootloader erases with Extended Erase (v3.0 and later)"""
+        return CMD_EXTENDED_ERASE in self.commands or CMD_ERASE not in self.commands
+
+    def describe(self) -> str:
+        """One-line summary of the connected bootloader"""
+        version = f"v{self.version >> 4}.{self.version & 0xF}" if self.version is not None else "v?"
+        pid = f"0x{self.pid:03X}" if self.pid is not None else "?"
+        return f"Bootloader {version}, PID {pid}, {self.port.baudrate} baud"
+
+    def connect(self, attempts: int = 5) -> None:
+        """
+        Synchronize with the bootloader and read its version, commands and ID
+
+        The first 0x7F after reset sets the bootloader's baudrate. A
+        bootloader that is already synchronized takes 0x7F as the start of
+        a command and answers NACK once another 0x7F completes it, so a
+        sync byte that stays unanswered is followed by another after
+        SYNC_TIMEOUT.
+
+        Args:
+            attempts: Sync bytes sent before giving up
+
+        Raises:
+            BootloaderTimeout: If nothing answers
+            BootloaderError: If the answer is not ACK or NACK
+        """
+        self.port.flush_input()
+        for _ in range(attempts):
+            self._send(bytes((SYNC,)))
+            try:
+                reply = self._read(1, SYNC_TIMEOUT)[0]
+            except BootloaderTimeout:
+                continue
+            if reply not in (ACK, NACK):
+                raise BootloaderError(f"Unexpected sync reply 0x{reply:02X} "
+                                      f"(wrong baudrate or not in bootloader mode?)")
+            break
+        else:
+            raise BootloaderTimeout(f"No bootloader answering on {self.port.path} "
+                                    f"at {self.port.baudrate} baud")
+        self.get()
+        self.get_id()
+
+    def _read(self, count: int, timeout: Optional[float] = None) -> memoryview:
+        """Read count bytes into the reused receive buffer"""
+        view = self._rx_view[:count]
+        self.port.read_into(view, self.timeout if timeout is None else timeout)
+        return view
+
+    def _expect_acks(self, what: str, count: int = 1,
+                     timeout: Optional[float] = None) -> None:
+        """Read count replies and require every one to be ACK"""
+        for reply in self._read(count, timeout):
+            if reply == NACK:
+                self._resync()
+                raise BootloaderNack(f"{what} rejected (NACK)")
+            if reply != ACK:
+                self._resync()
+                raise BootloaderError(f"{what}: unexpected reply 0x{reply:02X}")
+
+    def _resync(self) -> None:
+        """Drop replies to frames the bootloader rejected mid-pipeline"""
+        time.sleep(0.05)
+        self.port.flush_input()
+
+    def _send(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        """Write bytes the bootloader answers"""
+        self.port.write(data)
+        self.round_trips += 1
+
+    def _command(self, cmd: int) -> None:
+        """Send a command frame and wait for its ACK"""
+        self._send(COMMAND_FRAMES[cmd])
+        self._expect_acks(COMMAND_NAMES[cmd])
+
+    @staticmethod
+    def _put_address(frame: bytearray, offset: int, address: int) -> None:
+        struct.pack_into(">I", frame, offset, address)
+        frame[offset + 4] = address_checksum(address)
+
+    def _send_staged(self, frame: memoryview, stages: List[int], what: str,
+                     last_timeout: Optional[float] = None) -> None:
+        """
+        Send a frame made of stages that are each acknowledged
+
+        Args:
+            frame: Command frame followed by its argument frames
+            stages: End offset of every acknowledged part
+            what: Command name for error messages
+            last_timeout: Timeout of the final acknowledgement
+        """
+        if self.pipeline:
+            self._send(frame[:stages[-1]])
+            if len(stages) > 1:
+                self._expect_acks(what, len(stages) - 1)
+            self._expect_acks(what, 1, last_timeout)
+            return
+        start = 0
+        for index, end in enumerate(stages):
+            self._send(frame[start:end])
+            self._expect_acks(what, 1, last_timeout if index == len(stages) - 1 else None)
+            start = end
+
+    def get(self) -> bytes:
+        """
+        Get: bootloader version and supported commands
+
+        Returns:
+            Supported command codes
+        """
+        self._command(CMD_GET)
+        count = self._read(1)[0] + 1
+        data = bytes(self._read(count))
+        self._expect_acks("Get")
+        self.version, self.commands = data[0], data[1:]
+        return self.commands
+
+    def get_id(self) -> int:
+        """
+        Get ID: product ID of the part (0x410 for STM32F10x medium density)
+
+        Returns:
+            Product ID
+        """
+        self._command(CMD_GET_ID)
+        count = self._read(1)[0] + 1
+        data = bytes(self._read(count))
+        self._expect_acks("Get ID")
+        self.pid = int.from_bytes(data[:2], "big")
+        return self.pid
+
+    def read_block(self, address: int, size: int) -> memoryview:
+        """
+        Read Memory: up to BLOCK_SIZE bytes in one round trip
+
+        Args:
+            address: Start address
+            size: 1..256 bytes
+
+        Returns:
+            View of the reused receive buffer (valid until the next call)
+        """
+        frame = self._read_frame
+        self._put_address(frame, 2, address)
+        frame[7] = size - 1
+        frame[8] = (size - 1) ^ 0xFF
+        self._send_staged(memoryview(frame), [2, 7, 9], "Read Memory")
+        data = self._read(size)
+        self.bytes_read += size
+        return data
+
+    def read(self, address: int, size: int,
+             progress: Optional[BlockCallback] = None) -> bytes:
+        """
+        Read any amount of memory block by block
+
+        Args:
+            address: Start address
+            size: Bytes to read
+            progress: Called with the bytes read so far after every block
+
+        Returns:
+            Memory contents
+        """
+        out = bytearray(size)
+        view = memoryview(out)
+        for offset in range(0, size, BLOCK_SIZE):
+            count = min(BLOCK_SIZE, size - offset)
+            view[offset:offset + count] = self.read_block(address + offset, count)
+            if progress is not None:
+                progress(offset + count)
+        return bytes(out)
+
+    def write_block(self, address: int, data: Union[bytes, memoryview]) -> None:
+        """
+        Write Memory: up to BLOCK_SIZE bytes in one round trip
+
+        The target must be erased: the bootloader does not erase on write.
+
+        Args:
+            address: Start address
+            data: 1..256 bytes, a multiple of 4
+        """
+        size = len(data)
+        frame = self._write_frame
+        self._put_address(frame, 2, address)
+        frame[7] = size - 1
+        frame[8:8 + size] = data
+        frame[8 + size] = reduce(xor, data, size - 1)
+        self._send_staged(memoryview(frame), [2, 7, 9 + size], "Write Memory")
+        self.bytes_written += size
+
+    def write(self, address: int, data: Union[bytes, bytearray, memoryview],
+              progress: Optional[BlockCallback] = None) -> None:
+        """
+        Write any amount of data block by block
+
+        A tail that is not a multiple of 4 bytes is padded with 0xFF.
+
+        Args:
+            address: Start address
+            data: Bytes to program
+            progress: Called with the bytes written so far after every block
+        """
+        if len(data) % 4:
+            data = bytes(data) + b"\xff" * (4 - len(data) % 4)
+        view = memoryview(data)
+        for offset in range(0, len(view), BLOCK_SIZE):
+            block = view[offset:offset + BLOCK_SIZE]
+            self.write_block(address + offset, block)
+            if progress is not None:
+                progress(offset + len(block))
+
+    def erase(self, pages: Optional[Iterable[int]] = None) -> None:
+        """
+        Erase flash pages (sectors), or the whole flash
+
+        Uses Extended Erase when the bootloader has it, the legacy Erase
+        command otherwise.
+
+        Args:
+            pages: Page numbers, or None for a mass erase
+        """
+        if pages is None:
+            cmd = CMD_EXTENDED_ERASE if self.extended_erase else CMD_ERASE
+            self._command(cmd)
+            self._send(_EXTENDED_MASS_ERASE if self.extended_erase else _LEGACY_MASS_ERASE)
+            self._expect_acks("Mass erase", timeout=MASS_ERASE_TIMEOUT)
+            return
+
+        pages = list(pages)
+        if not pages:
+            return
+        if self.extended_erase:
+            batches = [pages]
+        else:
+            if max(pages) > 0xFF:
+                raise BootloaderError(f"Page {max(pages)} needs Extended Erase")
+            batches = [pages[i:i + _LEGACY_ERASE_BATCH]
+                       for i in range(0, len(pages), _LEGACY_ERASE_BATCH)]
+        for batch in batches:
+            if self.extended_erase:
+                frame = struct.pack(f">H{len(batch)}H", len(batch) - 1, *batch)
+                cmd = CMD_EXTENDED_ERASE
+            else:
+                frame = bytes((len(batch) - 1, *batch))
+                cmd = CMD_ERASE
+            self._command(cmd)
+            self._send(frame + bytes((reduce(xor, frame, 0),)))
+            self._expect_acks(COMMAND_NAMES[cmd],
+                              timeout=self.timeout + PAGE_ERASE_TIMEOUT * len(batch))
+
+    def go(self, address: int) -> None:
+        """
+        Go: leave the bootloader and start the code whose vector table is at address
+
+        Args:
+            address: Vector table address (usually the flash base)
+        """
+        self._put_address(self._go_frame, 2, address)
+        self._send_staged(memoryview(self._go_frame), [2, 7], "Go")
@@ -0,0 +1,204 @@
+"""
+UART Baudrate Negotiation - Fastest reliable bootloader baudrate per adapter
+Connects to the USART bootloader from the fastest rate down, stepping to the
+next slower one on NACKs, timeouts or a read-back mismatch, and remembers
+the fastest rate that worked in the settings store. Read-protected parts,
+which NACK Read Memory, are checked with Get and Get ID instead
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Optional, List, Sequence
+
+from ..config.settings import SettingsManager
+from .uart_bootloader import UartBootloader, BootloaderError, BootloaderNack
+
+# Rates tried, fastest first. The bootloader measures the rate on the sync
+# byte; FTDI, CP210x and CH340 adapters reach 921600 on short wiring
+UART_BAUDRATES = (921600, 460800, 230400, 115200, 57600, 38400, 19200, 9600)
+
+# Bytes read twice from the flash base to check a rate and measure it
+PROBE_SIZE = 1024
+
+# Seconds the port stays closed between attempts: closing drops DTR, which
+# resets the target on adapters wired DTR to NRST (and BOOT0 held high)
+RESET_DELAY = 0.05
+
+_BY_ID = Path("/dev/serial/by-id")
+
+
+def adapter_id(path: str) -> str:
+    """
+    Stable name of the serial adapter behind a device path
+
+    /dev/ttyUSB0 names whichever adapter was plugged in first; the udev
+    link in /dev/serial/by-id carries the adapter's USB serial number.
+
+    Args:
+        path: Serial device path
+
+    Returns:
+        by-id link name if one points at the device, otherwise path
+    """
+    try:
+        device = os.path.realpath(path)
+        for link in _BY_ID.iterdir():
+            if os.path.realpath(link) == device:
+                return link.name
+    except OSError:
+        pass
+    return path
+
+
+class BaudrateTuner:
+    """Connect to a UART bootloader at the fastest rate the link sustains"""
+
+    def __init__(self, programmer, settings: Optional[SettingsManager] = None,
+                 baudrates: Sequence[int] = UART_BAUDRATES,
+                 retune: bool = False):
+        """
+        Initialize tuner
+
+        Args:
+            programmer: STM32Programmer whose serial port is tuned
+            settings: Settings store holding the remembered rates
+            baudrates: Candidate rates, fastest first
+            retune: Start from the fastest rate instead of the remembered one
+        """
+        self.programmer = programmer
+        self.settings = settings or SettingsManager()
+        self.baudrates = sorted(baudrates, reverse=True)
+        self.retune = retune
+        self.adapter = adapter_id(programmer.config.serial_port)
+        self.baudrate: Optional[int] = None      # Rate of the last success
+        self.throughput: Optional[float] = None  # Probe read speed in bytes/s
+
+    @property
+    def remembered(self) -> Optional[int]:
+        """Stored rate for the programmer's adapter and chip"""
+        return self.settings.uart_baudrate(self.adapter, self.programmer.config.chip)
+
+    def candidates(self) -> List[int]:
+        """Rates to try, in order"""
+        start = None if self.retune else self.remembered
+        if start is None:
+            return list(self.baudrates)
+        return [start] + [b for b in self.baudrates if b < start]
+
+    def probe(self, bootloader: UartBootloader) -> float:
+        """
+        Check a connected link by reading the same flash twice
+
+        Bytes from the bootloader carry no checksum, so only a second copy
+        reveals bits flipped on the way to the host. Under read protection
+        (RDP level 1) Read Memory is NACKed, and the Get and Get ID replies
+        are compared instead (see probe_identity()).
+
+        Args:
+            bootloader: Connected client
+
+        Returns:
+            Read throughput in bytes/s
+
+        Raises:
+            BootloaderError: If a command fails or the copies differ
+        """
+        address = self.programmer.config.flash_start
+        # One block unpipelined first: after a NACKed command the bootloader
+        # would take a pipelined address frame for further commands
+        pipeline, bootloader.pipeline = bootloader.pipeline, False
+        try:
+            bootloader.read_block(address, 4)
+        except BootloaderNack:
+            if not getattr(self, "_warned_protected", False):
+                self._warned_protected = True
+                print(f"[WARNING] Read Memory rejected (read protection?): "
+                      f"checking the link with Get and Get ID")
+            return self.probe_identity(bootloader)
+        finally:
+            bootloader.pipeline = pipeline
+        start = time.perf_counter()
+        first = bootloader.read(address, PROBE_SIZE)
+        second = bootloader.read(address, PROBE_SIZE)
+        elapsed = time.perf_counter() - start
+        if first != second:
+            raise BootloaderError(f"Read-back mismatch at {bootloader.port.baudrate} baud")
+        return 2 * PROBE_SIZE / elapsed
+
+    def probe_identity(self, bootloader: UartBootloader) -> float:
+        """
+        Check a connected link by repeating Get and Get ID twice
+
+        Both replies must match what connect() received. They are only a
+        few bytes long, so a marginal rate is less likely to show up than
+        with probe().
+
+        Args:
+            bootloader: Connected client
+
+        Returns:
+            Reply throughput in bytes/s
+
+        Raises:
+            BootloaderError: If a command fails or a reply differs
+        """
+        expected = (bootloader.version, bytes(bootloader.commands), bootloader.pid)
+        received = 0
+        start = time.perf_counter()
+        for _ in range(2):
+            commands = bootloader.get()
+            pid = bootloader.get_id()
+            if (bootloader.version, bytes(commands), pid) != expected:
+                raise BootloaderError(f"Get/Get ID mismatch at {bootloader.port.baudrate} baud")
+            # ACK, count, version, commands, ACK; ACK, count, PID, ACK
+            received += len(commands) + 4 + 5
+        return received / (time.perf_counter() - start)
+
+    def connect(self) -> UartBootloader:
+        """
+        Open the serial port at the fastest reliable rate
+
+        Every attempt reopens the port, so an adapter that resets the
+        target on DTR hands each rate a bootloader waiting for its sync
+        byte. Without that wiring the bootloader keeps the rate it locked
+        onto first, and the search ends at that rate.
+
+        Returns:
+            Connected client at the chosen rate
+
+        Raises:
+            BootloaderError: If no rate works
+            OSError: If the serial port cannot be opened
+        """
+        config = self.programmer.config
+        remembered = self.remembered
+        candidates = self.candidates()
+        for index, baudrate in enumerate(candidates):
+            if index:
+                time.sleep(RESET_DELAY)
+            bootloader = None
+            try:
+                bootloader = UartBootloader.open(config.serial_port, baudrate,
+                                                 pipeline=config.uart_pipeline)
+                bootloader.connect()
+                throughput = self.probe(bootloader)
+            except BootloaderError as e:
+                if bootloader is not None:
+                    bootloader.close()
+                if index + 1 < len(candidates):
+                    print(f"[WARNING] {e}; retrying at {candidates[index + 1]} baud")
+                continue
+            except BaseException:
+                if bootloader is not None:
+                    bootloader.close()
+                raise
+
+            self.baudrate = baudrate
+            self.throughput = throughput
+            print(f"[INFO] UART link at {baudrate} baud: {throughput / 1024:.1f} KB/s read")
+            if baudrate != remembered:
+                self.settings.remember_uart_baudrate(self.adapter, config.chip, baudrate)
+                print(f"[INFO] Remembered {baudrate} baud for {self.adapter}/{config.chip}")
+            return bootloader
+        raise BootloaderError(f"No reliable baudrate found on {config.serial_port}")
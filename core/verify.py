@@ -0,0 +1,292 @@
+"""
+Verification - Check programmed flash without a full tool read-back
+Compares host-computed STM32 CRC32 values against checksums computed by the
+device's CRC unit, falling back to chunked read-back comparison
+"""
+
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional, List, Tuple
+
+from .flash_layout import FlashLayout, layout_for_chip
+from .chip_db import lookup_chip
+from .image import FirmwareImage
+
+CRC32_INIT = 0xFFFFFFFF
+
+# Byte -> byte with its bit order reversed
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+def _reverse32(value: int) -> int:
+    return int(f"{value:032b}"[::-1], 2)
+
+
+def stm32_crc32(data: bytes, crc: int = CRC32_INIT) -> int:
+    """
+    CRC32 as computed by the STM32 CRC peripheral
+
+    Polynomial 0x04C11DB7, initial value 0xFFFFFFFF, no reflection and no
+    final XOR, fed one little-endian 32-bit word at a time (the way a DMA
+    transfer of flash words into CRC_DR sees memory). Data that is not a
+    multiple of 4 bytes is padded with 0xFF, the erased flash value.
+
+    Args:
+        data: Bytes as laid out in memory
+        crc: Running CRC value to continue from
+
+    Returns:
+        CRC32 value
+    """
+    if len(data) % 4:
+        data = bytes(data) + b"\xff" * (4 - len(data) % 4)
+
+    # Put each word most significant byte first, then reverse the bits of
+    # every byte so zlib's reflected CRC32 walks the bits MSB first
+    swapped = bytearray(len(data))
+    swapped[0::4] = data[3::4]
+    swapped[1::4] = data[2::4]
+    swapped[2::4] = data[1::4]
+    swapped[3::4] = data[0::4]
+    reflected = zlib.crc32(bytes(swapped).translate(_BIT_REVERSE),
+                           _reverse32(crc) ^ 0xFFFFFFFF)
+    return _reverse32(reflected ^ 0xFFFFFFFF)
+
+
+# STM32F0/F1/F3 register map used to drive the CRC unit from DMA
+RCC_AHBENR = 0x40021014
+RCC_AHBENR_RESET = 0x00000014   # SRAM + FLITF clocks
+RCC_AHBENR_DMA1EN = 1 << 0
+RCC_AHBENR_CRCEN = 1 << 6
+
+CRC_DR = 0x40023000
+CRC_CR = 0x40023008
+CRC_CR_RESET = 1 << 0
+
+DMA1_ISR = 0x40020000
+DMA1_IFCR = 0x40020004
+DMA1_CCR1 = 0x40020008
+DMA1_CNDTR1 = 0x4002000C
+DMA1_CPAR1 = 0x40020010
+DMA1_CMAR1 = 0x40020014
+DMA_ISR_TCIF1 = 1 << 1
+DMA_ISR_TEIF1 = 1 << 3
+DMA_IFCR_CLEAR1 = 0xF
+
+# MEM2MEM | MSIZE=32 | PSIZE=32 | MINC | DIR=read from memory | EN
+DMA_CCR_MEM2MEM_CRC = (1 << 14) | (2 << 10) | (2 << 8) | (1 << 7) | (1 << 4) | 1
+DMA_MAX_TRANSFER = 0xFFFF
+
+def supports_dma_crc(chip: str) -> bool:
+    """
+    True if the chip's CRC unit can be fed from flash by DMA1 channel 1
+
+    The chip database marks the families (F0, F1, F3) whose CRC/DMA1/RCC
+    blocks sit at the addresses above.
+    """
+    info = lookup_chip(chip)
+    return info is not None and info.dma_crc
+
+
+def dma_crc_writes(address: int, size: int) -> List[Tuple[int, int]]:
+    """
+    Register writes that make the device CRC a flash region
+
+    The clocks must already be enabled. After the last write completes,
+    CRC_DR holds stm32_crc32(region).
+
+    Args:
+        address: Word-aligned region start
+        size: Region size in bytes (multiple of 4)
+
+    Returns:
+        List of (register address, value) in order
+    """
+    writes = [(CRC_CR, CRC_CR_RESET)]
+    words = size // 4
+    while words:
+        count = min(words, DMA_MAX_TRANSFER)
+        writes += [
+            (DMA1_CCR1, 0),
+            (DMA1_IFCR, DMA_IFCR_CLEAR1),
+            (DMA1_CPAR1, CRC_DR),
+            (DMA1_CMAR1, address),
+            (DMA1_CNDTR1, count),
+            (DMA1_CCR1, DMA_CCR_MEM2MEM_CRC),
+        ]
+        address += count * 4
+        words -= count
+    writes.append((DMA1_CCR1, 0))
+    return writes
+
+
+@dataclass
+class VerifyRegion:
+    """Part of one flash sector covered by the image"""
+    sector: int           # Sector start address
+    address: int          # Word-aligned region start
+    data: bytes           # Expected contents (word padded with 0xFF)
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+@dataclass
+class VerifyReport:
+    """Outcome of a verification"""
+    success: bool = False
+    method: str = "crc"  # crc, readback
+    regions_checked: int = 0
+    bytes_checked: int = 0
+    mismatched_sectors: List[int] = field(default_factory=list)
+    duration: float = 0.0
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        text = (f"{self.regions_checked} region(s), {self.bytes_checked} bytes "
+                f"checked by {self.method} in {self.duration:.2f}s")
+        if self.mismatched_sectors:
+            text += ", mismatched sectors: " + ", ".join(
+                hex(s) for s in self.mismatched_sectors)
+        return text
+
+
+class Verifier:
+    """Verify flash contents against an image"""
+
+    def __init__(self, programmer, layout: Optional[FlashLayout] = None,
+                 chunk_size: int = 64 * 1024):
+        """
+        Initialize verifier
+
+        Args:
+            programmer: STM32Programmer connected to the device
+            layout: Flash geometry (default: from the programmer's chip;
+                parts missing from the chip database are split into
+                chunk_size blocks)
+            chunk_size: Bytes per read-back request in fallback mode
+        """
+        self.programmer = programmer
+        self.layout = layout or layout_for_chip(programmer.config.chip)
+        self.chunk_size = chunk_size
+
+    def regions(self, image: FirmwareImage) -> List[VerifyRegion]:
+        """
+        Split the image into per-sector, word-aligned regions
+
+        Args:
+            image: Programmed image
+
+        Returns:
+            Regions in address order
+        """
+        layout = self.layout
+        if layout is None:
+            start, end = image.start or 0, image.end or 0
+            layout = FlashLayout(start, [self.chunk_size] * -(-(end - start) // self.chunk_size))
+        regions = []
+        for segment in image.segments:
+            for _, sector_start, sector_size in layout.sectors_in_range(
+                    segment.address, segment.end):
+                start = max(segment.address, sector_start) & ~3
+                end = min(segment.end, sector_start + sector_size)
+                end = min((end + 3) & ~3, sector_start + sector_size)
+                data = image.read(start, end - start)
+                if regions and regions[-1].sector == sector_start \
+                        and regions[-1].address + regions[-1].size >= start:
+                    # Two segments share a sector: merge into one region
+                    prev = regions[-1]
+                    merged_end = max(prev.address + prev.size, end)
+                    regions[-1] = VerifyRegion(sector_start, prev.address,
+                                               image.read(prev.address,
+                                                          merged_end - prev.address))
+                else:
+                    regions.append(VerifyRegion(sector_start, start, data))
+        return regions
+
+    def verify(self, image: FirmwareImage, method: str = "auto") -> VerifyReport:
+        """
+        Verify the device holds the image
+
+        Args:
+            image: Programmed image
+            method: "crc" (device CRC only), "readback", or "auto" (CRC,
+                    falling back to read-back when the device cannot
+                    compute checksums)
+
+        Returns:
+            VerifyReport
+        """
+        start = time.monotonic()
+        regions = self.regions(image)
+        report = None
+
+        if method in ("auto", "crc"):
+            report = self._verify_crc(regions)
+            if report is None:
+                if method == "crc":
+                    print("[ERROR] ✗ Device-side CRC is not available")
+                    report = VerifyReport(method="crc")
+                else:
+                    print("[INFO] Device-side CRC not available, "
+                          "falling back to read-back compare")
+        if report is None:
+            report = self._verify_readback(regions)
+
+        report.duration = time.monotonic() - start
+        return report
+
+    def _verify_crc(self, regions: List[VerifyRegion]) -> Optional[VerifyReport]:
+        """Compare host CRCs with device CRCs; None if unsupported"""
+        device = self.programmer.device_crc32([(r.address, r.size) for r in regions])
+        if device is None:
+            return None
+
+        report = VerifyReport(method="crc", regions_checked=len(regions))
+        for region, device_crc in zip(regions, device):
+            report.bytes_checked += region.size
+            if stm32_crc32(region.data) != device_crc:
+                report.mismatched_sectors.append(region.sector)
+        report.success = not report.mismatched_sectors
+        return report
+
+    def _verify_readback(self, regions: List[VerifyRegion]) -> VerifyReport:
+        """Read the regions back in chunks, stopping at the first mismatch"""
+        report = VerifyReport(method="readback")
+        for batch in self._batches(regions):
+            first = batch[0].address
+            last = batch[-1].address + batch[-1].size
+            device = self.programmer.read_bytes(first, last - first)
+            if device is None or len(device) != last - first:
+                print(f"[ERROR] ✗ Read-back of {hex(first)}-{hex(last)} failed")
+                report.mismatched_sectors.extend(r.sector for r in batch)
+                return report
+
+            view = memoryview(device)
+            for region in batch:
+                offset = region.address - first
+                report.regions_checked += 1
+                report.bytes_checked += region.size
+                if view[offset:offset + region.size] != region.data:
+                    report.mismatched_sectors.append(region.sector)
+            if report.mismatched_sectors:
+                return report
+
+        report.success = True
+        return report
+
+    def _batches(self, regions: List[VerifyRegion]) -> List[List[VerifyRegion]]:
+        """Group adjacent regions into reads of at most chunk_size bytes"""
+        batches = []
+        for region in regions:
+            if batches:
+                batch = batches[-1]
+                span = region.address + region.size - batch[0].address
+                contiguous = batch[-1].address + batch[-1].size == region.address
+                if contiguous and span <= self.chunk_size:
+                    batch.append(region)
+                    continue
+            batches.append([region])
+        return batches
@@ -0,0 +1,114 @@
+"""
+Write Planning - Skip erased-state bytes when programming an image
+Drops 0xFF runs that land in sectors erased anyway and splits writes at
+blank sectors and segment gaps, aligned to the chip's write granularity
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Tuple, Dict
+
+from .erase_plan import ErasePlan
+from .flash_layout import FlashLayout
+from .image import FirmwareImage, ERASED
+
+_BLANK = bytes([ERASED])
+
+
+@dataclass
+class WritePlan:
+    """Regions to write and blank sectors to erase instead of writing"""
+    layout: FlashLayout
+    regions: List[Tuple[int, bytes]] = field(default_factory=list)
+    blank_sectors: List[int] = field(default_factory=list)
+    image_bytes: int = 0
+
+    @property
+    def bytes_written(self) -> int:
+        return sum(len(data) for _, data in self.regions)
+
+    @property
+    def bytes_avoided(self) -> int:
+        """Image bytes not sent to the device"""
+        return max(self.image_bytes - self.bytes_written, 0)
+
+    def erase_plan(self) -> ErasePlan:
+        """Blank sectors, which no region touches and the tool won't erase"""
+        return ErasePlan(self.layout, list(self.blank_sectors))
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        text = (f"{len(self.regions)} region(s), {self.bytes_written} of "
+                f"{self.image_bytes} bytes written, {self.bytes_avoided} avoided")
+        if self.blank_sectors:
+            text += f", {len(self.blank_sectors)} blank sector(s) erased only"
+        return text
+
+
+def _align_down(value: int, step: int) -> int:
+    return value - value % step
+
+
+def _align_up(value: int, step: int) -> int:
+    return -(-value // step) * step
+
+
+def plan_writes(image: FirmwareImage, layout: FlashLayout,
+                write_size: int = 8, min_gap: int = 256) -> WritePlan:
+    """
+    Plan the writes that leave the device holding image
+
+    Every sector a region touches is erased by the tool before writing, so
+    0xFF bytes at the ends of a region need not be written. Regions only
+    split between sectors: the tools erase per write command, and a sector
+    shared by two commands would be erased twice.
+
+    Args:
+        image: Parsed firmware image
+        layout: Flash sector layout
+        write_size: Programming granularity; region ends are aligned to it
+        min_gap: Smallest 0xFF/gap run across a sector boundary worth
+            splitting a region for
+
+    Returns:
+        WritePlan (regions in address order)
+    """
+    plan = WritePlan(layout, image_bytes=image.size)
+
+    # Per sector: first and last+1 address of non-0xFF image data
+    used: Dict[int, List[int]] = {}
+    touched = set()
+    for segment in image.segments:
+        view = memoryview(segment.data)
+        for index, start, size in layout.sectors_in_range(segment.address, segment.end):
+            lo = max(start, segment.address)
+            hi = min(start + size, segment.end)
+            touched.add(index)
+            data = bytes(view[lo - segment.address:hi - segment.address])
+            head = len(data) - len(data.lstrip(_BLANK))
+            if head == len(data):
+                continue
+            tail = len(data.rstrip(_BLANK))
+            bounds = used.setdefault(index, [lo + head, lo + tail])
+            bounds[0] = min(bounds[0], lo + head)
+            bounds[1] = max(bounds[1], lo + tail)
+
+    plan.blank_sectors = sorted(touched - set(used))
+
+    groups: List[List[int]] = []
+    previous = None
+    for index in sorted(used):
+        first, last = used[index]
+        if (previous is not None and index == previous + 1
+                and first - used[previous][1] < min_gap):
+            groups[-1][1] = last
+            groups[-1][3] = index
+        else:
+            groups.append([first, last, index, index])
+        previous = index
+
+    for first, last, first_sector, last_sector in groups:
+        lo = max(_align_down(first, write_size), layout.sector_start(first_sector))
+        hi = min(_align_up(last, write_size),
+                 layout.sector_start(last_sector) + layout.sector_sizes[last_sector])
+        plan.regions.append((lo, image.read(lo, hi - lo)))
+    return plan
@@ -0,0 +1,7 @@
+"""Hardware-free simulators and fake tool backends for STM32 Programmer"""
+
+__all__ = ["SimulatedTarget", "FakeOpenOCD", "FakeOpenOCDServer", "SimulatedBootloader"]
+
+from .target import SimulatedTarget
+from .fake_openocd import FakeOpenOCD, FakeOpenOCDServer
+from .fake_bootloader import SimulatedBootloader
@@ -0,0 +1,555 @@
+"""
+Benchmarks - Measure the Python layer around the external tools
+Runs STM32Programmer, STM32Builder and STM32Deployer against the fake
+STM32_Programmer_CLI, openocd and make backends and a simulated flash
+target with configurable timings, and emits the results as JSON
+
+Usage: python -m utils.stm32Programmer.sim.benchmark [--output results.json]
+                                                     [--compare baseline.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Callable
+
+from .. import __version__
+from ..core.build_cache import BuildCache
+from ..core.build_scheduler import BuildScheduler
+from ..core.builder import STM32Builder
+from ..core.deployer import STM32Deployer
+from ..core.gang import GangProgrammer
+from ..core.memory_map import MemoryMap
+from ..core.programmer import STM32Programmer, STM32Config
+from ..core.tool_discovery import ToolDiscoveryCache
+from .fake_bootloader import SimulatedBootloader
+from .fake_make import firmware_bytes, write_map, synthetic_objects
+from .fake_stm32_cli import state_file_for
+from .launcher import make_launcher, _package_root
+from .fixture import SimulatedFixture
+from .target import (SimulatedTarget, STATE_ENV, WRITE_RATE_ENV, ERASE_TIME_ENV,
+                     FIXTURE_ENV)
+
+# 1 MB part with 2 KB pages, large enough for the size sweep
+BENCH_CHIP = "STM32F103RG"
+BENCH_FLASH_SIZE = 1024 * 1024
+BENCH_SECTOR_SIZE = 2048
+
+
+@dataclass
+class BenchmarkResult:
+    """Timings of one benchmark case"""
+    name: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    samples: List[float] = field(default_factory=list)
+    phases: Dict[str, float] = field(default_factory=dict)  # Median seconds
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        """Stable identifier used to match results across runs"""
+        params = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.name}[{params}]" if params else self.name
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.samples) if self.samples else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "key": self.key,
+            "params": self.params,
+            "samples": self.samples,
+            "median": self.median,
+            "min": min(self.samples) if self.samples else 0.0,
+            "mean": statistics.mean(self.samples) if self.samples else 0.0,
+            "phases": self.phases,
+            "extra": self.extra,
+        }
+
+
+class _ToolTimer:
+    """Accumulates wall time spent inside external tool invocations"""
+
+    # Classes whose _run() executes the external tools
+    TOOL_CLASSES = (STM32Programmer, STM32Builder)
+
+    def __init__(self):
+        self.intervals = []
+        self._lock = threading.Lock()
+        self._saved = {}
+
+    @property
+    def calls(self) -> int:
+        return len(self.intervals)
+
+    @property
+    def total(self) -> float:
+        """Wall time with at least one tool running (overlaps counted once)"""
+        busy = 0.0
+        end = None
+        for lo, hi in sorted(self.intervals):
+            if end is None or lo > end:
+                busy += hi - lo
+                end = hi
+            elif hi > end:
+                busy += hi - end
+                end = hi
+        return busy
+
+    def _timed(self, run):
+        def timed(obj, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return run(obj, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self.intervals.append((start, time.perf_counter()))
+        return timed
+
+    def __enter__(self) -> "_ToolTimer":
+        for cls in self.TOOL_CLASSES:
+            self._saved[cls] = cls.__dict__["_run"]
+            cls._run = self._timed(self._saved[cls])
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for cls, run in self._saved.items():
+            cls._run = run
+        self._saved.clear()
+
+
+class BenchmarkEnvironment:
+    """Scratch directory holding fake tool launchers and simulated targets"""
+
+    def __init__(self, root: Path, write_rate: float = 0.0,
+                 erase_time: float = 0.0, compile_time: float = 0.0,
+                 fixture: bool = False):
+        """
+        Initialize benchmark environment
+
+        Args:
+            root: Scratch directory (created)
+            write_rate: Simulated programming speed in bytes/second (0: instant)
+            erase_time: Simulated erase time per sector in seconds
+            compile_time: Simulated compile time per source file in seconds
+            fixture: Targets are only attached while self.fixture holds a unit
+        """
+        self.root = Path(root)
+        self.bin_dir = self.root / "bin"
+        self.state_file = self.root / "flash.bin"
+        env = {
+            STATE_ENV: str(self.state_file),
+            WRITE_RATE_ENV: str(write_rate),
+            ERASE_TIME_ENV: str(erase_time),
+            "STM32SIM_COMPILE_TIME": str(compile_time),
+        }
+        self.fixture = None
+        if fixture:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self.fixture = SimulatedFixture(self.root / "fixture", self.state_file,
+                                            BENCH_FLASH_SIZE, BENCH_SECTOR_SIZE)
+            self.fixture.detach()
+            env[FIXTURE_ENV] = str(self.fixture.fixture_file)
+        self.stm32_cli = make_launcher("STM32_Programmer_CLI", "fake_stm32_cli",
+                                       self.bin_dir, env)
+        self.openocd = make_launcher("openocd", "fake_openocd", self.bin_dir, env)
+        self.make = make_launcher("make", "fake_make", self.bin_dir, env)
+        self.discovery = ToolDiscoveryCache(self.root / "tools.json")
+        self.reset_target()
+
+    def reset_target(self, serials: List[Optional[str]] = (None,)) -> None:
+        """Write blank 1 MB flash state for each probe serial"""
+        for serial in serials:
+            SimulatedTarget(flash_size=BENCH_FLASH_SIZE,
+                            sector_size=BENCH_SECTOR_SIZE).save(
+                state_file_for(serial, str(self.state_file)))
+
+    def config(self, **kwargs) -> STM32Config:
+        """Programming configuration pointing at the fake CubeProgrammer"""
+        kwargs.setdefault("chip", BENCH_CHIP)
+        kwargs.setdefault("stm32cube_path", self.stm32_cli)
+        return STM32Config(**kwargs)
+
+    def programmer(self, backend: str = "cube", **kwargs) -> STM32Programmer:
+        """
+        Programmer bound to a fake backend
+
+        Args:
+            backend: "cube" (STM32_Programmer_CLI) or "openocd"
+            **kwargs: STM32Config overrides
+
+        Returns:
+            STM32Programmer instance
+        """
+        programmer = STM32Programmer(self.config(**kwargs), discovery=self.discovery)
+        if backend == "openocd":
+            # Never fall through to a real CubeProgrammer install
+            programmer.stm32_cli_path = None
+            programmer.openocd_path = self.openocd
+            programmer.use_openocd = True
+        return programmer
+
+    def image(self, size: int) -> Path:
+        """Firmware binary of size bytes"""
+        path = self.root / f"image_{size}.bin"
+        if not path.exists():
+            path.write_bytes(firmware_bytes(b"bench", size))
+        return path
+
+    def project(self, sources: int = 20, name: Optional[str] = None) -> Path:
+        """Generated-Makefile project (Debug/Makefile) with C sources"""
+        project = self.root / (name or f"project_{sources}")
+        if not project.exists():
+            (project / "Src").mkdir(parents=True)
+            (project / "Debug").mkdir()
+            (project / "Debug" / "Makefile").write_text("all:\n")
+            for i in range(sources):
+                (project / "Src" / f"module{i}.c").write_text(
+                    f"int module{i}(void) {{ return {i}; }}\n")
+        return project
+
+    @contextlib.contextmanager
+    def tools_on_path(self):
+        """Put the fake make first on PATH"""
+        path = os.environ.get("PATH", "")
+        os.environ["PATH"] = str(self.bin_dir) + os.pathsep + path
+        try:
+            yield
+        finally:
+            os.environ["PATH"] = path
+
+
+class BenchmarkSuite:
+    """Benchmark cases run against a BenchmarkEnvironment"""
+
+    def __init__(self, env: BenchmarkEnvironment, repeat: int = 3,
+                 sizes: List[int] = (16 * 1024, 64 * 1024, 256 * 1024),
+                 probes: List[int] = (1, 2, 4), verbose: bool = False):
+        """
+        Initialize suite
+
+        Args:
+            env: Benchmark environment
+            repeat: Samples per case
+            sizes: Image sizes for the flash scaling sweep
+            probes: Probe counts for the gang scaling sweep
+            verbose: Show the tool and library output
+        """
+        self.env = env
+        self.repeat = max(1, repeat)
+        self.sizes = list(sizes)
+        self.probes = list(probes)
+        self.verbose = verbose
+        self.results: List[BenchmarkResult] = []
+
+    def _quiet(self):
+        if self.verbose:
+            return contextlib.nullcontext()
+        return contextlib.redirect_stdout(io.StringIO())
+
+    def measure(self, name: str, run: Callable[[], Any],
+                setup: Optional[Callable[[], None]] = None,
+                **params) -> BenchmarkResult:
+        """
+        Time a case repeat times
+
+        Args:
+            name: Case name
+            run: Performs the operation; returns False on failure
+            setup: Untimed preparation run before every sample
+            **params: Case parameters recorded with the result
+
+        Returns:
+            BenchmarkResult (also appended to results)
+        """
+        result = BenchmarkResult(name, params)
+        tool_times = []
+        calls = 0
+        failures = 0
+        for _ in range(self.repeat):
+            if setup is not None:
+                with self._quiet():
+                    setup()
+            with self._quiet(), _ToolTimer() as timer:
+                start = time.perf_counter()
+                ok = run()
+                elapsed = time.perf_counter() - start
+            if ok is False:
+                failures += 1
+            result.samples.append(elapsed)
+            tool_times.append(timer.total)
+            calls = timer.calls
+
+        if calls:
+            tool = statistics.median(tool_times)
+            result.phases = {"tool": tool, "python": max(result.median - tool, 0.0)}
+            result.extra["tool_calls"] = calls
+        if failures:
+            result.extra["failures"] = failures
+        self.results.append(result)
+        print(f"  {result.key:<44} {result.median * 1000:9.1f} ms"
+              + (f"  ({failures} failed)" if failures else ""), file=sys.stderr)
+        return result
+
+    def run_all(self) -> List[BenchmarkResult]:
+        """Run every benchmark group"""
+        # Library output would otherwise mix with JSON written to stdout
+        with self._quiet():
+            self.bench_startup()
+            self.bench_flash()
+            self.bench_operations()
+            self.bench_gang()
+            self.bench_build()
+            self.bench_schedule()
+            self.bench_map()
+            if os.name == "posix":
+                self.bench_uart()
+        return self.results
+
+    # ------------------------------------------------------------------
+    # Cases
+    # ------------------------------------------------------------------
+
+    def _subprocess(self, args: List[str]) -> Callable[[], bool]:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = str(_package_root()) + os.pathsep + env.get("PYTHONPATH", "")
+        return lambda: subprocess.run(args, env=env, capture_output=True).returncode == 0
+
+    def bench_startup(self) -> None:
+        """Interpreter, import and CLI start-up times"""
+        package = __package__.rsplit(".", 1)[0]
+        self.measure("startup.python", self._subprocess([sys.executable, "-c", "pass"]))
+        self.measure("startup.import", self._subprocess(
+            [sys.executable, "-c", f"import {package}.core.programmer"]))
+        self.measure("startup.cli_help", self._subprocess(
+            [sys.executable, "-m", f"{package}.cli.flash_cli", "--help"]))
+        self.measure("startup.tool_spawn", self._subprocess([str(self.env.stm32_cli), "--version"]))
+
+    def bench_flash(self) -> None:
+        """End-to-end flash latency against image size, per backend"""
+        for backend in ("cube", "openocd"):
+            programmer = self.env.programmer(backend)
+            for size in self.sizes:
+                image = self.env.image(size)
+                result = self.measure(
+                    "flash", lambda: programmer.flash(image),
+                    setup=self.env.reset_target, backend=backend, size=size)
+                result.extra["bytes_per_second"] = size / result.median
+
+    def bench_operations(self) -> None:
+        """Erase, read-back, device CRC and differential flash"""
+        programmer = self.env.programmer()
+        size = self.sizes[-1]
+        image = self.env.image(size)
+        with self._quiet():
+            programmer.flash(image)
+        self.measure("erase", lambda: programmer.erase(full=True),
+                     setup=lambda: programmer.flash(image))
+        with self._quiet():
+            programmer.flash(image)
+        self.measure("read_memory", lambda: programmer.read_memory(
+            programmer.config.flash_start, size, self.env.root / "dump.bin"), size=size)
+        loaded = programmer.load_image(image)
+        self.measure("verify", lambda: programmer.verify_image(loaded, "crc"),
+                     method="crc", size=size)
+        self.measure("flash_diff_unchanged", lambda: programmer.flash(
+            image, diff=True), size=size)
+
+    def bench_gang(self) -> None:
+        """Gang flashing against probe count"""
+        size = self.sizes[0]
+        image = self.env.image(size)
+        programmer = self.env.programmer()
+        for count in self.probes:
+            serials = [f"BENCH{i:04d}" for i in range(count)]
+            self.measure("gang_flash", lambda: all(
+                r.success for r in GangProgrammer(programmer, serials).flash(image)),
+                setup=lambda: self.env.reset_target(serials), probes=count, size=size)
+
+    def bench_build(self) -> None:
+        """Full, incremental and cached builds and deploys"""
+        project = self.env.project()
+        cache = BuildCache(self.env.root / "build_cache")
+
+        def clean_objects():
+            for path in (project / "Debug").glob("*.o"):
+                path.unlink()
+
+        with self.env.tools_on_path():
+            builder = STM32Builder(project, discovery=self.env.discovery)
+            self.measure("build.full", builder.build, setup=clean_objects)
+            self.measure("build.noop", builder.build)
+
+            def deploy(use_cache: bool) -> bool:
+                deployer = STM32Deployer(project, self.env.config(), build_cache=cache)
+                return deployer.deploy(use_cache=use_cache)
+
+            self.measure("deploy.uncached", lambda: deploy(False), setup=clean_objects)
+            with self._quiet():
+                deploy(True)
+            self.measure("deploy.cached", lambda: deploy(True))
+
+    def bench_schedule(self, projects: int = 4, budget: int = 4) -> None:
+        """Full builds of several projects under one job budget"""
+        roots = [self.env.project(name=f"scheduled_{i}") for i in range(projects)]
+
+        def clean_objects():
+            for root in roots:
+                for path in (root / "Debug").glob("*.o"):
+                    path.unlink()
+
+        with self.env.tools_on_path():
+            scheduler = BuildScheduler.matrix(roots, budget=budget, output="quiet",
+                                              discovery=self.env.discovery)
+            self.measure("build_schedule", lambda: scheduler.run().success,
+                         setup=clean_objects, projects=projects, budget=budget)
+
+    def bench_map(self, objects: int = 1000, symbols: int = 50) -> None:
+        """Parsing a large linker map file"""
+        path = self.env.root / f"large_{objects}x{symbols}.map"
+        if not path.exists():
+            write_map(path, synthetic_objects(objects, symbols))
+        result = self.measure("map_parse", lambda: MemoryMap.load(path).top_symbols(20),
+                              symbols=objects * (symbols + 1))
+        result.extra["bytes_per_second"] = path.stat().st_size / result.median
+
+    def bench_uart(self, latency: float = 0.001) -> None:
+        """Native UART flashing with and without command pipelining"""
+        size = self.sizes[0]
+        image = self.env.image(size)
+        target = SimulatedTarget(flash_size=BENCH_FLASH_SIZE,
+                                 sector_size=BENCH_SECTOR_SIZE)
+        with SimulatedBootloader(target, latency=latency) as bootloader:
+            for pipeline in (True, False):
+                programmer = self.env.programmer(port="UART", native_uart=True,
+                                                 serial_port=bootloader.port,
+                                                 uart_pipeline=pipeline)
+                result = self.measure(
+                    "uart_flash", lambda: programmer.flash(image),
+                    setup=target.erase_all, pipeline=pipeline, size=size)
+                result.extra["bytes_per_second"] = size / result.median
+
+
+def compare(results: List[dict], baseline: List[dict],
+            threshold: float) -> List[str]:
+    """
+    Regressions of results against a baseline run
+
+    Args:
+        results: Result dicts of this run
+        baseline: Result dicts of the baseline run
+        threshold: Median ratio above which a case counts as regressed
+
+    Returns:
+        Keys of regressed cases
+    """
+    previous = {r["key"]: r for r in baseline}
+    regressed = []
+    for result in results:
+        old = previous.get(result["key"])
+        if not old or not old["median"]:
+            continue
+        ratio = result["median"] / old["median"]
+        flag = ""
+        if ratio > threshold:
+            regressed.append(result["key"])
+            flag = "  REGRESSED"
+        print(f"  {result['key']:<44} {ratio:6.2f}x{flag}", file=sys.stderr)
+    return regressed
+
+
+def _sizes(text: str) -> List[int]:
+    units = {"K": 1024, "M": 1024 * 1024}
+    sizes = []
+    for part in text.split(","):
+        part = part.strip().upper()
+        scale = units.get(part[-1:], 1)
+        sizes.append(int(part.rstrip("KM"), 0) * scale)
+    return sizes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the STM32 Programmer Python layer against "
+                    "simulated tools")
+    parser.add_argument("--output", type=Path, help="Write JSON results to file "
+                        "(default: stdout)")
+    parser.add_argument("--compare", type=Path, metavar="BASELINE",
+                        help="Compare medians against an earlier JSON result")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Slowdown ratio reported as a regression (default: 1.25)")
+    parser.add_argument("--repeat", type=int, default=3, help="Samples per case")
+    parser.add_argument("--sizes", type=_sizes, default="16K,64K,256K",
+                        help="Image sizes for the flash sweep (default: 16K,64K,256K)")
+    parser.add_argument("--probes", type=lambda t: [int(p) for p in t.split(",")],
+                        default="1,2,4", help="Probe counts for the gang sweep")
+    parser.add_argument("--write-rate", type=float, default=0.0,
+                        help="Simulated write speed in bytes/s (default: instant)")
+    parser.add_argument("--erase-time", type=float, default=0.0,
+                        help="Simulated erase time per sector in seconds")
+    parser.add_argument("--compile-time", type=float, default=0.0,
+                        help="Simulated compile time per source in seconds")
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the scratch directory")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Show tool and library output")
+    args = parser.parse_args(argv)
+
+    root = Path(tempfile.mkdtemp(prefix="stm32bench_"))
+    try:
+        env = BenchmarkEnvironment(root, args.write_rate, args.erase_time,
+                                   args.compile_time)
+        suite = BenchmarkSuite(env, args.repeat, args.sizes, args.probes, args.verbose)
+        print(f"[INFO] Running benchmarks in {root}", file=sys.stderr)
+        suite.run_all()
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "version": __version__,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "repeat": args.repeat,
+            "write_rate": args.write_rate,
+            "erase_time": args.erase_time,
+            "compile_time": args.compile_time,
+        },
+        "results": [r.to_dict() for r in suite.results],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+        print(f"[SUCCESS] ✓ Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        print(f"[INFO] Compared with {args.compare} (version "
+              f"{baseline.get('version', '?')})", file=sys.stderr)
+        if compare(report["results"], baseline.get("results", []), args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+"""
+Fake UART Bootloader - STM32 USART bootloader (AN3155) behind a pseudo-terminal
+Answers the system memory bootloader protocol on the master side of a pty
+so the native UART backend runs end to end without hardware. The line
+rate the host sets is honoured: the bootloader locks onto the rate of its
+sync byte, garbles traffic at any other rate, corrupts bytes above a
+maximum rate and can take the wire time of every byte
+
+Usage: python -m utils.stm32Programmer.sim.fake_bootloader
+"""
+
+import errno
+import os
+import queue
+import random
+import select
+import sys
+import threading
+import time
+from functools import reduce
+from operator import xor
+from pathlib import Path
+from typing import Optional, List
+
+from ..core.uart_bootloader import (
+    ACK, NACK, SYNC, CMD_GET, CMD_GET_ID, CMD_READ, CMD_GO, CMD_WRITE,
+    CMD_ERASE, CMD_EXTENDED_ERASE, address_checksum,
+)
+from .target import SimulatedTarget, target_from_env, STATE_ENV
+
+# Environment variable: highest baudrate the simulated wiring carries
+# cleanly (also enables wire timing when running main())
+MAX_BAUD_ENV = "STM32SIM_UART_MAX_BAUD"
+
+# Bits on the wire per byte: start, 8 data, even parity, stop
+BITS_PER_BYTE = 11
+
+
+def _termios_rates() -> dict:
+    """termios speed constant -> baud"""
+    import termios
+    return {getattr(termios, name): int(name[1:]) for name in dir(termios)
+            if name[0] == "B" and name[1:].isdigit()}
+
+
+class _Stopped(Exception):
+    """Raised inside the serving thread once stop() was called"""
+
+
+class _Hangup(Exception):
+    """Raised inside the serving thread when the host closed the port"""
+
+
+class SimulatedBootloader:
+    """AN3155 bootloader serving a SimulatedTarget on a pseudo-terminal"""
+
+    def __init__(self, target: Optional[SimulatedTarget] = None,
+                 state_file: Optional[Path] = None,
+                 pid: int = 0x410, version: int = 0x31,
+                 extended_erase: bool = True,
+                 latency: float = 0.0,
+                 max_baudrate: Optional[int] = None,
+                 error_rate: float = 0.02,
+                 wire_timing: bool = False,
+                 dtr_reset: bool = True,
+                 read_protected: bool = False):
+        """
+        Initialize simulated bootloader
+
+        Args:
+            target: Simulated target (default: fresh 64 KB target)
+            state_file: Persist target state here whenever the line goes idle
+            pid: Product ID reported by Get ID (0x410: STM32F10x medium density)
+            version: Bootloader version reported by Get (0x31: v3.1)
+            extended_erase: Offer Extended Erase (v3.0+) instead of Erase
+            latency: Seconds every reply takes to reach the host, as with
+                the latency timer of a USB serial adapter
+            max_baudrate: Above this rate every byte in either direction is
+                corrupted with probability error_rate (None: clean at any rate)
+            error_rate: Corruption probability per byte above max_baudrate
+            wire_timing: Bytes take 11 bit times at the line rate to arrive
+            dtr_reset: Closing the port resets the target back into the
+                bootloader, as with adapters wiring DTR to NRST
+            read_protected: Readout protection level 1: Read Memory, Write
+                Memory, Go and the erase commands are NACKed
+        """
+        import pty
+        import tty
+
+        self.target = target or SimulatedTarget()
+        self.state_file = state_file
+        self.pid = pid
+        self.version = version
+        self.latency = latency
+        self.max_baudrate = max_baudrate
+        self.error_rate = error_rate
+        self.wire_timing = wire_timing
+        self.dtr_reset = dtr_reset
+        self.read_protected = read_protected
+        self.commands = bytes((CMD_GET, CMD_GET_ID, CMD_READ, CMD_GO, CMD_WRITE,
+                               CMD_EXTENDED_ERASE if extended_erase else CMD_ERASE))
+        self.synced = False
+        self.app_running = False   # After Go, until the next reset
+        self.baudrate: Optional[int] = None   # Rate locked on by the sync byte
+        self.started = 0        # Go commands executed
+        self.resets = 0         # Resets through the port closing
+        self.nacks = 0
+        self.corrupted = 0      # Bytes garbled on the wire
+        self._dirty = False
+        self._random = random.Random(0)
+        self._rates = _termios_rates()
+        self._line_down = True
+        self._session = 0
+
+        self._master, slave = pty.openpty()
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        # Without a slave descriptor of our own, reads see EIO whenever the
+        # host has closed the port
+        os.close(slave)
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._outbox: "queue.Queue" = queue.Queue()
+        self._sender: Optional[threading.Thread] = None
+
+    def start(self) -> "SimulatedBootloader":
+        """Start serving in background threads"""
+        self._running = True
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        if self.latency or self.wire_timing:
+            self._sender = threading.Thread(target=self._send_delayed, daemon=True)
+            self._sender.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the pseudo-terminal"""
+        self._running = False
+        self._outbox.put(None)
+        for thread in (self._thread, self._sender):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout=2)
+        self._save()
+        try:
+            os.close(self._master)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "SimulatedBootloader":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _save(self) -> None:
+        if self._dirty and self.state_file is not None:
+            self.target.save(self.state_file)
+        self._dirty = False
+
+    def line_rate(self) -> Optional[int]:
+        """Baudrate the host has set on the port"""
+        import termios
+        try:
+            return self._rates.get(termios.tcgetattr(self._master)[5])
+        except termios.error:
+            return None
+
+    def _wire(self, data: bytes, rate: Optional[int]) -> bytes:
+        """Bytes as they arrive at the other end of the wire"""
+        if self.synced and rate != self.baudrate:
+            # The receiver samples at the wrong rate
+            self.corrupted += len(data)
+            return bytes(b ^ 0xA5 for b in data)
+        if self.max_baudrate is None or rate is None or rate <= self.max_baudrate:
+            return data
+        out = bytearray(data)
+        for i in range(len(out)):
+            if self._random.random() < self.error_rate:
+                out[i] ^= 1 << self._random.randrange(8)
+                self.corrupted += 1
+        return bytes(out)
+
+    def _wire_time(self, count: int, rate: Optional[int]) -> float:
+        if not self.wire_timing or not rate:
+            return 0.0
+        return count * BITS_PER_BYTE / rate
+
+    def _recv(self, count: int) -> bytes:
+        """Block until count bytes arrived from the host"""
+        data = b""
+        while len(data) < count:
+            if not select.select([self._master], [], [], 0)[0]:
+                self._save()   # Host is waiting for us or idle
+                while not select.select([self._master], [], [], 0.1)[0]:
+                    if not self._running:
+                        raise _Stopped()
+            try:
+                chunk = os.read(self._master, count - len(data))
+            except OSError as e:
+                if not self._running or e.errno != errno.EIO:
+                    raise _Stopped()
+                # No client has the port open
+                if not self._line_down:
+                    self._line_down = True
+                    raise _Hangup()
+                time.sleep(0.005)
+                continue
+            self._line_down = False
+            rate = self.line_rate()
+            delay = self._wire_time(len(chunk), rate)
+            if delay:
+                time.sleep(delay)
+            data += self._wire(chunk, rate)
+        return data
+
+    def _reply(self, data: bytes) -> None:
+        """Send bytes to the host, after the adapter latency"""
+        rate = self.line_rate()
+        data = self._wire(data, rate)
+        delay = self.latency + self._wire_time(len(data), rate)
+        if delay:
+            self._outbox.put((time.monotonic() + delay, self._session, data))
+        else:
+            os.write(self._master, data)
+
+    def _send_delayed(self) -> None:
+        """Deliver queued replies once their latency has passed"""
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            due, session, data = item
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if session != self._session:
+                continue   # Reply to a client that has gone
+            try:
+                os.write(self._master, data)
+            except OSError:
+                return
+
+    def _hangup(self) -> None:
+        """Host closed the port: DTR dropped"""
+        self._session += 1
+        if not self.dtr_reset:
+            return
+        # NRST pulse with BOOT0 high: back in the bootloader, waiting for
+        # a fresh autobaud byte
+        self.target.reset()
+        self._dirty = True
+        self.resets += 1
+        self.synced = False
+        self.app_running = False
+        self.baudrate = None
+
+    def _nack(self) -> None:
+        self.nacks += 1
+        self._reply(bytes((NACK,)))
+
+    def _recv_address(self) -> Optional[int]:
+        """Receive an address frame; None (NACK sent) if its checksum is wrong"""
+        frame = self._recv(5)
+        address = int.from_bytes(frame[:4], "big")
+        if address_checksum(address) != frame[4]:
+            self._nack()
+            return None
+        return address
+
+    def serve_forever(self) -> None:
+        """Answer commands until stop()"""
+        self._running = True
+        handlers = {
+            CMD_GET: self._get, CMD_GET_ID: self._get_id, CMD_READ: self._read,
+            CMD_GO: self._go, CMD_WRITE: self._write, CMD_ERASE: self._erase,
+            CMD_EXTENDED_ERASE: self._extended_erase,
+        }
+        while self._running:
+            try:
+                if self.app_running:
+                    # The application owns the USART; the host is not answered
+                    self._recv(1)
+                    continue
+                if not self.synced:
+                    # Anything but the autobaud byte is line noise
+                    if self._recv(1)[0] == SYNC:
+                        self.synced = True
+                        self.baudrate = self.line_rate()
+                        self._reply(bytes((ACK,)))
+                    continue
+                cmd, complement = self._recv(2)
+                if cmd ^ complement != 0xFF or cmd not in self.commands or \
+                        (self.read_protected and cmd not in (CMD_GET, CMD_GET_ID)):
+                    self._nack()
+                    continue
+                self._reply(bytes((ACK,)))
+                handlers[cmd]()
+            except _Hangup:
+                self._hangup()
+            except _Stopped:
+                return
+
+    def _get(self) -> None:
+        self._reply(bytes((len(self.commands), self.version)) + self.commands +
+                    bytes((ACK,)))
+
+    def _get_id(self) -> None:
+        self._reply(bytes((1, self.pid >> 8, self.pid & 0xFF, ACK)))
+
+    def _in_flash(self, address: int, size: int) -> bool:
+        target = self.target
+        return target.flash_base <= address and \
+            address + size <= target.flash_base + target.flash_size
+
+    def _readable(self, address: int, size: int) -> bool:
+        # Flash, or the unique device ID in system memory
+        return self._in_flash(address, size) or size <= self.target.UID_SIZE
+
+    def _read(self) -> None:
+        address = self._recv_address()
+        if address is None:
+            return
+        if not self._readable(address, 1):
+            self._nack()
+            return
+        self._reply(bytes((ACK,)))
+        count, complement = self._recv(2)
+        if count ^ complement != 0xFF or not self._readable(address, count + 1):
+            self._nack()
+            return
+        self._reply(bytes((ACK,)) + self.target.read(address, count + 1))
+
+    def _write(self) -> None:
+        address = self._recv_address()
+        if address is None:
+            return
+        self._reply(bytes((ACK,)))
+        count = self._recv(1)[0] + 1
+        data = self._recv(count)
+        checksum = self._recv(1)[0]
+        if reduce(xor, data, count - 1) != checksum or not self._in_flash(address, count):
+            self._nack()
+            return
+        try:
+            self.target.write(address, data)
+        except ValueError:
+            self._nack()
+            return
+        self._dirty = True
+        self._reply(bytes((ACK,)))
+
+    def _erase_pages(self, pages: List[int]) -> bool:
+        """Erase pages; False (NACK sent) if one does not exist"""
+        if any(page >= self.target.sector_count for page in pages):
+            self._nack()
+            return False
+        for page in pages:
+            self.target.erase_sectors(page, page)
+        self._dirty = True
+        self._reply(bytes((ACK,)))
+        return True
+
+    def _extended_erase(self) -> None:
+        code = self._recv(2)
+        count = int.from_bytes(code, "big")
+        if count >= 0xFFF0:
+            # Mass erase (0xFFFF) or bank erase (0xFFFE/0xFFFD)
+            if self._recv(1)[0] != code[0] ^ code[1]:
+                self._nack()
+                return
+            self._erase_pages(list(range(self.target.sector_count)))
+            return
+        frame = self._recv(2 * (count + 1))
+        if reduce(xor, code + frame, 0) != self._recv(1)[0]:
+            self._nack()
+            return
+        self._erase_pages([int.from_bytes(frame[i:i + 2], "big")
+                           for i in range(0, len(frame), 2)])
+
+    def _erase(self) -> None:
+        count = self._recv(1)[0]
+        if count == 0xFF:
+            if self._recv(1)[0] != 0x00:
+                self._nack()
+                return
+            self._erase_pages(list(range(self.target.sector_count)))
+            return
+        pages = self._recv(count + 1)
+        if reduce(xor, pages, count) != self._recv(1)[0]:
+            self._nack()
+            return
+        self._erase_pages(list(pages))
+
+    def _go(self) -> None:
+        address = self._recv_address()
+        if address is None:
+            return
+        self._reply(bytes((ACK,)))
+        # The application runs until the next reset re-enters the
+        # bootloader, which then waits for a fresh autobaud byte
+        self.target.reset()
+        self._dirty = True
+        self.started += 1
+        self.synced = False
+        self.app_running = True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Serve a simulated bootloader until interrupted"""
+    target = target_from_env()
+    state_file = Path(os.environ[STATE_ENV]) if target else None
+    max_baudrate = int(os.environ[MAX_BAUD_ENV]) if os.environ.get(MAX_BAUD_ENV) else None
+    bootloader = SimulatedBootloader(target, state_file, max_baudrate=max_baudrate,
+                                     wire_timing=max_baudrate is not None)
+    print(f"Simulated STM32 bootloader on {bootloader.port}", flush=True)
+    bootloader.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bootloader.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Fake make - Hardware-free stand-in for a GNU Make firmware build
+Compiles nothing: sources newer than their object stamp are "compiled"
+(gcc command lines are printed and STM32SIM_COMPILE_TIME is spent per file,
+spread over -j jobs) and a deterministic firmware image and GNU ld map
+file are linked
+
+Environment:
+    STM32SIM_COMPILE_TIME   Seconds spent per compiled source (default 0)
+    STM32SIM_FIRMWARE_SIZE  Size of the linked .bin in bytes (default 32768)
+
+Usage: python -m utils.stm32Programmer.sim.fake_make [-jN] [-C dir] [target]
+"""
+
+import hashlib
+import math
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional, List, Tuple, TextIO
+
+from ..core.build_cache import iter_source_files
+
+# Sources that produce an object file
+_COMPILED_SUFFIXES = (".c", ".cpp", ".cc", ".s", ".S")
+
+# (object file, [(input section, symbol, size), ...]) as linked into a map
+MapObject = Tuple[str, List[Tuple[str, str, int]]]
+
+
+def firmware_bytes(seed: bytes, size: int) -> bytes:
+    """Deterministic pseudo-random image contents derived from seed"""
+    out = bytearray()
+    counter = 0
+    while len(out) < size:
+        out += hashlib.sha256(seed + counter.to_bytes(4, "little")).digest()
+        counter += 1
+    return bytes(out[:size])
+
+
+def source_objects(sources: List[Path]) -> List[MapObject]:
+    """Map contents for compiled sources; code and data grow with the source"""
+    objects = []
+    for source in sources:
+        text = source.read_bytes()
+        digest = hashlib.sha256(text).digest()
+        name = source.stem
+        entries = [(f".text.{name}", name, 16 + 4 * (len(text) // 2)),
+                   (f".text.{name}_init", f"{name}_init", 8 + 4 * digest[0]),
+                   (f".rodata.{name}_table", "", 4 * (digest[1] % 32)),
+                   (f".data.{name}_state", f"{name}_state", 4 + 4 * (digest[2] % 8)),
+                   (f".bss.{name}_buffer", f"{name}_buffer", 4 * digest[3])]
+        objects.append((f"./Core/Src/{name}.o", [e for e in entries if e[2]]))
+    return objects
+
+
+def synthetic_objects(count: int, symbols: int) -> List[MapObject]:
+    """Map contents of a large project (count objects x symbols functions)"""
+    objects = []
+    for i in range(count):
+        entries = [(f".text.module{i}_function_with_long_name_{k}",
+                    f"module{i}_function_with_long_name_{k}", 4 * (1 + (i * 7 + k * 13) % 97))
+                   for k in range(symbols)]
+        entries.append((f".bss.module{i}_buffer", f"module{i}_buffer", 64 + 4 * (i % 50)))
+        objects.append((f"./Middlewares/Library/Src/module{i}.o", entries))
+    return objects
+
+
+def write_map(path: Path, objects: List[MapObject], flash_size: int = 0x100000,
+              ram_size: int = 0x18000) -> None:
+    """
+    Write a GNU ld map file for objects linked at 0x08000000/0x20000000
+
+    Long input section names are wrapped onto their own line, as ld does.
+
+    Args:
+        path: Map file
+        objects: Objects and their input sections
+        flash_size: Length of the FLASH region
+        ram_size: Length of the RAM region
+    """
+    def out_section(f: TextIO, name: str, address: int, size: int,
+                    load: Optional[int] = None) -> None:
+        header = f"{name:<15} 0x{address:016x} {size:>#10x}"
+        if load is not None:
+            header += f" load address 0x{load:016x}"
+        f.write(f"\n{header}\n")
+
+    def in_section(f: TextIO, name: str, address: int, size: int, owner: str,
+                   symbol: str) -> None:
+        if len(name) >= 15:
+            f.write(f" {name}\n                0x{address:016x} {size:>#10x} {owner}\n")
+        else:
+            f.write(f" {name:<14} 0x{address:016x} {size:>#10x} {owner}\n")
+        if symbol:
+            f.write(f"                0x{address:016x}                {symbol}\n")
+
+    def layout(kind: str, start: int) -> Tuple[List[tuple], int]:
+        placed = []
+        address = start
+        for owner, entries in objects:
+            for name, symbol, size in entries:
+                if name.startswith(kind):
+                    placed.append((name, address, size, owner, symbol))
+                    address += size
+        return placed, address - start
+
+    flash = 0x08000000
+    with open(path, "w") as f:
+        f.write("Archive member included to satisfy reference by file (symbol)\n\n"
+                "Discarded input sections\n\n"
+                " .text          0x0000000000000000        0x0 ./Core/Src/unused.o\n\n")
+        f.write("Memory Configuration\n\nName             Origin             Length"
+                "             Attributes\n")
+        f.write(f"RAM              0x0000000020000000 0x{ram_size:016x} xrw\n")
+        f.write(f"FLASH            0x0000000008000000 0x{flash_size:016x} xr\n")
+        f.write("*default*        0x0000000000000000 0xffffffffffffffff\n\n")
+        f.write("Linker script and memory map\n\nLOAD ./Core/Startup/startup.o\n")
+
+        out_section(f, ".isr_vector", flash, 0x10c)
+        f.write(" *(.isr_vector)\n")
+        in_section(f, ".isr_vector", flash, 0x10c, "./Core/Startup/startup.o", "g_pfnVectors")
+        f.write(f"                0x{flash + 0x10c:016x}                . = ALIGN (0x4)\n")
+        address = flash + 0x110
+
+        for kind, output in ((".text", ".text"), (".rodata", ".rodata")):
+            placed, size = layout(kind, address)
+            out_section(f, output, address, size + 4)
+            f.write(f" *({kind})\n *({kind}*)\n")
+            for entry in placed:
+                in_section(f, *entry)
+            f.write(f" *fill*         0x{address + size:016x}        0x4 \n")
+            address += size + 4
+
+        ram = 0x20000000
+        placed, size = layout(".data", ram)
+        f.write(f"                0x{address:016x}                _sidata = LOADADDR (.data)\n")
+        out_section(f, ".data", ram, size, address)
+        for entry in placed:
+            in_section(f, *entry)
+        ram += size
+        placed, size = layout(".bss", ram)
+        out_section(f, ".bss", ram, size + 0x20)
+        for entry in placed:
+            in_section(f, *entry)
+        f.write(f" COMMON         0x{ram + size:016x}       0x20 ./Core/Src/main.o\n"
+                f"                0x{ram + size:016x}                uwTick\n")
+        f.write("\n.debug_info     0x0000000000000000    0x1a2b3\n"
+                " .debug_info    0x0000000000000000     0x1234 ./Core/Src/main.o\n")
+        f.write("OUTPUT(firmware.elf elf32-littlearm)\n")
+
+
+def _sources(directory: Path) -> List[Path]:
+    """Compiled sources of the project built from directory"""
+    for root in (directory, directory.parent):
+        sources = [p for p in iter_source_files(root)
+                   if p.suffix in _COMPILED_SUFFIXES]
+        if sources:
+            return sources
+    return []
+
+
+def build(directory: Path, jobs: int = 1) -> int:
+    """Run a simulated incremental build in directory; returns exit code"""
+    if not (directory / "Makefile").exists():
+        print("make: *** No targets specified and no makefile found.  Stop.",
+              file=sys.stderr)
+        return 2
+
+    sources = _sources(directory)
+    stale = []
+    for source in sources:
+        stamp = directory / (source.stem + ".o")
+        if not stamp.exists() or stamp.stat().st_mtime_ns < source.stat().st_mtime_ns:
+            stale.append((source, stamp))
+
+    compile_time = float(os.environ.get("STM32SIM_COMPILE_TIME", "0") or 0)
+    for source, stamp in stale:
+        print(f"arm-none-eabi-gcc -mcpu=cortex-m3 -mthumb -O2 -c {source} -o {stamp.name}")
+        sys.stdout.flush()
+        stamp.write_text(hashlib.sha256(source.read_bytes()).hexdigest())
+    if stale and compile_time:
+        time.sleep(compile_time * math.ceil(len(stale) / max(jobs, 1)))
+
+    name = (directory.parent if directory.name in ("Debug", "Release")
+            else directory).name
+    output = directory / f"{name}.bin"
+    if stale or not output.exists():
+        seed = hashlib.sha256()
+        for source in sources:
+            seed.update((directory / (source.stem + ".o")).read_bytes())
+        size = int(os.environ.get("STM32SIM_FIRMWARE_SIZE", "32768"), 0)
+        print(f"arm-none-eabi-gcc -o {name}.elf *.o -T STM32_FLASH.ld")
+        output.write_bytes(firmware_bytes(seed.digest(), size))
+        write_map(directory / f"{name}.map", source_objects(sources))
+        print("   text    data     bss     dec     hex filename")
+        print(f"{size:7d}       0       0 {size:7d} {size:7x} {name}.elf")
+    else:
+        print("make: Nothing to be done for 'all'.")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Emulate the make command line"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if "--version" in argv:
+        print("GNU Make 4.3 (fake)")
+        return 0
+
+    directory = Path.cwd()
+    jobs = 1
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "-C" and i + 1 < len(argv):
+            directory = Path(argv[i + 1])
+            i += 1
+        elif arg.startswith("-j"):
+            jobs = int(arg[2:] or 1)
+        i += 1
+    return build(directory, jobs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
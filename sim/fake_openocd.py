@@ -0,0 +1,416 @@
+"""
+Fake OpenOCD - Hardware-free stand-in for the openocd executable
+Serves the Tcl RPC protocol and runs one-shot -c command lists against a
+SimulatedTarget so the session pool and OpenOCD paths can run without a probe
+
+Usage: python -m utils.stm32Programmer.sim.fake_openocd [openocd options]
+"""
+
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional, List, Tuple, Callable
+
+from ..core.image import FirmwareImage, ImageFormatError
+from .target import (SimulatedTarget, target_from_env, target_attached, apply_swd_clock,
+                     STATE_ENV)
+
+TCL_TERMINATOR = b"\x1a"
+
+# Wrapper used by OpenOCDSession to report command failures in-band
+_CATCH_RE = re.compile(r"^if \{\[catch \{(?P<cmd>.*)\} _ocd_msg\]\}", re.S)
+
+
+class FakeOpenOCDError(Exception):
+    """Raised when a simulated OpenOCD command fails"""
+
+
+def split_tcl_words(command: str) -> List[str]:
+    """Split a single Tcl command into words, honouring braces and quotes"""
+    words = []
+    i = 0
+    n = len(command)
+    while i < n:
+        if command[i].isspace():
+            i += 1
+            continue
+        if command[i] == "{":
+            depth = 1
+            j = i + 1
+            while j < n and depth:
+                if command[j] == "{":
+                    depth += 1
+                elif command[j] == "}":
+                    depth -= 1
+                j += 1
+            words.append(command[i + 1:j - 1])
+            i = j
+        elif command[i] == '"':
+            j = command.index('"', i + 1)
+            words.append(command[i + 1:j])
+            i = j + 1
+        else:
+            j = i
+            while j < n and not command[j].isspace():
+                j += 1
+            words.append(command[i:j])
+            i = j
+    return words
+
+
+class FakeOpenOCD:
+    """Interpreter for the subset of OpenOCD commands this package issues"""
+
+    def __init__(self, target: Optional[SimulatedTarget] = None,
+                 state_file: Optional[Path] = None):
+        """
+        Initialize fake OpenOCD
+
+        Args:
+            target: Simulated target (default: fresh 64 KB target)
+            state_file: Persist target state here after every command
+        """
+        self.target = target or SimulatedTarget()
+        self.state_file = state_file
+        self.initialized = False
+        self.adapter_speed_khz = 0
+        self.adapter_serial = None
+        self.tcl_port = None
+        self.shutdown_requested = False
+        self.commands_executed = 0
+        # Receives log lines emitted while long commands run
+        self.log: Optional[Callable[[str], None]] = None
+
+    def _load_file(self, path: str, address: Optional[int]) -> List[Tuple[int, bytes]]:
+        """Load an image file as (address, data) segments"""
+        file_path = Path(path)
+        if not file_path.exists():
+            raise FakeOpenOCDError(f"couldn't open {path}")
+        base = address if address is not None else self.target.flash_base
+        try:
+            image = FirmwareImage.load(file_path, base)
+        except ImageFormatError as e:
+            raise FakeOpenOCDError(str(e))
+        return [(s.address, bytes(s.data)) for s in image.segments]
+
+    def execute(self, command: str) -> str:
+        """
+        Execute one OpenOCD command
+
+        Args:
+            command: Command text (optionally wrapped in the session catch)
+
+        Returns:
+            Command result text
+
+        Raises:
+            FakeOpenOCDError: If the command fails
+        """
+        match = _CATCH_RE.match(command.strip())
+        if match:
+            try:
+                return self.execute(match.group("cmd"))
+            except FakeOpenOCDError as e:
+                return f"ERROR: {e}"
+
+        words = split_tcl_words(command)
+        if not words:
+            return ""
+
+        self.commands_executed += 1
+        try:
+            result = self._dispatch(words)
+        except (ValueError, IndexError) as e:
+            raise FakeOpenOCDError(str(e))
+
+        if self.state_file is not None:
+            self.target.save(self.state_file)
+        return result
+
+    def _dispatch(self, words: List[str]) -> str:
+        """Route a tokenized command to its handler"""
+        name, args = words[0], words[1:]
+
+        if name in ("init", "halt", "version", "transport", "source",
+                    "gdb_port", "telnet_port", "log_output", "debug_level"):
+            if name == "init":
+                if not target_attached():
+                    raise FakeOpenOCDError("init mode failed (unable to connect to the target)")
+                self._apply_speed()
+                self.initialized = True
+            elif name == "halt":
+                self.target.halted = True
+            elif name == "version":
+                return "Open On-Chip Debugger 0.12.0 (fake)"
+            return ""
+        if name == "tcl_port":
+            self.tcl_port = int(args[0])
+            return ""
+        if name in ("adapter", "hla_serial"):
+            if name == "hla_serial" or args[0] == "serial":
+                self.adapter_serial = args[-1]
+            elif args[0] == "speed":
+                if len(args) > 1:
+                    self.adapter_speed_khz = int(args[1])
+                    if self.initialized:
+                        self._apply_speed()
+                return str(self.adapter_speed_khz)
+            return ""
+        if name == "reset":
+            self.target.reset(halt=bool(args) and args[0] in ("halt", "init"))
+            return ""
+        if name in ("shutdown", "exit"):
+            self.shutdown_requested = True
+            return ""
+        if name == "program":
+            return self._program(args)
+        if name == "flash":
+            return self._flash(args)
+        if name == "verify_image":
+            return self._verify(args)
+        if name == "dump_image":
+            path, address, size = args[0], int(args[1], 0), int(args[2], 0)
+            Path(path).write_bytes(self.target.read(address, size))
+            return f"dumped {size} bytes"
+        if name == "read_memory":
+            address, width, count = (int(a, 0) for a in args[:3])
+            if width == 32:
+                return " ".join(hex(self.target.read32(address + 4 * i))
+                                for i in range(count))
+            if width != 8:
+                raise FakeOpenOCDError("only 8- and 32-bit reads are simulated")
+            data = self.target.read(address, count)
+            return " ".join(hex(b) for b in data)
+        if name == "mww":
+            self.target.write32(int(args[0], 0), int(args[1], 0))
+            return ""
+        if name == "mmw":
+            address, set_bits, clear_bits = (int(a, 0) for a in args[:3])
+            value = self.target.read32(address)
+            self.target.write32(address, (value & ~clear_bits) | set_bits)
+            return ""
+        if name == "mdw":
+            address = int(args[0], 0)
+            return f"{address:#010x}: {self.target.read32(address):08x}"
+        if len(words) > 3 and words[1] in ("option_write", "options_write"):
+            # <driver> option_write bank reg value [mask]: kept by register
+            self.target.option_bytes[words[3]] = " ".join(words[4:])
+            return ""
+        if name.endswith("mass_erase"):
+            self.target.erase_all()
+            return ""
+        if len(words) > 1 and words[1] == "mass_erase":
+            self.target.erase_all()
+            return ""
+
+        raise FakeOpenOCDError(f"invalid command name \"{name}\"")
+
+    def _apply_speed(self) -> None:
+        """Bring the simulated link up at the adapter speed"""
+        if not apply_swd_clock(self.target, self.adapter_speed_khz):
+            raise FakeOpenOCDError("Error connecting DP: cannot read IDR")
+
+    def _program(self, args: List[str]) -> str:
+        """program <file> [address] [verify] [reset] [exit]"""
+        flags = {a for a in args[1:] if not a[:1].isdigit()}
+        numbers = [a for a in args[1:] if a[:1].isdigit()]
+        address = int(numbers[0], 0) if numbers else None
+        self.target.halted = True
+        self._log("** Programming Started **")
+        start = time.monotonic()
+        written = 0
+        for seg_address, data in self._load_file(args[0], address):
+            self.target.write(seg_address, data, erase=True)
+            written += len(data)
+        self._log(f"wrote {written} bytes from file {args[0]} in "
+                  f"{self._rate_text(written, time.monotonic() - start)}")
+        self._log("** Programming Finished **")
+        if "verify" in flags:
+            self._log("** Verify Started **")
+            start = time.monotonic()
+            self._verify([args[0]] + numbers)
+            self._log(f"verified {written} bytes in "
+                      f"{self._rate_text(written, time.monotonic() - start)}")
+            self._log("** Verified OK **")
+        if "reset" in flags:
+            self._log("** Resetting Target **")
+            self.target.reset()
+        if "exit" in flags:
+            self.shutdown_requested = True
+        return ""
+
+    def _flash(self, args: List[str]) -> str:
+        """flash write_image / erase_sector / erase_address"""
+        sub = args[0]
+        if sub == "write_image":
+            rest = args[1:]
+            erase = bool(rest) and rest[0] == "erase"
+            if erase:
+                rest = rest[1:]
+            address = int(rest[1], 0) if len(rest) > 1 else None
+            written = 0
+            for seg_address, data in self._load_file(rest[0], address):
+                self.target.write(seg_address, data, erase=erase)
+                written += len(data)
+            return f"wrote {written} bytes from file {rest[0]}"
+        if sub == "erase_sector":
+            first = int(args[2], 0)
+            last = (self.target.sector_count - 1 if args[3] == "last"
+                    else int(args[3], 0))
+            self.target.erase_sectors(first, last)
+            return f"erased sectors {first} through {last} on flash bank {args[1]}"
+        if sub == "erase_address":
+            address, length = int(args[1], 0), int(args[2], 0)
+            first = self.target.sector_of(address)
+            last = self.target.sector_of(address + length - 1)
+            self.target.erase_sectors(first, last)
+            return ""
+        raise FakeOpenOCDError(f"unknown flash subcommand {sub}")
+
+    def _log(self, text: str) -> None:
+        if self.log is not None:
+            self.log(text)
+
+    @staticmethod
+    def _rate_text(size: int, seconds: float) -> str:
+        seconds = max(seconds, 1e-6)
+        return f"{seconds:.6f}s ({size / 1024 / seconds:.3f} KiB/s)"
+
+    def _verify(self, args: List[str]) -> str:
+        """verify_image <file> [address]"""
+        address = int(args[1], 0) if len(args) > 1 else None
+        for seg_address, data in self._load_file(args[0], address):
+            if self.target.read(seg_address, len(data)) != data:
+                raise FakeOpenOCDError("checksum mismatch - attempting binary compare")
+        return "verified"
+
+
+class FakeOpenOCDServer:
+    """Tcl RPC server in front of a FakeOpenOCD interpreter"""
+
+    def __init__(self, ocd: Optional[FakeOpenOCD] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialize server
+
+        Args:
+            ocd: Interpreter to serve (default: fresh FakeOpenOCD)
+            host: Bind address
+            port: Bind port (0 picks a free port)
+        """
+        self.ocd = ocd or FakeOpenOCD()
+        self._lock = threading.Lock()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(4)
+        self.host, self.port = self._sock.getsockname()[:2]
+        self._thread = None
+        self._running = False
+
+    def start(self) -> "FakeOpenOCDServer":
+        """Start serving in a background thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Accept clients until stop() or a shutdown command"""
+        self._running = True
+        while self._running and not self.ocd.shutdown_requested:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(conn,),
+                             daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        """Serve one client connection"""
+        buffer = b""
+        with conn:
+            while self._running:
+                try:
+                    chunk = conn.recv(65536)
+                except OSError:
+                    return
+                if not chunk:
+                    return
+                buffer += chunk
+                while TCL_TERMINATOR in buffer:
+                    request, buffer = buffer.split(TCL_TERMINATOR, 1)
+                    with self._lock:
+                        try:
+                            reply = self.ocd.execute(request.decode())
+                        except FakeOpenOCDError as e:
+                            reply = str(e)
+                    conn.sendall(reply.encode() + TCL_TERMINATOR)
+                    if self.ocd.shutdown_requested:
+                        self.stop()
+                        return
+
+    def stop(self) -> None:
+        """Stop the server and release the listening socket"""
+        self._running = False
+        try:
+            # close() alone does not wake a thread blocked in accept()
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Emulate the openocd command line"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    if "--version" in argv or "-v" in argv:
+        print("Open On-Chip Debugger 0.12.0 (fake)", file=sys.stderr)
+        return 0
+
+    target = target_from_env()
+    state_file = Path(os.environ[STATE_ENV]) if target else None
+    ocd = FakeOpenOCD(target, state_file)
+    ocd.log = lambda text: print(text, file=sys.stderr, flush=True)
+
+    commands = []
+    i = 0
+    while i < len(argv):
+        if argv[i] == "-c" and i + 1 < len(argv):
+            commands.append(argv[i + 1])
+            i += 2
+        elif argv[i] in ("-f", "-s", "-d") and i + 1 < len(argv):
+            i += 2
+        else:
+            i += 1
+
+    for command in commands:
+        try:
+            output = ocd.execute(command)
+        except FakeOpenOCDError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        if output:
+            print(output, file=sys.stderr)
+        if ocd.shutdown_requested:
+            return 0
+
+    if ocd.tcl_port is not None and ocd.tcl_port > 0:
+        server = FakeOpenOCDServer(ocd, port=ocd.tcl_port)
+        print(f"Info : Listening on port {server.port} for tcl connections",
+              file=sys.stderr)
+        sys.stderr.flush()
+        server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""
+Fake STM32_Programmer_CLI - Hardware-free stand-in for STM32CubeProgrammer
+Understands the subset of CLI options this package issues and applies them to
+a SimulatedTarget persisted in the file named by STM32SIM_STATE
+
+Environment:
+    STM32SIM_STATE          Flash state file (one file per probe serial)
+    STM32SIM_CONNECT_DELAY  Seconds spent "connecting" per invocation
+    STM32SIM_FAIL_PROBES    Comma-separated probe serials that fail to connect
+    STM32SIM_WRITE_RATE     Simulated programming speed in bytes/second
+    STM32SIM_ERASE_TIME     Simulated erase time per sector in seconds
+    STM32SIM_SWD_MAX_FREQ   Fastest reliable SWD clock in kHz for freq=
+    STM32SIM_FIXTURE        A target is attached only while this file exists
+
+Usage: python -m utils.stm32Programmer.sim.fake_stm32_cli [CLI options]
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional, List, Dict
+
+from ..core.image import FirmwareImage, ImageFormatError
+from .target import (SimulatedTarget, STATE_ENV, apply_env_timings, apply_swd_clock,
+                     target_attached)
+
+VERSION = "2.15.0 (fake)"
+
+# Bytes written between progress bar updates
+_PROGRESS_CHUNK = 4096
+
+
+class FakeCLIError(Exception):
+    """Raised when a simulated CLI operation fails"""
+
+
+def _parse_int(text: str) -> int:
+    return int(text, 0)
+
+
+def parse_args(argv: List[str]) -> List[List[str]]:
+    """Group argv into [option, values...] commands in order"""
+    commands = []
+    for arg in argv:
+        if arg.startswith("-") and not arg.lstrip("-").isdigit():
+            commands.append([arg])
+        elif commands:
+            commands[-1].append(arg)
+        else:
+            raise FakeCLIError(f"Unexpected argument: {arg}")
+    return commands
+
+
+def state_file_for(serial: Optional[str],
+                   state: Optional[str] = None) -> Optional[Path]:
+    """State file for a probe serial, derived from STM32SIM_STATE"""
+    state = state or os.environ.get(STATE_ENV)
+    if not state:
+        return None
+    path = Path(state)
+    if serial:
+        path = path.with_name(f"{path.stem}-{serial}{path.suffix}")
+    return path
+
+
+class FakeSTM32CLI:
+    """Interpreter for STM32_Programmer_CLI command lines"""
+
+    def __init__(self, target: Optional[SimulatedTarget] = None):
+        self.target = target
+        self.connect: Dict[str, str] = {}
+        self.state_file: Optional[Path] = None
+
+    def log(self, text: str) -> None:
+        print(text)
+        sys.stdout.flush()
+
+    def run(self, argv: List[str]) -> int:
+        """Execute a full command line; returns the process exit code"""
+        try:
+            commands = parse_args(argv)
+            for command in commands:
+                self._execute(command[0], command[1:])
+            if self.target is not None and self.state_file is not None:
+                self.target.save(self.state_file)
+            return 0
+        except (FakeCLIError, ValueError, IndexError, ImageFormatError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+
+    def _require_target(self) -> SimulatedTarget:
+        if self.target is None:
+            raise FakeCLIError("No debug probe detected")
+        return self.target
+
+    def _execute(self, option: str, values: List[str]) -> None:
+        if option in ("--version", "-version"):
+            self.log(f"STM32CubeProgrammer version: {VERSION}")
+        elif option in ("-l", "--list"):
+            self.log("===== DFU Interface   =====\n\nNo STM32 device in DFU mode connected")
+        elif option in ("-c", "--connect"):
+            self._connect(values)
+        elif option in ("-w", "--write", "-d", "--download"):
+            self._write(values)
+        elif option in ("-v", "--verify"):
+            self._verify(values)
+        elif option in ("-e", "--erase"):
+            self._erase(values)
+        elif option in ("-r", "--read", "-u", "--upload"):
+            self._read(values)
+        elif option in ("-rst", "--rst", "-hardRst"):
+            self._require_target().reset()
+            self.log("MCU Reset")
+        elif option in ("-w32", "--write32"):
+            self._require_target().write32(_parse_int(values[0]), _parse_int(values[1]))
+        elif option in ("-r32", "--read32"):
+            self._read32(values)
+        elif option in ("-ob", "--optionbytes"):
+            self._option_bytes(values)
+        elif option in ("-halt", "--halt"):
+            self._require_target().halted = True
+            self.log("Core halted")
+        elif option in ("-q", "--quietMode", "-vb", "--verbosity"):
+            pass
+        else:
+            raise FakeCLIError(f"wrong command: {option}")
+
+    def _connect(self, values: List[str]) -> None:
+        self.connect = dict(v.split("=", 1) for v in values if "=" in v)
+        serial = self.connect.get("sn")
+        failing = os.environ.get("STM32SIM_FAIL_PROBES", "")
+        if serial and serial in failing.split(","):
+            raise FakeCLIError("No STM32 target found!")
+        if not target_attached():
+            raise FakeCLIError("No STM32 target found!")
+
+        delay = float(os.environ.get("STM32SIM_CONNECT_DELAY", "0") or 0)
+        if delay:
+            time.sleep(delay)
+
+        self.state_file = state_file_for(serial)
+        if self.target is None:
+            self.target = apply_env_timings(
+                SimulatedTarget.load(self.state_file)
+                if self.state_file else SimulatedTarget())
+        freq = self.connect.get("freq")
+        if not apply_swd_clock(self.target, int(freq) if freq else None):
+            raise FakeCLIError("ST-LINK error (DEV_TARGET_NOT_HALTED)")
+        self.log("      -------------------------------------------------------------------")
+        self.log(f"                        STM32CubeProgrammer v{VERSION}")
+        self.log("      -------------------------------------------------------------------")
+        self.log(f"ST-LINK SN  : {serial or 'FAKE0000'}")
+        self.log(f"Frequency   : {self.connect.get('freq', '4000')} KHz")
+        self.log(f"Connection mode : {self.connect.get('mode', 'Normal')}")
+        self.log(f"Device ID   : 0x410")
+        self.log(f"Flash size  : {self.target.flash_size // 1024} KBytes")
+
+    def _load(self, values: List[str]) -> FirmwareImage:
+        path = Path(values[0])
+        if not path.exists():
+            raise FakeCLIError(f"File not found: {path}")
+        address = _parse_int(values[1]) if len(values) > 1 else None
+        return FirmwareImage.load(path, address)
+
+    def _write(self, values: List[str]) -> None:
+        target = self._require_target()
+        image = self._load(values)
+        self.log("Memory Programming ...")
+        self.log(f"Opening and parsing file: {Path(values[0]).name}")
+        self.log(f"  File          : {Path(values[0]).name}")
+        self.log(f"  Size          : {image.size} Bytes")
+        self.log(f"  Address       : {hex(image.start or 0)}")
+        for index, segment in enumerate(image.segments):
+            if segment.data:
+                first = target.sector_of(segment.address)
+                last = target.sector_of(segment.end - 1)
+                self.log(f"Erasing memory corresponding to segment {index}:")
+                self.log(f"Erasing internal memory sectors [{first} {last}]")
+                target.erase_sectors(first, last)
+        start = time.monotonic()
+        self.log("Download in Progress:")
+        total = image.size or 1
+        done = 0
+        for segment in image.segments:
+            for offset in range(0, len(segment.data), _PROGRESS_CHUNK):
+                chunk = bytes(segment.data[offset:offset + _PROGRESS_CHUNK])
+                target.write(segment.address + offset, chunk)
+                done += len(chunk)
+                self._progress(done * 100 // total)
+        sys.stdout.write("\n")
+        self.log("File download complete")
+        self.log(f"Time elapsed during download operation: "
+                 f"{_elapsed(time.monotonic() - start)}")
+
+    def _progress(self, percent: int) -> None:
+        """Redraw the progress bar in place, like the real tool"""
+        filled = percent // 2
+        sys.stdout.write(f"\r[{'=' * filled}{' ' * (50 - filled)}] {percent:3d}%")
+        sys.stdout.flush()
+
+    def _verify(self, values: List[str]) -> None:
+        target = self._require_target()
+        image = self._load(values)
+        self.log("Verifying ...")
+        for segment in image.segments:
+            if target.read(segment.address, len(segment.data)) != segment.data:
+                raise FakeCLIError("Download verification failed")
+        self.log("Download verified successfully")
+
+    def _erase(self, values: List[str]) -> None:
+        target = self._require_target()
+        tokens = " ".join(values).replace("[", " [ ").replace("]", " ] ").split()
+        if tokens and tokens[0] == "all":
+            target.erase_all()
+            self.log("Mass erase successfully achieved")
+            return
+        if tokens[:1] == ["["]:
+            first, last = _parse_int(tokens[1]), _parse_int(tokens[2])
+            target.erase_sectors(first, last)
+        else:
+            for token in tokens:
+                sector = _parse_int(token)
+                target.erase_sectors(sector, sector)
+        self.log("Flash memory erased successfully")
+
+    def _option_bytes(self, values: List[str]) -> None:
+        target = self._require_target()
+        if values == ["displ"]:
+            self.log("Option Bytes:")
+            for name, value in sorted(target.option_bytes.items()):
+                self.log(f"  {name:<12}: {value}")
+            return
+        for value in values:
+            name, sep, setting = value.partition("=")
+            if not sep:
+                raise FakeCLIError(f"wrong option byte setting: {value}")
+            target.option_bytes[name] = setting
+        self.log("Option Bytes successfully programmed")
+
+    def _read32(self, values: List[str]) -> None:
+        target = self._require_target()
+        address, size = _parse_int(values[0]), _parse_int(values[1])
+        self.log("Reading 32-bit memory content")
+        self.log(f"  Size          : {size} Bytes")
+        self.log(f"  Address:      : {address:#010x}")
+        self.log("")
+        for offset in range(0, size, 16):
+            words = [f"{target.read32(address + o):08X}"
+                     for o in range(offset, min(offset + 16, size), 4)]
+            self.log(f"0x{address + offset:08X} : {' '.join(words)}")
+
+    def _read(self, values: List[str]) -> None:
+        target = self._require_target()
+        path, address, size = Path(values[0]), _parse_int(values[1]), _parse_int(values[2])
+        self.log("Reading data...")
+        path.write_bytes(target.read(address, size))
+        self.log(f"Data read successfully")
+
+
+def _elapsed(seconds: float) -> str:
+    """Format seconds the way STM32_Programmer_CLI does (hh:mm:ss.mmm)"""
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:06.3f}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Emulate the STM32_Programmer_CLI command line"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    return FakeSTM32CLI().run(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
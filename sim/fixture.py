@@ -0,0 +1,97 @@
+"""
+Simulated Fixture - Programming socket whose units come and go
+Attaches a fresh blank target for every unit and removes it again, so the
+production line can run against the fake tools (STM32SIM_FIXTURE)
+"""
+
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+from .target import SimulatedTarget
+
+
+class SimulatedFixture:
+    """Socket holding at most one simulated unit"""
+
+    def __init__(self, fixture_file: Union[Path, str], state_file: Union[Path, str],
+                 flash_size: int = 64 * 1024, sector_size: int = 1024):
+        """
+        Initialize fixture
+
+        Args:
+            fixture_file: File the fake tools check (STM32SIM_FIXTURE)
+            state_file: Flash state file of the fake tools (STM32SIM_STATE)
+            flash_size: Flash size of each new unit
+            sector_size: Sector size of each new unit
+        """
+        self.fixture_file = Path(fixture_file)
+        self.state_file = Path(state_file)
+        self.flash_size = flash_size
+        self.sector_size = sector_size
+        self.inserted = 0
+        self._done = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def attached(self) -> bool:
+        return self.fixture_file.exists()
+
+    def attach(self) -> None:
+        """Insert a new blank unit"""
+        SimulatedTarget(flash_size=self.flash_size,
+                        sector_size=self.sector_size).save(self.state_file)
+        self.inserted += 1
+        self._done.clear()
+        self.fixture_file.write_text(f"unit {self.inserted}\n")
+
+    def detach(self) -> None:
+        """Remove the unit"""
+        if self.attached:
+            self.fixture_file.unlink()
+
+    def unit_done(self, record=None) -> None:
+        """Result callback (ProductionLine.on_result): the operator may swap units"""
+        self._done.set()
+
+    def start_operator(self, units: int, handling_time: float = 0.1,
+                       timeout: float = 60.0) -> threading.Thread:
+        """
+        Insert units one after another in a background thread
+
+        Each unit is removed once unit_done() is called for it (or after
+        timeout), handling_time seconds pass on insertion and on removal.
+
+        Args:
+            units: Units to insert
+            handling_time: Seconds the operator needs per insert/remove; must
+                exceed one attach check, or the line misses the removal
+            timeout: Seconds to wait for a unit's result
+
+        Returns:
+            The operator thread
+        """
+        def operate():
+            for _ in range(units):
+                if self._stop.wait(handling_time):
+                    break
+                self.attach()
+                self._done.wait(timeout)
+                if self._stop.wait(handling_time):
+                    break
+                self.detach()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=operate, daemon=True,
+                                        name="fixture-operator")
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        """Stop the operator thread and remove the unit"""
+        self._stop.set()
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.detach()
@@ -0,0 +1,56 @@
+"""
+Launchers - Executable wrappers for the fake tool backends
+Lets STM32Programmer/STM32Builder run the simulators wherever they expect a
+real executable path (STM32_Programmer_CLI, openocd, make)
+"""
+
+import os
+import platform
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+def _package_root() -> Path:
+    """Directory that must be on sys.path to import this package"""
+    # Keep symlinked checkouts intact: do not resolve()
+    here = Path(os.path.abspath(__file__)).parent
+    for _ in __package__.split("."):
+        here = here.parent
+    return here
+
+
+def make_launcher(name: str, module: str, directory: Union[Path, str],
+                  env: Optional[Dict[str, str]] = None) -> Path:
+    """
+    Write an executable wrapper that runs a simulator module
+
+    Args:
+        name: Executable name (e.g. "STM32_Programmer_CLI", "openocd")
+        module: Module inside sim/ to run (e.g. "fake_stm32_cli")
+        directory: Where to create the launcher
+        env: Extra environment variables baked into the launcher
+
+    Returns:
+        Path to the launcher
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = f"{__package__}.{module}"
+    root = _package_root()
+    env = env or {}
+
+    if platform.system() == "Windows":
+        path = directory / f"{name}.bat"
+        lines = ["@echo off", f'set "PYTHONPATH={root};%PYTHONPATH%"']
+        lines += [f'set "{key}={value}"' for key, value in env.items()]
+        lines.append(f'"{sys.executable}" -m {target} %*')
+        path.write_text("\r\n".join(lines) + "\r\n")
+    else:
+        path = directory / name
+        lines = ["#!/bin/sh", f'export PYTHONPATH="{root}${{PYTHONPATH:+:$PYTHONPATH}}"']
+        lines += [f'export {key}="{value}"' for key, value in env.items()]
+        lines.append(f'exec "{sys.executable}" -m {target} "$@"')
+        path.write_text("\n".join(lines) + "\n")
+        path.chmod(0o755)
+    return path
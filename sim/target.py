@@ -0,0 +1,293 @@
+"""
+Simulated STM32 Target - In-memory flash model for hardware-free runs
+Used by the fake programmer backends to emulate erase/write/read behaviour
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional, Union, Dict
+
+from ..core.verify import (
+    stm32_crc32, CRC32_INIT, RCC_AHBENR, RCC_AHBENR_RESET, RCC_AHBENR_DMA1EN,
+    RCC_AHBENR_CRCEN, CRC_DR, CRC_CR, CRC_CR_RESET, DMA1_ISR, DMA1_IFCR,
+    DMA1_CCR1, DMA1_CNDTR1, DMA1_CPAR1, DMA1_CMAR1, DMA_ISR_TCIF1,
+    DMA_ISR_TEIF1,
+)
+
+
+class SimulatedTarget:
+    """In-memory model of an STM32 flash array"""
+
+    ERASED = 0xFF
+    UID_SIZE = 12
+
+    def __init__(self, flash_base: int = 0x08000000,
+                 flash_size: int = 64 * 1024,
+                 sector_size: int = 1024,
+                 write_rate: float = 0.0,
+                 erase_time: float = 0.0):
+        """
+        Initialize simulated target
+
+        Args:
+            flash_base: Flash start address
+            flash_size: Flash size in bytes
+            sector_size: Uniform sector (page) size in bytes
+            write_rate: Programming speed in bytes/second (0: instant)
+            erase_time: Seconds spent erasing one sector
+        """
+        self.flash_base = flash_base
+        self.flash_size = flash_size
+        self.sector_size = sector_size
+        self.write_rate = write_rate
+        self.erase_time = erase_time
+        self.memory = bytearray([self.ERASED]) * flash_size
+        self.halted = False
+        self.resets = 0
+        self.registers: Dict[int, int] = {}
+        self.crc = CRC32_INIT
+        self.option_bytes: Dict[str, str] = {}
+        self.uid = os.urandom(self.UID_SIZE)  # A new target is a new device
+        # Set while the SWD clock is too fast for the wiring (see apply_swd_clock)
+        self.corrupt_writes = False
+
+    @property
+    def sector_count(self) -> int:
+        """Number of sectors in the flash array"""
+        return (self.flash_size + self.sector_size - 1) // self.sector_size
+
+    def _offset(self, address: int, size: int) -> int:
+        """Translate an address range to a memory offset, checking bounds"""
+        offset = address - self.flash_base
+        if offset < 0 or offset + size > self.flash_size:
+            raise ValueError(f"Address range {hex(address)}+{hex(size)} "
+                             f"outside flash")
+        return offset
+
+    def sector_of(self, address: int) -> int:
+        """Return the sector index containing address"""
+        return self._offset(address, 0) // self.sector_size
+
+    def erase_sectors(self, first: int, last: int) -> None:
+        """Erase sectors first..last inclusive"""
+        if first < 0 or last >= self.sector_count or first > last:
+            raise ValueError(f"Invalid sector range {first}..{last}")
+        if self.erase_time:
+            time.sleep(self.erase_time * (last - first + 1))
+        start = first * self.sector_size
+        end = min((last + 1) * self.sector_size, self.flash_size)
+        self.memory[start:end] = bytes([self.ERASED]) * (end - start)
+
+    def erase_all(self) -> None:
+        """Mass erase the whole flash array"""
+        self.erase_sectors(0, self.sector_count - 1)
+
+    def write(self, address: int, data: bytes, erase: bool = False) -> None:
+        """
+        Program data at address
+
+        Args:
+            address: Start address
+            data: Bytes to program
+            erase: Erase the touched sectors first (like write_image erase)
+
+        Raises:
+            ValueError: If the range is out of bounds or not erased
+        """
+        offset = self._offset(address, len(data))
+        if not data:
+            return
+        if erase:
+            self.erase_sectors(offset // self.sector_size,
+                               (offset + len(data) - 1) // self.sector_size)
+        current = self.memory[offset:offset + len(data)]
+        if current.count(self.ERASED) != len(current):
+            # Real flash refuses to program non-erased cells; allow only
+            # rewrites of identical content
+            for old, new in zip(current, data):
+                if old != self.ERASED and old != new:
+                    raise ValueError(f"Write to non-erased flash at "
+                                     f"{hex(address)}")
+        if self.write_rate:
+            time.sleep(len(data) / self.write_rate)
+        self.memory[offset:offset + len(data)] = data
+        if self.corrupt_writes:
+            self.memory[offset + len(data) - 1] ^= 0x01
+
+    def read(self, address: int, size: int) -> bytes:
+        """
+        Read size bytes starting at address
+
+        Short reads outside flash return the unique device ID, whichever
+        family's UID address they use.
+        """
+        in_flash = self.flash_base <= address < self.flash_base + self.flash_size
+        if not in_flash and size <= self.UID_SIZE:
+            return self.uid[:size]
+        offset = self._offset(address, size)
+        return bytes(self.memory[offset:offset + size])
+
+    def read32(self, address: int) -> int:
+        """
+        Read a 32-bit word from flash or a modelled peripheral register
+
+        Only the RCC clock enable, CRC unit and DMA1 channel 1 registers
+        used for device-side CRC are modelled; other registers read as 0.
+        """
+        if self.flash_base <= address < self.flash_base + self.flash_size:
+            return int.from_bytes(self.read(address, 4), "little")
+        if address == RCC_AHBENR:
+            return self.registers.get(address, RCC_AHBENR_RESET)
+        if address == CRC_DR:
+            return self.crc
+        return self.registers.get(address, 0)
+
+    def write32(self, address: int, value: int) -> None:
+        """Write a 32-bit peripheral register"""
+        value &= 0xFFFFFFFF
+        clocks = self.read32(RCC_AHBENR)
+        if address in (CRC_DR, CRC_CR) and not clocks & RCC_AHBENR_CRCEN:
+            return  # Unclocked peripheral ignores writes
+        if DMA1_ISR <= address <= DMA1_CMAR1 and not clocks & RCC_AHBENR_DMA1EN:
+            return
+
+        if address == CRC_CR:
+            if value & CRC_CR_RESET:
+                self.crc = CRC32_INIT
+        elif address == CRC_DR:
+            self.crc = stm32_crc32(value.to_bytes(4, "little"), self.crc)
+        elif address == DMA1_IFCR:
+            self.registers[DMA1_ISR] = self.registers.get(DMA1_ISR, 0) & ~value
+        else:
+            self.registers[address] = value
+            if address == DMA1_CCR1 and value & 1 and value & (1 << 14):
+                self._dma_transfer()
+
+    def _dma_transfer(self) -> None:
+        """Run a DMA1 channel 1 memory-to-memory transfer into CRC_DR"""
+        source = self.registers.get(DMA1_CMAR1, 0)
+        dest = self.registers.get(DMA1_CPAR1, 0)
+        count = self.registers.get(DMA1_CNDTR1, 0)
+        try:
+            data = self.read(source, count * 4)
+        except ValueError:
+            self.registers[DMA1_ISR] = self.registers.get(DMA1_ISR, 0) | DMA_ISR_TEIF1 | 1
+            return
+        if dest == CRC_DR and self.read32(RCC_AHBENR) & RCC_AHBENR_CRCEN:
+            self.crc = stm32_crc32(data, self.crc)
+        self.registers[DMA1_CNDTR1] = 0
+        self.registers[DMA1_ISR] = self.registers.get(DMA1_ISR, 0) | DMA_ISR_TCIF1 | 1
+
+    def reset(self, halt: bool = False) -> None:
+        """Reset the simulated core"""
+        self.resets += 1
+        self.halted = halt
+        self.registers.clear()
+        self.crc = CRC32_INIT
+
+    def save(self, state_file: Union[Path, str]) -> None:
+        """Persist flash contents and geometry to disk"""
+        state_file = Path(state_file)
+        state_file.write_bytes(bytes(self.memory))
+        meta = {
+            "flash_base": self.flash_base,
+            "flash_size": self.flash_size,
+            "sector_size": self.sector_size,
+            "resets": self.resets,
+            "option_bytes": self.option_bytes,
+            "uid": self.uid.hex(),
+        }
+        state_file.with_suffix(state_file.suffix + ".json").write_text(
+            json.dumps(meta))
+
+    @classmethod
+    def load(cls, state_file: Union[Path, str],
+             **defaults) -> "SimulatedTarget":
+        """
+        Load a target previously written by save()
+
+        Args:
+            state_file: Flash contents file
+            **defaults: Geometry used when the state file does not exist
+
+        Returns:
+            SimulatedTarget instance
+        """
+        state_file = Path(state_file)
+        meta_file = state_file.with_suffix(state_file.suffix + ".json")
+        if not state_file.exists() or not meta_file.exists():
+            return cls(**defaults)
+
+        meta = json.loads(meta_file.read_text())
+        target = cls(meta["flash_base"], meta["flash_size"],
+                     meta["sector_size"])
+        target.memory[:] = state_file.read_bytes()[:target.flash_size]
+        target.resets = meta.get("resets", 0)
+        target.option_bytes = meta.get("option_bytes", {})
+        if "uid" in meta:
+            target.uid = bytes.fromhex(meta["uid"])
+        return target
+
+
+# Environment variable naming the state file shared by fake tool processes
+STATE_ENV = "STM32SIM_STATE"
+
+# Environment variable naming the fixture file: while it is set, a target is
+# attached only while that file exists (see sim.fixture)
+FIXTURE_ENV = "STM32SIM_FIXTURE"
+
+# Environment variables holding the flash timing model
+WRITE_RATE_ENV = "STM32SIM_WRITE_RATE"   # bytes/second
+ERASE_TIME_ENV = "STM32SIM_ERASE_TIME"   # seconds per sector
+
+# Fastest SWD clock in kHz the simulated wiring carries cleanly (unset: any)
+SWD_MAX_FREQ_ENV = "STM32SIM_SWD_MAX_FREQ"
+
+# SWD clock the write rate is specified at (the STM32CubeProgrammer default)
+NOMINAL_SWD_FREQ = 4000
+
+
+def apply_env_timings(target: SimulatedTarget) -> SimulatedTarget:
+    """Configure write/erase timings from STM32SIM_WRITE_RATE/ERASE_TIME"""
+    target.write_rate = float(os.environ.get(WRITE_RATE_ENV, "0") or 0)
+    target.erase_time = float(os.environ.get(ERASE_TIME_ENV, "0") or 0)
+    return target
+
+
+def apply_swd_clock(target: SimulatedTarget, freq_khz: Optional[int]) -> bool:
+    """
+    Model the SWD clock: write speed scales with it, and past
+    STM32SIM_SWD_MAX_FREQ writes get corrupted (up to twice the limit) or
+    the target does not answer at all
+
+    Args:
+        target: Target whose write_rate was set by apply_env_timings
+        freq_khz: Requested SWD clock (None: NOMINAL_SWD_FREQ)
+
+    Returns:
+        False if the link does not come up at this clock
+    """
+    freq = freq_khz or NOMINAL_SWD_FREQ
+    limit = float(os.environ.get(SWD_MAX_FREQ_ENV, "0") or 0)
+    if limit and freq > 2 * limit:
+        return False
+    target.corrupt_writes = bool(limit) and freq > limit
+    rate = float(os.environ.get(WRITE_RATE_ENV, "0") or 0)
+    target.write_rate = rate * freq / NOMINAL_SWD_FREQ
+    return True
+
+
+def target_attached() -> bool:
+    """False while STM32SIM_FIXTURE names a missing file (unit removed)"""
+    fixture = os.environ.get(FIXTURE_ENV)
+    return not fixture or os.path.exists(fixture)
+
+
+def target_from_env(**defaults) -> Optional[SimulatedTarget]:
+    """Load the simulated target named by STM32SIM_STATE, if set"""
+    state_file = os.environ.get(STATE_ENV)
+    if not state_file:
+        return None
+    return apply_env_timings(SimulatedTarget.load(state_file, **defaults))
@@ -0,0 +1 @@
+"""Tests for STM32 Programmer"""
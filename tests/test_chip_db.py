@@ -0,0 +1,50 @@
+"""Chip database tests: prefix matching and size-dependent entries"""
+
+import unittest
+
+from ..core.chip_db import lookup_chip
+
+
+class LookupChipTest(unittest.TestCase):
+
+    def test_family_prefix(self):
+        info = lookup_chip("STM32F103C8")
+        self.assertEqual(info.family, "STM32F1")
+        self.assertEqual(info.flash_size, 64 * 1024)
+        self.assertEqual(info.sector_sizes, (1024,) * 64)
+        self.assertEqual(info.openocd_target, "stm32f1x.cfg")
+
+    def test_case_and_whitespace_are_ignored(self):
+        self.assertEqual(lookup_chip(" stm32g474re "), lookup_chip("STM32G474RE"))
+
+    def test_size_code_selects_size_dependent_entries(self):
+        self.assertEqual(lookup_chip("STM32F103RE").page_size, 2048)
+        self.assertFalse(lookup_chip("STM32F103RE").dual_bank)
+        self.assertEqual(lookup_chip("STM32F103ZG").bank_size, 512 * 1024)
+
+    def test_longer_prefix_overrides_family(self):
+        # Connectivity line uses 2 KB pages at any size
+        self.assertEqual(lookup_chip("STM32F105RB").page_size, 2048)
+        self.assertEqual(lookup_chip("STM32F103RB").page_size, 1024)
+
+    def test_longer_prefix_applies_only_from_its_minimum_size(self):
+        self.assertTrue(lookup_chip("STM32F427ZI").dual_bank)
+        self.assertEqual(len(lookup_chip("STM32F427ZI").sector_sizes), 24)
+        self.assertFalse(lookup_chip("STM32F427ZG").dual_bank)
+        self.assertFalse(lookup_chip("STM32G431RB").dual_bank)
+        self.assertTrue(lookup_chip("STM32G474RE").dual_bank)
+
+    def test_sub_family_overrides(self):
+        h743, h7a3 = lookup_chip("STM32H743ZI"), lookup_chip("STM32H7A3ZI")
+        self.assertEqual((h743.page_size, h743.write_size), (131072, 32))
+        self.assertEqual((h7a3.page_size, h7a3.write_size), (8192, 16))
+        self.assertEqual(h743.uid_address, 0x1FF1E800)
+        self.assertEqual(h7a3.uid_address, 0x08FFF800)
+
+    def test_unknown_parts(self):
+        for part in ("STM32H563ZI", "STM32", "STM32F", "GD32F103C8", ""):
+            self.assertIsNone(lookup_chip(part), part)
+
+
+if __name__ == "__main__":
+    unittest.main()
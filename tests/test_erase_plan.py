@@ -0,0 +1,82 @@
+"""Erase planning tests: sector sets for address ranges and bank-split runs"""
+
+import unittest
+
+from ..core.chip_db import lookup_chip
+from ..core.erase_plan import ErasePlan
+from ..core.flash_layout import layout_for_chip
+
+
+class ForRangesTest(unittest.TestCase):
+
+    def test_partial_sectors_are_included(self):
+        layout = layout_for_chip("STM32F103C8")
+        plan = ErasePlan.for_ranges(layout, [(0x08000401, 0x400)])
+        self.assertEqual(plan.sectors, [1, 2])
+        self.assertEqual(plan.bytes, 2048)
+
+    def test_overlapping_ranges_are_merged(self):
+        layout = layout_for_chip("STM32F103C8")
+        plan = ErasePlan.for_ranges(layout, [(0x08000800, 0x800), (0x08000400, 0x800),
+                                             (0x08000C00, 1)])
+        self.assertEqual(plan.sectors, [1, 2, 3])
+        self.assertEqual(plan.runs(), [(1, 3)])
+
+    def test_ranges_outside_flash_are_ignored(self):
+        layout = layout_for_chip("STM32F103C8")
+        plan = ErasePlan.for_ranges(layout, [(0x20000000, 0x100), (0x0800FC00, 0x800),
+                                             (0x08000000, 0)])
+        self.assertEqual(plan.sectors, [63])
+        self.assertEqual(ErasePlan.for_ranges(layout, []).summary(), "nothing to erase")
+
+    def test_whole_flash(self):
+        layout = layout_for_chip("STM32F103C8")
+        plan = ErasePlan.for_ranges(layout, [(layout.base, layout.size)])
+        self.assertTrue(plan.full)
+        self.assertEqual(plan.summary(), "sectors 0-63 (64 KB of 64 KB)")
+
+    def test_mixed_sector_sizes(self):
+        # F4: 4 x 16 KB, 64 KB, then 128 KB sectors
+        layout = layout_for_chip("STM32F407VG")
+        plan = ErasePlan.for_ranges(layout, [(0x0800C000, 0x20000)])
+        self.assertEqual(plan.sectors, [3, 4, 5])
+        self.assertEqual(plan.stm32cube_args(), ["-e", "[3", "5]"])
+
+
+class BankBoundaryTest(unittest.TestCase):
+
+    def test_f42x_run_splits_at_bank_2(self):
+        # 2 MB F42x: sectors 0-11 in bank 1, 12-23 in bank 2 starting at 0x08100000
+        layout = layout_for_chip("STM32F427ZI")
+        plan = ErasePlan.for_ranges(layout, [(0x080E0000, 0x30000)])
+        self.assertEqual(plan.sectors, [11, 12, 13, 14, 15])
+        self.assertEqual(plan.runs(), [(11, 11), (12, 15)])
+        self.assertEqual(plan.stm32cube_args(), ["-e", "[11", "11]", "-e", "[12", "15]"])
+        # stm32f4x.cfg numbers sectors across both banks
+        self.assertEqual(plan.openocd_commands(), ["flash erase_sector 0 11 11",
+                                                   "flash erase_sector 0 12 15"])
+
+    def test_f42x_single_bank_part_does_not_split(self):
+        layout = layout_for_chip("STM32F427ZG")
+        plan = ErasePlan.for_ranges(layout, [(0x080C0000, 0x40000)])
+        self.assertEqual(plan.runs(), [(10, 11)])
+
+    def test_h7_bank_2_is_its_own_openocd_bank(self):
+        layout = layout_for_chip("STM32H743ZI")
+        self.assertEqual(lookup_chip("STM32H743ZI").openocd_banks, 2)
+        plan = ErasePlan.for_ranges(layout, [(0x080C0000, 0x80000)])
+        self.assertEqual(plan.sectors, [6, 7, 8, 9])
+        self.assertEqual(plan.runs(), [(6, 7), (8, 9)])
+        self.assertEqual(plan.stm32cube_args(), ["-e", "[6", "7]", "-e", "[8", "9]"])
+        self.assertEqual(plan.openocd_commands(split_banks=True),
+                         ["flash erase_sector 0 6 7", "flash erase_sector 1 0 1"])
+
+    def test_h7_bank_2_only(self):
+        layout = layout_for_chip("STM32H743ZI")
+        plan = ErasePlan.for_ranges(layout, [(0x081E0000, 0x20000)])
+        self.assertEqual(plan.openocd_commands(split_banks=True),
+                         ["flash erase_sector 1 7 7"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""Firmware image parser tests: well-formed and malformed HEX/ELF input"""
+
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..core.image import FirmwareImage, ImageFormatError
+
+
+def hex_record(record_type: int, address: int, data: bytes) -> str:
+    """Intel HEX record with a valid checksum"""
+    raw = bytes((len(data), address >> 8, address & 0xFF, record_type)) + data
+    return ":" + (raw + bytes(((-sum(raw)) & 0xFF,))).hex().upper()
+
+
+def elf32(segments, entry: int = 0x08000101) -> bytes:
+    """Little-endian 32-bit ELF with one PT_LOAD program header per (address, data)"""
+    phoff = 52
+    data_offset = phoff + 32 * len(segments)
+    header = b"\x7fELF" + bytes((1, 1, 1)) + bytes(9)
+    header += struct.pack("<HHIIIIIHHHHHH", 2, 40, 1, entry, phoff, 0, 0,
+                          52, 32, len(segments), 40, 0, 0)
+    tables, blobs = b"", b""
+    for address, data in segments:
+        tables += struct.pack("<IIIIIIII", 1, data_offset + len(blobs), address,
+                              address, len(data), len(data), 5, 4)
+        blobs += data
+    return header + tables + blobs
+
+
+class ImageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.root = Path(self._dir.name)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def write(self, name: str, content) -> Path:
+        path = self.root / name
+        if isinstance(content, str):
+            path.write_text(content)
+        else:
+            path.write_bytes(content)
+        return path
+
+
+class HexParserTest(ImageTestCase):
+
+    def test_extended_linear_address(self):
+        path = self.write("fw.hex", "\n".join([
+            hex_record(4, 0, b"\x08\x00"),
+            hex_record(0, 0x0000, b"\x01\x02\x03\x04"),
+            hex_record(0, 0x0004, b"\x05\x06"),
+            hex_record(5, 0, b"\x08\x00\x01\x01"),
+            hex_record(1, 0, b""),
+        ]))
+        image = FirmwareImage.load(path)
+        self.assertEqual(image.start, 0x08000000)
+        self.assertEqual(bytes(image.segments[0].data), bytes(range(1, 7)))
+        self.assertEqual(image.entry_point, 0x08000101)
+
+    def assert_rejected(self, *lines: str):
+        path = self.write("bad.hex", "\n".join(lines) + "\n")
+        with self.assertRaises(ImageFormatError):
+            FirmwareImage.load(path)
+
+    def test_bare_colon(self):
+        self.assert_rejected(":")
+
+    def test_short_record(self):
+        self.assert_rejected(":0000")
+
+    def test_zero_length_address_records(self):
+        self.assert_rejected(":00000004FC")
+        self.assert_rejected(":00000002FE")
+
+    def test_zero_length_start_address(self):
+        self.assert_rejected(":00000005FB")
+
+    def test_length_mismatch(self):
+        self.assert_rejected(":04000000010203F6")
+
+    def test_bad_checksum(self):
+        self.assert_rejected(hex_record(0, 0, b"\x01\x02")[:-2] + "00")
+
+    def test_invalid_hex(self):
+        self.assert_rejected(":0Z000000")
+
+    def test_unknown_record_type(self):
+        self.assert_rejected(hex_record(7, 0, b"\x00"))
+
+
+class ElfParserTest(ImageTestCase):
+
+    def test_load_segments(self):
+        path = self.write("fw.elf", elf32([(0x08000000, b"\xaa" * 8),
+                                           (0x08000100, b"\xbb" * 4)]))
+        image = FirmwareImage.load(path)
+        self.assertEqual([(s.address, len(s.data)) for s in image.segments],
+                         [(0x08000000, 8), (0x08000100, 4)])
+        self.assertEqual(image.entry_point, 0x08000101)
+
+    def assert_rejected(self, content: bytes):
+        path = self.write("bad.elf", content)
+        with self.assertRaises(ImageFormatError):
+            FirmwareImage.load(path)
+
+    def test_empty_file(self):
+        self.assert_rejected(b"")
+
+    def test_magic_only(self):
+        self.assert_rejected(b"\x7fELF")
+
+    def test_truncated_header(self):
+        self.assert_rejected(elf32([(0x08000000, b"\x00" * 4)])[:40])
+
+    def test_truncated_64_bit_header(self):
+        self.assert_rejected(b"\x7fELF" + bytes((2, 1, 1)) + bytes(50))
+
+    def test_truncated_program_headers(self):
+        self.assert_rejected(elf32([(0x08000000, b"\x00" * 4)] * 3)[:52 + 16])
+
+    def test_segment_past_end(self):
+        self.assert_rejected(elf32([(0x08000000, b"\x00" * 64)])[:-16])
+
+    def test_not_elf(self):
+        self.assert_rejected(b"\x00" * 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""OpenOCD session tests against the fake OpenOCD Tcl server and executable"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..core.openocd_session import OpenOCDError, OpenOCDSession, OpenOCDSessionPool
+from ..sim.fake_openocd import FakeOpenOCDServer
+from ..sim.launcher import make_launcher
+from ..sim.target import SimulatedTarget, STATE_ENV, FIXTURE_ENV
+
+BASE = 0x08000000
+
+
+def pattern(size: int, seed: int = 0) -> bytes:
+    """Non-0xFF test data"""
+    return bytes((seed + i * 7) % 251 for i in range(size))
+
+
+class SessionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+
+    def write(self, name: str, data: bytes) -> Path:
+        path = self.root / name
+        path.write_bytes(data)
+        return path
+
+
+class AttachedSessionTest(SessionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = FakeOpenOCDServer().start()
+        self.addCleanup(self.server.stop)
+        self.target = self.server.ocd.target
+        self.session = OpenOCDSession(spawn=False, tcl_port=self.server.port, timeout=5)
+        self.assertTrue(self.session.start())
+        self.addCleanup(self.session.close)
+
+    def test_flash_verify_and_reset(self):
+        self.target.write(BASE, pattern(2048, seed=9))
+        path = self.write("fw.bin", pattern(3000))
+        self.assertTrue(self.session.flash(path, BASE + 0x400))
+        self.assertEqual(self.target.read(BASE + 0x400, 3000), pattern(3000))
+        # write_image erase clears the sectors it touches
+        self.assertEqual(self.target.read(BASE + 0x400 + 3000, 72), b"\xFF" * 72)
+        self.assertEqual(self.target.read(BASE, 0x400), pattern(0x400, seed=9))
+        self.assertFalse(self.target.halted)
+
+    def test_verify_failure(self):
+        self.target.corrupt_writes = True
+        self.assertFalse(self.session.flash(self.write("fw.bin", pattern(512)), BASE))
+
+    def test_erase_and_read_memory(self):
+        self.target.write(BASE, pattern(2048))
+        self.assertTrue(self.session.erase())
+        output = self.root / "dump.bin"
+        self.assertTrue(self.session.read_memory(BASE, 2048, output))
+        self.assertEqual(output.read_bytes(), b"\xFF" * 1024 + pattern(2048)[1024:])
+        self.assertTrue(self.session.erase(full=True))
+        self.assertEqual(self.target.memory, bytearray(b"\xFF") * len(self.target.memory))
+
+    def test_command_errors_keep_the_session(self):
+        with self.assertRaisesRegex(OpenOCDError, "invalid command name"):
+            self.session.command("no_such_command")
+        self.session.set_speed(1800)
+        self.assertEqual(self.server.ocd.adapter_speed_khz, 1800)
+        self.assertEqual(self.session.command("adapter speed"), "1800")
+
+    def test_closed_session(self):
+        self.session.close()
+        with self.assertRaises(OpenOCDError):
+            self.session.command("reset run")
+
+
+class SpawnedSessionTest(SessionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.state = self.root / "target.bin"
+        self.openocd = make_launcher("openocd", "fake_openocd", self.root / "bin",
+                                     {STATE_ENV: str(self.state)})
+
+    def test_session_process(self):
+        session = OpenOCDSession(self.openocd, probe_serial="066DFF55", timeout=10)
+        with session:
+            self.assertTrue(session.is_alive())
+            self.assertTrue(session.flash(self.write("fw.bin", pattern(1500)), BASE))
+            process = session.process
+        self.assertIsNotNone(process.poll())
+        self.assertFalse(session.is_alive())
+        self.assertEqual(SimulatedTarget.load(self.state).read(BASE, 1500), pattern(1500))
+
+    def test_failed_start(self):
+        # No target attached: init fails and OpenOCD exits
+        missing = make_launcher("openocd", "fake_openocd", self.root / "gone",
+                                {STATE_ENV: str(self.state),
+                                 FIXTURE_ENV: str(self.root / "missing")})
+        self.assertFalse(OpenOCDSession(missing, timeout=10).start())
+
+    def test_pool_reuses_and_restarts_sessions(self):
+        pool = OpenOCDSessionPool()
+        self.addCleanup(pool.close_all)
+        first = pool.acquire("A", openocd_path=self.openocd, target="stm32f1x.cfg", timeout=10)
+        self.assertIs(pool.acquire("A", openocd_path=self.openocd, target="stm32f1x.cfg"),
+                      first)
+        # A session started for another target config is replaced
+        second = pool.acquire("A", openocd_path=self.openocd, target="stm32f4x.cfg", timeout=10)
+        self.assertIsNot(second, first)
+        self.assertFalse(first.is_alive())
+        self.assertTrue(second.is_alive())
+        self.assertEqual(pool.serials(), ["A"])
+        pool.release("A")
+        self.assertEqual(len(pool), 0)
+        self.assertFalse(second.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
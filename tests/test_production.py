@@ -0,0 +1,85 @@
+"""Production line tests against the fake tools and a simulated fixture"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..core.production import LineStats, ProductionLine, UnitRecord, percentile
+from ..sim.benchmark import BenchmarkEnvironment
+from ..sim.target import SimulatedTarget
+
+# Seconds per operator insert/remove; must exceed one fake tool attach check
+HANDLING_TIME = 0.4
+
+
+class PercentileTest(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        values = [float(v) for v in range(10, 0, -1)]
+        self.assertEqual(percentile(values, 50), 5.0)
+        self.assertEqual(percentile(values, 90), 9.0)
+        self.assertEqual(percentile(values, 99), 10.0)
+        self.assertEqual(percentile(values, 0), 1.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_line_stats(self):
+        stats = LineStats()
+        for unit, (attached, done, success) in enumerate(
+                [(0.0, 2.0, True), (3.0, 4.0, True), (5.0, 8.0, False)], 1):
+            stats.add(UnitRecord(unit, str(unit), "", success=success), attached, done)
+        # The first cycle starts at its attach, later ones at the previous unit's end
+        self.assertEqual(stats.cycle_times, [2.0, 2.0, 4.0])
+        self.assertEqual((stats.passed, stats.failed, stats.units), (2, 1, 3))
+        self.assertEqual(stats.units_per_hour, 3 * 3600 / 8.0)
+        self.assertIn("cycle p50 2.00s p90 4.00s p99 4.00s", stats.summary())
+
+
+class ProductionLineTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.env = BenchmarkEnvironment(Path(directory.name), fixture=True)
+        self.addCleanup(self.env.fixture.stop)
+        self.log = self.env.root / "line.jsonl"
+        self.image = self.env.image(6000)
+
+    def run_line(self, units: int, **kwargs) -> LineStats:
+        line = ProductionLine(self.env.programmer(), self.image, log_path=self.log,
+                              serial_format="GW-{:05d}", poll_interval=0.02, **kwargs)
+        line.on_result.append(self.env.fixture.unit_done)
+        operator = self.env.fixture.start_operator(units, HANDLING_TIME, timeout=30)
+        stats = line.run(units=units)
+        operator.join(timeout=5)   # The last unit is removed
+        return stats
+
+    def records(self):
+        return [json.loads(line) for line in self.log.read_text().splitlines()]
+
+    def test_units_serials_and_resume(self):
+        stats = self.run_line(2)
+        self.assertEqual((stats.units, stats.passed), (2, 2))
+        self.assertEqual(self.env.fixture.inserted, 2)
+        self.assertEqual(len(stats.cycle_times), 2)
+        self.assertGreater(stats.units_per_hour, 0)
+        target = SimulatedTarget.load(self.env.state_file)
+        self.assertEqual(target.read(0x08000000, 6000), self.image.read_bytes())
+
+        # A new run continues the serials of the log
+        self.assertEqual(self.run_line(2).units, 2)
+        records = self.records()
+        self.assertEqual([r["unit"] for r in records], [1, 2, 3, 4])
+        self.assertEqual([r["serial"] for r in records],
+                         ["GW-00001", "GW-00002", "GW-00003", "GW-00004"])
+        self.assertTrue(all(r["success"] and r["error"] is None for r in records))
+        self.assertEqual(len({r["digest"] for r in records}), 1)
+        self.assertTrue(all(r["cycle_time"] >= r["program_time"] > 0 for r in records))
+
+    def test_first_serial(self):
+        self.run_line(1, first_serial=100)
+        self.assertEqual([r["serial"] for r in self.records()], ["GW-00100"])
+
+
+if __name__ == "__main__":
+    unittest.main()
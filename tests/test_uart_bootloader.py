@@ -0,0 +1,159 @@
+"""UART bootloader tests against the pty-backed simulated bootloader"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..core.programmer import STM32Config, STM32Programmer
+from ..core.uart_bootloader import BootloaderError, UartBootloader, CMD_ERASE
+
+BASE = 0x08000000
+
+
+def pattern(size: int, seed: int = 0) -> bytes:
+    """Non-0xFF test data"""
+    return bytes((seed + i * 7) % 251 for i in range(size))
+
+
+@unittest.skipUnless(os.name == "posix", "pseudo-terminals are POSIX only")
+class UartTestCase(unittest.TestCase):
+
+    bootloader_options = {}
+
+    def setUp(self):
+        from ..sim.fake_bootloader import SimulatedBootloader
+
+        self.sim = SimulatedBootloader(**self.bootloader_options).start()
+        self.addCleanup(self.sim.stop)
+
+    def connect(self, **kwargs) -> UartBootloader:
+        bootloader = UartBootloader.open(self.sim.port, 115200, **kwargs)
+        self.addCleanup(bootloader.close)
+        bootloader.connect()
+        return bootloader
+
+    def programmer(self) -> STM32Programmer:
+        return STM32Programmer(STM32Config(port="UART", serial_port=self.sim.port,
+                                           native_uart=True, chip="STM32F103C8"))
+
+
+class SyncTest(UartTestCase):
+
+    def test_connect_reads_version_commands_and_id(self):
+        bootloader = self.connect()
+        self.assertTrue(self.sim.synced)
+        self.assertEqual(bootloader.version, 0x31)
+        self.assertEqual(bootloader.pid, 0x410)
+        self.assertTrue(bootloader.extended_erase)
+        self.assertEqual(bootloader.describe(), "Bootloader v3.1, PID 0x410, 115200 baud")
+
+    def test_reconnect_to_a_synchronized_bootloader(self):
+        self.connect().close()
+        self.sim.dtr_reset = False
+        self.assertEqual(self.connect().pid, 0x410)
+
+
+class EraseTest(UartTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sim.target.write(BASE, pattern(4 * 1024))
+
+    def assert_erased(self, pages, kept):
+        memory = self.sim.target.memory
+        for page in pages:
+            self.assertEqual(memory[page * 1024:(page + 1) * 1024], b"\xFF" * 1024)
+        for page in kept:
+            self.assertNotEqual(memory[page * 1024:(page + 1) * 1024], b"\xFF" * 1024)
+
+    def test_extended_erase_pages(self):
+        self.connect().erase([1, 2])
+        self.assert_erased([1, 2], kept=[0, 3])
+
+    def test_mass_erase(self):
+        self.connect().erase()
+        self.assert_erased(range(4), kept=[])
+
+    def test_missing_page_is_rejected(self):
+        with self.assertRaises(BootloaderError):
+            self.connect().erase([64])
+
+
+class LegacyEraseTest(EraseTest):
+
+    bootloader_options = {"extended_erase": False, "version": 0x22}
+
+    def test_legacy_command(self):
+        bootloader = self.connect()
+        self.assertFalse(bootloader.extended_erase)
+        self.assertIn(CMD_ERASE, bootloader.commands)
+
+
+class WriteTest(UartTestCase):
+
+    def test_pipelined_write_needs_fewer_round_trips(self):
+        data = pattern(1000)
+        trips = {}
+        for pipeline, address in ((True, BASE), (False, BASE + 0x800)):
+            bootloader = self.connect(pipeline=pipeline)
+            before = bootloader.round_trips
+            bootloader.write(address, data)
+            trips[pipeline] = bootloader.round_trips - before
+            # The unaligned tail is padded with 0xFF
+            self.assertEqual(bootloader.read(address, 1004), data + b"\xFF" * 4)
+            bootloader.close()
+        self.assertEqual(trips, {True: 4, False: 12})
+
+    def test_write_to_programmed_flash_is_rejected(self):
+        bootloader = self.connect()
+        bootloader.write(BASE, pattern(256))
+        with self.assertRaises(BootloaderError):
+            bootloader.write(BASE, pattern(256, seed=1))
+        # The client recovers from the rejected pipelined block
+        self.assertEqual(bootloader.read(BASE, 256), pattern(256))
+
+    def test_progress(self):
+        seen = []
+        self.connect().write(BASE, pattern(600), seen.append)
+        self.assertEqual(seen, [256, 512, 600])
+
+
+class ProgramTest(UartTestCase):
+
+    def test_program_erases_and_verifies(self):
+        self.sim.target.write(BASE + 0x400, pattern(1024, seed=3))
+        data = pattern(1500)
+        self.programmer()._uart_program(self.connect(), [(BASE + 0x200, data)], verify=True)
+        self.assertEqual(self.sim.target.read(BASE + 0x200, len(data)), data)
+        # The rest of the touched pages is erased
+        self.assertEqual(self.sim.target.read(BASE, 0x200), b"\xFF" * 0x200)
+
+    def test_read_back_mismatch(self):
+        self.sim.target.corrupt_writes = True
+        with self.assertRaisesRegex(BootloaderError, "Verification failed at 0x80000ff"):
+            self.programmer()._uart_program(self.connect(), [(BASE, pattern(512))],
+                                            verify=True)
+
+    def test_short_read_back(self):
+        class ShortReads(UartBootloader):
+            def read(self, address, size, progress=None):
+                return super().read(address, size - 4, progress)
+
+        bootloader = ShortReads.open(self.sim.port)
+        self.addCleanup(bootloader.close)
+        bootloader.connect()
+        with self.assertRaisesRegex(BootloaderError, "Verification failed at 0x80000fc"):
+            self.programmer()._uart_program(bootloader, [(BASE, pattern(256))], verify=True)
+
+    def test_flash_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "fw.bin"
+            path.write_bytes(pattern(3000))
+            self.assertTrue(self.programmer().flash(path))
+        self.assertEqual(self.sim.target.read(BASE, 3000), pattern(3000))
+        self.assertEqual(self.sim.started, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
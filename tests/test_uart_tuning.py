@@ -0,0 +1,71 @@
+"""Baudrate negotiation tests against the pty-backed simulated bootloader"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..config.settings import SettingsManager
+from ..core.programmer import STM32Config, STM32Programmer
+from ..core.uart_bootloader import BootloaderError
+from ..core.uart_tuning import BaudrateTuner
+
+RATES = (460800, 230400, 115200, 57600)
+
+
+@unittest.skipUnless(os.name == "posix", "pseudo-terminals are POSIX only")
+class BaudrateTunerTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings = SettingsManager(Path(directory.name) / "config.json")
+
+    def start(self, **options):
+        from ..sim.fake_bootloader import SimulatedBootloader
+
+        sim = SimulatedBootloader(**options).start()
+        self.addCleanup(sim.stop)
+        self.programmer = STM32Programmer(STM32Config(
+            port="UART", serial_port=sim.port, baudrate="auto", native_uart=True))
+        return sim
+
+    def tune(self, retune: bool = False) -> BaudrateTuner:
+        tuner = BaudrateTuner(self.programmer, self.settings, RATES, retune)
+        tuner.connect().close()
+        return tuner
+
+    def test_fastest_rate_when_the_link_is_clean(self):
+        self.start()
+        tuner = self.tune()
+        self.assertEqual(tuner.baudrate, 460800)
+        self.assertEqual(tuner.remembered, 460800)
+
+    def test_falls_back_to_the_fastest_clean_rate(self):
+        self.start(max_baudrate=115200, error_rate=0.05)
+        self.assertEqual(self.tune().baudrate, 115200)
+        # The next connection starts at the remembered rate
+        tuner = BaudrateTuner(self.programmer, self.settings, RATES)
+        self.assertEqual(tuner.candidates(), [115200, 57600])
+
+    def test_no_rate_works(self):
+        self.start(max_baudrate=9600, error_rate=0.5)
+        with self.assertRaises(BootloaderError):
+            self.tune()
+        self.assertIsNone(self.settings.uart_baudrate(self.programmer.config.serial_port,
+                                                      self.programmer.config.chip))
+
+    def test_read_protected_part_is_checked_with_get_and_get_id(self):
+        sim = self.start(read_protected=True)
+        tuner = self.tune()
+        self.assertEqual(tuner.baudrate, 460800)
+        self.assertGreater(tuner.throughput, 0)
+        self.assertEqual(sim.nacks, 1)
+
+    def test_read_protected_part_still_falls_back(self):
+        self.start(read_protected=True, max_baudrate=115200, error_rate=0.2)
+        self.assertLessEqual(self.tune().baudrate, 115200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Write planning tests: blank sectors, trimmed region ends and alignment"""
+
+import unittest
+
+from ..core.flash_layout import FlashLayout
+from ..core.image import FirmwareImage, Segment
+from ..core.write_plan import plan_writes
+
+BASE = 0x08000000
+
+
+def image(*segments) -> FirmwareImage:
+    """Image from (offset from BASE, data) pairs"""
+    return FirmwareImage([Segment(BASE + offset, bytearray(data))
+                          for offset, data in segments])
+
+
+class PlanWritesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.layout = FlashLayout(BASE, [1024] * 8)
+
+    def test_all_blank_sectors_are_erased_not_written(self):
+        data = b"\x11" * 1024 + b"\xFF" * 2048 + b"\x22" * 1024
+        plan = plan_writes(image((0, data)), self.layout, write_size=2)
+        self.assertEqual(plan.regions, [(BASE, b"\x11" * 1024),
+                                        (BASE + 0xC00, b"\x22" * 1024)])
+        self.assertEqual(plan.blank_sectors, [1, 2])
+        self.assertEqual(plan.erase_plan().sectors, [1, 2])
+        self.assertEqual(plan.bytes_avoided, 2048)
+
+    def test_blank_image(self):
+        plan = plan_writes(image((0x400, b"\xFF" * 1500)), self.layout)
+        self.assertEqual(plan.regions, [])
+        self.assertEqual(plan.blank_sectors, [1, 2])
+        self.assertEqual(plan.bytes_written, 0)
+        self.assertEqual(plan.bytes_avoided, 1500)
+
+    def test_region_ends_align_to_write_size(self):
+        plan = plan_writes(image((0, b"\xFF" * 5 + b"\xAA" * 10 + b"\xFF" * 20)),
+                           self.layout, write_size=8)
+        self.assertEqual(plan.regions, [(BASE, b"\xFF" * 5 + b"\xAA" * 10 + b"\xFF")])
+
+    def test_alignment_pads_outside_the_image_with_0xff(self):
+        plan = plan_writes(image((0x3FD, b"\xAA" * 3)), self.layout, write_size=8)
+        self.assertEqual(plan.regions, [(BASE + 0x3F8, b"\xFF" * 5 + b"\xAA" * 3)])
+
+    def test_alignment_stays_inside_the_sector(self):
+        # 8-byte alignment would start the region in sector 0
+        layout = FlashLayout(BASE, [1028] * 4)
+        plan = plan_writes(image((1030, b"\xAA" * 4)), layout, write_size=8)
+        self.assertEqual(plan.regions[0][0], BASE + 1028)
+
+    def test_small_gap_across_sectors_keeps_one_region(self):
+        data = b"\x01" * 1024 + b"\xFF" * 100 + b"\x02" * 100
+        plan = plan_writes(image((0, data)), self.layout, write_size=2)
+        self.assertEqual(plan.regions, [(BASE, data)])
+
+    def test_large_gap_across_sectors_splits(self):
+        data = b"\x01" * 1024 + b"\xFF" * 300 + b"\x02" * 100
+        plan = plan_writes(image((0, data)), self.layout, write_size=2)
+        self.assertEqual(plan.regions, [(BASE, b"\x01" * 1024),
+                                        (BASE + 1324, b"\x02" * 100)])
+
+    def test_segment_gap_within_a_sector_is_not_split(self):
+        plan = plan_writes(image((0, b"\x01" * 16), (512, b"\x02" * 16)),
+                           self.layout, write_size=2)
+        self.assertEqual(len(plan.regions), 1)
+        self.assertEqual(plan.regions[0][1], b"\x01" * 16 + b"\xFF" * 496 + b"\x02" * 16)
+
+
+if __name__ == "__main__":
+    unittest.main()